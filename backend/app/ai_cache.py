@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""İçerik adresli AI analiz önbelleği.
+
+Anahtar, (sağlayıcı, model, prompt sürümü, analiz tipi, normalize girdi) üçlüsünün
+sha256 özetidir; veri değişmediği sürece aynı analiz için LLM tekrar çağrılmaz.
+Katmanlar: Redis (TTL ile) → ai_analysis_cache tablosu → mevcut sonuçlar
+(ScheduledReportLog.ai_analysis ve JobStatus.result_text, ai_cache_key ile).
+PostgreSQL'den gelen isabetler Redis'e geri yazılır.
+"""
+
+import hashlib
+import json
+import logging
+import math
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app import config
+from app.cache import get_redis_client
+from app.models import AIAnalysisCache, JobStatus, ScheduledReportLog
+
+logger = logging.getLogger(__name__)
+
+AI_CACHE_PREFIX = "ai_analysis"
+
+# Bu ifadelerle başlayan yanıtlar sağlayıcı hatasıdır, önbelleğe alınmaz
+_ERROR_PREFIXES = ("Hata", "AI analizi oluşturulamadı")
+
+
+def normalize_payload(value: Any) -> Any:
+    """Girdiyi kanonik biçime getirir: anahtarlar sıralı, ondalıklar yuvarlanmış, tarihler ISO."""
+    if isinstance(value, dict):
+        return {str(k): normalize_payload(value[k]) for k in sorted(value, key=str)}
+    if isinstance(value, (list, tuple)):
+        return [normalize_payload(v) for v in value]
+    if isinstance(value, bool) or value is None or isinstance(value, int):
+        return value
+    if isinstance(value, (float, Decimal)):
+        value = float(value)
+        if math.isnan(value) or math.isinf(value):
+            return None
+        value = round(value, 6)
+        return int(value) if value.is_integer() else value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, str):
+        return value.strip()
+    return str(value)
+
+
+def analysis_key(kind: str, provider: str, model: str, prompt_version: str, payload: Any) -> str:
+    """Analizin içerik adresi (sha256 hex)."""
+    canonical = json.dumps(
+        [kind, provider, model, prompt_version, normalize_payload(payload)],
+        ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(text: Optional[str]) -> bool:
+    """Boş ve hata yanıtları önbelleğe alınmaz."""
+    return bool(text and text.strip()) and not text.lstrip().startswith(_ERROR_PREFIXES)
+
+
+def _redis_key(key: str) -> str:
+    return f"{AI_CACHE_PREFIX}:{key}"
+
+
+def _get_session_factory(session_factory=None):
+    if session_factory is not None:
+        return session_factory
+    from app.database import async_session_factory
+
+    return async_session_factory
+
+
+def _remember(key: str, text: str, ttl: int) -> None:
+    client = get_redis_client()
+    if not client or ttl <= 0:
+        return
+    try:
+        client.set(_redis_key(key), text.encode("utf-8"), ex=ttl)
+    except Exception as e:
+        logger.warning("AI önbelleği Redis'e yazılamadı: %s", e)
+
+
+async def _lookup_database(session, key: str, now: datetime, ttl: int) -> Optional[tuple[str, datetime]]:
+    """Tablo ve mevcut sonuçlar içinde anahtarı arar; (metin, son geçerlilik) döner."""
+    row = (await session.execute(
+        select(AIAnalysisCache.result_text, AIAnalysisCache.expires_at)
+        .where(AIAnalysisCache.cache_key == key, AIAnalysisCache.expires_at > now)
+    )).first()
+    if row:
+        return row.result_text, row.expires_at
+
+    since = now - timedelta(seconds=ttl)
+    log = (await session.execute(
+        select(ScheduledReportLog.ai_analysis, ScheduledReportLog.completed_at)
+        .where(
+            ScheduledReportLog.ai_cache_key == key,
+            ScheduledReportLog.status == "success",
+            ScheduledReportLog.ai_analysis.is_not(None),
+            ScheduledReportLog.completed_at >= since,
+        )
+        .order_by(ScheduledReportLog.completed_at.desc())
+        .limit(1)
+    )).first()
+    if log and is_cacheable(log.ai_analysis):
+        return log.ai_analysis, log.completed_at + timedelta(seconds=ttl)
+
+    job = (await session.execute(
+        select(JobStatus.result_text, JobStatus.updated_at)
+        .where(
+            JobStatus.ai_cache_key == key,
+            JobStatus.status == "completed",
+            JobStatus.result_text.is_not(None),
+            JobStatus.updated_at >= since,
+        )
+        .order_by(JobStatus.updated_at.desc())
+        .limit(1)
+    )).first()
+    if job and is_cacheable(job.result_text):
+        return job.result_text, job.updated_at + timedelta(seconds=ttl)
+    return None
+
+
+async def get_cached_analysis(key: str, session_factory=None) -> Optional[str]:
+    """Önbellekteki analizi döner; yoksa None."""
+    ttl = config.AI_CACHE_TTL_SECONDS
+    if ttl <= 0:
+        return None
+
+    client = get_redis_client()
+    if client:
+        try:
+            cached = client.get(_redis_key(key))
+            if cached is not None:
+                return cached.decode("utf-8") if isinstance(cached, bytes) else cached
+        except Exception as e:
+            logger.warning("AI önbelleği Redis'ten okunamadı: %s", e)
+
+    session_factory = _get_session_factory(session_factory)
+    if not session_factory:
+        return None
+    now = datetime.utcnow()
+    try:
+        async with session_factory() as session:
+            found = await _lookup_database(session, key, now, ttl)
+    except Exception as e:
+        logger.warning("AI önbelleği veritabanından okunamadı: %s", e)
+        return None
+    if not found:
+        return None
+    text, expires_at = found
+    remaining = int((expires_at.replace(tzinfo=None) - now).total_seconds())
+    _remember(key, text, remaining)
+    return text
+
+
+async def store_analysis(
+    key: str,
+    text: str,
+    *,
+    kind: str,
+    provider: str,
+    model: str,
+    persist: bool = True,
+    session_factory=None,
+) -> None:
+    """Analizi Redis'e ve (persist=True ise) ai_analysis_cache tablosuna yazar.
+
+    persist=False, sonucu zaten kendi tablosunda (ör. JobStatus.result_text) saklanan analizler içindir.
+    """
+    ttl = config.AI_CACHE_TTL_SECONDS
+    if ttl <= 0 or not is_cacheable(text):
+        return
+    _remember(key, text, ttl)
+    if not persist:
+        return
+
+    session_factory = _get_session_factory(session_factory)
+    if not session_factory:
+        return
+    now = datetime.utcnow()
+    values = {
+        "cache_key": key,
+        "kind": kind,
+        "provider": provider,
+        "model": model,
+        "result_text": text,
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=ttl),
+    }
+    stmt = pg_insert(AIAnalysisCache).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AIAnalysisCache.cache_key],
+        set_={k: stmt.excluded[k] for k in ("result_text", "created_at", "expires_at")},
+    )
+    try:
+        async with session_factory() as session:
+            await session.execute(stmt)
+            # Süresi dolan kayıtlar yazma sırasında temizlenir (expires_at indeksli)
+            await session.execute(delete(AIAnalysisCache).where(AIAnalysisCache.expires_at <= now))
+            await session.commit()
+    except Exception as e:
+        logger.warning("AI önbelleği veritabanına yazılamadı: %s", e)
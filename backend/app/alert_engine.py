@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""Vektörel uyarı kuralı değerlendirme motoru.
+
+Tüm aktif AlertRule'lar ve hesap bazlı kampanya metrikleri sütunsal numpy
+dizilerine çevrilir; her hesap için kurallar × kampanyalar matrisi tek seferde
+değerlendirilir (lt, gt ve önceki snapshot'a göre change_pct). Bellek kullanımı
+kural blokları (RULE_CHUNK) ile sınırlandırılır.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Mapping, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from app.models import AlertMetricSnapshot
+
+ALERT_METRICS = ("ctr", "roas", "spend", "cpc", "cpm", "impressions", "clicks", "frequency")
+METRIC_INDEX = {m: i for i, m in enumerate(ALERT_METRICS)}
+
+COND_LT = 0
+COND_GT = 1
+COND_CHANGE_PCT = 2
+CONDITION_CODES = {"lt": COND_LT, "gt": COND_GT, "change_pct": COND_CHANGE_PCT}
+
+# Aynı anda değerlendirilen kural satırı sayısı (kural × kampanya matrisinin bellek sınırı)
+RULE_CHUNK = 512
+
+
+def account_key(account_id: Optional[str]) -> str:
+    """Kural/kampanya gruplaması için hesap anahtarı (hesap belirtilmemişse varsayılan hesap)."""
+    return account_id or "default"
+
+
+@dataclass
+class CampaignFrame:
+    """Bir hesabın kampanya metrikleri: values[metrik, kampanya] (eksik değerler NaN)."""
+    account_key: str
+    campaign_ids: list[str]
+    names: list[str]
+    values: np.ndarray
+
+    @classmethod
+    def from_campaigns(cls, key: str, campaigns: Sequence[Mapping[str, Any]]) -> "CampaignFrame":
+        if not campaigns:
+            return cls(key, [], [], np.empty((len(ALERT_METRICS), 0)))
+        df = pd.DataFrame.from_records(list(campaigns), columns=["id", "name", *ALERT_METRICS])
+        values = df[list(ALERT_METRICS)].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float).T
+        ids = ["" if v is None or v != v else str(v) for v in df["id"].tolist()]
+        names = [n if isinstance(n, str) and n else "Bilinmeyen Kampanya" for n in df["name"].tolist()]
+        return cls(key, ids, names, np.ascontiguousarray(values))
+
+    def to_snapshot(self) -> dict:
+        """change_pct karşılaştırması için saklanacak sütunsal snapshot."""
+        return {
+            "campaign_ids": self.campaign_ids,
+            "metrics": {
+                m: [None if np.isnan(v) else float(v) for v in self.values[i]]
+                for i, m in enumerate(ALERT_METRICS)
+            },
+        }
+
+    def align_previous(self, snapshot: Optional[Mapping[str, Any]]) -> Optional[np.ndarray]:
+        """Önceki snapshot değerlerini mevcut kampanya sırasına hizalar (eşleşmeyen = NaN)."""
+        if not snapshot or not snapshot.get("campaign_ids"):
+            return None
+        prev_ids = snapshot["campaign_ids"]
+        prev_pos = {cid: i for i, cid in enumerate(prev_ids)}
+        idx = np.fromiter((prev_pos.get(cid, -1) for cid in self.campaign_ids), dtype=np.int64, count=len(self.campaign_ids))
+        found = idx >= 0
+        prev_metrics = snapshot.get("metrics") or {}
+        out = np.full(self.values.shape, np.nan)
+        for i, m in enumerate(ALERT_METRICS):
+            column = prev_metrics.get(m)
+            if not column or len(column) != len(prev_ids):
+                continue
+            arr = np.array([np.nan if v is None else v for v in column], dtype=float)
+            out[i, found] = arr[idx[found]]
+        return out
+
+
+@dataclass
+class RuleFrame:
+    """Bir hesabın kuralları sütunsal biçimde."""
+    rules: list[Any]
+    metric_idx: np.ndarray
+    condition: np.ndarray
+    threshold: np.ndarray
+    eligible: np.ndarray
+
+    @classmethod
+    def from_rules(cls, rules: Sequence[Any], now: datetime, ignore_cooldown: bool = False) -> "RuleFrame":
+        n = len(rules)
+        metric_idx = np.zeros(n, dtype=np.int64)
+        condition = np.full(n, -1, dtype=np.int8)
+        threshold = np.zeros(n, dtype=float)
+        eligible = np.zeros(n, dtype=bool)
+        for i, rule in enumerate(rules):
+            m = METRIC_INDEX.get(rule.metric)
+            c = CONDITION_CODES.get(rule.condition)
+            if m is None or c is None:
+                continue
+            metric_idx[i] = m
+            condition[i] = c
+            threshold[i] = float(rule.threshold)
+            eligible[i] = ignore_cooldown or not _in_cooldown(rule, now)
+        return cls(list(rules), metric_idx, condition, threshold, eligible)
+
+
+@dataclass
+class RuleMatch:
+    """Tetiklenen kural ve kampanya."""
+    rule: Any
+    account_key: str
+    campaign_id: str
+    campaign_name: str
+    metric: str
+    condition: str
+    threshold: float
+    actual_value: float
+    previous_value: Optional[float] = None
+    change_pct: Optional[float] = None
+
+
+def _in_cooldown(rule: Any, now: datetime) -> bool:
+    if rule.last_triggered and rule.cooldown_minutes:
+        last = rule.last_triggered
+        if last.tzinfo is not None and now.tzinfo is None:
+            last = last.replace(tzinfo=None)
+        return now < last + timedelta(minutes=rule.cooldown_minutes)
+    return False
+
+
+def evaluate_account(
+    rules: RuleFrame,
+    campaigns: CampaignFrame,
+    previous: Optional[np.ndarray] = None,
+    first_only: bool = True,
+) -> list[RuleMatch]:
+    """Bir hesabın tüm kurallarını tüm kampanyalarına karşı tek seferde değerlendirir.
+
+    first_only=True iken her kural için ilk eşleşen kampanya döner (spam önlemi).
+    """
+    n_rules = len(rules.rules)
+    if n_rules == 0 or not campaigns.campaign_ids:
+        return []
+    matches: list[RuleMatch] = []
+    for start in range(0, n_rules, RULE_CHUNK):
+        sl = slice(start, start + RULE_CHUNK)
+        metric_idx = rules.metric_idx[sl]
+        cond = rules.condition[sl][:, None]
+        thr = rules.threshold[sl][:, None]
+        current = campaigns.values[metric_idx]
+
+        # NaN karşılaştırmaları False döner; eksik metrikler tetiklemez
+        with np.errstate(invalid="ignore", divide="ignore"):
+            hit = ((cond == COND_LT) & (current < thr)) | ((cond == COND_GT) & (current > thr))
+            pct = None
+            if previous is not None and (cond == COND_CHANGE_PCT).any():
+                prev = previous[metric_idx]
+                pct = (current - prev) / np.abs(prev) * 100.0
+                hit |= (cond == COND_CHANGE_PCT) & np.isfinite(pct) & (np.abs(pct) >= thr)
+        hit &= rules.eligible[sl][:, None]
+
+        if first_only:
+            rows = np.flatnonzero(hit.any(axis=1))
+            cols = hit[rows].argmax(axis=1)
+        else:
+            rows, cols = np.nonzero(hit)
+
+        for r, c in zip(rows.tolist(), cols.tolist()):
+            rule = rules.rules[start + r]
+            metric = ALERT_METRICS[metric_idx[r]]
+            is_change = rules.condition[start + r] == COND_CHANGE_PCT
+            matches.append(RuleMatch(
+                rule=rule,
+                account_key=campaigns.account_key,
+                campaign_id=campaigns.campaign_ids[c],
+                campaign_name=campaigns.names[c],
+                metric=metric,
+                condition=rule.condition,
+                threshold=float(rules.threshold[start + r]),
+                actual_value=float(current[r, c]),
+                previous_value=float(prev[r, c]) if is_change else None,
+                change_pct=float(pct[r, c]) if is_change else None,
+            ))
+    return matches
+
+
+def evaluate_rules(
+    rules: Iterable[Any],
+    campaigns_by_account: Mapping[str, Union[CampaignFrame, Sequence[Mapping[str, Any]]]],
+    previous_by_account: Optional[Mapping[str, Mapping[str, Any]]] = None,
+    now: Optional[datetime] = None,
+    first_only: bool = True,
+    ignore_cooldown: bool = False,
+) -> list[RuleMatch]:
+    """Tüm kuralları hesaplarına göre gruplayıp değerlendirir ve eşleşmeleri döner.
+
+    campaigns_by_account: account_key -> kampanya listesi (dict) veya CampaignFrame.
+    previous_by_account: account_key -> CampaignFrame.to_snapshot() çıktısı (change_pct için).
+    Kampanyası olmayan hesapların kuralları atlanır; ignore_cooldown manuel testler içindir.
+    """
+    now = now or datetime.utcnow()
+    previous_by_account = previous_by_account or {}
+    grouped: dict[str, list[Any]] = {}
+    for rule in rules:
+        grouped.setdefault(account_key(rule.ad_account_id), []).append(rule)
+
+    matches: list[RuleMatch] = []
+    for key, account_rules in grouped.items():
+        campaigns = campaigns_by_account.get(key)
+        if campaigns is None:
+            continue
+        frame = campaigns if isinstance(campaigns, CampaignFrame) else CampaignFrame.from_campaigns(key, campaigns)
+        previous = frame.align_previous(previous_by_account.get(key))
+        matches.extend(evaluate_account(RuleFrame.from_rules(account_rules, now, ignore_cooldown), frame, previous, first_only))
+    return matches
+
+
+async def load_snapshots(session, keys: Iterable[str]) -> dict[str, dict]:
+    """Hesapların önceki metrik snapshot'larını okur."""
+    keys = list(keys)
+    if not keys:
+        return {}
+    result = await session.execute(select(AlertMetricSnapshot).where(AlertMetricSnapshot.account_key.in_(keys)))
+    return {row.account_key: row.data for row in result.scalars().all()}
+
+
+def merge_snapshot(existing: Optional[Mapping[str, Any]], frame: CampaignFrame) -> dict:
+    """Kısmi (hedefli) bir değerlendirmenin metriklerini mevcut snapshot'a işler.
+
+    Frame'deki kampanyalar güncellenir/eklenir, diğer kampanyaların değerleri korunur.
+    """
+    if not existing or not existing.get("campaign_ids"):
+        return frame.to_snapshot()
+    ids = list(existing["campaign_ids"])
+    old_metrics = existing.get("metrics") or {}
+    metrics = {}
+    for m in ALERT_METRICS:
+        column = old_metrics.get(m)
+        metrics[m] = list(column) if column and len(column) == len(ids) else [None] * len(ids)
+    pos = {cid: i for i, cid in enumerate(ids)}
+    new_metrics = frame.to_snapshot()["metrics"]
+    for j, cid in enumerate(frame.campaign_ids):
+        i = pos.get(cid)
+        if i is None:
+            i = pos[cid] = len(ids)
+            ids.append(cid)
+            for m in ALERT_METRICS:
+                metrics[m].append(None)
+        for m in ALERT_METRICS:
+            metrics[m][i] = new_metrics[m][j]
+    return {"campaign_ids": ids, "metrics": metrics}
+
+
+async def save_snapshots(session, frames: Iterable[CampaignFrame], merge: bool = False) -> None:
+    """Mevcut metrikleri bir sonraki change_pct karşılaştırması için saklar (commit çağırana ait).
+
+    merge=True iken frame yalnızca bazı kampanyaları içerir ve mevcut snapshot'a işlenir.
+    """
+    now = datetime.utcnow()
+    for frame in frames:
+        existing = await session.get(AlertMetricSnapshot, frame.account_key)
+        if existing is None:
+            session.add(AlertMetricSnapshot(account_key=frame.account_key, data=frame.to_snapshot(), captured_at=now))
+        else:
+            existing.data = merge_snapshot(existing.data, frame) if merge else frame.to_snapshot()
+            existing.captured_at = now
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Meta webhook değişikliklerinden hedefli, debounce'lu uyarı kontrolü.
+
+Webhook ile gelen kampanya değişiklikleri hesap bazında bir Redis set'inde biriktirilir.
+Hesap için ilk değişiklik geldiğinde ALERT_REEVAL_DEBOUNCE_SECONDS gecikmeli tek bir
+Celery task'ı planlanır; task çalıştığında biriken kampanya id'lerini alır ve yalnızca
+o kampanyalar için kuralları değerlendirir. Böylece ardışık webhook'lar tek bir Meta
+çağrısında toplanır. Redis yoksa task gecikmesiz ve id'lerle birlikte kuyruğa alınır.
+"""
+
+import logging
+from typing import Any, Callable, Iterable, Optional
+
+from app import config
+from app.cache import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+ALERT_REEVAL_PENDING_PREFIX = "alert_reeval:pending"
+ALERT_REEVAL_SCHEDULED_PREFIX = "alert_reeval:scheduled"
+# Task kaybolursa (worker çökmesi) debounce kilidi bu ek süre sonunda kendiliğinden düşer
+ALERT_REEVAL_LOCK_GRACE_SECONDS = 300
+ALERT_REEVAL_PENDING_TTL = 60 * 60
+
+# (account_id, campaign_ids, countdown) -> task'ı kuyruğa alır
+Enqueue = Callable[[Optional[str], list[str], int], Any]
+
+
+def _account_token(account_id: Optional[str]) -> str:
+    return account_id or "default"
+
+
+def pending_key(account_id: Optional[str]) -> str:
+    return f"{ALERT_REEVAL_PENDING_PREFIX}:{_account_token(account_id)}"
+
+
+def scheduled_key(account_id: Optional[str]) -> str:
+    return f"{ALERT_REEVAL_SCHEDULED_PREFIX}:{_account_token(account_id)}"
+
+
+def _normalize_account(account_id: Any) -> Optional[str]:
+    if not account_id:
+        return None
+    account_id = str(account_id)
+    return account_id if account_id.startswith("act_") else f"act_{account_id}"
+
+
+def extract_changed_campaigns(events: Iterable[dict]) -> dict[Optional[str], set[str]]:
+    """Webhook olaylarından hesap -> değişen kampanya id'leri çıkarır.
+
+    Olay: {"object_id": entry id, "value": change.value, ...} (webhooks router'ının ürettiği biçim).
+    Hesap: entry id (act_...) veya value.account_id; bulunamazsa None (varsayılan hesap).
+    Kampanya: value.campaign_id veya campaign_ öneki taşıyan entry id.
+    """
+    changed: dict[Optional[str], set[str]] = {}
+    for event in events:
+        object_id = str(event.get("object_id") or "")
+        value = event.get("value")
+        if not isinstance(value, dict):
+            value = {}
+        campaign_id = value.get("campaign_id")
+        if not campaign_id and object_id.startswith("campaign_"):
+            campaign_id = object_id[len("campaign_"):]
+        if not campaign_id:
+            continue
+        account = _normalize_account(value.get("account_id")) or (object_id if object_id.startswith("act_") else None)
+        changed.setdefault(account, set()).add(str(campaign_id))
+    return changed
+
+
+def _default_enqueue(account_id: Optional[str], campaign_ids: list[str], countdown: int) -> None:
+    from app.tasks import reevaluate_campaign_alerts_task
+
+    reevaluate_campaign_alerts_task.apply_async(args=[account_id, campaign_ids], countdown=countdown)
+
+
+def schedule_reevaluation(
+    account_id: Optional[str],
+    campaign_ids: Iterable[str],
+    enqueue: Optional[Enqueue] = None,
+) -> bool:
+    """Kampanyaları bekleyen kümeye ekler; hesap için planlı task yoksa yenisini planlar.
+
+    Dönüş: Yeni bir task kuyruğa alındıysa True (debounce penceresindeyse False).
+    """
+    ids = sorted({str(cid) for cid in campaign_ids if cid})
+    if not ids:
+        return False
+    enqueue = enqueue or _default_enqueue
+    debounce = config.ALERT_REEVAL_DEBOUNCE_SECONDS
+
+    client = get_redis_client()
+    if not client:
+        enqueue(account_id, ids, 0)
+        return True
+    try:
+        pipe = client.pipeline(transaction=True)
+        pipe.sadd(pending_key(account_id), *ids)
+        pipe.expire(pending_key(account_id), ALERT_REEVAL_PENDING_TTL)
+        pipe.set(scheduled_key(account_id), "1", nx=True, ex=debounce + ALERT_REEVAL_LOCK_GRACE_SECONDS)
+        _, _, lock_acquired = pipe.execute()
+    except Exception as e:
+        logger.warning("Uyarı yeniden değerlendirme kuyruğu yazılamadı (account=%s): %s", account_id, e)
+        enqueue(account_id, ids, 0)
+        return True
+
+    if not lock_acquired:
+        return False
+    enqueue(account_id, [], debounce)
+    return True
+
+
+def drain_pending_campaigns(account_id: Optional[str]) -> list[str]:
+    """Hesap için biriken kampanya id'lerini alıp kümeyi ve debounce kilidini temizler.
+
+    Kilit önce silinir; bu andan sonra gelen webhook'lar yeni bir task planlar.
+    """
+    client = get_redis_client()
+    if not client:
+        return []
+    try:
+        pipe = client.pipeline(transaction=True)
+        pipe.delete(scheduled_key(account_id))
+        pipe.smembers(pending_key(account_id))
+        pipe.delete(pending_key(account_id))
+        _, members, _ = pipe.execute()
+    except Exception as e:
+        logger.warning("Bekleyen kampanyalar okunamadı (account=%s): %s", account_id, e)
+        return []
+    return sorted(m.decode() if isinstance(m, bytes) else str(m) for m in members or ())
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Geçmiş analiz dersleri: analiz işi tamamlanırken bir kez çıkarılır ve analysis_lessons tablosuna yazılır.
+
+Dersler hesap (ad_account_id) ve rapor bölümü (template_id) ile etiketlenir. Stratejist özeti,
+seçilen işlerin en öncelikli derslerini büyük result_text metinlerini yeniden taramadan tek
+indeksli sorguyla alır. Tablo eklenmeden önce tamamlanmış işler (lesson_count boş) ilk
+kullanımda bir kez taranıp tabloya yazılır.
+"""
+
+import logging
+from typing import Optional, Sequence
+
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import AnalysisLesson, JobStatus
+from app.report_templates import REPORT_TEMPLATES
+from app.saved_reports import get_saved_report_by_id_optional
+from app.services.strategy_service import extract_lessons_from_analysis
+
+logger = logging.getLogger(__name__)
+
+# Stratejist prompt'una eklenecek en fazla ders ve sorgulanacak en fazla iş
+MAX_LESSONS = 20
+MAX_JOBS = 10
+_MAX_LESSON_CHARS = 500
+
+# _run_analyze bölümleri bu ayraçla birleştirir; her bölüm "## <şablon başlığı>" ile başlar
+_SECTION_SEPARATOR = "\n\n---\n\n"
+
+
+def template_titles(template_ids: Sequence[str]) -> dict[str, str]:
+    """Şablon başlığı -> şablon id (bölüm başlıklarından etiket bulmak için)."""
+    wanted = set(template_ids)
+    return {t["title"]: t["id"] for t in REPORT_TEMPLATES if t["id"] in wanted}
+
+
+def extract_job_lessons(result_text: str, titles: Optional[dict[str, str]] = None) -> list[tuple[Optional[str], str]]:
+    """Analiz metnini rapor bölümlerine ayırıp (şablon_id, ders) listesi döner; tekrarlanan dersler atlanır."""
+    titles = titles or {}
+    lessons: list[tuple[Optional[str], str]] = []
+    seen: set[str] = set()
+    for part in (result_text or "").split(_SECTION_SEPARATOR):
+        heading = part.lstrip().split("\n", 1)[0]
+        template_id = titles.get(heading[3:].strip()) if heading.startswith("## ") else None
+        for lesson in extract_lessons_from_analysis(part):
+            lesson = lesson[:_MAX_LESSON_CHARS]
+            if lesson and lesson not in seen:
+                seen.add(lesson)
+                lessons.append((template_id, lesson))
+    return lessons
+
+
+async def replace_job_lessons(
+    session: AsyncSession,
+    job_id: str,
+    ad_account_id: Optional[str],
+    lessons: list[tuple[Optional[str], str]],
+) -> None:
+    """İşin derslerini yazar (varsa öncekilerin yerine) ve JobStatus.lesson_count'u günceller; commit çağırana aittir."""
+    await session.execute(delete(AnalysisLesson).where(AnalysisLesson.job_id == job_id))
+    session.add_all(
+        AnalysisLesson(job_id=job_id, ad_account_id=ad_account_id, template_id=template_id, position=i, text=text)
+        for i, (template_id, text) in enumerate(lessons)
+    )
+    await session.execute(update(JobStatus).where(JobStatus.id == job_id).values(lesson_count=len(lessons)))
+
+
+async def _backfill_lessons(session: AsyncSession, job_ids: list[str]) -> None:
+    """lesson_count'u boş (tablodan önce tamamlanmış) işlerin derslerini bir kez çıkarıp yazar."""
+    result = await session.execute(
+        select(JobStatus)
+        .where(JobStatus.id.in_(job_ids))
+        .where(JobStatus.job_type == "analyze")
+        .where(JobStatus.status == "completed")
+        .where(JobStatus.lesson_count.is_(None))
+    )
+    rows = result.scalars().all()
+    for row in rows:
+        saved = await get_saved_report_by_id_optional(session, row.report_id) or {}
+        titles = template_titles(saved.get("template_ids") or [])
+        await replace_job_lessons(session, row.id, saved.get("ad_account_id"), extract_job_lessons(row.result_text, titles))
+    if rows:
+        await session.commit()
+
+
+async def get_top_lessons(session: AsyncSession, job_ids: Sequence[str], limit: int = MAX_LESSONS) -> list[str]:
+    """Seçilen tamamlanmış analiz işlerinin en öncelikli dersleri.
+
+    Sıralama önce iş içindeki sıraya (position), sonra işlerin verildiği sıraya göredir; böylece
+    her işin ilk önerileri diğer işlerin sonraki maddelerinden önce gelir.
+    """
+    job_ids = list(dict.fromkeys(job_ids))[:MAX_JOBS]
+    if not job_ids:
+        return []
+    try:
+        await _backfill_lessons(session, job_ids)
+    except Exception as e:
+        await session.rollback()
+        logger.warning("Eski analiz dersleri çıkarılamadı: %s", e)
+
+    job_order = case({job_id: i for i, job_id in enumerate(job_ids)}, value=AnalysisLesson.job_id)
+    result = await session.execute(
+        select(AnalysisLesson.text)
+        .join(JobStatus, JobStatus.id == AnalysisLesson.job_id)
+        .where(AnalysisLesson.job_id.in_(job_ids))
+        .where(JobStatus.status == "completed")
+        .order_by(AnalysisLesson.position, job_order)
+        .limit(limit * 2)
+    )
+    # Farklı işlerde aynı ders tekrar edebilir
+    return list(dict.fromkeys(result.scalars().all()))[:limit]
@@ -9,6 +9,9 @@ from typing import Any, Optional, Callable
 import redis
 from app import config
 
+# Gönderime hazır JSON yanıtlarının anahtar öneki (bkz. app.http_cache.cached_json_response)
+RESPONSE_CACHE_PREFIX = "api_response"
+
 # Redis client (lazy initialization)
 _redis_client: Optional[redis.Redis] = None
 
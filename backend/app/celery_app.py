@@ -19,12 +19,19 @@ app.conf.update(
     task_acks_late=True,
     task_track_started=True,
     beat_schedule={
-        # Akıllı uyarı sistemi - Her 15 dakikada bir çalışır
+        # Akıllı uyarı sistemi - Her 15 dakikada bir tam tarama
+        # (webhook değişiklikleri ayrıca reevaluate_campaign_alerts ile hedefli kontrol planlar)
         "check-alert-rules": {
-            "task": "app.tasks.check_alert_rules_task",
+            "task": "app.tasks.check_alert_rules",
             "schedule": 900.0,  # 15 dakika
             "options": {"expires": 600},
         },
+        # Bildirim outbox'ı - bekleyen/yeniden denenecek bildirimleri teslim et
+        "dispatch-notifications": {
+            "task": "app.tasks.dispatch_notifications",
+            "schedule": 60.0,  # 1 dakika
+            "options": {"expires": 50},
+        },
         # Zamanlanmış raporlar - Her dakika kontrol et
         "check-scheduled-reports": {
             "task": "app.tasks.check_scheduled_reports_task",
@@ -21,6 +21,38 @@ CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:63
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CACHE_TTL = int(os.getenv("CACHE_TTL", "300"))  # 5 dakika varsayılan
 CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+# Dashboard yanıtları: bu boyutun (bayt) üzerindeki JSON gövdeleri gzip/brotli ile sıkıştırılır; 0 = her zaman
+RESPONSE_COMPRESSION_MIN_BYTES = max(0, int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024")))
+
+# AI analiz önbelleği: aynı sağlayıcı/model/prompt ve veriyle tekrar LLM çağrısı yapılmaz
+AI_CACHE_TTL_SECONDS = max(0, int(os.getenv("AI_CACHE_TTL_SECONDS", "21600")))  # 6 saat; 0 = kapalı
+
+# AI sağlayıcıları: sağlayıcı başına aynı anda yapılabilecek istek sayısı ve istek zaman aşımı
+AI_MAX_CONCURRENCY = max(1, int(os.getenv("AI_MAX_CONCURRENCY", "4")))
+AI_REQUEST_TIMEOUT_SECONDS = max(5.0, float(os.getenv("AI_REQUEST_TIMEOUT_SECONDS", "120")))
+# Prompt'a eklenen veri tablosu için token bütçesi (aşılırsa özet + uç değerler + örneklem gönderilir)
+AI_PROMPT_DATA_TOKENS = max(500, int(os.getenv("AI_PROMPT_DATA_TOKENS", "6000")))
+# Hedging: birincil sağlayıcı p95 gecikmesi içinde yanıt vermezse yedek sağlayıcı da başlatılır.
+# Yeterli ölçüm yokken AI_HEDGE_DEFAULT_DELAY_SECONDS beklenir; AI_HARD_DEADLINE_SECONDS sonunda kural tabanlı analiz döner.
+AI_HEDGE_ENABLED = os.getenv("AI_HEDGE_ENABLED", "true").lower() == "true"
+AI_HEDGE_DEFAULT_DELAY_SECONDS = max(1.0, float(os.getenv("AI_HEDGE_DEFAULT_DELAY_SECONDS", "30")))
+AI_HARD_DEADLINE_SECONDS = max(5.0, float(os.getenv("AI_HARD_DEADLINE_SECONDS", "150")))
+
+# PDF çizimi: süreç başına aynı anda çizilecek en fazla PDF (thread havuzu boyutu)
+PDF_RENDER_WORKERS = max(1, int(os.getenv("PDF_RENDER_WORKERS", "2")))
+
+# Stratejist yüklemesi: açılmış (gzip sonrası) veri için üst sınır (MB); parçalar halinde okunur
+STRATEGY_UPLOAD_MAX_MB = max(1, int(os.getenv("STRATEGY_UPLOAD_MAX_MB", "200")))
+STRATEGY_UPLOAD_MAX_BYTES = STRATEGY_UPLOAD_MAX_MB * 1024 * 1024
+
+# Meta API: aynı anda çalışabilecek paralel veri çekme işi (rate limit bütçesi)
+META_MAX_CONCURRENCY = max(1, int(os.getenv("META_MAX_CONCURRENCY", "3")))
+
+# Webhook kaynaklı hedefli uyarı kontrolü: aynı hesaptaki değişiklikler bu süre boyunca biriktirilir
+ALERT_REEVAL_DEBOUNCE_SECONDS = max(0, int(os.getenv("ALERT_REEVAL_DEBOUNCE_SECONDS", "30")))
+
+# Webhook olay günlüğü (Redis Stream) için yaklaşık üst sınır (XADD MAXLEN ~)
+WEBHOOK_EVENTS_MAXLEN = max(100, int(os.getenv("WEBHOOK_EVENTS_MAXLEN", "10000")))
 
 # CORS origins - virgülle ayrılmış liste, boşluklar strip edilir
 _cors_origins_raw = os.getenv(
@@ -4,6 +4,7 @@
 import logging
 from typing import AsyncGenerator, Optional
 
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.pool import NullPool
 
@@ -81,6 +82,19 @@ async def get_db_session_optional() -> AsyncGenerator[Optional[AsyncSession], No
             await session.close()
 
 
+# create_all mevcut tablolara sonradan eklenen kolon/index'leri oluşturmaz; idempotent tamamlama
+_SCHEMA_UPGRADES = (
+    "CREATE INDEX IF NOT EXISTS ix_scheduled_reports_active_next_run ON scheduled_reports (is_active, next_run_at)",
+    "ALTER TABLE scheduled_report_logs ADD COLUMN IF NOT EXISTS run_key VARCHAR(96)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS scheduled_report_logs_run_key_key ON scheduled_report_logs (run_key)",
+    "ALTER TABLE scheduled_report_logs ADD COLUMN IF NOT EXISTS ai_cache_key VARCHAR(64)",
+    "CREATE INDEX IF NOT EXISTS ix_scheduled_report_logs_ai_cache_key ON scheduled_report_logs (ai_cache_key)",
+    "ALTER TABLE job_status ADD COLUMN IF NOT EXISTS ai_cache_key VARCHAR(64)",
+    "CREATE INDEX IF NOT EXISTS ix_job_status_ai_cache_key ON job_status (ai_cache_key)",
+    "ALTER TABLE job_status ADD COLUMN IF NOT EXISTS lesson_count INTEGER",
+)
+
+
 async def init_db() -> None:
     """Tüm tabloları oluşturur. Uygulama başlarken çağrılır."""
     if not engine:
@@ -88,6 +102,8 @@ async def init_db() -> None:
     try:
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            for statement in _SCHEMA_UPGRADES:
+                await conn.execute(text(statement))
         logger.info("PostgreSQL tabloları hazır.")
     except Exception as e:
         logger.exception("PostgreSQL init_db hatası: %s", e)
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""Varlık listeleri (kampanya / reklam seti / reklam) için sunucu tarafı sayfalama, sıralama ve alan seçimi.
+
+Liste, cached_json_response'un Redis'te tuttuğu hazır JSON'dan bir kez çözülüp süreç içinde
+anlık görüntü (EntitySnapshot) olarak saklanır. Sıralama düzenleri (indeks listesi + id → konum)
+görüntü başına alan/yön için bir kez hesaplanır; sonraki sayfalar yalnızca dilimleme yapar.
+Görüntünün güncelliği Redis değerinin başındaki ETag okunarak (GETRANGE) doğrulanır, böylece
+webhook sonrası temizlenen veya yenilenen liste tüm worker'larda yeniden yüklenir.
+
+İmleç (cursor) son gönderilen varlığın id'si ve sıradaki konumu taşır; liste arada değişse de
+sayfa o varlıktan sonra devam eder (varlık silindiyse konuma düşülür).
+"""
+
+import base64
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+import orjson
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+from app import config
+from app.cache import get_redis_client
+from app.http_cache import (
+    cached_json_response,
+    encode_json,
+    etag_for,
+    json_response,
+    response_cache_key,
+    store_cached_body,
+)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Süreç içinde tutulacak en fazla anlık görüntü (hesap × gün × uç nokta)
+MAX_SNAPSHOTS = 32
+
+# ETag: tırnaklı 32 hane; Redis değeri '"<özet>"\n<json>' ile başlar
+_ETAG_HEAD_BYTES = 35
+
+
+def _sort_key(value: Any) -> tuple:
+    """Karışık tipli Meta alanları için sıralama anahtarı: sayılar (sayısal metinler dahil), sonra metinler."""
+    if isinstance(value, (int, float)):
+        return (0, float(value))
+    if isinstance(value, str):
+        try:
+            return (0, float(value))
+        except ValueError:
+            return (1, value.casefold())
+    return (1, str(value).casefold())
+
+
+def _parse_sort(sort: Optional[str]) -> tuple[Optional[str], bool]:
+    """"spend" artan, "-spend" azalan; boşsa Meta'nın döndürdüğü sıra."""
+    if not sort or not sort.strip():
+        return None, False
+    sort = sort.strip()
+    return (sort[1:], True) if sort.startswith("-") else (sort, False)
+
+
+def encode_cursor(last_id: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([last_id, offset])).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        last_id, offset = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return str(last_id), max(0, int(offset))
+    except Exception:
+        raise ValueError("Geçersiz cursor.")
+
+
+class EntitySnapshot:
+    """Önbellekteki listenin çözülmüş hali ve alan/yön başına sıralama düzenleri."""
+
+    def __init__(self, rows: list[dict], etag: str, expires_at: float):
+        self.rows = rows
+        self.etag = etag
+        self.expires_at = expires_at
+        self._orders: dict[tuple[Optional[str], bool], tuple[list[int], dict[str, int]]] = {}
+
+    def order(self, field: Optional[str], descending: bool) -> tuple[list[int], dict[str, int]]:
+        """(sıralı satır indeksleri, id → sıradaki konum); görüntü başına bir kez hesaplanır."""
+        cached = self._orders.get((field, descending))
+        if cached is not None:
+            return cached
+        rows = self.rows
+        if field is None:
+            indexes = list(range(len(rows)))
+            if descending:
+                indexes.reverse()
+        else:
+            present = [i for i, row in enumerate(rows) if row.get(field) not in (None, "")]
+            keys = {i: _sort_key(rows[i][field]) for i in present}
+            # sorted kararlıdır; eşit değerlerde Meta sırası korunur, boş değerler her yönde sonda
+            indexes = sorted(present, key=keys.__getitem__, reverse=descending)
+            present_set = set(present)
+            indexes += [i for i in range(len(rows)) if i not in present_set]
+        positions = {str(rows[i].get("id")): pos for pos, i in enumerate(indexes)}
+        self._orders[(field, descending)] = (indexes, positions)
+        return indexes, positions
+
+    def page(
+        self,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        sort: Optional[str] = None,
+        fields: Optional[str] = None,
+    ) -> dict:
+        field, descending = _parse_sort(sort)
+        indexes, positions = self.order(field, descending)
+        start = 0
+        if cursor:
+            last_id, offset = decode_cursor(cursor)
+            start = positions[last_id] + 1 if last_id in positions else offset
+        selected = indexes[start: start + limit]
+
+        wanted = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+        if wanted:
+            if "id" not in wanted:
+                wanted.insert(0, "id")
+            data = [{f: self.rows[i][f] for f in wanted if f in self.rows[i]} for i in selected]
+        else:
+            data = [self.rows[i] for i in selected]
+
+        end = start + len(selected)
+        next_cursor = None
+        if selected and end < len(indexes):
+            next_cursor = encode_cursor(str(self.rows[selected[-1]].get("id")), end)
+        return {"data": data, "count": len(data), "total": len(self.rows), "next_cursor": next_cursor}
+
+
+_snapshots: "OrderedDict[str, EntitySnapshot]" = OrderedDict()
+
+
+def _remember(key: str, snapshot: EntitySnapshot) -> EntitySnapshot:
+    _snapshots[key] = snapshot
+    _snapshots.move_to_end(key)
+    while len(_snapshots) > MAX_SNAPSHOTS:
+        _snapshots.popitem(last=False)
+    return snapshot
+
+
+def clear_snapshots() -> None:
+    _snapshots.clear()
+
+
+async def get_snapshot(name: str, args: tuple, producer: Callable[[], Awaitable[Any]]) -> EntitySnapshot:
+    """Listenin anlık görüntüsü: süreçteki kopya Redis'teki ETag ile aynıysa o, değilse yeniden yüklenir."""
+    client = get_redis_client() if config.CACHE_ENABLED else None
+    key = response_cache_key(name, args)
+    snapshot = _snapshots.get(key)
+    ttl = config.CACHE_TTL
+    if client:
+        try:
+            head = client.getrange(key, 0, _ETAG_HEAD_BYTES)
+            if head:
+                etag = head.partition(b"\n")[0].decode("ascii")
+                if snapshot is not None and snapshot.etag == etag:
+                    return snapshot
+                cached = client.get(key)
+                if cached:
+                    etag, _, body = cached.partition(b"\n")
+                    rows = orjson.loads(body).get("data") or []
+                    return _remember(key, EntitySnapshot(rows, etag.decode("ascii"), time.monotonic() + ttl))
+        except Exception as e:
+            print(f"Cache read error: {e}")
+    elif snapshot is not None and snapshot.expires_at > time.monotonic():
+        return snapshot
+
+    payload = await producer()
+    body = encode_json(payload)
+    etag = etag_for(body)
+    store_cached_body(client, key, etag, body)
+    return _remember(key, EntitySnapshot(list(payload.get("data") or []), etag, time.monotonic() + ttl))
+
+
+async def entity_list_response(
+    request: Request,
+    name: str,
+    args: tuple,
+    producer: Callable[[], Awaitable[Any]],
+    *,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+    fields: Optional[str] = None,
+) -> Response:
+    """Parametre yoksa tam liste (hazır bayt yolu); limit/cursor/sort/fields varsa sunucu tarafı sayfa."""
+    if limit is None and not cursor and not sort and not fields:
+        return await cached_json_response(request, name, args, producer)
+    snapshot = await get_snapshot(name, args, producer)
+    try:
+        page = snapshot.page(limit=limit or DEFAULT_PAGE_SIZE, cursor=cursor, sort=sort, fields=fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response(request, page)
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""Dashboard uç noktaları için koşullu JSON yanıtları (ETag / If-None-Match → 304) ve sıkıştırma.
+
+Gövde bir kez JSON baytlarına çevrilir; ETag bu baytların sha256 özetidir (güçlü ETag). İstemcinin
+If-None-Match başlığı eşleşirse gövdesiz 304 döner, böylece değişmeyen veri için tekrarlanan
+dashboard sorguları neredeyse bant genişliği harcamaz. RESPONSE_COMPRESSION_MIN_BYTES üzerindeki
+gövdeler Accept-Encoding'e göre brotli (paket kuruluysa) veya gzip ile sıkıştırılır. Sıkıştırılmış
+temsil kendi ETag'ini taşır ("<özet>-br" / "<özet>-gzip"); karşılaştırmada bu ek yok sayılır.
+
+JSON orjson ile üretilir. cached_json_response yanıtı Redis'te gönderime hazır bayt olarak (ETag ile
+birlikte) saklar; önbellek isabetinde ne pickle çözme ne de yeniden JSON'a çevirme yapılır.
+"""
+
+import gzip
+import hashlib
+from typing import Any, Awaitable, Callable, Optional
+
+import orjson
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from app import config
+from app.cache import RESPONSE_CACHE_PREFIX, cache_key, get_redis_client
+
+try:
+    import brotli
+except ImportError:  # brotli opsiyonel; yoksa yalnızca gzip
+    brotli = None
+
+CACHE_CONTROL = "private, no-cache"
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _default(value: Any) -> Any:
+    """orjson'un doğrudan tanımadığı tipler (Decimal, pydantic modelleri vb.) için FastAPI dönüşümü."""
+    return jsonable_encoder(value)
+
+
+def encode_json(payload: Any) -> bytes:
+    """Payload'ı UTF-8 JSON baytlarına çevirir (orjson; NaN/inf değerleri null olur)."""
+    return orjson.dumps(payload, default=_default, option=_ORJSON_OPTIONS)
+
+
+def etag_for(body: bytes) -> str:
+    """Gövdenin güçlü ETag'i (sha256 özetinin ilk 32 hanesi, tırnaklı)."""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for encoding in ("br", "gzip"):
+        tag = tag.removesuffix(f"-{encoding}")
+    return tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match başlığı ETag ile eşleşiyor mu (zayıf karşılaştırma, kodlama eki yok sayılır)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = _opaque(etag)
+    return any(_opaque(tag) == wanted for tag in if_none_match.split(","))
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Accept-Encoding'e göre kullanılacak sıkıştırma (br > gzip); q=0 olanlar reddedilmiş sayılır."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in _ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def bytes_response(request: Request, body: bytes, etag: Optional[str] = None) -> Response:
+    """Hazır JSON baytları için koşullu (304) ve gerekirse sıkıştırılmış yanıt."""
+    etag = etag or etag_for(body)
+    encoding = None
+    if len(body) >= config.RESPONSE_COMPRESSION_MIN_BYTES:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": f'{etag[:-1]}-{encoding}"' if encoding else etag,
+        "Cache-Control": CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def json_response(request: Request, payload: Any) -> Response:
+    """Payload'ı JSON'a çevirip koşullu yanıt döner (bkz. bytes_response)."""
+    return bytes_response(request, encode_json(payload))
+
+
+async def cached_json_response(
+    request: Request,
+    name: str,
+    args: tuple,
+    producer: Callable[[], Awaitable[Any]],
+    ttl: Optional[int] = None,
+) -> Response:
+    """producer() sonucunu JSON baytları olarak önbelleğe alıp koşullu yanıt döner.
+
+    Redis değeri "<etag>\n<json>" biçimindedir; isabette gövde olduğu gibi gönderilir, ETag
+    eşleşirse 304 döner. Anahtar adı ve args'tan oluşur (ör. api_response:('campaigns', 30, 'act_1'))
+    ve hesap bazlı temizlik (MetaAdsService.invalidate_campaigns_cache) bu kalıba göre yapılır.
+    """
+    client = get_redis_client() if config.CACHE_ENABLED else None
+    key = response_cache_key(name, args)
+    if client:
+        try:
+            cached = client.get(key)
+            if cached:
+                etag, _, body = cached.partition(b"\n")
+                return bytes_response(request, body, etag.decode("ascii"))
+        except Exception as e:
+            print(f"Cache read error: {e}")
+
+    body = encode_json(await producer())
+    etag = etag_for(body)
+    store_cached_body(client, key, etag, body, ttl)
+    return bytes_response(request, body, etag)
+
+
+def response_cache_key(name: str, args: tuple) -> str:
+    return cache_key(RESPONSE_CACHE_PREFIX, name, *args)
+
+
+def store_cached_body(client, key: str, etag: str, body: bytes, ttl: Optional[int] = None) -> None:
+    """Gövdeyi "<etag>\n<json>" olarak Redis'e yazar (client yoksa bir şey yapmaz)."""
+    if not client:
+        return
+    try:
+        client.setex(key, ttl or config.CACHE_TTL, etag.encode("ascii") + b"\n" + body)
+    except Exception as e:
+        print(f"Cache write error: {e}")
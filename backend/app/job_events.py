@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Job ilerleme olayları: Redis pub/sub ile yayın, SSE ile dinleme.
+
+Celery worker ilerleme adımlarını (progress) veritabanına yazmak yerine Redis kanalına
+yayınlar; veritabanına yalnızca durum geçişleri (running/completed/failed) yazılır.
+Son ilerleme değeri ayrıca kısa ömürlü bir anahtarda tutulur ki polling yapan
+istemciler de güncel değeri görebilsin.
+"""
+
+import json
+import logging
+from typing import Any, AsyncIterator, Optional
+
+from app import config
+from app.cache import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+JOB_CHANNEL_PREFIX = "job_events"
+JOB_PROGRESS_PREFIX = "job_progress"
+JOB_PROGRESS_TTL = 60 * 60 * 6  # 6 saat
+TERMINAL_STATUSES = frozenset({"completed", "failed"})
+
+
+def job_channel(job_id: str) -> str:
+    return f"{JOB_CHANNEL_PREFIX}:{job_id}"
+
+
+def job_progress_key(job_id: str) -> str:
+    return f"{JOB_PROGRESS_PREFIX}:{job_id}"
+
+
+def publish_job_event(job_id: str, event: dict[str, Any]) -> bool:
+    """Olayı job kanalına yayınlar ve son durumu saklar. Redis yoksa False döner."""
+    client = get_redis_client()
+    if not client:
+        return False
+    payload = json.dumps({"job_id": job_id, **event}, ensure_ascii=False, default=str)
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.setex(job_progress_key(job_id), JOB_PROGRESS_TTL, payload)
+        pipe.publish(job_channel(job_id), payload)
+        pipe.execute()
+        return True
+    except Exception as e:
+        logger.warning("Job olayı yayınlanamadı (job_id=%s): %s", job_id, e)
+        return False
+
+
+def get_live_job_state(job_id: str) -> Optional[dict[str, Any]]:
+    """Redis'teki son yayınlanmış job durumunu döner (yoksa None)."""
+    client = get_redis_client()
+    if not client:
+        return None
+    try:
+        raw = client.get(job_progress_key(job_id))
+        return json.loads(raw) if raw else None
+    except Exception:
+        return None
+
+
+async def subscribe_job_events(job_id: str, heartbeat: float = 15.0) -> AsyncIterator[Optional[dict[str, Any]]]:
+    """Job kanalını dinler; her olay için dict, heartbeat süresi dolduğunda None üretir.
+
+    Redis erişilemezse hiçbir şey üretmeden biter (çağıran polling'e düşebilir).
+    """
+    if not config.CACHE_ENABLED or get_redis_client() is None:
+        return
+    import redis.asyncio as aioredis
+
+    client = aioredis.from_url(config.REDIS_URL, decode_responses=True, socket_connect_timeout=5)
+    pubsub = client.pubsub()
+    try:
+        await pubsub.subscribe(job_channel(job_id))
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=heartbeat)
+            if message is None:
+                yield None
+                continue
+            try:
+                yield json.loads(message["data"])
+            except (TypeError, ValueError):
+                continue
+    finally:
+        try:
+            await pubsub.unsubscribe(job_channel(job_id))
+            await pubsub.aclose()
+            await client.aclose()
+        except Exception:
+            pass
+
+
+def sse_format(data: dict[str, Any], event: Optional[str] = None) -> str:
+    """Server-Sent Events satırı oluşturur."""
+    lines = []
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
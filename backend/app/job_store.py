@@ -9,6 +9,7 @@ from sqlalchemy import create_engine, select
 from sqlalchemy.orm import sessionmaker, Session
 
 from app import config
+from app.job_events import publish_job_event
 from app.models import Base, JobStatus
 
 _sync_engine = None
@@ -71,6 +72,7 @@ def update_job_sync(
     file_name: Optional[str] = None,
     pdf_path: Optional[str] = None,
     error_message: Optional[str] = None,
+    ai_cache_key: Optional[str] = None,
 ) -> None:
     """Job durumunu günceller (Celery worker sync)."""
     session = get_sync_session()
@@ -94,8 +96,14 @@ def update_job_sync(
             row.pdf_path = pdf_path
         if error_message is not None:
             row.error_message = error_message
+        if ai_cache_key is not None:
+            row.ai_cache_key = ai_cache_key
         row.updated_at = datetime.utcnow()
         session.commit()
+        event = {"status": row.status, "progress": row.progress}
+        if row.error_message:
+            event["error_message"] = row.error_message
+        publish_job_event(job_id, event)
     except Exception:
         session.rollback()
         raise
@@ -103,6 +111,16 @@ def update_job_sync(
         session.close()
 
 
+def report_job_progress(job_id: str, progress: int, status: str = "running") -> None:
+    """İlerleme adımını Redis kanalına yayınlar; veritabanına yazmaz.
+
+    Redis kullanılamıyorsa eski davranışa (job_status satırını güncelleme) düşer.
+    """
+    progress = min(100, max(0, progress))
+    if not publish_job_event(job_id, {"status": status, "progress": progress}):
+        update_job_sync(job_id, progress=progress)
+
+
 def job_to_dict(row: JobStatus) -> dict[str, Any]:
     """ORM JobStatus -> API dict."""
     return {
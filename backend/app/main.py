@@ -1,15 +1,20 @@
+import asyncio
 import logging
 import time
 from collections import defaultdict
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.exceptions import HTTPException
 from app.routers import campaigns, adsets, reports, ai_analysis, email_reports, settings, creatives, ads, whatsapp, jobs, targeting, ad_summaries, alerts, webhooks, scheduled_reports, auth, users, cache as cache_router, slack
 from app import config
 from app.database import init_db
 from app.deps import get_current_user
+from app.routers.webhooks import process_webhook_payloads
+from app.services.ai_providers import close_providers
+from app.targeting_catalog import get_catalog
+from app.webhook_events import consume_webhook_payloads
 
 # Logger ayarı
 logger = logging.getLogger(__name__)
@@ -39,10 +44,18 @@ async def _rate_limit_middleware(request: Request, call_next):
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Uygulama başlarken PostgreSQL tablolarını oluşturur."""
+    """Uygulama başlarken PostgreSQL tablolarını oluşturur, hedef kitle kataloğunu yükler ve webhook olay tüketicisini başlatır; kapanışta AI istemcilerini kapatır."""
     await init_db()
+    try:
+        get_catalog()
+    except OSError as e:
+        logger.warning("Hedef kitle kataloğu yüklenemedi: %s", e)
+    webhook_consumer = asyncio.create_task(consume_webhook_payloads(process_webhook_payloads))
     yield
-    # shutdown: nothing to do
+    webhook_consumer.cancel()
+    with suppress(asyncio.CancelledError):
+        await webhook_consumer
+    await close_providers()
 
 
 app = FastAPI(
@@ -50,6 +63,7 @@ app = FastAPI(
     description="Meta Ads raporlama, analiz ve AI önerileri",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
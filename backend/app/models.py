@@ -5,7 +5,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any, List, Optional
 
-from sqlalchemy import JSON, DateTime, String, Text, ForeignKey, Boolean
+from sqlalchemy import JSON, DateTime, String, Text, ForeignKey, Boolean, Index
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -80,6 +80,9 @@ class JobStatus(Base):
     status: Mapped[str] = mapped_column(String(32), nullable=False)  # "pending" | "running" | "completed" | "failed"
     progress: Mapped[int] = mapped_column(default=0)  # 0-100
     result_text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # analyze sonucu (metin)
+    # analyze: sonucun AI önbellek anahtarı; aynı veriyle yeni analiz result_text'i yeniden kullanır
+    ai_cache_key: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, index=True)
+    lesson_count: Mapped[Optional[int]] = mapped_column(nullable=True)  # analysis_lessons'a yazılan ders sayısı (None: çıkarılmadı)
     file_path: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # export: ZIP/CSV yolu
     file_name: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)  # indirme adı
     pdf_path: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # analyze: PDF rapor yolu
@@ -88,6 +91,23 @@ class JobStatus(Base):
     updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
 
 
+class AnalysisLesson(Base):
+    """Tamamlanan analiz işinden bir kez çıkarılan ders; stratejist özeti metni yeniden taramadan buradan okur."""
+    __tablename__ = "analysis_lessons"
+    __table_args__ = (
+        Index("ix_analysis_lessons_job_position", "job_id", "position"),
+        Index("ix_analysis_lessons_account_template", "ad_account_id", "template_id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    job_id: Mapped[str] = mapped_column(String(36), ForeignKey("job_status.id", ondelete="CASCADE"), nullable=False)
+    ad_account_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    template_id: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)  # dersin çıktığı rapor bölümü
+    position: Mapped[int] = mapped_column(nullable=False)  # iş içindeki sıra; öneriler uyarılardan önce gelir
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+
+
 class AlertRule(Base):
     """Akıllı uyarı kuralı: Metrik, eşik, bildirim kanalları."""
     __tablename__ = "alert_rules"
@@ -124,6 +144,51 @@ class AlertHistory(Base):
     sent_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
 
+class NotificationOutbox(Base):
+    """Gönderilecek bildirimler (outbox). Uyarı ile aynı transaction'da yazılır, dispatcher teslim eder."""
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        Index("ix_notification_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    alert_history_id: Mapped[Optional[str]] = mapped_column(
+        String(36), ForeignKey("alert_history.id", ondelete="CASCADE"), nullable=True
+    )
+    channel: Mapped[str] = mapped_column(String(32), nullable=False)  # "email" | "whatsapp"
+    recipient: Mapped[str] = mapped_column(String(255), nullable=False)
+    subject: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")  # "pending" | "sending" | "sent" | "failed"
+    attempts: Mapped[int] = mapped_column(default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class AlertMetricSnapshot(Base):
+    """Hesap bazlı son kampanya metrikleri; change_pct kuralları bir önceki kontrolle karşılaştırılır."""
+    __tablename__ = "alert_metric_snapshots"
+
+    account_key: Mapped[str] = mapped_column(String(64), primary_key=True)  # ad_account_id veya "default"
+    data: Mapped[dict] = mapped_column(JSON, nullable=False)  # {"campaign_ids": [...], "metrics": {"ctr": [...], ...}}
+    captured_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+
+
+class AIAnalysisCache(Base):
+    """AI analiz sonuçları; anahtar (sağlayıcı, model, prompt sürümü, normalize veri) özetidir."""
+    __tablename__ = "ai_analysis_cache"
+
+    cache_key: Mapped[str] = mapped_column(String(64), primary_key=True)  # sha256 hex
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)  # "campaigns" | "single" | "report" | "weekly"
+    provider: Mapped[str] = mapped_column(String(32), nullable=False)
+    model: Mapped[str] = mapped_column(String(128), nullable=False)
+    result_text: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+
+
 def saved_report_to_dict(row: SavedReport) -> dict[str, Any]:
     """ORM SavedReport -> API için dict."""
     return {
@@ -159,6 +224,10 @@ def alert_rule_to_dict(row: AlertRule) -> dict[str, Any]:
 class ScheduledReport(Base):
     """Zamanlanmış otomatik rapor görevi."""
     __tablename__ = "scheduled_reports"
+    __table_args__ = (
+        # Dakikalık dispatcher sorgusu (is_active AND next_run_at <= now) yalnızca vadesi gelenleri tarar
+        Index("ix_scheduled_reports_active_next_run", "is_active", "next_run_at"),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -198,12 +267,15 @@ class ScheduledReportLog(Base):
     scheduled_report_id: Mapped[str] = mapped_column(String(36), ForeignKey("scheduled_reports.id", ondelete="CASCADE"), nullable=False)
     
     status: Mapped[str] = mapped_column(String(32), nullable=False)  # "success", "failed", "running"
+    # Dispatcher idempotency anahtarı (rapor_id:planlanan_zaman); aynı çalışma iki kez yapılmaz
+    run_key: Mapped[Optional[str]] = mapped_column(String(96), nullable=True, unique=True)
     started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
     completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     
     # Rapor içeriği
     summary_data: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
     ai_analysis: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    ai_cache_key: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, index=True)
     error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
     # Gönderim durumu
@@ -1,27 +1,52 @@
 # -*- coding: utf-8 -*-
-"""AI analiz sonuçlarını PDF'e dönüştürme modülü."""
+"""AI analiz sonuçlarını PDF'e dönüştürme modülü.
 
+Fontlar ve paragraf stilleri süreç başına bir kez hazırlanır. render_analysis_pdf çizimi
+sınırlı bir thread havuzunda (PDF_RENDER_WORKERS) yapar; böylece reportlab event loop'u
+bloklamaz. Süreç düzeyinde paralellik Celery'nin prefork worker'larından gelir.
+"""
+
+import asyncio
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.pdfbase.pdfmetrics import registerFontFamily, stringWidth
 from reportlab.lib.units import cm
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.enums import TA_LEFT, TA_CENTER
 
+from app import config
+
+_DEJAVU_OBLIQUE = '/usr/share/fonts/truetype/dejavu/DejaVuSans-Oblique.ttf'
+_DEJAVU_BOLD_OBLIQUE = '/usr/share/fonts/truetype/dejavu/DejaVuSans-BoldOblique.ttf'
+
+# Sayfa içerik genişliği (A4, 2 cm kenar boşlukları ile)
+CONTENT_WIDTH = 16 * cm
 
+
+@lru_cache(maxsize=None)
 def _register_fonts():
-    """Türkçe karakter desteği için fontları kaydet."""
+    """Türkçe karakter desteği için fontları kaydet (süreç başına bir kez)."""
     try:
         # Sistemde varsa DejaVu fontlarını kullan
         pdfmetrics.registerFont(TTFont('DejaVuSans', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'))
         pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'))
+        # <b>/<i> etiketlerinin gerçekten kalın/eğik çizilmesi için aile eşlemesi (eğik fontlar fonts-dejavu-extra'da)
+        italic, bold_italic = 'DejaVuSans', 'DejaVuSans-Bold'
+        if Path(_DEJAVU_OBLIQUE).exists() and Path(_DEJAVU_BOLD_OBLIQUE).exists():
+            pdfmetrics.registerFont(TTFont('DejaVuSans-Oblique', _DEJAVU_OBLIQUE))
+            pdfmetrics.registerFont(TTFont('DejaVuSans-BoldOblique', _DEJAVU_BOLD_OBLIQUE))
+            italic, bold_italic = 'DejaVuSans-Oblique', 'DejaVuSans-BoldOblique'
+        registerFontFamily('DejaVuSans', normal='DejaVuSans', bold='DejaVuSans-Bold', italic=italic, boldItalic=bold_italic)
         return 'DejaVuSans', 'DejaVuSans-Bold'
     except Exception as e:
         print(f"DejaVu font yüklenemedi: {e}")
@@ -34,6 +59,121 @@ def _register_fonts():
             return 'Helvetica', 'Helvetica-Bold'
 
 
+@lru_cache(maxsize=None)
+def _styles() -> dict:
+    """PDF paragraf stilleri (süreç başına bir kez oluşturulur; çizim sırasında değiştirilmez)."""
+    font_normal, font_bold = _register_fonts()
+    styles = getSampleStyleSheet()
+    
+    # Başlık stili
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontName=font_bold,
+        fontSize=18,
+        textColor=colors.HexColor('#1e40af'),
+        spaceAfter=20,
+        alignment=TA_CENTER,
+    )
+    
+    # Heading1 stili - daha kompakt
+    h1_style = ParagraphStyle(
+        'CustomH1',
+        parent=styles['Heading1'],
+        fontName=font_bold,
+        fontSize=14,
+        textColor=colors.HexColor('#1e3a5f'),
+        spaceAfter=6,
+        spaceBefore=10,
+    )
+    
+    # Heading2 stili - daha kompakt
+    h2_style = ParagraphStyle(
+        'CustomH2',
+        parent=styles['Heading2'],
+        fontName=font_bold,
+        fontSize=12,
+        textColor=colors.HexColor('#2563eb'),
+        spaceAfter=4,
+        spaceBefore=8,
+    )
+    
+    # Heading3 stili - daha kompakt
+    h3_style = ParagraphStyle(
+        'CustomH3',
+        parent=styles['Heading3'],
+        fontName=font_bold,
+        fontSize=11,
+        textColor=colors.HexColor('#374151'),
+        spaceAfter=4,
+        spaceBefore=6,
+    )
+    
+    # Normal metin stili
+    normal_style = ParagraphStyle(
+        'CustomNormal',
+        parent=styles['Normal'],
+        fontName=font_normal,
+        fontSize=10,
+        leading=14,
+        textColor=colors.HexColor('#1f2937'),
+    )
+    
+    # Liste öğesi stili
+    bullet_style = ParagraphStyle(
+        'CustomBullet',
+        parent=styles['Normal'],
+        fontName=font_normal,
+        fontSize=10,
+        leading=14,
+        leftIndent=20,
+        textColor=colors.HexColor('#1f2937'),
+    )
+
+    # Tarih
+    date_style = ParagraphStyle(
+        'DateStyle',
+        parent=normal_style,
+        fontSize=9,
+        textColor=colors.gray,
+        alignment=TA_CENTER,
+    )
+
+    # Tablo hücreleri
+    table_cell_style = ParagraphStyle(
+        'TableCell',
+        parent=normal_style,
+        fontSize=8.5,
+        leading=11,
+    )
+    table_header_style = ParagraphStyle(
+        'TableHeader',
+        parent=table_cell_style,
+        fontName=font_bold,
+    )
+
+    footer_style = ParagraphStyle(
+        'Footer',
+        parent=normal_style,
+        fontSize=8,
+        textColor=colors.gray,
+        alignment=TA_CENTER,
+    )
+
+    return {
+        'Title': title_style,
+        'Heading1': h1_style,
+        'Heading2': h2_style,
+        'Heading3': h3_style,
+        'Normal': normal_style,
+        'Bullet': bullet_style,
+        'TableCell': table_cell_style,
+        'TableHeader': table_header_style,
+        'Date': date_style,
+        'Footer': footer_style,
+    }
+
+
 def _safe(text: str) -> str:
     """XML özel karakterlerini escape'le (<, >, &) — ReportLab Paragraph XML bekler."""
     text = text.replace('&', '&amp;')
@@ -42,70 +182,170 @@ def _safe(text: str) -> str:
     return text
 
 
+# --- Markdown → flowable derleyici (tek geçiş) ---
+_HEADING_RE = re.compile(r'(#{1,6})\s+(.*)')
+_LIST_RE = re.compile(r'([*+-]|\d{1,3}[.)])\s+(.*)')
+_RULE_RE = re.compile(r'(?:-{3,}|\*{3,}|_{3,})')
+_TABLE_SEP_RE = re.compile(r'\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?')
+# **kalın**, __kalın__, *eğik*, _eğik_, `kod` (kelime içindeki _ ve * işaretlenmez)
+_INLINE_RE = re.compile(
+    r'\*\*(?P<b1>.+?)\*\*'
+    r'|(?<!\w)__(?P<b2>.+?)__(?!\w)'
+    r'|(?<![\w*])\*(?![\s*])(?P<i1>.+?)(?<!\s)\*(?![\w*])'
+    r'|(?<!\w)_(?![\s_])(?P<i2>.+?)(?<!\s)_(?!\w)'
+    r'|`(?P<code>[^`]+)`'
+)
+
+_SEPARATOR_STYLE = TableStyle([
+    ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.HexColor('#e5e7eb')),
+    ('TOPPADDING', (0, 0), (-1, 0), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+])
+_DATA_TABLE_COMMANDS = [
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#eff6ff')),
+    ('LINEBELOW', (0, 0), (-1, 0), 0.75, colors.HexColor('#2563eb')),
+    ('LINEBELOW', (0, 1), (-1, -1), 0.25, colors.HexColor('#e5e7eb')),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('TOPPADDING', (0, 0), (-1, -1), 3),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+]
+_CELL_PADDING = 8
+_INLINE_MARKERS = frozenset('*_`')
+
+
+@lru_cache(maxsize=None)
+def _data_table_style(font_normal: str, font_bold: str, font_size: float) -> TableStyle:
+    """Tablo stili; düz metin hücreleri de paragraf hücreleriyle aynı fontla çizilir."""
+    return TableStyle(_DATA_TABLE_COMMANDS + [
+        ('FONTNAME', (0, 0), (-1, -1), font_normal),
+        ('FONTNAME', (0, 0), (-1, 0), font_bold),
+        ('FONTSIZE', (0, 0), (-1, -1), font_size),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#1f2937')),
+    ])
+
+
+def _inline(text: str) -> str:
+    """Satır içi markdown'u ReportLab paragraf işaretlemesine çevirir (düz metin escape edilir)."""
+    out = []
+    pos = 0
+    for m in _INLINE_RE.finditer(text):
+        out.append(_safe(text[pos:m.start()]))
+        kind = m.lastgroup
+        inner = m.group(kind)
+        if kind in ('b1', 'b2'):
+            out.append(f"<b>{_inline(inner)}</b>")
+        elif kind in ('i1', 'i2'):
+            out.append(f"<i>{_inline(inner)}</i>")
+        else:
+            out.append(_safe(inner))
+        pos = m.end()
+    out.append(_safe(text[pos:]))
+    return ''.join(out)
+
+
+def _table_cells(line: str) -> list[str]:
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|') and not line.endswith('\\|'):
+        line = line[:-1]
+    return [cell.strip().replace('\\|', '|') for cell in re.split(r'(?<!\\)\|', line)]
+
+
+def _table_flowable(rows: list[list[str]], styles) -> Table:
+    header_style = styles.get('TableHeader', styles['Normal'])
+    cell_style = styles.get('TableCell', styles['Normal'])
+    n_cols = max(len(row) for row in rows)
+    col_width = CONTENT_WIDTH / n_cols
+    fit_width = col_width - _CELL_PADDING
+
+    def cell(text: str, style: ParagraphStyle):
+        # Satıra sığan işaretsiz hücreler (çoğunlukla sayılar) Paragraph'a çevrilmeden çizilir
+        if _INLINE_MARKERS.isdisjoint(text) and stringWidth(text, style.fontName, style.fontSize) <= fit_width:
+            return text
+        return Paragraph(_inline(text), style)
+
+    data = [
+        [cell(text, header_style if r == 0 else cell_style) for text in row + [''] * (n_cols - len(row))]
+        for r, row in enumerate(rows)
+    ]
+    table = Table(data, colWidths=[col_width] * n_cols, repeatRows=1, hAlign='LEFT')
+    table.setStyle(_data_table_style(cell_style.fontName, header_style.fontName, cell_style.fontSize))
+    return table
+
+
+def _separator() -> Table:
+    line_table = Table([['']], colWidths=[CONTENT_WIDTH])
+    line_table.setStyle(_SEPARATOR_STYLE)
+    return line_table
+
+
 def _markdown_to_pdf_elements(text: str, styles) -> list:
-    """Markdown metnini ReportLab elementlerine dönüştür."""
-    elements = []
-    lines = text.split('\n')
-    
+    """Markdown metnini tek geçişte ReportLab elementlerine dönüştür.
+
+    Desteklenenler: # başlıklar, madde ve numaralı listeler (girinti ile iç içe), | tabloları
+    (başlık + ayırıcı satır), --- ayırıcı, satır içi **kalın** / *eğik* / `kod`.
+    """
+    headings = {1: styles['Heading1'], 2: styles['Heading2']}
+    heading3 = styles['Heading3']
     normal_style = styles['Normal']
-    heading1_style = styles['Heading1']
-    heading2_style = styles['Heading2']
-    heading3_style = styles['Heading3']
     bullet_style = styles['Bullet']
-    
+    nested_bullets: dict[int, ParagraphStyle] = {}
+
+    elements = []
+    lines = text.split('\n')
+    n = len(lines)
     i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        
+    while i < n:
+        raw = lines[i]
+        line = raw.strip()
+        i += 1
         if not line:
-            # Çok fazla boş satır ekleme, sadece küçük boşluk
+            # Çok fazla boş satır ekleme; stiller zaten spaceAfter içeriyor
+            continue
+
+        first = line[0]
+        if first == '#':
+            m = _HEADING_RE.match(line)
+            if m:
+                elements.append(Paragraph(_inline(m.group(2)), headings.get(len(m.group(1)), heading3)))
+                continue
+
+        if first == '|' and i < n and '|' in lines[i] and _TABLE_SEP_RE.fullmatch(lines[i].strip()):
+            rows = [_table_cells(line)]
             i += 1
+            while i < n and lines[i].strip().startswith('|'):
+                rows.append(_table_cells(lines[i]))
+                i += 1
+            elements.append(_table_flowable(rows, styles))
             continue
-        
-        # Başlıklar - Spacer ekleme, stil zaten spaceAfter içeriyor
-        if line.startswith('# '):
-            elements.append(Paragraph(_safe(line[2:]), heading1_style))
-        elif line.startswith('## '):
-            elements.append(Paragraph(_safe(line[3:]), heading2_style))
-        elif line.startswith('### '):
-            elements.append(Paragraph(_safe(line[4:]), heading3_style))
-        elif line.startswith('#### '):
-            elements.append(Paragraph(_safe(line[5:]), heading3_style))
-        
-        # Kalın metin (**text**)
-        elif line.startswith('**') and line.endswith('**'):
-            clean = line.replace('**', '')
-            elements.append(Paragraph(f"<b>{_safe(clean)}</b>", normal_style))
-        
-        # Liste öğeleri
-        elif line.startswith('* ') or line.startswith('- '):
-            content = line[2:]
-            # İçinde ** varsa kalın yap - önce escape et, sonra kalınlık ekle
-            safe_content = _safe(content)
-            safe_content = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', safe_content)
-            elements.append(Paragraph(f"• {safe_content}", bullet_style))
-        
-        # Sayfa sonu ayırıcı (---) - PDF'de sayfa sonu yerine ince çizgi kullan
-        elif line == '---':
-            # Şablonlar arasına ince ayırıcı çizgi ekle, sayfa sonu değil
-            line_data = [['']]
-            line_table = Table(line_data, colWidths=[16 * cm])
-            line_table.setStyle(TableStyle([
-                ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.HexColor('#e5e7eb')),
-                ('TOPPADDING', (0, 0), (-1, 0), 6),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
-            ]))
-            elements.append(line_table)
-        
-        # Normal metin
-        else:
-            # Markdown kalınlık işaretlerini HTML'e çevir
-            safe_line = _safe(line)
-            safe_line = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', safe_line)
-            elements.append(Paragraph(safe_line, normal_style))
-        
-        i += 1
-    
+
+        if first in '-*_' and _RULE_RE.fullmatch(line):
+            # Şablonlar arasına sayfa sonu değil ince ayırıcı çizgi
+            elements.append(_separator())
+            continue
+
+        if first in '*+-' or first.isdigit():
+            m = _LIST_RE.match(line)
+            if m:
+                marker, content = m.groups()
+                bullet = '•' if marker in '*+-' else marker
+                depth = min((len(raw) - len(raw.lstrip())) // 2, 4)
+                style = bullet_style
+                if depth:
+                    style = nested_bullets.get(depth)
+                    if style is None:
+                        style = nested_bullets[depth] = ParagraphStyle(
+                            f'{bullet_style.name}{depth}', parent=bullet_style,
+                            leftIndent=bullet_style.leftIndent + 14 * depth,
+                        )
+                elements.append(Paragraph(f"{bullet} {_inline(content)}", style))
+                continue
+
+        elements.append(Paragraph(_inline(line), normal_style))
+
     return elements
 
 
@@ -126,7 +366,7 @@ def generate_analysis_pdf(
         Kaydedilen PDF dosyasının yolu veya None
     """
     try:
-        font_normal, font_bold = _register_fonts()
+        styles = _styles()
         
         doc = SimpleDocTemplate(
             str(output_path),
@@ -137,89 +377,14 @@ def generate_analysis_pdf(
             bottomMargin=2 * cm,
         )
         
-        # Stil tanımları
-        styles = getSampleStyleSheet()
-        
-        # Başlık stili
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontName=font_bold,
-            fontSize=18,
-            textColor=colors.HexColor('#1e40af'),
-            spaceAfter=20,
-            alignment=TA_CENTER,
-        )
-        
-        # Heading1 stili - daha kompakt
-        h1_style = ParagraphStyle(
-            'CustomH1',
-            parent=styles['Heading1'],
-            fontName=font_bold,
-            fontSize=14,
-            textColor=colors.HexColor('#1e3a5f'),
-            spaceAfter=6,
-            spaceBefore=10,
-        )
-        
-        # Heading2 stili - daha kompakt
-        h2_style = ParagraphStyle(
-            'CustomH2',
-            parent=styles['Heading2'],
-            fontName=font_bold,
-            fontSize=12,
-            textColor=colors.HexColor('#2563eb'),
-            spaceAfter=4,
-            spaceBefore=8,
-        )
-        
-        # Heading3 stili - daha kompakt
-        h3_style = ParagraphStyle(
-            'CustomH3',
-            parent=styles['Heading3'],
-            fontName=font_bold,
-            fontSize=11,
-            textColor=colors.HexColor('#374151'),
-            spaceAfter=4,
-            spaceBefore=6,
-        )
-        
-        # Normal metin stili
-        normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=styles['Normal'],
-            fontName=font_normal,
-            fontSize=10,
-            leading=14,
-            textColor=colors.HexColor('#1f2937'),
-        )
-        
-        # Liste öğesi stili
-        bullet_style = ParagraphStyle(
-            'CustomBullet',
-            parent=styles['Normal'],
-            fontName=font_normal,
-            fontSize=10,
-            leading=14,
-            leftIndent=20,
-            textColor=colors.HexColor('#1f2937'),
-        )
-        
         elements = []
         
         # Başlık
-        elements.append(Paragraph(f"AI Rapor Analizi: {report_name}", title_style))
+        elements.append(Paragraph(f"AI Rapor Analizi: {report_name}", styles['Title']))
         elements.append(Spacer(1, 0.3 * cm))
         
         # Tarih
-        date_style = ParagraphStyle(
-            'DateStyle',
-            parent=normal_style,
-            fontSize=9,
-            textColor=colors.gray,
-            alignment=TA_CENTER,
-        )
-        elements.append(Paragraph(f"Oluşturulma Tarihi: {datetime.now().strftime('%d.%m.%Y %H:%M')}", date_style))
+        elements.append(Paragraph(f"Oluşturulma Tarihi: {datetime.now().strftime('%d.%m.%Y %H:%M')}", styles['Date']))
         elements.append(Spacer(1, 0.5 * cm))
         
         # Çizgi
@@ -232,26 +397,12 @@ def generate_analysis_pdf(
         elements.append(Spacer(1, 0.5 * cm))
         
         # Analiz içeriği - özel stillerle
-        custom_styles = {
-            'Heading1': h1_style,
-            'Heading2': h2_style,
-            'Heading3': h3_style,
-            'Normal': normal_style,
-            'Bullet': bullet_style,
-        }
-        content_elements = _markdown_to_pdf_elements(analysis_text, custom_styles)
+        content_elements = _markdown_to_pdf_elements(analysis_text, styles)
         elements.extend(content_elements)
         
         # Footer
         elements.append(Spacer(1, 2 * cm))
-        footer_style = ParagraphStyle(
-            'Footer',
-            parent=normal_style,
-            fontSize=8,
-            textColor=colors.gray,
-            alignment=TA_CENTER,
-        )
-        elements.append(Paragraph("— Meta Ads Dashboard AI Analiz Raporu —", footer_style))
+        elements.append(Paragraph("— Meta Ads Dashboard AI Analiz Raporu —", styles['Footer']))
         
         # PDF oluştur
         doc.build(elements)
@@ -261,3 +412,20 @@ def generate_analysis_pdf(
     except Exception as e:
         print(f"PDF oluşturma hatası: {e}")
         return None
+
+
+# --- Thread havuzunda çizim ---
+_thread_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=config.PDF_RENDER_WORKERS, thread_name_prefix="pdf")
+    return _thread_pool
+
+
+async def render_analysis_pdf(analysis_text: str, report_name: str, output_path: Path) -> Optional[Path]:
+    """generate_analysis_pdf'i event loop'u bloklamadan thread havuzunda çalıştırır."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_thread_pool(), generate_analysis_pdf, analysis_text, report_name, output_path)
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""Token bütçeli prompt sıkıştırma: büyük rapor tablolarını LLM'e sığacak özet tabloya çevirir.
+
+Satırlar JSON yerine tek başlıklı, "|" ayrılmış tablo olarak kodlanır (anahtarlar her satırda
+tekrarlanmaz). Tablo bütçeye sığmıyorsa: sayısal sütunların toplu istatistikleri, sıralama
+metriğine göre en yüksek / en düşük satırlar ve aradaki satırlardan sıralı dağılım boyunca eşit
+aralıklı (katmanlı) örneklem seçilir. Seçim belirlenimcidir; aynı veri aynı prompt'u (ve aynı
+önbellek anahtarını) üretir.
+"""
+
+import math
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Optional, Sequence
+
+# Türkçe metin + sayılar için kaba token tahmini (karakter / token)
+CHARS_PER_TOKEN = 3.5
+
+# Sıralama metriği verilmezse sırayla aranan sütunlar
+RANK_COLUMNS = ("Harcanan Tutar", "spend", "Sonuçlar", "conversions", "Gösterim", "impressions")
+
+# Toplamı anlamsız olan oran/ortalama sütunları (adında geçen ifadeler)
+_RATIO_HINTS = ("ctr", "cpc", "cpm", "roas", "frequency", "başına", "oran", "%")
+
+_MAX_CELL_CHARS = 40
+
+
+def estimate_tokens(text: str) -> int:
+    """Metnin yaklaşık token sayısı."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@dataclass
+class CompactTable:
+    """Sıkıştırılmış tablo metni ve kapsama bilgisi."""
+    text: str
+    total_rows: int
+    included_rows: int
+    est_tokens: int
+
+    @property
+    def sampled(self) -> bool:
+        return self.included_rows < self.total_rows
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        value = float(value)
+        return None if math.isnan(value) or math.isinf(value) else value
+    return None
+
+
+def _format_number(value: float) -> str:
+    if value.is_integer():
+        return str(int(value))
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def _cell(value: Any) -> str:
+    number = _number(value)
+    if number is not None:
+        return _format_number(number)
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    text = " ".join(str(value).replace("|", "/").split())
+    return text if len(text) <= _MAX_CELL_CHARS else text[: _MAX_CELL_CHARS - 1] + "…"
+
+
+def encode_row(row: dict, columns: Sequence[str]) -> str:
+    """Satırı kompakt tablo satırına çevirir ("|" ayrılmış hücreler)."""
+    return "|".join(_cell(row.get(c)) for c in columns)
+
+
+def _columns(rows: Sequence[dict], columns: Sequence[str] | None) -> list[str]:
+    present: dict[str, None] = {}
+    for row in rows[:50]:
+        present.update(dict.fromkeys(row))
+    if columns:
+        ordered = [c for c in columns if c in present]
+        if ordered:
+            return ordered
+    return list(present)
+
+
+def _numeric_columns(rows: Sequence[dict], columns: Sequence[str]) -> list[str]:
+    numeric = []
+    for col in columns:
+        seen = False
+        for row in rows:
+            value = row.get(col)
+            if value is None or value == "":
+                continue
+            if _number(value) is None:
+                break
+            seen = True
+        else:
+            if seen:
+                numeric.append(col)
+    return numeric
+
+
+def _aggregates(col_values: dict[str, list[Optional[float]]]) -> list[str]:
+    lines = []
+    for col, column in col_values.items():
+        values = sorted(v for v in column if v is not None)
+        if not values:
+            continue
+        n = len(values)
+        median = values[n // 2] if n % 2 else (values[n // 2 - 1] + values[n // 2]) / 2
+        parts = []
+        if not any(h in col.lower() for h in _RATIO_HINTS):
+            parts.append(f"toplam={_format_number(sum(values))}")
+        parts += [
+            f"ort={_format_number(sum(values) / n)}",
+            f"min={_format_number(values[0])}",
+            f"medyan={_format_number(median)}",
+            f"max={_format_number(values[-1])}",
+        ]
+        lines.append(f"- {col}: " + ", ".join(parts))
+    return lines
+
+
+def _even_sample(items: Sequence, k: int) -> list:
+    """Sıralı listeden k elemanı eşit aralıklarla seçer (her katmandan bir temsilci)."""
+    if k <= 0 or not items:
+        return []
+    if k >= len(items):
+        return list(items)
+    step = len(items) / k
+    return [items[int(i * step + step / 2)] for i in range(k)]
+
+
+def _select(ranked: Sequence[int], n: int) -> tuple[list[int], list[int], list[int]]:
+    """n satır için (en yüksekler, en düşükler, örneklem) indeksleri; ranked büyükten küçüğe sıralı."""
+    if n >= len(ranked):
+        return list(ranked), [], []
+    edge = max(1, n // 4) if n >= 3 else n
+    top = list(ranked[:edge])
+    bottom = list(ranked[len(ranked) - min(edge, n - edge):]) if n > edge else []
+    middle = ranked[edge: len(ranked) - len(bottom)]
+    return top, bottom, _even_sample(middle, n - len(top) - len(bottom))
+
+
+def compact_rows(
+    rows: Sequence[dict],
+    columns: Sequence[str] | None = None,
+    budget_tokens: int = 6000,
+    rank_by: Optional[str] = None,
+) -> CompactTable:
+    """Satırları budget_tokens içine sığan kompakt tablo metnine çevirir."""
+    total = len(rows)
+    if not rows:
+        return CompactTable("(veri yok)", 0, 0, estimate_tokens("(veri yok)"))
+
+    cols = _columns(rows, columns)
+    numeric = _numeric_columns(rows, cols)
+    rank_col = rank_by if rank_by in numeric else next((c for c in RANK_COLUMNS if c in numeric), None)
+    if rank_col is None and numeric:
+        rank_col = numeric[0]
+
+    header = "|".join(cols)
+    encoded: dict[int, str] = {}
+
+    def line(i: int) -> str:
+        if i not in encoded:
+            encoded[i] = encode_row(rows[i], cols)
+        return encoded[i]
+
+    # Tamamı sığıyorsa tablo olduğu gibi gönderilir (bütçe aşılınca kodlama erken durur)
+    budget_chars = budget_tokens * CHARS_PER_TOKEN
+    size = len(header) + 40
+    for i in range(total):
+        size += len(line(i)) + 1
+        if size > budget_chars:
+            break
+    else:
+        text = f"Tablo ({total} satır, sütunlar '|' ile ayrılmış):\n{header}\n" + "\n".join(line(i) for i in range(total))
+        if estimate_tokens(text) <= budget_tokens:
+            return CompactTable(text, total, total, estimate_tokens(text))
+
+    # Bütçe aşıldı: özet istatistik + uç değerler + katmanlı örneklem
+    col_values = {c: [_number(row.get(c)) for row in rows] for c in numeric}
+    agg_lines = _aggregates(col_values)
+    if rank_col:
+        rank_values = col_values[rank_col]
+        ranked = sorted(range(total), key=lambda i: (-(rank_values[i] or 0.0), i))
+    else:
+        ranked = list(range(total))
+
+    def render(n: int) -> tuple[str, int]:
+        top, bottom, sample = _select(ranked, n)
+        sections = [
+            f"Tablo özeti: {total} satırın {len(top) + len(bottom) + len(sample)} tanesi gösteriliyor"
+            + (f" (sıralama: {rank_col})." if rank_col else "."),
+        ]
+        if agg_lines:
+            sections.append(f"Tüm {total} satırın istatistikleri:\n" + "\n".join(agg_lines))
+        sections.append(f"Sütunlar: {header}")
+        label = rank_col or "sıra"
+        if top:
+            sections.append(f"En yüksek {label} ({len(top)}):\n" + "\n".join(line(i) for i in top))
+        if bottom:
+            sections.append(f"En düşük {label} ({len(bottom)}):\n" + "\n".join(line(i) for i in bottom))
+        if sample:
+            sections.append(
+                f"Aradaki satırlardan eşit aralıklı örneklem ({len(sample)}):\n"
+                + "\n".join(line(i) for i in sample)
+            )
+        text = "\n\n".join(sections)
+        return text, len(top) + len(bottom) + len(sample)
+
+    # Bütçeye sığan en fazla satır sayısı (ikili arama)
+    lo, hi = 0, total
+    best = render(0)
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        candidate = render(mid)
+        if estimate_tokens(candidate[0]) <= budget_tokens:
+            best, lo = candidate, mid + 1
+        else:
+            hi = mid - 1
+    text, included = best
+    return CompactTable(text, total, included, estimate_tokens(text))
@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 """15 rapor şablonu tanımı ve şablona göre veri üretimi."""
 
-from typing import Any, Optional
+import asyncio
+from typing import Any, AsyncIterator, Optional, Union
 
 # Şablon listesi: id, başlık, kırılım açıklaması, metrik açıklaması
 REPORT_TEMPLATES = [
@@ -270,6 +271,50 @@ async def get_report_data_for_template(
     return []
 
 
+async def iter_templates_data(
+    template_ids: list[str],
+    days: int,
+    account_id: Optional[str],
+    meta_service: Any,
+) -> AsyncIterator[tuple[int, str, Union[list[dict], Exception]]]:
+    """Şablonları paralel çeker; her biri bittikçe (sıra, şablon_id, satırlar|hata) üretir.
+
+    Eşzamanlılık meta_service.concurrency_limiter() ile sınırlandırılır. Bir şablonun
+    hatası diğerlerini iptal etmez; hata nesnesi sonuç yerine döndürülür.
+    """
+    if not template_ids:
+        return
+    limiter = meta_service.concurrency_limiter()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def _fetch(index: int, tid: str) -> None:
+        try:
+            async with limiter:
+                rows = await get_report_data_for_template(tid, days, account_id, meta_service)
+            await queue.put((index, tid, rows))
+        except Exception as e:
+            await queue.put((index, tid, e))
+
+    async with asyncio.TaskGroup() as tg:
+        for i, tid in enumerate(template_ids):
+            tg.create_task(_fetch(i, tid))
+        for _ in template_ids:
+            yield await queue.get()
+
+
+async def fetch_templates_data(
+    template_ids: list[str],
+    days: int,
+    account_id: Optional[str],
+    meta_service: Any,
+) -> list[Union[list[dict], Exception]]:
+    """Şablonları paralel çeker; sonuçları template_ids sırasıyla döndürür (hata varsa Exception)."""
+    results: list[Union[list[dict], Exception]] = [[] for _ in template_ids]
+    async for index, _tid, result in iter_templates_data(template_ids, days, account_id, meta_service):
+        results[index] = result
+    return results
+
+
 def get_template_csv_columns(template_id: str) -> list[str]:
     """Şablonun CSV sütun sırasını döndürür."""
     t = next((x for x in REPORT_TEMPLATES if x["id"] == template_id), None)
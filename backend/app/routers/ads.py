@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel
 from typing import Optional
 from app.services.meta_service import meta_service, MetaAPIError
 from app import config
+from app.entity_snapshots import MAX_PAGE_SIZE, entity_list_response
 
 router = APIRouter()
 
@@ -21,6 +22,34 @@ class CreateAdBody(BaseModel):
     ad_account_id: Optional[str] = None
 
 
+@router.get("")
+async def list_ads(
+    request: Request,
+    days: int = Query(30, ge=7, le=365),
+    ad_account_id: Optional[str] = Query(None, description="Reklam hesabı ID (act_xxx)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Sayfa boyutu (verilirse sunucu tarafı sayfalama)"),
+    cursor: Optional[str] = Query(None, description="Önceki yanıttaki next_cursor"),
+    sort: Optional[str] = Query(None, description="Sıralama alanı; azalan için '-' öneki (örn. -spend)"),
+    fields: Optional[str] = Query(None, description="Döndürülecek alanlar, virgülle (id her zaman eklenir)"),
+):
+    """Hesaptaki reklamlar ve metrikleri; veri değişmediyse 304 döner."""
+    async def payload():
+        ads = await meta_service.get_ads(days=days, account_id=ad_account_id)
+        return {"data": ads, "count": len(ads)}
+
+    try:
+        return await entity_list_response(
+            request, "ads", (days, ad_account_id), payload,
+            limit=limit, cursor=cursor, sort=sort, fields=fields,
+        )
+    except HTTPException:
+        raise
+    except MetaAPIError as e:
+        _handle_meta_error(e)
+    except Exception as e:
+        _handle_meta_error(e)
+
+
 @router.post("")
 async def create_ad(body: CreateAdBody):
     """Reklam oluşturur (adset + kreatif bağlanır)."""
@@ -35,6 +64,7 @@ async def create_ad(body: CreateAdBody):
             body.name,
             status=body.status,
         )
+        meta_service.invalidate_campaigns_cache(aid)
         return {"success": True, "ad": result}
     except MetaAPIError as e:
         _handle_meta_error(e)
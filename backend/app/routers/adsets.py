@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 from app.services.meta_service import meta_service, MetaAPIError
 from app import config
+from app.entity_snapshots import MAX_PAGE_SIZE, entity_list_response
 
 router = APIRouter()
 
@@ -32,6 +33,34 @@ class CreateAdsetBody(BaseModel):
     ad_account_id: Optional[str] = None
 
 
+@router.get("")
+async def list_adsets(
+    request: Request,
+    days: int = Query(30, ge=7, le=365),
+    ad_account_id: Optional[str] = Query(None, description="Reklam hesabı ID (act_xxx)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Sayfa boyutu (verilirse sunucu tarafı sayfalama)"),
+    cursor: Optional[str] = Query(None, description="Önceki yanıttaki next_cursor"),
+    sort: Optional[str] = Query(None, description="Sıralama alanı; azalan için '-' öneki (örn. -spend)"),
+    fields: Optional[str] = Query(None, description="Döndürülecek alanlar, virgülle (id her zaman eklenir)"),
+):
+    """Hesaptaki reklam setleri (hedefleme ve bütçe bilgisiyle)."""
+    async def payload():
+        adsets = await meta_service.get_ad_sets(days=days, account_id=ad_account_id)
+        return {"data": adsets, "count": len(adsets)}
+
+    try:
+        return await entity_list_response(
+            request, "adsets", (days, ad_account_id), payload,
+            limit=limit, cursor=cursor, sort=sort, fields=fields,
+        )
+    except HTTPException:
+        raise
+    except MetaAPIError as e:
+        _handle_meta_error(e)
+    except Exception as e:
+        _handle_meta_error(e)
+
+
 @router.post("")
 async def create_adset(body: CreateAdsetBody):
     """Yeni reklam seti oluşturur. Bütçe hesap para biriminin en küçük biriminde (örn. TL kuruş)."""
@@ -54,6 +83,7 @@ async def create_adset(body: CreateAdsetBody):
             optimization_goal=body.optimization_goal,
             status=body.status,
         )
+        meta_service.invalidate_campaigns_cache(aid)
         return {"success": True, "adset": result}
     except MetaAPIError as e:
         _handle_meta_error(e)
@@ -72,6 +102,8 @@ async def update_adset_budget(adset_id: str, body: AdsetBudgetBody):
             daily_budget=body.daily_budget,
             lifetime_budget=body.lifetime_budget,
         )
+        # Reklam setinin hesabı bilinmediğinden tüm liste cache'leri temizlenir
+        meta_service.invalidate_campaigns_cache()
         return {"success": True, "adset_id": adset_id, "result": result}
     except MetaAPIError as e:
         _handle_meta_error(e)
@@ -1,9 +1,10 @@
 import asyncio
-import json
 import logging
-from fastapi import APIRouter, HTTPException, Query, Body, Depends
-from typing import Optional
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query, Body, Depends, Request, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Awaitable, Optional, TypeVar
+from pydantic import BaseModel, Field
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -11,12 +12,25 @@ logger = logging.getLogger(__name__)
 
 from app.database import get_db_session_optional, get_session
 from app.services.meta_service import meta_service, MetaAPIError
-from app.services.ai_service import analyze_campaigns, analyze_single_campaign, analyze_report_data, generate_ad_summary_from_reports
+from app.services.ai_service import (
+    analyze_campaigns,
+    analyze_campaigns_batch,
+    analyze_single_campaign,
+    analyze_report_data,
+    generate_ad_summary_from_reports,
+    stream_campaigns_analysis,
+    stream_report_analysis,
+    stream_single_campaign_analysis,
+)
+from app.job_events import sse_format
 from app.report_templates import REPORT_TEMPLATES, get_report_data_for_template, get_template_csv_columns
 from app.saved_reports import get_saved_report_by_id_optional
 from app.models import JobStatus
-from app.routers.targeting import get_targeting_options_data
+from app.routers.targeting import get_targeting_catalog
+from app.targeting_catalog import TargetingCatalog
 from app.services import strategy_service
+from app.services.ai_router import get_provider_stats
+from app.analysis_lessons import get_top_lessons
 from app import config
 
 router = APIRouter()
@@ -24,6 +38,13 @@ router = APIRouter()
 
 class AnalyzeReportBody(BaseModel):
     report_id: str
+    refresh: bool = False  # True: önbellekteki analizi yok say, yeniden üret
+
+
+class AnalyzeBatchBody(BaseModel):
+    campaign_ids: list[str] = Field(..., min_length=1, max_length=100)
+    days: int = Field(30, ge=7, le=365)
+    refresh: bool = False  # True: önbellekteki analizleri yok say, yeniden üret
 
 
 class GenerateAdSummaryBody(BaseModel):
@@ -32,6 +53,29 @@ class GenerateAdSummaryBody(BaseModel):
     job_ids: list[str] = []
 
 
+T = TypeVar("T")
+
+# İstemci bağlantısı bu aralıkla kontrol edilir (saniye)
+_DISCONNECT_POLL_SECONDS = 0.5
+
+
+async def _until_disconnected(request: Request, awaitable: Awaitable[T]) -> T:
+    """AI çağrısını bekler; istemci bağlantıyı kapatırsa çağrıyı (ve sağlayıcı isteğini) iptal eder."""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=_DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                logger.info("İstemci bağlantıyı kapattı, AI isteği iptal edildi: %s", request.url.path)
+                raise HTTPException(status_code=499, detail="İstemci bağlantıyı kapattı")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
 def _handle_meta_error(e: Exception):
     if isinstance(e, MetaAPIError):
         raise HTTPException(status_code=503, detail=e.args[0] if e.args else "Meta API hatası.")
@@ -138,8 +182,10 @@ async def get_anomalies(
 
 @router.get("/analyze")
 async def analyze_all_campaigns(
+    request: Request,
     days: int = Query(30, ge=7, le=365),
     ad_account_id: Optional[str] = Query(None),
+    refresh: bool = Query(False, description="Önbellekteki analizi yok say, yeniden üret"),
 ):
     """Tüm kampanyaları AI ile analiz et"""
     try:
@@ -147,7 +193,7 @@ async def analyze_all_campaigns(
         if not campaigns:
             raise HTTPException(status_code=404, detail="Kampanya bulunamadı")
 
-        analysis = await analyze_campaigns(campaigns)
+        analysis = await _until_disconnected(request, analyze_campaigns(campaigns, use_cache=not refresh))
         return {
             "analysis": analysis,
             "campaign_count": len(campaigns),
@@ -159,11 +205,70 @@ async def analyze_all_campaigns(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _token_events(meta: dict, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Analiz akışını SSE olaylarına çevirir: "start", her parça için "token", sonunda "done" veya "error"."""
+    yield sse_format(meta, event="start")
+    try:
+        async for chunk in chunks:
+            yield sse_format({"text": chunk}, event="token")
+    except Exception as e:
+        logger.warning("AI akışı kesildi: %s", e)
+        yield sse_format({"detail": str(e)}, event="error")
+        return
+    yield sse_format(meta, event="done")
+
+
+@router.get("/analyze/stream")
+async def stream_all_campaigns_analysis(
+    days: int = Query(30, ge=7, le=365),
+    ad_account_id: Optional[str] = Query(None),
+    refresh: bool = Query(False, description="Önbellekteki analizi yok say, yeniden üret"),
+):
+    """Tüm kampanyaların AI analizini Server-Sent Events olarak akıtır."""
+    try:
+        campaigns = await meta_service.get_campaigns(days, account_id=ad_account_id)
+    except Exception as e:
+        _handle_meta_error(e)
+    if not campaigns:
+        raise HTTPException(status_code=404, detail="Kampanya bulunamadı")
+    meta = {"campaign_count": len(campaigns), "period_days": days}
+    return _sse_response(_token_events(meta, stream_campaigns_analysis(campaigns, use_cache=not refresh)))
+
+
+@router.get("/analyze/{campaign_id}/stream")
+async def stream_campaign_analysis(
+    campaign_id: str,
+    days: int = Query(30, ge=7, le=365),
+    ad_account_id: Optional[str] = Query(None),
+    refresh: bool = Query(False, description="Önbellekteki analizi yok say, yeniden üret"),
+):
+    """Tek kampanya AI analizini Server-Sent Events olarak akıtır."""
+    try:
+        campaigns = await meta_service.get_campaigns(days, account_id=ad_account_id)
+    except Exception as e:
+        _handle_meta_error(e)
+    campaign = next((c for c in campaigns if c.get("id") == campaign_id), None)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Kampanya bulunamadı")
+    meta = {"campaign": campaign}
+    return _sse_response(_token_events(meta, stream_single_campaign_analysis(campaign, use_cache=not refresh)))
+
+
 @router.get("/analyze/{campaign_id}")
 async def analyze_campaign(
+    request: Request,
     campaign_id: str,
     days: int = Query(30, ge=7, le=365),
     ad_account_id: Optional[str] = Query(None),
+    refresh: bool = Query(False, description="Önbellekteki analizi yok say, yeniden üret"),
 ):
     """Tek bir kampanyayı derinlemesine analiz et"""
     try:
@@ -173,7 +278,7 @@ async def analyze_campaign(
         if not campaign:
             raise HTTPException(status_code=404, detail="Kampanya bulunamadı")
 
-        analysis = await analyze_single_campaign(campaign)
+        analysis = await _until_disconnected(request, analyze_single_campaign(campaign, use_cache=not refresh))
         return {"campaign": campaign, "analysis": analysis}
     except HTTPException:
         raise
@@ -181,6 +286,25 @@ async def analyze_campaign(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/analyze-batch")
+async def analyze_campaign_batch(request: Request, body: AnalyzeBatchBody):
+    """Seçilen kampanyaları toplu analiz eder: yalnızca bu kampanyaların metrikleri çekilir,
+    analizler bağlam bütçesine sığan en az sayıda LLM çağrısıyla üretilir."""
+    try:
+        campaigns = await meta_service.get_campaigns_by_ids(body.campaign_ids, body.days)
+    except Exception as e:
+        _handle_meta_error(e)
+    if not campaigns:
+        raise HTTPException(status_code=404, detail="Kampanya bulunamadı")
+    found = {str(c.get("id")) for c in campaigns}
+    result = await _until_disconnected(request, analyze_campaigns_batch(campaigns, use_cache=not body.refresh))
+    return {
+        **result,
+        "missing_campaign_ids": [cid for cid in dict.fromkeys(body.campaign_ids) if cid not in found],
+        "period_days": body.days,
+    }
+
+
 def _get_report_template_ids(saved: dict):
     """Kayıtlı rapor kaydından şablon id listesi (eski template_id veya template_ids)."""
     if saved.get("template_ids"):
@@ -192,6 +316,7 @@ def _get_report_template_ids(saved: dict):
 
 @router.post("/analyze-report")
 async def analyze_saved_report(
+    request: Request,
     body: AnalyzeReportBody,
     session: Optional[AsyncSession] = Depends(get_db_session_optional),
 ):
@@ -235,8 +360,12 @@ async def analyze_saved_report(
                 continue
             total_rows += len(rows)
             try:
-                analysis = await analyze_report_data(report_name, title, rows, columns or [])
+                analysis = await _until_disconnected(
+                    request, analyze_report_data(report_name, title, rows, columns or [], use_cache=not body.refresh)
+                )
                 parts.append(f"## {title}\n\n{analysis}")
+            except HTTPException:
+                raise
             except Exception as ae:
                 parts.append(f"## {title}\n\nAnaliz atlandı: {ae!s}")
         combined = "\n\n---\n\n".join(parts)
@@ -257,8 +386,62 @@ async def analyze_saved_report(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/analyze-report/stream")
+async def stream_saved_report_analysis(
+    body: AnalyzeReportBody,
+    session: Optional[AsyncSession] = Depends(get_db_session_optional),
+):
+    """Kayıtlı rapor analizini şablon şablon Server-Sent Events olarak akıtır.
+
+    Olaylar: "start", her şablon için "section" ve ardından "token"lar, sonunda "done".
+    Token'lar birleştirildiğinde /analyze-report ile aynı markdown metni oluşur.
+    """
+    saved = await get_saved_report_by_id_optional(session, body.report_id)
+    if not saved:
+        raise HTTPException(status_code=404, detail="Kayıtlı rapor bulunamadı.")
+    tids = _get_report_template_ids(saved)
+    if not tids:
+        raise HTTPException(status_code=400, detail="Raporda şablon bilgisi yok.")
+    days = saved.get("days", 30)
+    account_id = saved.get("ad_account_id")
+    report_name = saved.get("name", "Rapor")
+
+    async def _events():
+        yield sse_format({"report_id": body.report_id, "report_name": report_name, "template_count": len(tids)}, event="start")
+        total_rows = 0
+        for i, tid in enumerate(tids):
+            if i > 0:
+                await asyncio.sleep(2)
+                yield sse_format({"text": "\n\n---\n\n"}, event="token")
+            template = next((t for t in REPORT_TEMPLATES if t["id"] == tid), {})
+            title = template.get("title", tid)
+            yield sse_format({"index": i, "title": title}, event="section")
+            yield sse_format({"text": f"## {title}\n\n"}, event="token")
+            try:
+                rows = await get_report_data_for_template(tid, days, account_id, meta_service)
+            except MetaAPIError as e:
+                err_msg = str(e.args[0]) if e.args else "Meta API hatası"
+                yield sse_format({"text": f"Meta API hatası: {err_msg}. Birkaç dakika sonra tekrar deneyin."}, event="token")
+                continue
+            if not rows:
+                yield sse_format({"text": "Bu şablon için veri bulunamadı (Meta API boş döndü)."}, event="token")
+                continue
+            total_rows += len(rows)
+            columns = get_template_csv_columns(tid) or []
+            try:
+                async for chunk in stream_report_analysis(report_name, title, rows, columns, use_cache=not body.refresh):
+                    yield sse_format({"text": chunk}, event="token")
+            except Exception as ae:
+                logger.warning("Rapor analizi akışı kesildi: %s", ae)
+                yield sse_format({"text": f"Analiz atlandı: {ae!s}"}, event="token")
+        yield sse_format({"report_id": body.report_id, "row_count": total_rows}, event="done")
+
+    return _sse_response(_events())
+
+
 @router.post("/generate-ad-summary")
 async def generate_ad_summary(
+    request: Request,
     body: GenerateAdSummaryBody,
     session: Optional[AsyncSession] = Depends(get_db_session_optional),
 ):
@@ -275,14 +458,14 @@ async def generate_ad_summary(
             if row and row.result_text:
                 analysis_parts.append(f"--- Rapor ({job_id}) ---\n{row.result_text}")
     analysis_texts = "\n\n".join(analysis_parts) if analysis_parts else ""
-    targeting_options = get_targeting_options_data()
+    targeting_options = get_targeting_catalog()
     try:
-        data = await generate_ad_summary_from_reports(
+        data = await _until_disconnected(request, generate_ad_summary_from_reports(
             user_context=body.user_context.strip(),
             analysis_texts=analysis_texts,
             image_base64=body.user_context_image_base64 if body.user_context_image_base64 else None,
             targeting_options=targeting_options,
-        )
+        ))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     return {"form": data}
@@ -299,6 +482,12 @@ class StrategicAdSummaryBody(BaseModel):
     user_context_image_base64: Optional[str] = None
 
 
+@router.get("/provider-stats")
+async def get_ai_provider_stats():
+    """Sağlayıcı başına son çağrıların gecikme (p95) ve hata oranı; hedging bu değerlere göre yapılır."""
+    return {"providers": get_provider_stats(), "hedging": config.AI_HEDGE_ENABLED}
+
+
 @router.get("/behavior-modes")
 async def get_behavior_modes():
     """Tüm davranış modellerini listeler."""
@@ -307,6 +496,7 @@ async def get_behavior_modes():
 
 @router.post("/generate-strategic-ad-summary")
 async def generate_strategic_ad_summary(
+    request: Request,
     body: StrategicAdSummaryBody,
     session: Optional[AsyncSession] = Depends(get_db_session_optional),
 ):
@@ -314,65 +504,122 @@ async def generate_strategic_ad_summary(
     Stratejist Asistanı: Davranış modeli, ham veri ve geçmiş analizleri birleştirerek
     hata payı minimize edilmiş, yüksek dönüşüm odaklı reklam planı oluşturur.
     """
-    if not body.user_context.strip():
-        raise HTTPException(status_code=400, detail="Reklam çıkacağınız ürün/hizmet hakkında metin girin.")
-    
-    # Davranış modu doğrulama
-    if body.behavior_mode not in strategy_service.BEHAVIOR_MODES:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Geçersiz davranış modu. Geçerli değerler: {list(strategy_service.BEHAVIOR_MODES.keys())}"
-        )
+    _validate_strategic_request(body.user_context, body.behavior_mode)
     
     # 1. Ham veri analizi
     performance_analysis = {"best_ctr": None, "lowest_cpc": None, "best_platforms": [], "best_ages": [], "worst_platforms": [], "worst_ages": []}
     
     if body.raw_data_csv:
-        raw_rows = strategy_service.parse_csv_data(body.raw_data_csv)
-        performance_analysis = strategy_service.analyze_performance_data(raw_rows)
+        raw_frame = strategy_service.parse_csv_frame(body.raw_data_csv)
+        performance_analysis = strategy_service.analyze_performance_frame(raw_frame)
     elif body.raw_data_json:
-        raw_rows = strategy_service.parse_json_data(body.raw_data_json)
-        performance_analysis = strategy_service.analyze_performance_data(raw_rows)
+        raw_frame = strategy_service.parse_json_frame(body.raw_data_json)
+        performance_analysis = strategy_service.analyze_performance_frame(raw_frame)
     
-    # 2. Geçmiş analiz derslerini çıkar
+    return await _strategic_ad_summary(
+        request,
+        session,
+        user_context=body.user_context,
+        behavior_mode=body.behavior_mode,
+        performance_analysis=performance_analysis,
+        job_ids=body.job_ids,
+        image_base64=body.user_context_image_base64,
+    )
+
+
+@router.post("/generate-strategic-ad-summary/upload")
+async def generate_strategic_ad_summary_upload(
+    request: Request,
+    file: UploadFile = File(..., description="Ham performans verisi: CSV, JSON Lines veya JSON (.gz sıkıştırılmış olabilir)"),
+    user_context: str = Form(...),
+    behavior_mode: str = Form("RISK_MINIMIZER"),
+    job_ids: list[str] = Form([]),
+    user_context_image_base64: Optional[str] = Form(None),
+    session: Optional[AsyncSession] = Depends(get_db_session_optional),
+):
+    """
+    Stratejist Asistanı (dosya yükleme): Ham veri JSON gövdesinde metin olarak değil, multipart
+    dosya olarak gönderilir. Dosya parça parça okunup toplanır (bellek kullanımı sınırlı);
+    AI'a yalnızca toplu performans özeti gider.
+    """
+    _validate_strategic_request(user_context, behavior_mode)
+    try:
+        performance_analysis = await run_in_threadpool(
+            strategy_service.analyze_performance_stream, file.file, file.filename or ""
+        )
+    except strategy_service.UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        await file.close()
+
+    return await _strategic_ad_summary(
+        request,
+        session,
+        user_context=user_context,
+        behavior_mode=behavior_mode,
+        performance_analysis=performance_analysis,
+        job_ids=job_ids,
+        image_base64=user_context_image_base64,
+    )
+
+
+def _validate_strategic_request(user_context: str, behavior_mode: str) -> None:
+    if not user_context.strip():
+        raise HTTPException(status_code=400, detail="Reklam çıkacağınız ürün/hizmet hakkında metin girin.")
+    
+    # Davranış modu doğrulama
+    if behavior_mode not in strategy_service.BEHAVIOR_MODES:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Geçersiz davranış modu. Geçerli değerler: {list(strategy_service.BEHAVIOR_MODES.keys())}"
+        )
+
+
+async def _strategic_ad_summary(
+    request: Request,
+    session: Optional[AsyncSession],
+    *,
+    user_context: str,
+    behavior_mode: str,
+    performance_analysis: dict,
+    job_ids: list[str],
+    image_base64: Optional[str],
+) -> dict:
+    """Performans özeti hazır olduktan sonraki ortak adımlar: geçmiş dersler, prompt ve AI çağrısı."""
+    # 2. Geçmiş analiz dersleri (iş tamamlanırken çıkarılmış; tek indeksli sorgu)
     past_lessons = []
-    if body.job_ids and session:
-        for job_id in body.job_ids[:10]:
-            result = await session.execute(
-                select(JobStatus).where(JobStatus.id == job_id).where(JobStatus.job_type == "analyze").where(JobStatus.status == "completed")
-            )
-            row = result.scalar_one_or_none()
-            if row and row.result_text:
-                lessons = strategy_service.extract_lessons_from_analysis(row.result_text)
-                past_lessons.extend(lessons)
+    if job_ids and session:
+        past_lessons = await get_top_lessons(session, job_ids)
     
     # 3. Davranış modeline göre prompt oluştur
-    mode_rules = strategy_service.BEHAVIOR_MODES[body.behavior_mode]
+    mode_rules = strategy_service.BEHAVIOR_MODES[behavior_mode]
     strategic_prompt = strategy_service.generate_behavior_mode_prompt(
-        behavior_mode=body.behavior_mode,
+        behavior_mode=behavior_mode,
         performance_analysis=performance_analysis,
         past_lessons=past_lessons,
-        user_context=body.user_context.strip()
+        user_context=user_context.strip()
     )
     
     # 4. AI ile stratejik özet oluştur
-    targeting_options = get_targeting_options_data()
+    targeting_options = get_targeting_catalog()
     try:
-        data = await generate_strategic_ad_summary_with_ai(
+        data = await _until_disconnected(request, generate_strategic_ad_summary_with_ai(
             strategic_prompt=strategic_prompt,
-            behavior_mode=body.behavior_mode,
+            behavior_mode=behavior_mode,
             mode_rules=mode_rules,
             performance_analysis=performance_analysis,
-            image_base64=body.user_context_image_base64,
+            image_base64=image_base64,
             targeting_options=targeting_options,
-        )
+        ))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     
     return {
         "form": data,
         "strategy": {
-            "behavior_mode": body.behavior_mode,
+            "behavior_mode": behavior_mode,
             "mode_name": mode_rules.name_tr,
             "risk_level": mode_rules.risk_level,
             "budget_multiplier": mode_rules.budget_multiplier,
@@ -400,17 +647,17 @@ async def generate_strategic_ad_summary_with_ai(
     mode_rules: strategy_service.BehaviorModeRules,
     performance_analysis: dict,
     image_base64: Optional[str],
-    targeting_options: dict
+    targeting_options: "TargetingCatalog | dict"
 ) -> dict:
     """AI kullanarak stratejik reklam özeti oluşturur."""
     
-    from app.services.ai_service import _ai_provider, _get_claude_model, _get_gemini_model, AD_SUMMARY_JSON_SCHEMA
+    from app.services.ai_service import AD_SUMMARY_JSON_SCHEMA, _format_targeting_for_prompt, generate_json_with_ai
     
     targeting_block = ""
     if targeting_options:
         targeting_block = f"""
 ## MEVCUT HEDEF KITLE SEÇENEKLERİ (ZORUNLU - SADECE BUNLARDAN SEÇ):
-{_format_targeting_for_prompt(targeting_options)}
+{_format_targeting_for_prompt(targeting_options, strategic_prompt)}
 """
     
     full_prompt = f"""{strategic_prompt}
@@ -428,86 +675,8 @@ async def generate_strategic_ad_summary_with_ai(
 - Sadece geçerli JSON döndür, başka metin ekleme
 """
     
-    provider = _ai_provider()
-    anthropic_key = config.get_setting("ANTHROPIC_API_KEY") or ""
-    gemini_key = config.get_setting("GEMINI_API_KEY") or ""
-    
-    # Claude (resim destekli)
-    if anthropic_key and provider != "gemini":
-        try:
-            import anthropic
-            import base64
-            client = anthropic.Anthropic(api_key=anthropic_key)
-            content = [{"type": "text", "text": full_prompt}]
-            if image_base64:
-                try:
-                    content.insert(0, {
-                        "type": "image",
-                        "source": {"type": "base64", "media_type": "image/jpeg", "data": image_base64},
-                    })
-                except Exception:
-                    pass
-            message = client.messages.create(
-                model=_get_claude_model(),
-                max_tokens=4000,
-                system="Sen Meta Ads strateji uzmanısın. Davranış modellerine göre optimize edilmiş reklam planları oluşturursun. Sadece geçerli JSON döndür.",
-                messages=[{"role": "user", "content": content}],
-            )
-            if message.content and len(message.content) > 0 and hasattr(message.content[0], "text"):
-                text = message.content[0].text.strip()
-                if "```json" in text:
-                    text = text.split("```json")[1].split("```")[0].strip()
-                elif "```" in text:
-                    text = text.split("```")[1].split("```")[0].strip()
-                return json.loads(text)
-        except Exception as e:
-            if gemini_key:
-                pass
-            else:
-                raise ValueError(f"Claude hatası: {e}") from e
-    
-    # Gemini (resim destekli)
-    if gemini_key:
-        try:
-            import google.generativeai as genai
-            import base64
-            genai.configure(api_key=gemini_key)
-            model_name = _get_gemini_model()
-            model = genai.GenerativeModel(model_name)
-            parts = [full_prompt]
-            if image_base64:
-                try:
-                    import PIL.Image
-                    import io
-                    img_data = base64.b64decode(image_base64)
-                    img = PIL.Image.open(io.BytesIO(img_data))
-                    parts.insert(0, img)
-                except Exception:
-                    pass
-            response = model.generate_content(parts)
-            if response.candidates:
-                part = response.candidates[0].content.parts[0] if response.candidates[0].content.parts else None
-                if part and hasattr(part, "text"):
-                    text = part.text.strip()
-                    if "```json" in text:
-                        text = text.split("```json")[1].split("```")[0].strip()
-                    elif "```" in text:
-                        text = text.split("```")[1].split("```")[0].strip()
-                    return json.loads(text)
-        except Exception as e:
-            raise ValueError(f"AI hatası: {e}") from e
-    
-    raise ValueError("GEMINI_API_KEY veya ANTHROPIC_API_KEY tanımlı olmalı.")
-
-
-def _format_targeting_for_prompt(options: dict) -> str:
-    """Hedef kitle seçeneklerini prompt için metne dönüştürür."""
-    parts = []
-    for cat, key in [("Demografik Bilgiler", "demographics"), ("İlgi Alanları", "interests"), ("Davranışlar", "behaviors")]:
-        items = options.get(key) or []
-        labels = [x.get("label", "").strip() for x in items if x.get("label") and "Kullanılamıyor" not in str(x.get("size", ""))]
-        if labels:
-            parts.append(f"### {cat} (sadece bu etiketlerden seç, aynen kopyala):\n" + "\n".join(f"- {l}" for l in labels[:300]))
-        else:
-            parts.append(f"### {cat}: (boş)")
-    return "\n\n".join(parts)
+    return await generate_json_with_ai(
+        full_prompt,
+        image_base64=image_base64,
+        system="Sen Meta Ads strateji uzmanısın. Davranış modellerine göre optimize edilmiş reklam planları oluşturursun. Sadece geçerli JSON döndür.",
+    )
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 """Akıllı Uyarı Sistemi API - CRUD + Test Endpoint'leri."""
-from datetime import datetime, timedelta
 from typing import Optional, List
 from uuid import uuid4
 
@@ -12,6 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_session
 from app.models import AlertRule, AlertHistory, alert_rule_to_dict, alert_history_to_dict
 from app.services.meta_service import meta_service, MetaAPIError
+from app.alert_engine import CampaignFrame, account_key as alert_account_key, evaluate_rules, load_snapshots
 from app import config
 
 router = APIRouter(prefix="/api/alerts", tags=["Alerts"])
@@ -217,6 +217,13 @@ async def list_alert_history(
 
 # ============ Test / Manuel Kontrol Endpoint'leri ============
 
+def _test_message(rule: AlertRule, match) -> str:
+    name = match.campaign_name or "Kampanya"
+    if match.change_pct is not None:
+        return f"{name} - {rule.metric.upper()}: {match.actual_value:.2f} (değişim: %{match.change_pct:+.1f}, eşik: ±%{rule.threshold})"
+    return f"{name} - {rule.metric.upper()}: {match.actual_value:.2f} (eşik: {rule.threshold})"
+
+
 @router.post("/test/{rule_id}")
 async def test_alert_rule(
     rule_id: str,
@@ -238,33 +245,24 @@ async def test_alert_rule(
     except MetaAPIError as e:
         raise HTTPException(status_code=503, detail=f"Meta API hatası: {e}")
     
-    test_results = []
-    
-    for campaign in campaigns:
-        metric_value = campaign.get(rule.metric)
-        if metric_value is None:
-            continue
-        
-        metric_value = float(metric_value)
-        triggered = False
-        
-        if rule.condition == "lt" and metric_value < rule.threshold:
-            triggered = True
-        elif rule.condition == "gt" and metric_value > rule.threshold:
-            triggered = True
-        
-        if triggered:
-            test_results.append(AlertTestResult(
-                rule_id=rule.id,
-                rule_name=rule.name,
-                triggered=True,
-                metric=rule.metric,
-                threshold=rule.threshold,
-                actual_value=metric_value,
-                message=f"{campaign.get('name', 'Kampanya')} - {rule.metric.upper()}: {metric_value:.2f} (eşik: {rule.threshold})",
-                campaign_id=campaign.get('id'),
-                campaign_name=campaign.get('name'),
-            ))
+    key = alert_account_key(rule.ad_account_id)
+    previous = await load_snapshots(session, [key])
+    # Test: cooldown yok sayılır ve eşleşen tüm kampanyalar listelenir
+    matches = evaluate_rules([rule], {key: campaigns}, previous, first_only=False, ignore_cooldown=True)
+    test_results = [
+        AlertTestResult(
+            rule_id=rule.id,
+            rule_name=rule.name,
+            triggered=True,
+            metric=rule.metric,
+            threshold=rule.threshold,
+            actual_value=m.actual_value,
+            message=_test_message(rule, m),
+            campaign_id=m.campaign_id,
+            campaign_name=m.campaign_name,
+        )
+        for m in matches
+    ]
     
     return {
         "rule": alert_rule_to_dict(rule),
@@ -293,41 +291,25 @@ async def check_all_rules_manually(
     if not rules:
         return {"message": "Aktif kural bulunamadı.", "checked": 0, "triggered": 0}
     
-    # Tüm kampanyaları bir kere çek (optimizasyon)
-    try:
-        campaigns = await meta_service.get_campaigns(7, account_id=ad_account_id)
-    except MetaAPIError as e:
-        raise HTTPException(status_code=503, detail=f"Meta API hatası: {e}")
-    
-    triggered_count = 0
+    # Her hesabın kampanyaları bir kere çekilir, kurallar vektörel motorla tek seferde değerlendirilir
+    frames = {}
+    for account_id in {rule.ad_account_id for rule in rules}:
+        key = alert_account_key(account_id)
+        try:
+            campaigns = await meta_service.get_campaigns(7, account_id=account_id)
+        except MetaAPIError as e:
+            raise HTTPException(status_code=503, detail=f"Meta API hatası: {e}")
+        frames[key] = CampaignFrame.from_campaigns(key, campaigns)
     
-    for rule in rules:
-        # Cooldown kontrolü
-        if rule.last_triggered and rule.cooldown_minutes:
-            cooldown_end = rule.last_triggered + timedelta(minutes=rule.cooldown_minutes)
-            if datetime.utcnow() < cooldown_end:
-                continue
-        
-        for campaign in campaigns:
-            metric_value = campaign.get(rule.metric)
-            if metric_value is None:
-                continue
-            
-            metric_value = float(metric_value)
-            
-            if rule.condition == "lt" and metric_value < rule.threshold:
-                triggered_count += 1
-                # Not: Gerçek uygulamada burada bildirim gönderilir
-                break  # Bir kural bir kez tetiklenir
-            elif rule.condition == "gt" and metric_value > rule.threshold:
-                triggered_count += 1
-                break
+    # Not: Bildirim gönderilmez; sadece tetiklenecek kural sayısı döner
+    previous = await load_snapshots(session, frames.keys())
+    triggered_count = len(evaluate_rules(rules, frames, previous))
     
     return {
         "message": f"{len(rules)} kural kontrol edildi.",
         "checked": len(rules),
         "triggered": triggered_count,
-        "campaigns_checked": len(campaigns),
+        "campaigns_checked": sum(len(f.campaign_ids) for f in frames.values()),
     }
 
 
@@ -350,6 +332,7 @@ async def list_available_metrics():
         "conditions": [
             {"id": "lt", "name": "Küçükse (<)", "description": "Değer eşikten küçükse uyarı ver"},
             {"id": "gt", "name": "Büyükse (>)", "description": "Değer eşikten büyükse uyarı ver"},
+            {"id": "change_pct", "name": "Değişim (%)", "description": "Önceki kontrole göre değişim yüzdesi eşiği aşarsa uyarı ver"},
         ],
         "channels": [
             {"id": "email", "name": "E-posta", "requires": "email_to"},
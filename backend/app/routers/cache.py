@@ -6,6 +6,7 @@ from typing import Optional
 
 from app.cache import get_cache_stats, clear_all_cache, invalidate_prefix
 from app.deps import RequireAdmin
+from app.services.meta_service import meta_service
 
 router = APIRouter()
 
@@ -47,8 +48,8 @@ async def clear_cache(
 async def invalidate_campaigns_cache(
     current_user: RequireAdmin
 ):
-    """Kampanya cache'ini temizle (sadece admin)."""
-    deleted_count = invalidate_prefix("campaigns")
+    """Kampanya cache'ini ve hazır kampanya / reklam seti / reklam yanıtlarını temizle (sadece admin)."""
+    deleted_count = meta_service.invalidate_campaigns_cache()
     return {
         "message": "Kampanya cache'i temizlendi",
         "deleted_keys": deleted_count
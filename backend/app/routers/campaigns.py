@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Query, HTTPException, Body
+from fastapi import APIRouter, Query, HTTPException, Body, Request
 from fastapi.responses import StreamingResponse
 from typing import Optional
 from pydantic import BaseModel
 import io
 from app.services.meta_service import meta_service, MetaAPIError
 from app import config
+from app.entity_snapshots import MAX_PAGE_SIZE, entity_list_response
+from app.http_cache import cached_json_response, json_response
 
 router = APIRouter()
 
@@ -62,13 +64,26 @@ async def get_accounts():
 @router.get("")
 @router.get("/")
 async def get_campaigns(
+    request: Request,
     days: int = Query(30, ge=7, le=365),
-    ad_account_id: Optional[str] = Query(None, description="Reklam hesabı ID (act_xxx)")
+    ad_account_id: Optional[str] = Query(None, description="Reklam hesabı ID (act_xxx)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Sayfa boyutu (verilirse sunucu tarafı sayfalama)"),
+    cursor: Optional[str] = Query(None, description="Önceki yanıttaki next_cursor"),
+    sort: Optional[str] = Query(None, description="Sıralama alanı; azalan için '-' öneki (örn. -spend)"),
+    fields: Optional[str] = Query(None, description="Döndürülecek alanlar, virgülle (id her zaman eklenir)"),
 ):
     """Tüm kampanyaları ve metriklerini getir"""
-    try:
+    async def payload():
         campaigns = await meta_service.get_campaigns(days, account_id=ad_account_id)
         return {"data": campaigns, "count": len(campaigns)}
+
+    try:
+        return await entity_list_response(
+            request, "campaigns", (days, ad_account_id), payload,
+            limit=limit, cursor=cursor, sort=sort, fields=fields,
+        )
+    except HTTPException:
+        raise
     except MetaAPIError as e:
         _handle_meta_error(e)
     except Exception as e:
@@ -77,13 +92,14 @@ async def get_campaigns(
 
 @router.get("/summary")
 async def get_account_summary(
+    request: Request,
     days: int = Query(30, ge=7, le=365),
     ad_account_id: Optional[str] = Query(None, description="Reklam hesabı ID")
 ):
     """Hesap özeti"""
     try:
         summary = await meta_service.get_account_summary(days, account_id=ad_account_id)
-        return summary
+        return json_response(request, summary)
     except MetaAPIError as e:
         _handle_meta_error(e)
     except Exception as e:
@@ -92,13 +108,14 @@ async def get_account_summary(
 
 @router.get("/daily")
 async def get_daily_breakdown(
+    request: Request,
     days: int = Query(30, ge=7, le=365),
     ad_account_id: Optional[str] = Query(None, description="Reklam hesabı ID")
 ):
     """Günlük performans verisi"""
     try:
         data = await meta_service.get_daily_breakdown(days, account_id=ad_account_id)
-        return {"data": data}
+        return json_response(request, {"data": data})
     except MetaAPIError as e:
         _handle_meta_error(e)
     except Exception as e:
@@ -115,6 +132,7 @@ async def create_campaign(body: CreateCampaignBody):
         result = await meta_service.create_campaign(
             aid, body.name, body.objective, body.status
         )
+        meta_service.invalidate_campaigns_cache(aid)
         return {"success": True, "campaign": result}
     except MetaAPIError as e:
         _handle_meta_error(e)
@@ -127,6 +145,8 @@ async def update_campaign_status(campaign_id: str, body: CampaignStatusBody):
     """Kampanya durumunu günceller (ACTIVE, PAUSED, ARCHIVED)."""
     try:
         result = await meta_service.update_campaign_status(campaign_id, body.status)
+        # Kampanyanın hesabı bilinmediğinden tüm liste cache'leri temizlenir
+        meta_service.invalidate_campaigns_cache()
         return {"success": True, "campaign_id": campaign_id, "status": body.status.upper(), "result": result}
     except MetaAPIError as e:
         _handle_meta_error(e)
@@ -136,14 +156,18 @@ async def update_campaign_status(campaign_id: str, body: CampaignStatusBody):
 
 @router.get("/{campaign_id}/adsets")
 async def get_ad_sets(
+    request: Request,
     campaign_id: str,
     days: int = Query(30, ge=7, le=365),
     ad_account_id: Optional[str] = Query(None)
 ):
     """Kampanyaya ait reklam setleri"""
-    try:
+    async def payload():
         adsets = await meta_service.get_ad_sets(campaign_id, days, account_id=ad_account_id)
         return {"data": adsets, "count": len(adsets)}
+
+    try:
+        return await cached_json_response(request, "campaign_adsets", (campaign_id, days, ad_account_id), payload)
     except MetaAPIError as e:
         _handle_meta_error(e)
     except Exception as e:
@@ -152,14 +176,18 @@ async def get_ad_sets(
 
 @router.get("/{campaign_id}/ads")
 async def get_ads(
+    request: Request,
     campaign_id: str,
     days: int = Query(30, ge=7, le=365),
     ad_account_id: Optional[str] = Query(None)
 ):
     """Kampanyaya ait reklamlar"""
-    try:
+    async def payload():
         ads = await meta_service.get_ads(campaign_id, days, account_id=ad_account_id)
         return {"data": ads, "count": len(ads)}
+
+    try:
+        return await cached_json_response(request, "campaign_ads", (campaign_id, days, ad_account_id), payload)
     except MetaAPIError as e:
         _handle_meta_error(e)
     except Exception as e:
@@ -1,15 +1,18 @@
 # -*- coding: utf-8 -*-
 """Arka plan işleri: export/analyze job başlatma, durum ve indirme."""
 
+import asyncio
 from pathlib import Path
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_session
 from app.models import JobStatus
+from app.job_events import TERMINAL_STATUSES, get_live_job_state, sse_format, subscribe_job_events
 from app.job_store import create_job_sync, job_to_dict
 from app.saved_reports import get_saved_report_by_id_optional
 from app.tasks import export_report_task, analyze_report_task
@@ -51,6 +54,27 @@ async def enqueue_analyze_report(report_id: str):
     return {"job_id": job_id, "report_id": report_id, "job_type": "analyze"}
 
 
+def _job_with_live_progress(row: JobStatus) -> dict:
+    """DB kaydını Redis'teki canlı ilerleme ile birleştirir (ilerleme adımları DB'ye yazılmaz)."""
+    data = job_to_dict(row)
+    if row.status not in TERMINAL_STATUSES:
+        live = get_live_job_state(row.id)
+        if live and live.get("progress") is not None:
+            data["progress"] = max(data["progress"] or 0, int(live["progress"]))
+    return data
+
+
+async def _load_job_dict(job_id: str) -> Optional[dict]:
+    """Stream içinde (istek oturumu kapandıktan sonra) job kaydını okur."""
+    from app.database import async_session_factory
+    if not async_session_factory:
+        return None
+    async with async_session_factory() as session:
+        result = await session.execute(select(JobStatus).where(JobStatus.id == job_id))
+        row = result.scalar_one_or_none()
+        return _job_with_live_progress(row) if row else None
+
+
 @router.get("/{job_id}")
 async def get_job_status(job_id: str, session: AsyncSession = Depends(get_session)):
     """Job durumu ve ilerleme (progress)."""
@@ -58,7 +82,60 @@ async def get_job_status(job_id: str, session: AsyncSession = Depends(get_sessio
     row = result.scalar_one_or_none()
     if not row:
         raise HTTPException(status_code=404, detail="İş bulunamadı")
-    return job_to_dict(row)
+    return _job_with_live_progress(row)
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request, session: AsyncSession = Depends(get_session)):
+    """Job ilerlemesini Server-Sent Events olarak yayınlar (polling gerektirmez).
+
+    Olaylar: "snapshot" (bağlanınca mevcut durum), "progress" (her ilerleme adımı),
+    "done" (completed/failed sonrası tam kayıt). Redis yoksa 2 sn'de bir DB'den okunur.
+    """
+    result = await session.execute(select(JobStatus).where(JobStatus.id == job_id))
+    row = result.scalar_one_or_none()
+    if not row:
+        raise HTTPException(status_code=404, detail="İş bulunamadı")
+    snapshot = _job_with_live_progress(row)
+
+    async def _events():
+        yield sse_format(snapshot, event="snapshot")
+        if snapshot["status"] in TERMINAL_STATUSES:
+            return
+        async for event in subscribe_job_events(job_id):
+            if await request.is_disconnected():
+                return
+            if event is None:
+                # Abonelikten önce kaçırılmış olabilecek son durumu kontrol et
+                live = get_live_job_state(job_id)
+                if live and live.get("status") in TERMINAL_STATUSES:
+                    yield sse_format(await _load_job_dict(job_id) or live, event="done")
+                    return
+                yield ": keepalive\n\n"
+                continue
+            yield sse_format(event, event="progress")
+            if event.get("status") in TERMINAL_STATUSES:
+                yield sse_format(await _load_job_dict(job_id) or event, event="done")
+                return
+        # Redis kullanılamıyor: DB polling'e düş
+        last = snapshot
+        while not await request.is_disconnected():
+            await asyncio.sleep(2)
+            current = await _load_job_dict(job_id)
+            if not current:
+                return
+            if (current["status"], current["progress"]) != (last["status"], last["progress"]):
+                yield sse_format(current, event="progress")
+                last = current
+            if current["status"] in TERMINAL_STATUSES:
+                yield sse_format(current, event="done")
+                return
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/{job_id}/download")
@@ -3,8 +3,8 @@ from pathlib import Path
 from fastapi import APIRouter, Query, HTTPException, Depends
 from fastapi.responses import StreamingResponse, HTMLResponse, FileResponse
 from datetime import datetime
-import asyncio
 import io
+import json
 import uuid
 import zipfile
 from typing import Optional, List
@@ -17,8 +17,10 @@ from app.models import JobStatus
 from app.services.meta_service import meta_service, MetaAPIError
 from app.report_templates import (
     REPORT_TEMPLATES,
+    fetch_templates_data,
     get_report_data_for_template,
     get_template_csv_columns,
+    iter_templates_data,
 )
 from app.saved_reports import (
     load_saved_reports,
@@ -204,51 +206,102 @@ def _get_report_template_ids(r: dict) -> List[str]:
     return []
 
 
+def _template_payload(tid: str, rows: List[dict]) -> dict:
+    """Tek şablonun API yanıtındaki bölümü."""
+    tpl = next((t for t in REPORT_TEMPLATES if t["id"] == tid), {})
+    return {
+        "template_id": tid,
+        "template_title": tpl.get("title"),
+        "data": rows,
+        "columns": get_template_csv_columns(tid) or [],
+    }
+
+
+def _saved_report_data_response(report_id: str, r: dict, days: int, templates_payload: List[dict]) -> dict:
+    """Şablon bölümlerinden /saved/{id}/data yanıtını oluşturur (tek şablonda düz alanlar da eklenir)."""
+    if len(templates_payload) == 1:
+        t0 = templates_payload[0]
+        return {
+            "report_id": report_id,
+            "name": r.get("name"),
+            "template_title": t0["template_title"],
+            "days": days,
+            "data": t0["data"],
+            "columns": t0["columns"],
+            "templates": templates_payload,
+        }
+    return {
+        "report_id": report_id,
+        "name": r.get("name"),
+        "days": days,
+        "templates": templates_payload,
+    }
+
+
+def _raise_first_template_error(results: list) -> None:
+    """Paralel çekilen şablonlardan ilk hatayı (şablon sırasına göre) fırlatır."""
+    for res in results:
+        if isinstance(res, Exception):
+            raise res
+
+
+def _error_detail(e: Exception) -> str:
+    if isinstance(e, MetaAPIError):
+        return str(e.args[0]) if e.args else "Meta API hatası."
+    return str(e)
+
+
 @router.get("/saved/{report_id}/data")
 async def get_saved_report_data(
     report_id: str,
+    stream: bool = Query(False, description="true ise şablonlar bittikçe NDJSON satırları olarak gönderilir"),
     session: Optional[AsyncSession] = Depends(get_db_session_optional),
 ):
-    """Kayıtlı raporun verisini JSON olarak döndürür (AI analizi için). Tek veya çoklu şablon destekler."""
+    """Kayıtlı raporun verisini JSON olarak döndürür (AI analizi için). Tek veya çoklu şablon destekler.
+
+    Şablonlar Meta rate limit bütçesi dahilinde paralel çekilir. stream=true ile her şablon
+    tamamlandığında bir satır ({"type": "template"|"error", "index": ...}) gönderilir; son satır
+    ({"type": "complete"}) şablon sırası korunmuş tam yanıtı içerir.
+    """
     r = await get_saved_report_by_id_optional(session, report_id)
     if not r:
         raise HTTPException(status_code=404, detail="Rapor bulunamadı.")
     tids = _get_report_template_ids(r)
     if not tids:
         raise HTTPException(status_code=400, detail="Raporda şablon bilgisi yok.")
+    days = r.get("days", 30)
+    account_id = r.get("ad_account_id")
+
+    if stream:
+        async def _ndjson():
+            payloads: List[Optional[dict]] = [None] * len(tids)
+            errors: List[dict] = []
+            async for index, tid, result in iter_templates_data(tids, days, account_id, meta_service):
+                if isinstance(result, Exception):
+                    err = {"type": "error", "index": index, "template_id": tid, "detail": _error_detail(result)}
+                    errors.append(err)
+                    yield json.dumps(err, ensure_ascii=False, default=str) + "\n"
+                    continue
+                payloads[index] = _template_payload(tid, result)
+                yield json.dumps(
+                    {"type": "template", "index": index, **payloads[index]},
+                    ensure_ascii=False,
+                    default=str,
+                ) + "\n"
+            done = _saved_report_data_response(report_id, r, days, [p for p in payloads if p is not None])
+            done["type"] = "complete"
+            done["errors"] = errors or None
+            yield json.dumps(done, ensure_ascii=False, default=str) + "\n"
+
+        return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
+
+    results = await fetch_templates_data(tids, days, account_id, meta_service)
     try:
-        days = r.get("days", 30)
-        account_id = r.get("ad_account_id")
-        templates_payload = []
-        for tid in tids:
-            rows = await get_report_data_for_template(tid, days, account_id, meta_service)
-            tpl = next((t for t in REPORT_TEMPLATES if t["id"] == tid), {})
-            columns = get_template_csv_columns(tid)
-            templates_payload.append({
-                "template_id": tid,
-                "template_title": tpl.get("title"),
-                "data": rows,
-                "columns": columns or [],
-            })
-        if len(templates_payload) == 1:
-            t0 = templates_payload[0]
-            return {
-                "report_id": report_id,
-                "name": r.get("name"),
-                "template_title": t0["template_title"],
-                "days": days,
-                "data": t0["data"],
-                "columns": t0["columns"],
-                "templates": templates_payload,
-            }
-        return {
-            "report_id": report_id,
-            "name": r.get("name"),
-            "days": days,
-            "templates": templates_payload,
-        }
+        _raise_first_template_error(results)
     except MetaAPIError as e:
-        raise HTTPException(status_code=503, detail=str(e.args[0]) if e.args else "Meta API hatası.")
+        raise HTTPException(status_code=503, detail=_error_detail(e))
+    templates_payload = [_template_payload(tid, rows) for tid, rows in zip(tids, results)]
+    return _saved_report_data_response(report_id, r, days, templates_payload)
 
 
 @router.get("/saved/{report_id}/last-export")
@@ -318,10 +371,11 @@ async def export_saved_report_csv(
                 media_type="text/csv",
                 headers={"Content-Disposition": f"attachment; filename={filename}"},
             )
+        results = await fetch_templates_data(tids, days, account_id, meta_service)
+        _raise_first_template_error(results)
         buf = io.BytesIO()
         with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
-            for tid in tids:
-                rows = await get_report_data_for_template(tid, days, account_id, meta_service)
+            for tid, rows in zip(tids, results):
                 columns = get_template_csv_columns(tid)
                 if columns:
                     rows = [{k: row.get(k, "") for k in columns} for row in rows]
@@ -362,11 +416,12 @@ async def write_saved_report_csv_to_disk(
     report_name = r.get("name", "rapor")
     files_written: List[dict] = []
     errors: List[str] = []
-    for i, tid in enumerate(tids):
-        if i > 0:
-            await asyncio.sleep(2)
+    # Şablonlar rate limit bütçesi dahilinde paralel çekilir; dosyalar şablon sırasıyla yazılır
+    results = await fetch_templates_data(tids, days, account_id, meta_service)
+    for tid, rows in zip(tids, results):
         try:
-            rows = await get_report_data_for_template(tid, days, account_id, meta_service)
+            if isinstance(rows, Exception):
+                raise rows
             columns = get_template_csv_columns(tid)
             if columns:
                 rows = [{k: row.get(k, "") for k in columns} for row in rows]
@@ -328,6 +328,14 @@ async def get_recent_logs(
 
 # ============ Metadata Endpoint'leri ============
 
+@router.get("/metadata/grouping-metrics")
+async def get_grouping_metrics():
+    """Aynı (hesap, gün, rapor tipi) raporlarının gruplanmasıyla kazanılan Meta/AI çağrıları."""
+    from app.tasks import get_grouping_metrics as read_grouping_metrics
+
+    return read_grouping_metrics()
+
+
 @router.get("/metadata/frequencies")
 async def get_frequencies():
     """Kullanılabilir frekanslar ve örnekler."""
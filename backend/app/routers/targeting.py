@@ -1,76 +1,51 @@
-"""
-Hedef kitle seçenekleri API - Demografik Bilgiler, İlgi Alanları, Davranışlar.
-Meta Ads Manager'da manuel reklam oluşturma için özet üretiminde kullanılır.
-"""
-import os
-from pathlib import Path
-from fastapi import APIRouter, HTTPException
-
-router = APIRouter(tags=["Targeting"])
-
-# Docker'da TARGETING_FILES_DIR=/project ile proje kökü mount edilir
-_roottmp = Path(__file__).resolve().parent.parent.parent.parent
-_fallback = Path(os.getenv("TARGETING_FILES_DIR", ""))
-BASE_DIR = _fallback if _fallback and _fallback.exists() else _roottmp
-
-DEMOGRAPHICS_FILE = BASE_DIR / "Meta - Demografik Bilgiler.txt"
-BEHAVIORS_FILE = BASE_DIR / "Meta - Davranışlar.txt"
-INTERESTS_FILE = BASE_DIR / "Meta -  İlgi Alanları.txt"
-INTERESTS_ALT = BASE_DIR / "Meta - İlgi Alanları.txt"
-
-
-def _parse_targeting_file(file_path: Path) -> list[dict]:
-    """Txt dosyasını parse eder; label ve size içeren öğeleri döner."""
-    items: list[dict] = []
-    if not file_path.exists():
-        return items
-
-    try:
-        content = file_path.read_text(encoding="utf-8", errors="replace")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Dosya okunamadı: {e}")
-
-    # Satır formatı: "   * Etiket (Büyüklük: X - Y)" veya "   * Alt Kategori"
-    buyukluk_marker = "(Büyüklük:"
-
-    for line in content.splitlines():
-        line = line.rstrip()
-        if "*" not in line:
-            continue
-        idx = line.find("*")
-        rest = line[idx + 1 :].strip()
-        if not rest:
-            continue
-
-        if buyukluk_marker in rest:
-            i = rest.rfind(buyukluk_marker)
-            label = rest[:i].strip().rstrip("(").strip()
-            start = i + len(buyukluk_marker)
-            end = rest.find(")", start)
-            size_val = rest[start:end].strip() if end >= 0 else None
-        else:
-            label = rest
-            size_val = None
-
-        # Çok kısa veya boş etiketleri atla
-        if len(label) < 2:
-            continue
-
-        items.append({"label": label, "size": size_val})
-    return items
-
-
-def get_targeting_options_data() -> dict:
-    """Demografik bilgiler, ilgi alanları ve davranışları döner (AI ve API için)."""
-    interests_path = INTERESTS_FILE if INTERESTS_FILE.exists() else INTERESTS_ALT
-    return {
-        "demographics": _parse_targeting_file(DEMOGRAPHICS_FILE),
-        "interests": _parse_targeting_file(interests_path),
-        "behaviors": _parse_targeting_file(BEHAVIORS_FILE),
-    }
-
-
-@router.get("/options")
-async def get_targeting_options():
-    """Demografik bilgiler, ilgi alanları ve davranışları döner."""
-    return get_targeting_options_data()
+"""
+Hedef kitle seçenekleri API - Demografik Bilgiler, İlgi Alanları, Davranışlar.
+Meta Ads Manager'da manuel reklam oluşturma için özet üretiminde kullanılır.
+Dosyalar app.targeting_catalog'da bir kez ayrıştırılıp indekslenir.
+"""
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.targeting_catalog import TargetingCatalog, get_catalog
+
+router = APIRouter(tags=["Targeting"])
+
+
+def get_targeting_catalog() -> TargetingCatalog:
+    """Güncel hedef kitle kataloğu (AI prompt'ları ve arama için); dosya okunamazsa 500."""
+    try:
+        return get_catalog()
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Dosya okunamadı: {e}")
+
+
+def get_targeting_options_data() -> dict:
+    """Demografik bilgiler, ilgi alanları ve davranışları döner (AI ve API için)."""
+    return get_targeting_catalog().options()
+
+
+@router.get("/options")
+async def get_targeting_options():
+    """Demografik bilgiler, ilgi alanları ve davranışları döner."""
+    return get_targeting_options_data()
+
+
+@router.get("/search")
+async def search_targeting_options(
+    q: str = Query("", max_length=100, description="Etiket araması (Türkçe karakter duyarsız)"),
+    category: Optional[Literal["demographics", "interests", "behaviors"]] = None,
+    min_size: Optional[int] = Query(None, ge=0, description="Kitle büyüklüğü alt sınırı"),
+    max_size: Optional[int] = Query(None, ge=0, description="Kitle büyüklüğü üst sınırı"),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+):
+    """Hedef kitle seçeneklerinde arama; kitle büyüklüğü aralığıyla filtrelenebilir."""
+    total, items = get_targeting_catalog().search(q, category, min_size, max_size, limit=limit, offset=offset)
+    return {
+        "query": q,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "items": [item.as_dict() for item in items],
+    }
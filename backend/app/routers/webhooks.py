@@ -7,6 +7,7 @@ olayları gerçek zamanlı webhook ile bildirir.
 
 Webhook URL: https://yourdomain.com/api/webhooks/meta
 """
+import asyncio
 import hmac
 import hashlib
 import json
@@ -19,7 +20,15 @@ from pydantic import BaseModel, Field
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.alert_triggers import extract_changed_campaigns, schedule_reevaluation
 from app.database import get_db_session_optional
+from app.webhook_events import (
+    append_webhook_events,
+    enqueue_webhook_payload,
+    forget_entries,
+    mark_entries_seen,
+    read_webhook_events,
+)
 from app.models import AlertRule, AlertHistory
 from app.services.meta_service import meta_service
 from app import config
@@ -180,6 +189,120 @@ async def _send_webhook_alert(
         logger.info(f"[Webhook Alert] {message}")
 
 
+async def process_webhook_events(events: list[dict]) -> int:
+    """
+    Webhook olaylarını işler: kritik değişiklikler için uyarı ve değişen kampanyaların
+    kurallarını hedefli (debounce'lu) yeniden değerlendirme planlaması.
+    Dönüş: Planlanan hedefli kontrol sayısı
+    """
+    await asyncio.gather(*(
+        _send_webhook_alert(
+            session=None,
+            object_type=event.get("object_type") or "unknown",
+            object_id=event.get("object_id"),
+            changed_fields=[event["field"]] if event.get("field") else [],
+            event_data=event["value"] if isinstance(event.get("value"), dict) else {},
+        )
+        for event in events
+    ))
+    
+    scheduled = 0
+    for account_id, campaign_ids in extract_changed_campaigns(events).items():
+        try:
+            if schedule_reevaluation(account_id, campaign_ids):
+                scheduled += 1
+        except Exception as e:
+            logger.warning(f"Uyarı yeniden değerlendirmesi planlanamadı (account={account_id}): {e}")
+    return scheduled
+
+
+def webhook_payload_to_events(payload: dict) -> list[dict]:
+    """
+    Meta webhook payload'ını değişiklik başına bir olaya dönüştürür.
+    Her olay, yeniden gönderimleri elemek için entry id + zamandan oluşan entry_key taşır.
+    """
+    events = []
+    for entry in payload.get("entry") or []:
+        object_id = entry.get("id")  # act_xxx, campaign_xxx, adset_xxx, ad_xxx
+        changes = entry.get("changes") or []
+        time_unix = entry.get("time")
+        
+        # Object tipini belirle (ID prefix'inden)
+        object_type = "unknown"
+        if object_id:
+            if object_id.startswith("act_"):
+                object_type = "ad_account"
+            elif object_id.startswith("campaign_"):
+                object_type = "campaigns"
+            elif object_id.startswith("adset_"):
+                object_type = "adsets"
+            elif object_id.startswith("ad_"):
+                object_type = "ads"
+        
+        # Her değişikliği olay olarak topla
+        for change in changes:
+            field = change.get("field")
+            events.append({
+                "object_type": object_type,
+                "object_id": object_id,
+                "field": field,
+                "value": change.get("value", {}),
+                "time": (datetime.fromtimestamp(time_unix) if time_unix else datetime.utcnow()).isoformat(),
+                "entry_key": f"{object_id}:{time_unix}" if object_id and time_unix else None,
+            })
+    return events
+
+
+async def process_webhook_payloads(bodies: list[bytes]) -> dict:
+    """
+    Kuyruktan alınan ham webhook gövdelerini toplu işler: ayrıştırma, yeniden gönderimleri
+    entry id + zamana göre eleme, olay günlüğüne yazma ve uyarıları dağıtma.
+    """
+    stats = {"payloads": len(bodies), "invalid": 0, "duplicates": 0, "events": 0}
+    entries: dict[Optional[str], list[dict]] = {}
+    for body in bodies:
+        try:
+            payload = json.loads(body)
+        except (TypeError, ValueError):
+            stats["invalid"] += 1
+            continue
+        if not isinstance(payload, dict) or payload.get("object") != "ads":
+            stats["invalid"] += 1
+            continue
+        body_entries: dict[Optional[str], list[dict]] = {}
+        for event in webhook_payload_to_events(payload):
+            body_entries.setdefault(event["entry_key"], []).append(event)
+        for key, key_events in body_entries.items():
+            if key is not None and key in entries:
+                # Aynı batch içinde yeniden gönderim
+                stats["duplicates"] += 1
+                continue
+            entries.setdefault(key, []).extend(key_events)
+    
+    # Zaman bilgisi olmayan entry'ler elenemez, her zaman işlenir
+    events = entries.pop(None, [])
+    keys = list(entries.keys())
+    new_keys = []
+    for key, is_new in zip(keys, mark_entries_seen(keys)):
+        if is_new:
+            new_keys.append(key)
+            events.extend(entries[key])
+        else:
+            stats["duplicates"] += 1
+    
+    for event in events:
+        logger.info(f"[Meta Webhook] {event['object_type']}:{event['object_id']} - {event['field']} değişti")
+    try:
+        await process_webhook_events(events)
+    except Exception:
+        # Batch ACK'lenmeyecek; yeniden alındığında tekrar olarak elenmesin
+        forget_entries(new_keys)
+        raise
+    append_webhook_events(events)
+    stats["events"] = len(events)
+    return stats
+
+
 # ============ Webhook Endpoint'leri ============
 
 @router.get("/meta")
@@ -217,7 +340,6 @@ async def meta_webhook_verify(
 async def meta_webhook_callback(
     request: Request,
     x_hub_signature_256: Optional[str] = Header(None),
-    session: AsyncSession = Depends(get_db_session_optional),
 ):
     """
     Meta webhook callback endpoint'i.
@@ -255,7 +377,12 @@ async def meta_webhook_callback(
         logger.error("Geçersiz webhook imzası")
         raise HTTPException(status_code=403, detail="Invalid signature")
     
-    # JSON parse et
+    # Ham gövde kuyruğa alınır ve hemen 200 dönülür (Meta yavaş yanıtları yeniden dener).
+    # Ayrıştırma, tekrar eleme ve uyarılar arka plan tüketicisinde yapılır.
+    if enqueue_webhook_payload(body):
+        return {"status": "accepted", "timestamp": datetime.utcnow().isoformat()}
+    
+    # Redis yoksa istek içinde işlenir
     try:
         payload = json.loads(body)
     except json.JSONDecodeError:
@@ -267,59 +394,12 @@ async def meta_webhook_callback(
         logger.warning(f"Bilinmeyen object tipi: {payload.get('object')}")
         return {"status": "ignored", "reason": "unknown_object_type"}
     
-    # Entry'leri işle
-    entries = payload.get("entry", [])
-    processed_count = 0
-    
-    for entry in entries:
-        object_id = entry.get("id")  # act_xxx, campaign_xxx, adset_xxx, ad_xxx
-        changes = entry.get("changes", [])
-        time_unix = entry.get("time")
-        
-        # Object tipini belirle (ID prefix'inden)
-        object_type = "unknown"
-        if object_id:
-            if object_id.startswith("act_"):
-                object_type = "ad_account"
-            elif object_id.startswith("campaign_"):
-                object_type = "campaigns"
-            elif object_id.startswith("adset_"):
-                object_type = "adsets"
-            elif object_id.startswith("ad_"):
-                object_type = "ads"
-        
-        # Her değişikliği işle
-        for change in changes:
-            field = change.get("field")
-            value = change.get("value", {})
-            
-            event_data = {
-                "object_type": object_type,
-                "object_id": object_id,
-                "field": field,
-                "value": value,
-                "time": datetime.fromtimestamp(time_unix) if time_unix else datetime.utcnow(),
-            }
-            
-            logger.info(f"[Meta Webhook] {object_type}:{object_id} - {field} değişti")
-            
-            # Değişikliği işle ve gerekirse uyarı gönder
-            if session:
-                changed_fields = [field] if field else []
-                await _send_webhook_alert(
-                    session=session,
-                    object_type=object_type,
-                    object_id=object_id,
-                    changed_fields=changed_fields,
-                    event_data=value
-                )
-            
-            processed_count += 1
+    stats = await process_webhook_payloads([body])
     
     # Her zaman 200 OK döndür (Meta tekrar denemesin)
     return {
         "status": "success",
-        "processed": processed_count,
+        "processed": stats["events"],
         "timestamp": datetime.utcnow().isoformat(),
     }
 
@@ -393,33 +473,15 @@ async def test_webhook_delivery(
 
 # ============ Webhook Event History ============
 
-# Bellek içi son webhook olayları (geliştirme için)
-_recent_webhook_events: list = []
-MAX_STORED_EVENTS = 100
-
-
 @router.get("/events")
 async def get_recent_webhook_events(
     limit: int = Query(50, ge=1, le=100),
     object_type: Optional[str] = Query(None),
+    before: Optional[str] = Query(None, description="Bu stream id'sinden eski olaylar (sayfalama)"),
+    after: Optional[str] = Query(None, description="Bu stream id'sinden yeni olaylar (canlı izleme)"),
 ):
     """
     Son webhook olaylarını döner (debug/izleme için).
-    Not: Üretim ortamında Redis/DB kullanılmalı.
+    Olaylar Redis Stream'den okunur; object_type verilirse ilgili tipin stream'i kullanılır.
     """
-    events = _recent_webhook_events
-    
-    if object_type:
-        events = [e for e in events if e.get("object_type") == object_type]
-    
-    return {
-        "events": events[-limit:],
-        "total_stored": len(_recent_webhook_events),
-    }
-
-
-def _store_webhook_event(event: dict):
-    """Webhook olayını belleğe kaydet (debug için)"""
-    _recent_webhook_events.append(event)
-    if len(_recent_webhook_events) > MAX_STORED_EVENTS:
-        _recent_webhook_events.pop(0)
+    return read_webhook_events(limit=limit, object_type=object_type, before=before, after=after)
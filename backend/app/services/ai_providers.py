@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""AI sağlayıcı soyutlaması: sağlayıcı başına uzun ömürlü async istemciler.
+
+Claude (AsyncAnthropic), Gemini (REST, httpx) ve Ollama (httpx) için istemciler event loop
+başına bir kez oluşturulur ve bağlantıları (TLS oturumları dahil) istekler arasında paylaşılır.
+Her sağlayıcının kendi eşzamanlılık semaforu vardır (AI_MAX_CONCURRENCY); istekler
+AI_REQUEST_TIMEOUT_SECONDS ile sınırlanır ve çağıran iptal edildiğinde (ör. istemci bağlantıyı
+kapattığında) sağlayıcı isteği de iptal edilir.
+"""
+
+import abc
+import asyncio
+import json
+import logging
+import weakref
+from typing import AsyncIterator, Optional, Sequence
+
+import httpx
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_NAMES = ("claude", "gemini", "ollama")
+
+
+class AIProviderError(Exception):
+    """Sağlayıcı yanıt üretemedi."""
+
+
+class AIProvider(abc.ABC):
+    """Ortak arayüz: complete() tam yanıt, stream() metin parçaları döner."""
+
+    name = ""
+
+    def __init__(self, api_key: str, base_url: Optional[str], max_concurrency: int, timeout: float):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def complete(
+        self,
+        model: str,
+        system: str,
+        prompt: str,
+        max_tokens: int = 2000,
+        images: Sequence[str] = (),
+        timeout: Optional[float] = None,
+    ) -> str:
+        """Tam yanıtı döner; images base64 JPEG listesidir (görsel destekli modeller)."""
+        async with self._semaphore:
+            return await asyncio.wait_for(
+                self._complete(model, system, prompt, max_tokens, images),
+                timeout or self.timeout,
+            )
+
+    async def stream(self, model: str, system: str, prompt: str, max_tokens: int = 2000) -> AsyncIterator[str]:
+        """Yanıtı parça parça iletir; semafor akış boyunca tutulur."""
+        async with self._semaphore:
+            async for chunk in self._stream(model, system, prompt, max_tokens):
+                yield chunk
+
+    @abc.abstractmethod
+    async def _complete(self, model, system, prompt, max_tokens, images) -> str:
+        """Sağlayıcıya özgü tek seferlik istek."""
+
+    @abc.abstractmethod
+    def _stream(self, model, system, prompt, max_tokens) -> AsyncIterator[str]:
+        """Sağlayıcıya özgü akış; async generator olarak uygulanır."""
+
+    async def aclose(self) -> None:
+        pass
+
+
+class ClaudeProvider(AIProvider):
+    name = "claude"
+    max_retries = 2
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        import anthropic
+
+        self._client = anthropic.AsyncAnthropic(
+            api_key=self.api_key,
+            base_url=self.base_url or None,
+            timeout=self.timeout,
+            max_retries=self.max_retries,
+        )
+
+    @staticmethod
+    def _content(prompt: str, images: Sequence[str]):
+        if not images:
+            return prompt
+        blocks = [
+            {"type": "image", "source": {"type": "base64", "media_type": "image/jpeg", "data": data}}
+            for data in images
+        ]
+        return blocks + [{"type": "text", "text": prompt}]
+
+    async def _complete(self, model, system, prompt, max_tokens, images) -> str:
+        message = await self._client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            system=system,
+            messages=[{"role": "user", "content": self._content(prompt, images)}],
+        )
+        text = "".join(getattr(block, "text", "") for block in message.content or [])
+        if not text:
+            raise AIProviderError("Claude boş yanıt döndü")
+        return text
+
+    async def _stream(self, model, system, prompt, max_tokens) -> AsyncIterator[str]:
+        async with self._client.messages.stream(
+            model=model,
+            max_tokens=max_tokens,
+            system=system,
+            messages=[{"role": "user", "content": prompt}],
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+
+    async def aclose(self) -> None:
+        await self._client.close()
+
+
+class GeminiProvider(AIProvider):
+    name = "gemini"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._client = httpx.AsyncClient(
+            base_url=(self.base_url or "https://generativelanguage.googleapis.com").rstrip("/"),
+            headers={"x-goog-api-key": self.api_key},
+            timeout=httpx.Timeout(self.timeout, connect=10.0),
+        )
+
+    @staticmethod
+    def _body(system: str, prompt: str, max_tokens: int, images: Sequence[str] = ()) -> dict:
+        parts = [{"inlineData": {"mimeType": "image/jpeg", "data": data}} for data in images]
+        parts.append({"text": prompt})
+        body = {
+            "contents": [{"role": "user", "parts": parts}],
+            "generationConfig": {"maxOutputTokens": max_tokens},
+        }
+        if system:
+            body["systemInstruction"] = {"parts": [{"text": system}]}
+        return body
+
+    @staticmethod
+    def _texts(data: dict) -> list[str]:
+        return [
+            part["text"]
+            for candidate in data.get("candidates") or []
+            for part in (candidate.get("content") or {}).get("parts") or []
+            if part.get("text")
+        ]
+
+    async def _complete(self, model, system, prompt, max_tokens, images) -> str:
+        r = await self._client.post(
+            f"/v1beta/models/{model}:generateContent", json=self._body(system, prompt, max_tokens, images)
+        )
+        if r.status_code >= 400:
+            raise AIProviderError(f"Gemini HTTP {r.status_code}: {r.text[:300]}")
+        text = "".join(self._texts(r.json()))
+        if not text:
+            raise AIProviderError("Gemini boş yanıt döndü")
+        return text
+
+    async def _stream(self, model, system, prompt, max_tokens) -> AsyncIterator[str]:
+        async with self._client.stream(
+            "POST",
+            f"/v1beta/models/{model}:streamGenerateContent",
+            params={"alt": "sse"},
+            json=self._body(system, prompt, max_tokens),
+        ) as r:
+            if r.status_code >= 400:
+                raise AIProviderError(f"Gemini HTTP {r.status_code}: {(await r.aread())[:300]!r}")
+            async for line in r.aiter_lines():
+                if line.startswith("data:"):
+                    for text in self._texts(json.loads(line[5:])):
+                        yield text
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class OllamaProvider(AIProvider):
+    name = "ollama"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._client = httpx.AsyncClient(
+            base_url=(self.base_url or "http://localhost:11434").rstrip("/"),
+            timeout=httpx.Timeout(self.timeout, connect=10.0),
+        )
+
+    async def _complete(self, model, system, prompt, max_tokens, images) -> str:
+        body = {"model": model, "prompt": prompt, "system": system, "stream": False}
+        if images:
+            body["images"] = list(images)
+        r = await self._client.post("/api/generate", json=body)
+        if r.status_code >= 400:
+            raise AIProviderError(f"Ollama HTTP {r.status_code}: {r.text[:300]}")
+        return (r.json().get("response") or "").strip()
+
+    async def _stream(self, model, system, prompt, max_tokens) -> AsyncIterator[str]:
+        body = {"model": model, "prompt": prompt, "system": system, "stream": True}
+        async with self._client.stream("POST", "/api/generate", json=body) as r:
+            if r.status_code >= 400:
+                raise AIProviderError(f"Ollama HTTP {r.status_code}")
+            async for line in r.aiter_lines():
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if data.get("response"):
+                    yield data["response"]
+                if data.get("done"):
+                    return
+
+
+_PROVIDER_CLASSES = {"claude": ClaudeProvider, "gemini": GeminiProvider, "ollama": OllamaProvider}
+
+# event loop -> {sağlayıcı adı: (ayar imzası, istemci)}; Celery her task'ta yeni loop açar
+_registry: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+
+def _provider_settings(name: str) -> tuple[str, Optional[str]]:
+    if name == "claude":
+        return config.get_setting("ANTHROPIC_API_KEY") or "", config.get_setting("ANTHROPIC_BASE_URL") or None
+    if name == "gemini":
+        return config.get_setting("GEMINI_API_KEY") or "", config.get_setting("GEMINI_BASE_URL") or None
+    return "", config.get_setting("OLLAMA_BASE_URL") or None
+
+
+def get_provider(name: str) -> AIProvider:
+    """Çalışan event loop için sağlayıcı istemcisini döner (ayarlar değiştiyse yeniden oluşturur)."""
+    cls = _PROVIDER_CLASSES.get(name)
+    if cls is None:
+        raise ValueError(f"Bilinmeyen AI sağlayıcı: {name}")
+    loop = asyncio.get_running_loop()
+    providers = _registry.setdefault(loop, {})
+    signature = _provider_settings(name)
+    current = providers.get(name)
+    if current and current[0] == signature:
+        return current[1]
+    provider = cls(*signature, max_concurrency=config.AI_MAX_CONCURRENCY, timeout=config.AI_REQUEST_TIMEOUT_SECONDS)
+    providers[name] = (signature, provider)
+    if current:
+        # Ayar (API anahtarı/adres) değişti: eski istemcinin bağlantılarını kapat
+        loop.create_task(current[1].aclose())
+    return provider
+
+
+async def close_providers() -> None:
+    """Çalışan loop'taki tüm sağlayıcı istemcilerini kapatır (uygulama kapanışı)."""
+    providers = _registry.pop(asyncio.get_running_loop(), {})
+    for _, provider in providers.values():
+        try:
+            await provider.aclose()
+        except Exception as e:
+            logger.warning("AI istemcisi kapatılamadı (%s): %s", provider.name, e)
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""AI sağlayıcı yönlendirici: hedging, yedek sağlayıcıya geçiş ve kesin süre sınırı.
+
+Seçili (birincil) sağlayıcı, kendi p95 gecikmesi içinde yanıt vermezse sıradaki sağlayıcı da
+başlatılır ve ilk gelen geçerli yanıt kullanılır (diğeri iptal edilir). Hata alan sağlayıcının
+yerine sıradaki hemen denenir. AI_HARD_DEADLINE_SECONDS dolduğunda bekleyen tüm istekler iptal
+edilir ve kural tabanlı analiz döner. Sağlayıcı başına son gecikme/hata istatistikleri (süreç
+içinde) hem hedging gecikmesini hem de sağlayıcı sırasını belirler.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+# İstatistik penceresi (son N çağrı) ve p95 için gereken en az başarılı örnek
+STATS_WINDOW = 50
+MIN_LATENCY_SAMPLES = 5
+# Bu oranın üzerinde hata veren birincil sağlayıcı sıranın sonuna alınır
+UNHEALTHY_ERROR_RATE = 0.5
+
+RULE_BASED = "rule_based"
+
+
+class ProviderStats:
+    """Sağlayıcının son STATS_WINDOW çağrısındaki gecikme ve hata bilgisi."""
+
+    def __init__(self, window: int = STATS_WINDOW):
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.outcomes: deque[bool] = deque(maxlen=window)
+
+    def record_success(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+        self.outcomes.append(True)
+
+    def record_error(self) -> None:
+        self.outcomes.append(False)
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+    def snapshot(self) -> dict:
+        p95 = self.p95()
+        return {
+            "calls": len(self.outcomes),
+            "error_rate": round(self.error_rate(), 3),
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+        }
+
+
+_stats: dict[str, ProviderStats] = {}
+
+
+def provider_stats(name: str) -> ProviderStats:
+    return _stats.setdefault(name, ProviderStats())
+
+
+def get_provider_stats() -> dict[str, dict]:
+    """Sağlayıcı başına gecikme/hata özeti (bu süreç için)."""
+    return {name: stats.snapshot() for name, stats in sorted(_stats.items())}
+
+
+def reset_provider_stats() -> None:
+    _stats.clear()
+
+
+def hedge_delay(name: str) -> float:
+    """Sıradaki sağlayıcının başlatılmasından önce beklenecek süre: sağlayıcının p95 gecikmesi."""
+    p95 = provider_stats(name).p95()
+    return p95 if p95 is not None else config.AI_HEDGE_DEFAULT_DELAY_SECONDS
+
+
+def configured_providers() -> list[str]:
+    """Anahtarı / adresi tanımlı sağlayıcılar."""
+    names = []
+    if config.get_setting("ANTHROPIC_API_KEY"):
+        names.append("claude")
+    if config.get_setting("GEMINI_API_KEY"):
+        names.append("gemini")
+    if config.get_setting("OLLAMA_BASE_URL"):
+        names.append("ollama")
+    return names
+
+
+def candidate_order(primary: str, available: Optional[list[str]] = None) -> list[str]:
+    """Denenecek sağlayıcı sırası: birincil önce (sağlıklıysa), yedekler hata oranı ve p95'e göre."""
+    available = configured_providers() if available is None else available
+    secondaries = [p for p in available if p != primary]
+    secondaries.sort(key=lambda p: (provider_stats(p).error_rate(), provider_stats(p).p95() or 0.0))
+    if provider_stats(primary).error_rate() > UNHEALTHY_ERROR_RATE and len(provider_stats(primary).outcomes) >= MIN_LATENCY_SAMPLES:
+        return secondaries + [primary]
+    return [primary] + secondaries
+
+
+@dataclass
+class RoutedResult:
+    """Yönlendirilmiş çağrının sonucu; provider yanıtı veren sağlayıcı (veya rule_based)."""
+    value: Any
+    provider: str
+    attempts: int
+    hedged: bool = False
+
+
+async def hedged_call(
+    primary: str,
+    call: Callable[[str], Awaitable[Any]],
+    rule_based: Optional[Callable[[], Any]] = None,
+    *,
+    providers: Optional[list[str]] = None,
+    deadline: Optional[float] = None,
+    hedge: Optional[bool] = None,
+) -> RoutedResult:
+    """call(sağlayıcı) çağrısını hedging ve yedek sağlayıcılarla çalıştırır.
+
+    call istisna fırlatırsa (yanıt ayrıştırılamadı dahil) sıradaki sağlayıcı denenir. Tüm
+    sağlayıcılar başarısız olursa veya süre dolarsa rule_based() döner; rule_based yoksa son
+    hata (süre dolduysa asyncio.TimeoutError) fırlatılır.
+    """
+    order = candidate_order(primary, providers)
+    hedge = config.AI_HEDGE_ENABLED if hedge is None else hedge
+    deadline = config.AI_HARD_DEADLINE_SECONDS if deadline is None else deadline
+    loop = asyncio.get_running_loop()
+    ends_at = loop.time() + deadline
+
+    async def attempt(name: str):
+        started = time.monotonic()
+        try:
+            value = await call(name)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            provider_stats(name).record_error()
+            raise
+        provider_stats(name).record_success(time.monotonic() - started)
+        return value
+
+    pending: dict[asyncio.Task, str] = {}
+    queue = list(order)
+    launched = 0
+    hedged = False
+    last_error: Optional[BaseException] = None
+
+    def launch() -> None:
+        nonlocal launched
+        name = queue.pop(0)
+        pending[asyncio.ensure_future(attempt(name))] = name
+        launched += 1
+
+    try:
+        if queue:
+            launch()
+        while pending:
+            remaining = ends_at - loop.time()
+            if remaining <= 0:
+                break
+            newest = list(pending.values())[-1]
+            wait_for = min(remaining, hedge_delay(newest)) if hedge and queue else remaining
+            done, _ = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = pending.pop(task)
+                if task.exception() is None:
+                    return RoutedResult(task.result(), name, launched, hedged=hedged)
+                last_error = task.exception()
+                logger.warning("AI sağlayıcı %s başarısız: %r", name, last_error)
+            if queue and loop.time() < ends_at and (not done or not pending):
+                # Yanıt p95 içinde gelmedi (hedge) veya çalışan istek kalmadı (yedeğe geç)
+                hedged = hedged or not done
+                launch()
+    finally:
+        # Kaybeden / süresi dolan istekler iptal edilir ve bağlantılarını bırakmaları beklenir
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    timed_out = loop.time() >= ends_at
+    if timed_out:
+        logger.warning("AI yanıtı %.0f sn içinde gelmedi (%s)", deadline, ", ".join(order[:launched]))
+    if rule_based is not None:
+        return RoutedResult(rule_based(), RULE_BASED, launched)
+    if timed_out:
+        raise asyncio.TimeoutError(f"AI yanıtı {deadline:.0f} sn içinde gelmedi")
+    raise last_error or ValueError("Tanımlı AI sağlayıcı yok.")
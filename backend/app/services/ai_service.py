@@ -1,11 +1,19 @@
 import os
 import json
 import asyncio
-import httpx
+import hashlib
+import re
+import time
 from decimal import Decimal
 from datetime import date, datetime
+from typing import AsyncIterator, Callable, Optional
 from dotenv import load_dotenv
 from app import config
+from app.ai_cache import analysis_key, get_cached_analysis, is_cacheable, store_analysis
+from app.prompt_compaction import compact_rows, encode_row, estimate_tokens
+from app.services.ai_providers import get_provider
+from app.services.ai_router import RULE_BASED, RoutedResult, configured_providers, hedged_call
+from app.targeting_catalog import TargetingCatalog
 
 load_dotenv()
 
@@ -50,227 +58,112 @@ Her analizde şu formatta yanıt ver:
 5. 💰 BÜTÇE TAVSİYESİ"""
 
 
-# --- Gemini ---
+# --- Model seçimi ---
 def _get_gemini_model() -> str:
     """Kullanıcının seçtiği Gemini modelini veya varsayılanı döndür."""
     return config.get_setting("AI_MODEL_GEMINI") or config.AI_PROVIDERS["gemini"]["default_model"]
 
 
-def _gemini_analyze_campaigns(campaigns_data: list[dict]) -> str:
-    import google.generativeai as genai
-    genai.configure(api_key=config.get_setting("GEMINI_API_KEY") or "")
-    model_name = _get_gemini_model()
-    model = genai.GenerativeModel(model_name)
-    summary = []
-    for c in campaigns_data[:20]:
-        summary.append({
-            "name": c.get("name", ""),
-            "status": c.get("status", ""),
-            "objective": c.get("objective", ""),
-            "spend": c.get("spend", 0),
-            "impressions": c.get("impressions", 0),
-            "clicks": c.get("clicks", 0),
-            "ctr": c.get("ctr", 0),
-            "cpc": c.get("cpc", 0),
-            "cpm": c.get("cpm", 0),
-            "roas": c.get("roas", 0),
-            "frequency": c.get("frequency", 0),
-            "conversions": c.get("conversions", 0),
-        })
-    prompt = f"""{SYSTEM_PROMPT}
-
-Aşağıdaki Meta Ads kampanya verilerini analiz et ve detaylı öneriler ver (Türkçe):
-
-{json.dumps(summary, ensure_ascii=False, indent=2)}
-
-Toplam {len(campaigns_data)} kampanya var. Lütfen kapsamlı bir analiz yap."""
-    response = model.generate_content(prompt)
-    return response.text
-
-
-def _gemini_analyze_single(campaign: dict) -> str:
-    import google.generativeai as genai
-    genai.configure(api_key=config.get_setting("GEMINI_API_KEY") or "")
-    model_name = _get_gemini_model()
-    model = genai.GenerativeModel(model_name)
-    prompt = f"""{SYSTEM_PROMPT}
-
-Bu kampanyayı derinlemesine analiz et (Türkçe):
-
-Kampanya Adı: {campaign.get('name')}
-Durum: {campaign.get('status')}
-Hedef: {campaign.get('objective')}
-Harcama: {campaign.get('spend', 0):.2f} TL
-Gösterim: {campaign.get('impressions', 0):,}
-Tıklama: {campaign.get('clicks', 0):,}
-CTR: %{campaign.get('ctr', 0):.2f}
-CPC: {campaign.get('cpc', 0):.2f} TL
-CPM: {campaign.get('cpm', 0):.2f} TL
-ROAS: {campaign.get('roas', 0):.2f}x
-Frequency: {campaign.get('frequency', 0):.1f}
-Dönüşüm: {campaign.get('conversions', 0)}
-
-Bu kampanya için özel optimizasyon önerileri ver."""
-    response = model.generate_content(prompt)
-    return response.text
-
-
-def _gemini_weekly_report(data: dict) -> str:
-    import google.generativeai as genai
-    genai.configure(api_key=config.get_setting("GEMINI_API_KEY") or "")
-    model_name = _get_gemini_model()
-    model = genai.GenerativeModel(model_name)
-    prompt = f"""Sen bir Meta Ads raporlama uzmanısın. Haftalık performans raporlarını profesyonel ve anlaşılır şekilde özetliyorsun (Türkçe).
-
-Bu haftalık verilere göre yöneticiye göndermek için kısa ve öz bir rapor yaz:
-
-{json.dumps(data, ensure_ascii=False, indent=2)}
-
-Rapor şunları içermeli:
-- Haftalık özet (2-3 cümle)
-- En iyi performans gösteren kampanya
-- Dikkat gerektiren alan
-- Önümüzdeki hafta için 2-3 öneri
-
-HTML formatında yaz (e-posta için)."""
-    response = model.generate_content(prompt)
-    return response.text
-
-
-# --- Claude ---
 def _get_claude_model() -> str:
     """Kullanıcının seçtiği Claude modelini veya varsayılanı döndür."""
     return config.get_setting("AI_MODEL_CLAUDE") or config.AI_PROVIDERS["claude"]["default_model"]
 
 
-def _claude_analyze_campaigns(campaigns_data: list[dict]) -> str:
-    import anthropic
-    client = anthropic.Anthropic(api_key=config.get_setting("ANTHROPIC_API_KEY") or "")
-    model_name = _get_claude_model()
-    summary = []
-    for c in campaigns_data[:20]:
-        summary.append({
-            "name": c.get("name", ""),
-            "status": c.get("status", ""),
-            "objective": c.get("objective", ""),
-            "spend": c.get("spend", 0),
-            "impressions": c.get("impressions", 0),
-            "clicks": c.get("clicks", 0),
-            "ctr": c.get("ctr", 0),
-            "cpc": c.get("cpc", 0),
-            "cpm": c.get("cpm", 0),
-            "roas": c.get("roas", 0),
-            "frequency": c.get("frequency", 0),
-            "conversions": c.get("conversions", 0),
-        })
-    message = client.messages.create(
-        model=model_name,
-        max_tokens=2000,
-        system=SYSTEM_PROMPT,
-        messages=[{
-            "role": "user",
-            "content": f"""Aşağıdaki Meta Ads kampanya verilerini analiz et ve detaylı öneriler ver:\n\n{json.dumps(summary, ensure_ascii=False, indent=2)}\n\nToplam {len(campaigns_data)} kampanya var. Lütfen kapsamlı bir analiz yap."""
-        }]
-    )
-    return message.content[0].text
-
-
-def _claude_analyze_single(campaign: dict) -> str:
-    import anthropic
-    client = anthropic.Anthropic(api_key=config.get_setting("ANTHROPIC_API_KEY") or "")
-    model_name = _get_claude_model()
-    message = client.messages.create(
-        model=model_name,
-        max_tokens=1500,
-        system=SYSTEM_PROMPT,
-        messages=[{
-            "role": "user",
-            "content": f"""Bu kampanyayı derinlemesine analiz et:\n\nKampanya Adı: {campaign.get('name')}\nDurum: {campaign.get('status')}\nHedef: {campaign.get('objective')}\nHarcama: {campaign.get('spend', 0):.2f} TL\nGösterim: {campaign.get('impressions', 0):,}\nTıklama: {campaign.get('clicks', 0):,}\nCTR: %{campaign.get('ctr', 0):.2f}\nCPC: {campaign.get('cpc', 0):.2f} TL\nCPM: {campaign.get('cpm', 0):.2f} TL\nROAS: {campaign.get('roas', 0):.2f}x\nFrequency: {campaign.get('frequency', 0):.1f}\nDönüşüm: {campaign.get('conversions', 0)}\n\nBu kampanya için özel optimizasyon önerileri ver."""
-        }]
-    )
-    return message.content[0].text
-
-
-def _claude_weekly_report(data: dict) -> str:
-    import anthropic
-    client = anthropic.Anthropic(api_key=config.get_setting("ANTHROPIC_API_KEY") or "")
-    model_name = _get_claude_model()
-    message = client.messages.create(
-        model=model_name,
-        max_tokens=1500,
-        system="Sen bir Meta Ads raporlama uzmanısın. Haftalık performans raporlarını profesyonel ve anlaşılır şekilde özetliyorsun.",
-        messages=[{
-            "role": "user",
-            "content": f"""Bu haftalık verilere göre yöneticiye göndermek için kısa ve öz bir rapor yaz:\n\n{json.dumps(data, ensure_ascii=False, indent=2)}\n\nRapor: haftalık özet, en iyi kampanya, dikkat alanı, 2-3 öneri. HTML formatında (e-posta için)."""
-        }]
-    )
-    return message.content[0].text
-
-
-# --- Ollama (self-hosted LLM) ---
 def _get_ollama_model() -> str:
     """Kullanıcının seçtiği Ollama modelini veya varsayılanı döndür."""
     return config.get_setting("AI_MODEL_OLLAMA") or config.get_setting("OLLAMA_MODEL") or config.AI_PROVIDERS["ollama"]["default_model"]
 
 
-def _ollama_generate(prompt: str, system: str = "") -> str:
-    base = (config.get_setting("OLLAMA_BASE_URL") or "http://localhost:11434").rstrip("/")
-    model = _get_ollama_model()
-    full_prompt = f"{system}\n\n{prompt}" if system else prompt
-    try:
-        with httpx.Client(timeout=120.0) as client:
-            r = client.post(
-                f"{base}/api/generate",
-                json={"model": model, "prompt": full_prompt, "stream": False},
-            )
-            r.raise_for_status()
-            data = r.json()
-            return (data.get("response") or "").strip()
-    except Exception as e:
-        return f"Hata (Ollama): {e}. Ollama çalışıyor mu? OLLAMA_BASE_URL ve OLLAMA_MODEL doğru mu?"
+def _provider_model(provider: str) -> str:
+    if provider == "gemini":
+        return _get_gemini_model()
+    if provider == "ollama":
+        return _get_ollama_model()
+    if provider == "claude":
+        return _get_claude_model()
+    return provider
 
 
-def _ollama_analyze_campaigns(campaigns_data: list[dict]) -> str:
-    summary = []
-    for c in campaigns_data[:20]:
-        summary.append({
-            "name": c.get("name", ""), "status": c.get("status", ""), "objective": c.get("objective", ""),
-            "spend": c.get("spend", 0), "impressions": c.get("impressions", 0), "clicks": c.get("clicks", 0),
-            "ctr": c.get("ctr", 0), "cpc": c.get("cpc", 0), "cpm": c.get("cpm", 0),
-            "roas": c.get("roas", 0), "frequency": c.get("frequency", 0), "conversions": c.get("conversions", 0),
-        })
-    prompt = f"""Aşağıdaki Meta Ads kampanya verilerini analiz et ve Türkçe detaylı öneriler ver:
+# --- Prompt'lar (tüm sağlayıcılar için ortak) ---
+WEEKLY_SYSTEM_PROMPT = "Sen bir Meta Ads raporlama uzmanısın. Haftalık performans raporlarını profesyonel ve anlaşılır şekilde özetliyorsun."
 
-{json.dumps(summary, ensure_ascii=False, indent=2)}
+REPORT_SYSTEM_PROMPT = "Sen bir Meta Ads veri analisti olarak rapor verisini Türkçe özetliyorsun ve öneri veriyorsun."
 
-Toplam {len(campaigns_data)} kampanya. Yanıt: 1) Genel değerlendirme 2) Güçlü yönler 3) Dikkat edilmesi gerekenler 4) Somut öneriler (en az 5 madde) 5) Bütçe tavsiyesi."""
-    return _ollama_generate(prompt, system=SYSTEM_PROMPT)
+# Kampanya prompt'larında kullanılan alanlar (önbellek anahtarı yalnızca bunlardan oluşur)
+_CAMPAIGN_PROMPT_FIELDS = (
+    "name", "status", "objective", "spend", "impressions", "clicks",
+    "ctr", "cpc", "cpm", "roas", "frequency", "conversions",
+)
 
 
-def _ollama_analyze_single(campaign: dict) -> str:
-    prompt = f"""Bu kampanyayı derinlemesine analiz et (Türkçe):
+def _campaigns_table(campaigns_data: list[dict]) -> str:
+    """Kampanyaları token bütçesine sığan kompakt tabloya çevirir (harcamaya göre uç değerler + örneklem)."""
+    summary = [
+        {k: c.get(k, "" if k in ("name", "status", "objective") else 0) for k in _CAMPAIGN_PROMPT_FIELDS}
+        for c in campaigns_data
+    ]
+    return compact_rows(summary, _CAMPAIGN_PROMPT_FIELDS, config.AI_PROMPT_DATA_TOKENS, rank_by="spend").text
+
 
-Kampanya: {campaign.get('name')} | Durum: {campaign.get('status')} | Hedef: {campaign.get('objective')}
-Harcama: {campaign.get('spend', 0):.2f} TL | Gösterim: {campaign.get('impressions', 0):,} | Tıklama: {campaign.get('clicks', 0):,}
-CTR: %{campaign.get('ctr', 0):.2f} | CPC: {campaign.get('cpc', 0):.2f} TL | CPM: {campaign.get('cpm', 0):.2f} TL
-ROAS: {campaign.get('roas', 0):.2f}x | Frequency: {campaign.get('frequency', 0):.1f} | Dönüşüm: {campaign.get('conversions', 0)}
+def _campaigns_prompt(campaigns_data: list[dict], table: Optional[str] = None) -> str:
+    table = table if table is not None else _campaigns_table(campaigns_data)
+    return f"""Aşağıdaki Meta Ads kampanya verilerini analiz et ve detaylı öneriler ver:\n\n{table}\n\nToplam {len(campaigns_data)} kampanya var. Lütfen kapsamlı bir analiz yap."""
 
-Bu kampanya için özel optimizasyon önerileri ver."""
-    return _ollama_generate(prompt, system=SYSTEM_PROMPT)
 
+def _single_campaign_prompt(campaign: dict) -> str:
+    return f"""Bu kampanyayı derinlemesine analiz et:\n\nKampanya Adı: {campaign.get('name')}\nDurum: {campaign.get('status')}\nHedef: {campaign.get('objective')}\nHarcama: {campaign.get('spend', 0):.2f} TL\nGösterim: {campaign.get('impressions', 0):,}\nTıklama: {campaign.get('clicks', 0):,}\nCTR: %{campaign.get('ctr', 0):.2f}\nCPC: {campaign.get('cpc', 0):.2f} TL\nCPM: {campaign.get('cpm', 0):.2f} TL\nROAS: {campaign.get('roas', 0):.2f}x\nFrequency: {campaign.get('frequency', 0):.1f}\nDönüşüm: {campaign.get('conversions', 0)}\n\nBu kampanya için özel optimizasyon önerileri ver."""
 
-def _ollama_weekly_report(data: dict) -> str:
-    prompt = f"""Meta Ads haftalık veri. Yöneticiye kısa rapor yaz (Türkçe, HTML uygun):
 
-{json.dumps(data, ensure_ascii=False, indent=2)}
+def _weekly_report_prompt(data: dict) -> str:
+    return f"""Bu haftalık verilere göre yöneticiye göndermek için kısa ve öz bir rapor yaz:\n\n{json.dumps(data, ensure_ascii=False, indent=2, default=_json_serial)}\n\nRapor: haftalık özet, en iyi kampanya, dikkat alanı, 2-3 öneri. HTML formatında (e-posta için)."""
 
-İçerik: haftalık özet, en iyi kampanya, dikkat alanı, 2-3 öneri."""
-    return _ollama_generate(prompt, system="Sen bir Meta Ads raporlama uzmanısın. Haftalık raporları özetliyorsun.")
 
+def _report_table(rows: list, columns: list) -> str:
+    """Rapor satırlarını token bütçesine sığan kompakt tabloya çevirir."""
+    return compact_rows(rows, columns, config.AI_PROMPT_DATA_TOKENS).text
 
-def _ollama_analyze_report(report_name: str, template_title: str, prompt_common: str, data_str: str) -> str:
-    full = prompt_common + "\n\nVeri:\n" + data_str
-    return _ollama_generate(full, system="Sen bir Meta Ads veri analisti olarak rapor verisini Türkçe özetliyorsun ve öneri veriyorsun.")
+
+def _report_prompt_parts(
+    report_name: str, template_title: str, rows: list, columns: list, table: Optional[str] = None,
+) -> tuple[str, str]:
+    """Rapor analizi için (talimat, kompakt veri tablosu) döner."""
+    col_str = ", ".join(str(c) for c in columns or [])
+    prompt_common = f"""Aşağıdaki Meta reklam rapor verisini analiz et. Rapor adı: "{report_name}". Şablon: "{template_title}".
+Veri {len(rows)} satır ve şu sütunları içeriyor: {col_str}.
+Satırlar "|" ile ayrılmış tablo olarak verilmiştir; tüm satırlar sığmadıysa istatistikler tüm veriyi kapsar.
+Türkçe olarak: 1) Özet bulgular 2) En iyi / en zayıf performans 3) Somut öneriler (en az 3 madde) yaz. Kısa ve öz olsun."""
+
+    data_str = table if table is not None else _report_table(rows, columns)
+    return prompt_common, data_str
+
+
+# --- Sağlayıcı çağrıları (uzun ömürlü async istemciler: app.services.ai_providers) ---
+async def _complete(provider: str, system: str, prompt: str, max_tokens: int = 2000, images=()) -> str:
+    """Sağlayıcıdan tam yanıt alır; hata veya zaman aşımında istisna fırlatır."""
+    return await get_provider(provider).complete(
+        _provider_model(provider), system, prompt, max_tokens=max_tokens, images=images,
+    )
+
+
+def _provider_stream(provider: str, system: str, prompt: str, max_tokens: int) -> AsyncIterator[str]:
+    return get_provider(provider).stream(_provider_model(provider), system, prompt, max_tokens)
+
+
+# Tüm sağlayıcılar başarısız olduğunda veya süre dolduğunda kural tabanlı sonuca eklenen not
+FALLBACK_NOTE = "\n\n*Not: AI sağlayıcıları zamanında yanıt veremediği için kural tabanlı analiz gösteriliyor.*"
+
+
+async def _routed_complete(
+    provider: str, system: str, prompt: str, max_tokens: int, rule_based: Callable[[], str],
+) -> RoutedResult:
+    """Seçili sağlayıcıyı hedging ve yedek sağlayıcılarla çağırır; hepsi başarısızsa kural tabanlı analiz."""
+    async def call(name: str) -> str:
+        text = await _complete(name, system, prompt, max_tokens)
+        if not is_cacheable(text):
+            raise ValueError(f"{name} geçersiz yanıt döndü")
+        return text
+
+    return await hedged_call(provider, call, lambda: rule_based() + FALLBACK_NOTE)
 
 
 # --- Kural tabanlı analiz (API yok) ---
@@ -348,123 +241,340 @@ def _rule_based_analyze_report(report_name: str, template_title: str, rows: list
     return "\n".join(lines)
 
 
-# --- Ortak async arayüz (thread ile bloklamayı önler) ---
-async def analyze_campaigns(campaigns_data: list[dict]) -> str:
-    provider = _ai_provider()
-    if provider == "gemini":
-        return await asyncio.to_thread(_gemini_analyze_campaigns, campaigns_data)
-    if provider == "ollama":
-        return await asyncio.to_thread(_ollama_analyze_campaigns, campaigns_data)
-    if provider == "rule_based":
-        return await asyncio.to_thread(_rule_based_analyze_campaigns, campaigns_data)
-    return await asyncio.to_thread(_claude_analyze_campaigns, campaigns_data)
+# --- AI analiz önbelleği ---
+# Prompt şablonları değiştiğinde artırılır; eski önbellek kayıtları kendiliğinden geçersiz olur
+AI_PROMPT_VERSION = "3"
 
 
-async def analyze_single_campaign(campaign: dict) -> str:
-    provider = _ai_provider()
-    if provider == "gemini":
-        return await asyncio.to_thread(_gemini_analyze_single, campaign)
-    if provider == "ollama":
-        return await asyncio.to_thread(_ollama_analyze_single, campaign)
-    if provider == "rule_based":
-        return await asyncio.to_thread(_rule_based_analyze_single, campaign)
-    return await asyncio.to_thread(_claude_analyze_single, campaign)
+def _prompt_version() -> str:
+    return f"{AI_PROMPT_VERSION}:{hashlib.sha256(SYSTEM_PROMPT.encode('utf-8')).hexdigest()[:8]}"
+
+
+def _campaign_prompt_input(campaign: dict) -> dict:
+    return {k: campaign.get(k) for k in _CAMPAIGN_PROMPT_FIELDS}
+
+
+def _campaigns_cache_payload(campaigns_data: list[dict], table: Optional[str] = None) -> dict:
+    # Anahtar, prompt'a giren kompakt tablodan türetilir (bütçe dışı kalan satırlar anahtarı değiştirmez)
+    return {
+        "count": len(campaigns_data),
+        "table": table if table is not None else _campaigns_table(campaigns_data),
+    }
+
+
+def _report_cache_payload(
+    report_name: str, template_title: str, rows: list, columns: list, table: Optional[str] = None,
+) -> dict:
+    return {
+        "report_name": report_name,
+        "template_title": template_title,
+        "columns": list(columns or []),
+        "row_count": len(rows),
+        "table": table if table is not None else _report_table(rows, columns),
+    }
+
+
+def analysis_cache_key(kind: str, payload, provider: Optional[str] = None) -> str:
+    """Mevcut sağlayıcı/model/prompt sürümüyle analiz önbellek anahtarı."""
+    provider = provider or _ai_provider()
+    return analysis_key(kind, provider, _provider_model(provider), _prompt_version(), payload)
+
 
+def campaigns_analysis_cache_key(campaigns_data: list[dict]) -> str:
+    """analyze_campaigns sonucunun önbellek anahtarı (zamanlanmış rapor log'u için)."""
+    return analysis_cache_key("campaigns", _campaigns_cache_payload(campaigns_data))
+
+
+def report_job_cache_key(report_name: str, sections: list) -> str:
+    """Çok şablonlu analiz işinin tamamı için anahtar; sections: [(başlık, satırlar, sütunlar) | hata metni]."""
+    payload = [
+        _report_cache_payload(report_name, s[0], s[1], s[2]) if isinstance(s, tuple) else s
+        for s in sections
+    ]
+    return analysis_cache_key("report_job", payload)
 
-async def generate_weekly_report_text(data: dict) -> str:
+
+async def _cached_analysis(kind: str, payload, compute, use_cache: bool) -> str:
+    """compute(provider) sonucunu önbellekle sarar; use_cache=False önbelleği atlar ama sonucu yeniler.
+
+    compute metin veya RoutedResult döner; kural tabanlı yedek sonuçlar önbelleğe yazılmaz.
+    """
     provider = _ai_provider()
-    if provider == "gemini":
-        return await asyncio.to_thread(_gemini_weekly_report, data)
-    if provider == "ollama":
-        return await asyncio.to_thread(_ollama_weekly_report, data)
-    if provider == "rule_based":
-        return await asyncio.to_thread(
-            lambda: "Haftalık rapor (kural tabanlı): Verilerinizi kampanya listesinden inceleyebilirsiniz. AI özeti için Claude, Gemini veya Ollama seçin."
+    if provider == "rule_based" or config.AI_CACHE_TTL_SECONDS <= 0:
+        result = await compute(provider)
+        return result.value if isinstance(result, RoutedResult) else result
+    key = analysis_cache_key(kind, payload, provider)
+    if use_cache:
+        cached = await get_cached_analysis(key)
+        if cached is not None:
+            return cached
+    result = await compute(provider)
+    text, answered_by = (result.value, result.provider) if isinstance(result, RoutedResult) else (result, provider)
+    if answered_by != RULE_BASED and is_cacheable(text):
+        await store_analysis(key, text, kind=kind, provider=answered_by, model=_provider_model(answered_by))
+    return text
+
+
+# --- Ortak async arayüz ---
+async def analyze_campaigns(campaigns_data: list[dict], use_cache: bool = True) -> str:
+    table = _campaigns_table(campaigns_data)
+
+    async def compute(provider: str):
+        if provider == "rule_based":
+            return _rule_based_analyze_campaigns(campaigns_data)
+        return await _routed_complete(
+            provider, SYSTEM_PROMPT, _campaigns_prompt(campaigns_data, table), 2000,
+            lambda: _rule_based_analyze_campaigns(campaigns_data),
         )
-    return await asyncio.to_thread(_claude_weekly_report, data)
 
+    return await _cached_analysis("campaigns", _campaigns_cache_payload(campaigns_data, table), compute, use_cache)
 
-def _analyze_report_data_sync(report_name: str, template_title: str, rows: list, columns: list) -> str:
-    """Rapor verisini (CSV benzeri tablo) AI ile analiz ettirir. Provider: ollama | rule_based | claude | gemini."""
-    col_list = columns if columns else []
-    col_str = ", ".join(str(c) for c in col_list)
-    prompt_common = f"""Aşağıdaki Meta reklam rapor verisini analiz et. Rapor adı: "{report_name}". Şablon: "{template_title}".
-Veri {len(rows)} satır ve şu sütunları içeriyor: {col_str}.
-Türkçe olarak: 1) Özet bulgular 2) En iyi / en zayıf performans 3) Somut öneriler (en az 3 madde) yaz. Kısa ve öz olsun."""
 
-    try:
-        data_str = json.dumps(rows[:100], ensure_ascii=False, indent=0, default=_json_serial)
-    except (TypeError, ValueError):
-        data_str = json.dumps([{k: str(v) for k, v in row.items()} for row in rows[:100]], ensure_ascii=False, indent=0)
+async def analyze_single_campaign(campaign: dict, use_cache: bool = True) -> str:
+    async def compute(provider: str):
+        if provider == "rule_based":
+            return _rule_based_analyze_single(campaign)
+        return await _routed_complete(
+            provider, SYSTEM_PROMPT, _single_campaign_prompt(campaign), 1500,
+            lambda: _rule_based_analyze_single(campaign),
+        )
+
+    return await _cached_analysis("single", _campaign_prompt_input(campaign), compute, use_cache)
 
+
+async def generate_weekly_report_text(data: dict, use_cache: bool = True) -> str:
+    def rule_based() -> str:
+        return "Haftalık rapor (kural tabanlı): Verilerinizi kampanya listesinden inceleyebilirsiniz. AI özeti için Claude, Gemini veya Ollama seçin."
+
+    async def compute(provider: str):
+        if provider == "rule_based":
+            return rule_based()
+        return await _routed_complete(provider, WEEKLY_SYSTEM_PROMPT, _weekly_report_prompt(data), 1500, rule_based)
+
+    return await _cached_analysis("weekly", data, compute, use_cache)
+
+
+async def _analyze_report_data(
+    report_name: str, template_title: str, rows: list, columns: list, table: Optional[str] = None,
+):
+    """Rapor verisini (CSV benzeri tablo) AI ile analiz ettirir. Provider: ollama | rule_based | claude | gemini."""
+    col_list = columns if columns else []
     provider = _ai_provider()
-    if provider == "ollama":
-        return _ollama_analyze_report(report_name, template_title, prompt_common, data_str)
     if provider == "rule_based":
         return _rule_based_analyze_report(report_name, template_title, rows, col_list)
+    if provider != "ollama" and not configured_providers():
+        return "Hata: .env dosyasında GEMINI_API_KEY veya ANTHROPIC_API_KEY tanımlı değil. Ayarlardan birini ekleyin."
 
-    # Claude veya Gemini
-    anthropic_key = config.get_setting("ANTHROPIC_API_KEY") or ""
-    if anthropic_key and provider != "gemini":
-        try:
-            import anthropic
-            client = anthropic.Anthropic(api_key=anthropic_key)
-            message = client.messages.create(
-                model="claude-opus-4-5-20251101",
-                max_tokens=2000,
-                system="Sen bir Meta Ads veri analisti olarak rapor verisini Türkçe özetliyorsun ve öneri veriyorsun.",
-                messages=[{"role": "user", "content": prompt_common + "\n\nVeri:\n" + data_str}],
-            )
-            if message.content and len(message.content) > 0 and hasattr(message.content[0], "text"):
-                return message.content[0].text
-        except Exception:
-            pass  # Claude başarısız olursa aşağıda Gemini denenir veya hata mesajı
-
-    # Gemini (eski SDK - 404 alınırsa önce Claude dene, olmazsa kural tabanlı analiz döndür)
-    gemini_key = config.get_setting("GEMINI_API_KEY") or ""
-    if gemini_key:
-        try:
-            import google.generativeai as genai
-            genai.configure(api_key=gemini_key)
-            model_name = _get_gemini_model()
-            model = genai.GenerativeModel(model_name)
-            response = model.generate_content(prompt_common + "\n\nVeri:\n" + data_str)
-            if response.candidates:
-                part = response.candidates[0].content.parts[0] if response.candidates[0].content.parts else None
-                if part and hasattr(part, "text"):
-                    return part.text
-        except Exception as e:
-            err = str(e).lower()
-            if "404" in err or "not found" in err:
-                # Gemini model bulunamadı: Claude varsa dene, yoksa kural tabanlı analiz ver
-                if anthropic_key:
-                    try:
-                        import anthropic
-                        client = anthropic.Anthropic(api_key=anthropic_key)
-                        message = client.messages.create(
-                            model=_get_claude_model(),
-                            max_tokens=2000,
-                            system="Sen bir Meta Ads veri analisti olarak rapor verisini Türkçe özetliyorsun ve öneri veriyorsun.",
-                            messages=[{"role": "user", "content": prompt_common + "\n\nVeri:\n" + data_str}],
-                        )
-                        if message.content and len(message.content) > 0 and hasattr(message.content[0], "text"):
-                            return message.content[0].text
-                    except Exception:
-                        pass
-                # Claude yok veya başarısız: kural tabanlı analiz ile kullanıcıya en azından özet ver
-                rule_result = _rule_based_analyze_report(report_name, template_title, rows, col_list)
-                return rule_result + "\n\n*Not: Daha detaylı analiz için Ayarlar'dan AI sağlayıcı olarak Claude seçebilir veya ANTHROPIC_API_KEY ekleyebilirsiniz.*"
-
-    if anthropic_key:
-        return "Hata: Claude yanıt üretemedi."
-    if gemini_key:
-        return "Hata: Gemini kullanılamadı. ANTHROPIC_API_KEY ekleyerek Claude ile deneyin."
-    return "Hata: .env dosyasında GEMINI_API_KEY veya ANTHROPIC_API_KEY tanımlı değil. Ayarlardan birini ekleyin."
-
-
-async def analyze_report_data(report_name: str, template_title: str, rows: list[dict], columns: list) -> str:
+    prompt_common, data_str = _report_prompt_parts(report_name, template_title, rows, col_list, table)
+    return await _routed_complete(
+        provider, REPORT_SYSTEM_PROMPT, prompt_common + "\n\nVeri:\n" + data_str, 2000,
+        lambda: _rule_based_analyze_report(report_name, template_title, rows, col_list),
+    )
+
+
+async def analyze_report_data(
+    report_name: str, template_title: str, rows: list[dict], columns: list, use_cache: bool = True,
+) -> str:
     """Rapor verisini async olarak AI ile analiz ettirir."""
-    return await asyncio.to_thread(_analyze_report_data_sync, report_name, template_title, rows, columns)
+    table = _report_table(rows, columns)
+
+    async def compute(provider: str):
+        return await _analyze_report_data(report_name, template_title, rows, columns, table)
+
+    payload = _report_cache_payload(report_name, template_title, rows, columns, table)
+    return await _cached_analysis("report", payload, compute, use_cache)
+
+
+# --- Toplu kampanya analizi: birçok kampanya mümkün olan en az LLM çağrısında ---
+BATCH_SYSTEM_PROMPT = """Sen bir Meta Ads (Facebook & Instagram Reklam) uzmanısın.
+Birden fazla kampanyayı tek yanıtta, her kampanya için ayrı bölüm halinde Türkçe analiz ediyorsun.
+CTR < %1 kreatif/hedef kitle, ROAS < 2 karlılık, Frequency > 3 reklam yorgunluğu, yüksek CPM dar kitle/rekabet sorunudur."""
+
+# Yanıtta kampanya başına ayrılan yaklaşık çıktı (token); bir çağrıdaki kampanya sayısını sınırlar
+BATCH_SECTION_TOKENS = 350
+BATCH_MAX_OUTPUT_TOKENS = 4000
+_BATCH_COLUMNS = ("id",) + _CAMPAIGN_PROMPT_FIELDS
+_SECTION_RE = re.compile(r"^#{2,4}\s*\[([^\]\n]+)\][^\n]*$", re.M)
+
+
+def _campaign_batches(campaigns: list[dict]) -> list[list[dict]]:
+    """Kampanyaları girdi (AI_PROMPT_DATA_TOKENS) ve çıktı bütçesine sığan en az sayıda gruba böler."""
+    per_call = max(1, BATCH_MAX_OUTPUT_TOKENS // BATCH_SECTION_TOKENS)
+    batches, current, used = [], [], 0
+    for c in campaigns:
+        tokens = estimate_tokens(encode_row(c, _BATCH_COLUMNS)) + 1
+        if current and (len(current) >= per_call or used + tokens > config.AI_PROMPT_DATA_TOKENS):
+            batches.append(current)
+            current, used = [], 0
+        current.append(c)
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _batch_prompt(campaigns: list[dict]) -> str:
+    table = compact_rows(campaigns, _BATCH_COLUMNS, budget_tokens=10**9).text
+    return f"""Aşağıdaki {len(campaigns)} Meta Ads kampanyasının HER BİRİNİ ayrı ayrı analiz et.
+Her kampanyanın bölümünü tam olarak "### [kampanya id] Kampanya Adı" başlığıyla başlat (id köşeli parantez içinde).
+Her bölümde kısaca: değerlendirme, dikkat edilmesi gerekenler ve 3-5 somut öneri yaz; kampanya başına en fazla 150 kelime.
+
+{table}"""
+
+
+def _split_sections(text: str, ids: set[str]) -> dict[str, str]:
+    """Toplu yanıtı "### [id]" başlıklarından kampanya bölümlerine ayırır."""
+    sections = {}
+    matches = list(_SECTION_RE.finditer(text))
+    for i, m in enumerate(matches):
+        cid = m.group(1).strip()
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        body = text[m.end():end].strip()
+        if cid in ids and body:
+            sections[cid] = body
+    return sections
+
+
+async def analyze_campaigns_batch(campaigns_data: list[dict], use_cache: bool = True) -> dict:
+    """Birçok kampanyayı toplu analiz eder; kampanya başına bölüm ve maliyet/eşzamanlılık özeti döner.
+
+    Önbellekte olan kampanyalar atlanır; kalanlar bağlam bütçesine sığan gruplar halinde tek
+    çağrıda analiz edilir ve gruplar paralel gönderilir (sağlayıcı semaforu ile sınırlı).
+    Yanıtta bölümü eksik kalan kampanyalar için kural tabanlı analiz kullanılır.
+    """
+    started = time.monotonic()
+    provider = _ai_provider()
+    caching = provider != "rule_based" and config.AI_CACHE_TTL_SECONDS > 0
+    by_id = {str(c.get("id")): c for c in campaigns_data}
+    results: dict[str, dict] = {}
+    usage = {
+        "campaigns": len(by_id), "cached": 0, "llm_calls": 0, "batch_sizes": [], "providers": {},
+        "fallback_sections": 0, "est_input_tokens": 0, "est_output_tokens": 0, "peak_concurrency": 0,
+    }
+
+    def section(cid: str, analysis: str, source: str) -> None:
+        results[cid] = {"campaign_id": cid, "campaign_name": by_id[cid].get("name"), "analysis": analysis, "source": source}
+
+    keys = {cid: analysis_cache_key("batch_item", _campaign_prompt_input(c), provider) for cid, c in by_id.items()}
+    if caching and use_cache:
+        cached = await asyncio.gather(*(get_cached_analysis(keys[cid]) for cid in by_id))
+        for cid, text in zip(by_id, cached):
+            if text is not None:
+                section(cid, text, "cache")
+                usage["cached"] += 1
+
+    pending = [c for cid, c in by_id.items() if cid not in results]
+    if provider == "rule_based":
+        for c in pending:
+            section(str(c.get("id")), _rule_based_analyze_single(c), "rule_based")
+        pending = []
+
+    in_flight = 0
+
+    async def run_batch(batch: list[dict]) -> None:
+        nonlocal in_flight
+        ids = {str(c.get("id")) for c in batch}
+        prompt = _batch_prompt(batch)
+        max_tokens = min(BATCH_MAX_OUTPUT_TOKENS, BATCH_SECTION_TOKENS * len(batch) + 200)
+
+        async def call(name: str) -> tuple[str, dict[str, str]]:
+            text = await _complete(name, BATCH_SYSTEM_PROMPT, prompt, max_tokens)
+            sections = _split_sections(text, ids)
+            if not sections:
+                raise ValueError(f"{name} yanıtında kampanya bölümü bulunamadı")
+            return text, sections
+
+        in_flight += 1
+        usage["peak_concurrency"] = max(usage["peak_concurrency"], in_flight)
+        try:
+            result = await hedged_call(provider, call, lambda: None)
+        finally:
+            in_flight -= 1
+        usage["llm_calls"] += result.attempts
+        usage["est_input_tokens"] += estimate_tokens(BATCH_SYSTEM_PROMPT + prompt) * result.attempts
+        sections = {}
+        if result.provider != RULE_BASED:
+            text, sections = result.value
+            usage["est_output_tokens"] += estimate_tokens(text)
+            usage["providers"][result.provider] = usage["providers"].get(result.provider, 0) + 1
+        for c in batch:
+            cid = str(c.get("id"))
+            if cid in sections:
+                section(cid, sections[cid], result.provider)
+                if caching:
+                    await store_analysis(
+                        keys[cid], sections[cid], kind="batch_item",
+                        provider=result.provider, model=_provider_model(result.provider),
+                    )
+            else:
+                section(cid, _rule_based_analyze_single(c) + FALLBACK_NOTE, RULE_BASED)
+                usage["fallback_sections"] += 1
+
+    batches = _campaign_batches(pending)
+    usage["batch_sizes"] = [len(b) for b in batches]
+    await asyncio.gather(*(run_batch(b) for b in batches))
+    usage["elapsed_ms"] = round((time.monotonic() - started) * 1000)
+    return {"sections": [results[cid] for cid in by_id], "usage": usage}
+
+
+# --- Akışlı (streaming) analiz: sağlayıcı token'ları geldikçe iletilir ---
+async def _stream_cached(
+    kind: str,
+    payload,
+    system: str,
+    prompt: str,
+    max_tokens: int,
+    rule_based: Callable[[], str],
+    use_cache: bool,
+) -> AsyncIterator[str]:
+    """Sağlayıcı akışını iletir; önbellekte varsa tek parça döner, tamamlanan akışı önbelleğe yazar."""
+    provider = _ai_provider()
+    if provider == "rule_based":
+        yield await asyncio.to_thread(rule_based)
+        return
+    caching = config.AI_CACHE_TTL_SECONDS > 0
+    key = analysis_cache_key(kind, payload, provider)
+    if caching and use_cache:
+        cached = await get_cached_analysis(key)
+        if cached is not None:
+            yield cached
+            return
+    chunks = []
+    async for chunk in _provider_stream(provider, system, prompt, max_tokens):
+        chunks.append(chunk)
+        yield chunk
+    text = "".join(chunks)
+    if caching and is_cacheable(text):
+        await store_analysis(key, text, kind=kind, provider=provider, model=_provider_model(provider))
+
+
+def stream_campaigns_analysis(campaigns_data: list[dict], use_cache: bool = True) -> AsyncIterator[str]:
+    """analyze_campaigns'in akışlı sürümü (aynı önbellek anahtarını paylaşır)."""
+    table = _campaigns_table(campaigns_data)
+    return _stream_cached(
+        "campaigns", _campaigns_cache_payload(campaigns_data, table), SYSTEM_PROMPT, _campaigns_prompt(campaigns_data, table),
+        2000, lambda: _rule_based_analyze_campaigns(campaigns_data), use_cache,
+    )
+
+
+def stream_single_campaign_analysis(campaign: dict, use_cache: bool = True) -> AsyncIterator[str]:
+    """analyze_single_campaign'in akışlı sürümü."""
+    return _stream_cached(
+        "single", _campaign_prompt_input(campaign), SYSTEM_PROMPT, _single_campaign_prompt(campaign),
+        1500, lambda: _rule_based_analyze_single(campaign), use_cache,
+    )
+
+
+def stream_report_analysis(
+    report_name: str, template_title: str, rows: list[dict], columns: list, use_cache: bool = True,
+) -> AsyncIterator[str]:
+    """analyze_report_data'nın akışlı sürümü."""
+    prompt_common, data_str = _report_prompt_parts(report_name, template_title, rows, columns)
+    return _stream_cached(
+        "report", _report_cache_payload(report_name, template_title, rows, columns, data_str), REPORT_SYSTEM_PROMPT,
+        prompt_common + "\n\nVeri:\n" + data_str, 2000,
+        lambda: _rule_based_analyze_report(report_name, template_title, rows, list(columns or [])), use_cache,
+    )
 
 
 # --- Reklam özeti AI ile oluşturma ---
@@ -504,23 +614,57 @@ AD_SUMMARY_JSON_SCHEMA = """
 """
 
 
-def _format_targeting_for_prompt(options: dict) -> str:
-    """Hedef kitle seçeneklerini prompt için metne dönüştürür."""
-    parts = []
-    for cat, key in [("Demografik Bilgiler", "demographics"), ("İlgi Alanları", "interests"), ("Davranışlar", "behaviors")]:
-        items = options.get(key) or []
-        labels = [x.get("label", "").strip() for x in items if x.get("label") and "Kullanılamıyor" not in str(x.get("size", ""))]
-        if labels:
-            parts.append(f"### {cat} (sadece bu etiketlerden seç, aynen kopyala):\n" + "\n".join(f"- {l}" for l in labels[:300]))
-        else:
-            parts.append(f"### {cat}: (boş)")
-    return "\n\n".join(parts)
+def _format_targeting_for_prompt(options: TargetingCatalog | dict, context: str = "") -> str:
+    """Hedef kitle seçeneklerini prompt için metne dönüştürür; context ile en alakalı etiketler seçilir."""
+    catalog = options if isinstance(options, TargetingCatalog) else TargetingCatalog.from_options(options)
+    return catalog.prompt_fragment(context)
+
 
+def _extract_json(text: str) -> dict:
+    """Model yanıtındaki JSON bloğunu (```json ... ``` dahil) ayrıştırır."""
+    text = text.strip()
+    if "```json" in text:
+        text = text.split("```json")[1].split("```")[0].strip()
+    elif "```" in text:
+        text = text.split("```")[1].split("```")[0].strip()
+    return json.loads(text)
 
-def _generate_ad_summary_sync(
-    user_context: str, analysis_texts: str, image_base64: str | None, targeting_options: dict | None = None
+
+JSON_SYSTEM_PROMPT = "Sen Meta Ads uzmanısın. Sadece geçerli JSON döndür, başka açıklama yazma."
+
+
+async def generate_json_with_ai(
+    prompt: str,
+    image_base64: str | None = None,
+    system: str = JSON_SYSTEM_PROMPT,
+    max_tokens: int = 4000,
 ) -> dict:
-    """Kullanıcı bağlamı ve rapor analizlerine göre reklam özeti JSON oluşturur."""
+    """Claude / Gemini ile JSON üretir (hedging ve yedek sağlayıcı ile); başarısız olursa ValueError fırlatır."""
+    available = [p for p in configured_providers() if p in ("claude", "gemini")]
+    if not available:
+        raise ValueError("GEMINI_API_KEY veya ANTHROPIC_API_KEY tanımlı olmalı.")
+    provider = _ai_provider()
+    primary = provider if provider in available else available[0]
+    images = [image_base64] if image_base64 else []
+
+    async def call(name: str) -> dict:
+        return _extract_json(await _complete(name, system, prompt, max_tokens, images=images))
+
+    try:
+        result = await hedged_call(primary, call, providers=available)
+    except asyncio.TimeoutError as e:
+        raise ValueError(str(e)) from e
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"AI hatası: {e}") from e
+    return result.value
+
+
+def _ad_summary_prompt(
+    user_context: str, analysis_texts: str, targeting_options: TargetingCatalog | dict | None = None
+) -> str:
+    """Kullanıcı bağlamı ve rapor analizlerinden reklam özeti prompt'u oluşturur."""
     targeting_block = ""
     if targeting_options:
         targeting_block = f"""
@@ -529,7 +673,7 @@ Aşağıdaki listeler Meta - Demografik Bilgiler, İlgi Alanları ve Davranışl
 selectedDemographics, selectedInterests, selectedBehaviors alanları için MUTLAKA bu listelerdeki etiketlerden seç.
 Etiketleri BİREBİR, virgül/nokta farkı olmadan kopyala. Listede olmayan bir etiket ASLA yazma.
 
-{_format_targeting_for_prompt(targeting_options)}
+{_format_targeting_for_prompt(targeting_options, f"{user_context} {analysis_texts}")}
 """
 
     prompt = f"""Sen bir Meta Ads (Facebook & Instagram) uzmanısın. Kullanıcının reklam çıkacağı ürün/hizmet bilgisi ve mevcut performans raporlarına dayanarak eksiksiz, kaliteli bir reklam özeti oluştur.
@@ -559,89 +703,15 @@ Etiketleri BİREBİR, virgül/nokta farkı olmadan kopyala. Listede olmayan bir
 - headline: Kısa başlık
 - cta: MESSAGE (sohbet), CALL_NOW (arama), LEARN_MORE (web)
 - Tüm string değerler Türkçe"""
-
-    provider = _ai_provider()
-    anthropic_key = config.get_setting("ANTHROPIC_API_KEY") or ""
-    gemini_key = config.get_setting("GEMINI_API_KEY") or ""
-
-    # Claude (resim destekli)
-    if anthropic_key and provider != "gemini":
-        try:
-            import anthropic
-            import base64
-            client = anthropic.Anthropic(api_key=anthropic_key)
-            content = [{"type": "text", "text": prompt}]
-            if image_base64:
-                try:
-                    content.insert(0, {
-                        "type": "image",
-                        "source": {"type": "base64", "media_type": "image/jpeg", "data": image_base64},
-                    })
-                except Exception:
-                    pass
-            message = client.messages.create(
-                model=_get_claude_model(),
-                max_tokens=4000,
-                system="Sen Meta Ads uzmanısın. Sadece geçerli JSON döndür, başka açıklama yazma.",
-                messages=[{"role": "user", "content": content}],
-            )
-            if message.content and len(message.content) > 0 and hasattr(message.content[0], "text"):
-                text = message.content[0].text.strip()
-                # JSON blokunu çıkar
-                if "```json" in text:
-                    text = text.split("```json")[1].split("```")[0].strip()
-                elif "```" in text:
-                    text = text.split("```")[1].split("```")[0].strip()
-                return json.loads(text)
-        except Exception as e:
-            if gemini_key:
-                pass  # Gemini'ye düş
-            else:
-                raise ValueError(f"Claude hatası: {e}") from e
-
-    # Gemini (resim destekli)
-    if gemini_key:
-        try:
-            import google.generativeai as genai
-            import base64
-            genai.configure(api_key=gemini_key)
-            model_name = _get_gemini_model()
-            model = genai.GenerativeModel(model_name)
-            parts = [prompt]
-            if image_base64:
-                try:
-                    import PIL.Image
-                    import io
-                    img_data = base64.b64decode(image_base64)
-                    img = PIL.Image.open(io.BytesIO(img_data))
-                    parts.insert(0, img)
-                except Exception:
-                    pass
-            response = model.generate_content(parts)
-            if response.candidates:
-                part = response.candidates[0].content.parts[0] if response.candidates[0].content.parts else None
-                if part and hasattr(part, "text"):
-                    text = part.text.strip()
-                    if "```json" in text:
-                        text = text.split("```json")[1].split("```")[0].strip()
-                    elif "```" in text:
-                        text = text.split("```")[1].split("```")[0].strip()
-                    return json.loads(text)
-        except Exception as e:
-            if anthropic_key:
-                raise ValueError(f"Gemini hatası: {e}") from e
-            raise
-
-    raise ValueError("GEMINI_API_KEY veya ANTHROPIC_API_KEY tanımlı olmalı.")
+    return prompt
 
 
 async def generate_ad_summary_from_reports(
     user_context: str,
     analysis_texts: str,
     image_base64: str | None = None,
-    targeting_options: dict | None = None,
+    targeting_options: TargetingCatalog | dict | None = None,
 ) -> dict:
     """Rapor analizlerine ve kullanıcı bağlamına göre reklam özeti JSON üretir."""
-    return await asyncio.to_thread(
-        _generate_ad_summary_sync, user_context, analysis_texts, image_base64, targeting_options
-    )
+    prompt = _ad_summary_prompt(user_context, analysis_texts, targeting_options)
+    return await generate_json_with_ai(prompt, image_base64=image_base64)
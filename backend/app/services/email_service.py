@@ -4,6 +4,7 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
 from datetime import datetime
+from typing import Optional
 from dotenv import load_dotenv
 from app import config
 
@@ -130,6 +131,56 @@ def build_report_html(
 """
 
 
+def _build_alert_message(to_email: str, subject: str, body: str) -> MIMEMultipart:
+    """Uyarı e-postası MIME mesajını oluşturur (düz metin + basit HTML)."""
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = f"🚨 {subject}"
+    msg["From"] = _smtp_user()
+    msg["To"] = to_email
+
+    # Düz metin versiyonu
+    text_part = MIMEText(body, "plain", "utf-8")
+    msg.attach(text_part)
+
+    # HTML versiyonu (basit formatlama)
+    html_body = body.replace("\n", "<br>")
+    html_content = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="UTF-8">
+        <style>
+            body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif; background: #f4f6f9; margin: 0; padding: 20px; }}
+            .container {{ max-width: 600px; margin: 0 auto; background: white; border-radius: 12px; overflow: hidden; box-shadow: 0 4px 20px rgba(0,0,0,0.1); }}
+            .header {{ background: linear-gradient(135deg, #dc2626, #ef4444); color: white; padding: 24px; text-align: center; }}
+            .header h1 {{ margin: 0; font-size: 20px; }}
+            .content {{ padding: 24px; font-size: 14px; line-height: 1.6; color: #333; }}
+            .alert-box {{ background: #fef2f2; border-left: 4px solid #dc2626; padding: 16px; border-radius: 8px; margin: 16px 0; }}
+            .footer {{ background: #f4f6f9; text-align: center; padding: 16px; font-size: 12px; color: #999; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h1>🚨 Meta Ads Uyarısı</h1>
+            </div>
+            <div class="content">
+                <div class="alert-box">
+                    {html_body}
+                </div>
+            </div>
+            <div class="footer">
+                Bu uyarı Meta Ads Dashboard tarafından otomatik oluşturulmuştur.
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    html_part = MIMEText(html_content, "html", "utf-8")
+    msg.attach(html_part)
+    return msg
+
+
 def send_alert_email(to_email: str, subject: str, body: str) -> bool:
     """
     Basit uyarı e-postası gönder (alert sistemi için).
@@ -143,51 +194,7 @@ def send_alert_email(to_email: str, subject: str, body: str) -> bool:
         bool: Başarılı ise True
     """
     try:
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = f"🚨 {subject}"
-        msg["From"] = _smtp_user()
-        msg["To"] = to_email
-
-        # Düz metin versiyonu
-        text_part = MIMEText(body, "plain", "utf-8")
-        msg.attach(text_part)
-
-        # HTML versiyonu (basit formatlama)
-        html_body = body.replace("\n", "<br>")
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <style>
-                body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif; background: #f4f6f9; margin: 0; padding: 20px; }}
-                .container {{ max-width: 600px; margin: 0 auto; background: white; border-radius: 12px; overflow: hidden; box-shadow: 0 4px 20px rgba(0,0,0,0.1); }}
-                .header {{ background: linear-gradient(135deg, #dc2626, #ef4444); color: white; padding: 24px; text-align: center; }}
-                .header h1 {{ margin: 0; font-size: 20px; }}
-                .content {{ padding: 24px; font-size: 14px; line-height: 1.6; color: #333; }}
-                .alert-box {{ background: #fef2f2; border-left: 4px solid #dc2626; padding: 16px; border-radius: 8px; margin: 16px 0; }}
-                .footer {{ background: #f4f6f9; text-align: center; padding: 16px; font-size: 12px; color: #999; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🚨 Meta Ads Uyarısı</h1>
-                </div>
-                <div class="content">
-                    <div class="alert-box">
-                        {html_body}
-                    </div>
-                </div>
-                <div class="footer">
-                    Bu uyarı Meta Ads Dashboard tarafından otomatik oluşturulmuştur.
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        html_part = MIMEText(html_content, "html", "utf-8")
-        msg.attach(html_part)
+        msg = _build_alert_message(to_email, subject, body)
 
         # SMTP ile gönder
         with smtplib.SMTP(_smtp_host(), _smtp_port()) as server:
@@ -199,3 +206,47 @@ def send_alert_email(to_email: str, subject: str, body: str) -> bool:
     except Exception as e:
         print(f"Alert e-posta gönderme hatası: {e}")
         return False
+
+
+def send_alert_emails_batch(messages: list[tuple[str, str, str]]) -> list[Optional[str]]:
+    """
+    Birden fazla uyarı e-postasını tek SMTP bağlantısı üzerinden gönderir.
+
+    Args:
+        messages: (to_email, subject, body) listesi
+
+    Returns:
+        Her mesaj için hata metni; başarılıysa None. Bağlantı kurulamazsa tüm mesajlar hatalı döner.
+    """
+    if not messages:
+        return []
+    try:
+        server = smtplib.SMTP(_smtp_host(), _smtp_port(), timeout=30)
+    except Exception as e:
+        return [f"SMTP bağlantı hatası: {e}"] * len(messages)
+    results: list[Optional[str]] = []
+    try:
+        server.starttls()
+        server.login(_smtp_user(), _smtp_password())
+        for to_email, subject, body in messages:
+            try:
+                msg = _build_alert_message(to_email, subject, body)
+                server.sendmail(_smtp_user(), to_email, msg.as_string())
+                results.append(None)
+            except smtplib.SMTPServerDisconnected as e:
+                # Bağlantı koptu: kalan mesajlar bir sonraki denemede gönderilir
+                results.append(str(e))
+                break
+            except Exception as e:
+                results.append(str(e))
+    except Exception as e:
+        results.append(f"SMTP oturum hatası: {e}")
+    finally:
+        try:
+            server.quit()
+        except Exception:
+            pass
+    # Gönderilemeyen kalan mesajları hatalı işaretle
+    while len(results) < len(messages):
+        results.append(results[-1] if results else "SMTP hatası")
+    return results
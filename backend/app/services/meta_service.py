@@ -1,13 +1,15 @@
 import asyncio
 import json
 import logging
+import weakref
 import httpx
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import Optional
 from dotenv import load_dotenv
 from app import config
-from app.cache import cached, invalidate_prefix
+from app.cache import RESPONSE_CACHE_PREFIX, cached, invalidate_cache, invalidate_prefix
+from app.entity_snapshots import clear_snapshots
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +40,48 @@ def _is_meta_configured(account_id: Optional[str] = None) -> bool:
     return True
 
 
+CAMPAIGN_FIELDS = "id,name,status,objective,daily_budget,lifetime_budget,start_time,stop_time"
+INSIGHT_FIELDS = "impressions,clicks,spend,reach,ctr,cpc,cpm,cpp,actions,action_values,frequency"
+# Graph API ?ids= isteğinde izin verilen en fazla nesne sayısı
+IDS_PER_REQUEST = 50
+
+
+def _parse_insight(insight: Optional[dict]) -> dict:
+    """Insights satırını kampanya metriklerine çevirir (satır yoksa sıfır metrikler)."""
+    if not insight:
+        return {
+            "impressions": 0, "clicks": 0, "spend": 0, "reach": 0,
+            "ctr": 0, "cpc": 0, "cpm": 0, "frequency": 0,
+            "conversions": 0, "conversion_value": 0, "roas": 0
+        }
+    # Dönüşüm hesapla
+    conversions = 0
+    conversion_value = 0
+    for action in insight.get("actions", []):
+        if action["action_type"] in ["purchase", "lead", "complete_registration"]:
+            conversions += int(action.get("value", 0))
+    for av in insight.get("action_values", []):
+        if av["action_type"] == "purchase":
+            conversion_value += float(av.get("value", 0))
+
+    spend = float(insight.get("spend", 0))
+    roas = conversion_value / spend if spend > 0 else 0
+
+    return {
+        "impressions": int(insight.get("impressions", 0)),
+        "clicks": int(insight.get("clicks", 0)),
+        "spend": spend,
+        "reach": int(insight.get("reach", 0)),
+        "ctr": float(insight.get("ctr", 0)),
+        "cpc": float(insight.get("cpc", 0)),
+        "cpm": float(insight.get("cpm", 0)),
+        "frequency": float(insight.get("frequency", 0)),
+        "conversions": conversions,
+        "conversion_value": conversion_value,
+        "roas": round(roas, 2),
+    }
+
+
 class MetaAPIError(Exception):
     """Meta API hataları için (router'da 503 dönmek için kullanılır)."""
     pass
@@ -46,6 +90,23 @@ class MetaAPIError(Exception):
 class MetaAdsService:
     def __init__(self):
         self.base_url = META_BASE_URL
+        # Event loop başına paylaşılan semaphore (Celery her task'ta yeni loop açar)
+        self._limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def concurrency_limiter(self) -> asyncio.Semaphore:
+        """Meta'ya paralel veri çekme işlerini META_MAX_CONCURRENCY ile sınırlayan semaphore.
+
+        Aynı event loop içindeki tüm çağıranlar aynı bütçeyi paylaşır; böylece
+        paralel rapor şablonları toplamda rate limit'i aşmaz.
+        """
+        loop = asyncio.get_running_loop()
+        limiter = self._limiters.get(loop)
+        if limiter is None:
+            limiter = asyncio.Semaphore(config.META_MAX_CONCURRENCY)
+            self._limiters[loop] = limiter
+        return limiter
 
     async def _get(self, endpoint: str, params: Optional[dict] = None) -> dict:
         """Meta API'ye GET isteği gönderir (endpoint zaten account_id içerir)."""
@@ -131,9 +192,57 @@ class MetaAdsService:
 
         return enriched
     
+    async def get_campaigns_by_ids(self, campaign_ids: list[str], days: int = 30) -> list[dict]:
+        """Yalnızca verilen kampanyaları ve metriklerini getirir (cache'siz).
+
+        Webhook sonrası hedefli uyarı kontrolü ve toplu AI analizi için; tüm hesabı taramak
+        yerine ?ids= istekleri yapılır ve insights alan genişletmesiyle aynı istekte gelir
+        (IDS_PER_REQUEST kampanya için tek istek, parçalar META_MAX_CONCURRENCY ile paralel).
+        """
+        ids = [str(cid) for cid in dict.fromkeys(campaign_ids) if cid]
+        if not ids or not _is_meta_configured():
+            return []
+        insights_field = (
+            f"insights.time_range({json.dumps(self._date_range(days), separators=(',', ':'))})"
+            f"{{{INSIGHT_FIELDS}}}"
+        )
+
+        async def fetch(chunk: list[str]) -> dict:
+            async with self.concurrency_limiter():
+                return await self._get(
+                    "",
+                    params={
+                        "ids": ",".join(chunk),
+                        "fields": f"{CAMPAIGN_FIELDS},{insights_field}",
+                    }
+                )
+
+        chunks = [ids[i:i + IDS_PER_REQUEST] for i in range(0, len(ids), IDS_PER_REQUEST)]
+        data = {}
+        for part in await asyncio.gather(*(fetch(chunk) for chunk in chunks)):
+            data.update(part)
+        enriched = []
+        for cid in ids:
+            campaign = data.get(cid)
+            if not campaign:
+                continue
+            rows = (campaign.pop("insights", None) or {}).get("data") or []
+            enriched.append({**campaign, **_parse_insight(rows[0] if rows else None)})
+        return enriched
+
     def invalidate_campaigns_cache(self, account_id: Optional[str] = None) -> int:
-        """Kampanya cache'ini temizle."""
-        return invalidate_prefix("campaigns")
+        """Kampanya cache'ini, hazır dashboard yanıtlarını ve süreçteki liste görüntülerini temizle.
+
+        account_id verilirse yalnızca o hesabın kayıtları; varsayılan hesabın listeleri key'de
+        account_id=None ile tutulduğundan varsayılan hesap için hepsi temizlenir.
+        """
+        clear_snapshots()
+        default_account = (config.get_setting("META_AD_ACCOUNT_ID") or "").strip()
+        if account_id and account_id != default_account:
+            # Key formatı: campaigns:(<service>, days[, 'act_x'])[:[('account_id', 'act_x')]]
+            # ve api_response:('<uç nokta>', ..., 'act_x')
+            return invalidate_cache(f"campaigns:*'{account_id}'*") + invalidate_cache(f"{RESPONSE_CACHE_PREFIX}:*'{account_id}'*")
+        return invalidate_prefix("campaigns") + invalidate_prefix(RESPONSE_CACHE_PREFIX)
 
     async def get_campaign_insights(self, campaign_id: str, days: int = 30) -> dict:
         """Kampanya için performans metrikleri"""
@@ -141,45 +250,15 @@ class MetaAdsService:
             data = await self._get(
                 f"{campaign_id}/insights",
                 params={
-                    "fields": "impressions,clicks,spend,reach,ctr,cpc,cpm,cpp,actions,action_values,frequency",
+                    "fields": INSIGHT_FIELDS,
                     "time_range": json.dumps(self._date_range(days))
                 }
             )
             if data.get("data"):
-                insight = data["data"][0]
-                # Dönüşüm hesapla
-                conversions = 0
-                conversion_value = 0
-                for action in insight.get("actions", []):
-                    if action["action_type"] in ["purchase", "lead", "complete_registration"]:
-                        conversions += int(action.get("value", 0))
-                for av in insight.get("action_values", []):
-                    if av["action_type"] == "purchase":
-                        conversion_value += float(av.get("value", 0))
-
-                spend = float(insight.get("spend", 0))
-                roas = conversion_value / spend if spend > 0 else 0
-
-                return {
-                    "impressions": int(insight.get("impressions", 0)),
-                    "clicks": int(insight.get("clicks", 0)),
-                    "spend": spend,
-                    "reach": int(insight.get("reach", 0)),
-                    "ctr": float(insight.get("ctr", 0)),
-                    "cpc": float(insight.get("cpc", 0)),
-                    "cpm": float(insight.get("cpm", 0)),
-                    "frequency": float(insight.get("frequency", 0)),
-                    "conversions": conversions,
-                    "conversion_value": conversion_value,
-                    "roas": round(roas, 2),
-                }
+                return _parse_insight(data["data"][0])
         except Exception as e:
             logger.warning("get_campaign_insights hatası (campaign_id=%s): %s", campaign_id, e)
-        return {
-            "impressions": 0, "clicks": 0, "spend": 0, "reach": 0,
-            "ctr": 0, "cpc": 0, "cpm": 0, "frequency": 0,
-            "conversions": 0, "conversion_value": 0, "roas": 0
-        }
+        return _parse_insight(None)
 
     async def get_ad_sets(self, campaign_id: Optional[str] = None, days: int = 30, account_id: Optional[str] = None) -> list[dict]:
         """Reklam setlerini getirir"""
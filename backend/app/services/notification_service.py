@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""Bildirim outbox'ı ve dispatcher.
+
+Uyarılar bildirimlerini doğrudan göndermez; notification_outbox tablosuna aynı
+transaction içinde kayıt ekler. Dispatcher bekleyen kayıtları kilitleyerek alır
+(SKIP LOCKED), aynı alıcıya giden mesajları tek mesajda birleştirir, kanalları
+paralel teslim eder (e-posta için tek SMTP bağlantısı, WhatsApp için paylaşılan
+HTTP istemcisi) ve başarısız gönderimleri üstel geri çekilme ile yeniden dener.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+from uuid import uuid4
+
+import httpx
+from sqlalchemy import or_, select
+
+from app.models import AlertHistory, NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_MAX_ATTEMPTS = 5
+NOTIFICATION_BACKOFF_BASE_SECONDS = 30
+NOTIFICATION_BACKOFF_MAX_SECONDS = 60 * 60
+# Dispatcher çökerse "sending" kayıtları bu süre sonra yeniden alınır
+NOTIFICATION_LEASE_SECONDS = 10 * 60
+NOTIFICATION_CLAIM_LIMIT = 200
+WHATSAPP_CONCURRENCY = 5
+# WhatsApp metin mesajı sınırı 4096 karakter; birleştirmede pay bırakılır
+CHANNEL_MAX_CHARS = {"whatsapp": 4000, "email": 100_000}
+BATCH_SEPARATOR = "\n\n────────────\n\n"
+
+
+@dataclass
+class NotificationBatch:
+    """Aynı kanal ve alıcıya tek mesajda gönderilecek outbox kayıtları."""
+    channel: str
+    recipient: str
+    subject: Optional[str]
+    body: str
+    outbox_ids: list[str] = field(default_factory=list)
+
+
+def enqueue_notification(
+    session,
+    *,
+    channel: str,
+    recipient: str,
+    body: str,
+    subject: Optional[str] = None,
+    alert_history_id: Optional[str] = None,
+) -> NotificationOutbox:
+    """Outbox'a kayıt ekler (commit çağıranın transaction'ında yapılır)."""
+    row = NotificationOutbox(
+        id=str(uuid4()),
+        alert_history_id=alert_history_id,
+        channel=channel,
+        recipient=recipient,
+        subject=subject,
+        body=body,
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    session.add(row)
+    return row
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    """attempts. başarısız denemeden sonra beklenecek süre (üstel, üst sınırlı)."""
+    seconds = NOTIFICATION_BACKOFF_BASE_SECONDS * (2 ** max(0, attempts - 1))
+    return timedelta(seconds=min(seconds, NOTIFICATION_BACKOFF_MAX_SECONDS))
+
+
+def group_batches(rows: list) -> list[NotificationBatch]:
+    """Kayıtları (kanal, alıcı) bazında birleştirir; kanal karakter sınırını aşan gruplar bölünür."""
+    groups: "OrderedDict[tuple[str, str], list]" = OrderedDict()
+    for row in rows:
+        groups.setdefault((row.channel, row.recipient), []).append(row)
+
+    batches: list[NotificationBatch] = []
+    for (channel, recipient), items in groups.items():
+        limit = CHANNEL_MAX_CHARS.get(channel, 100_000)
+        current: list = []
+        size = 0
+        for row in items:
+            extra = len(row.body) + (len(BATCH_SEPARATOR) if current else 0)
+            if current and size + extra > limit:
+                batches.append(_make_batch(channel, recipient, current))
+                current, size = [], 0
+                extra = len(row.body)
+            current.append(row)
+            size += extra
+        if current:
+            batches.append(_make_batch(channel, recipient, current))
+    return batches
+
+
+def _make_batch(channel: str, recipient: str, rows: list) -> NotificationBatch:
+    if len(rows) == 1:
+        subject = rows[0].subject
+    else:
+        subject = f"Meta Ads: {len(rows)} yeni uyarı"
+    return NotificationBatch(
+        channel=channel,
+        recipient=recipient,
+        subject=subject,
+        body=BATCH_SEPARATOR.join(r.body for r in rows),
+        outbox_ids=[r.id for r in rows],
+    )
+
+
+# ---------- Kanal teslimatçıları: batch listesi -> her batch için hata (None = başarılı) ----------
+
+async def deliver_email_batches(batches: list[NotificationBatch]) -> list[Optional[str]]:
+    """Tüm e-posta batch'lerini tek SMTP bağlantısı ile (ayrı thread'de) gönderir."""
+    from app.services.email_service import send_alert_emails_batch
+
+    messages = [(b.recipient, b.subject or "Meta Ads Uyarısı", b.body) for b in batches]
+    return await asyncio.to_thread(send_alert_emails_batch, messages)
+
+
+async def deliver_whatsapp_batches(batches: list[NotificationBatch]) -> list[Optional[str]]:
+    """WhatsApp batch'lerini paylaşılan HTTP istemcisiyle sınırlı eşzamanlılıkla gönderir."""
+    from app.services.whatsapp_service import whatsapp_service
+
+    semaphore = asyncio.Semaphore(WHATSAPP_CONCURRENCY)
+
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        async def _send(batch: NotificationBatch) -> Optional[str]:
+            async with semaphore:
+                try:
+                    await whatsapp_service.send_text_message(batch.recipient, batch.body, client=client)
+                    return None
+                except Exception as e:
+                    return str(e)
+
+        return list(await asyncio.gather(*(_send(b) for b in batches)))
+
+
+ChannelDeliverer = Callable[[list[NotificationBatch]], Awaitable[list[Optional[str]]]]
+
+CHANNEL_DELIVERERS: dict[str, ChannelDeliverer] = {
+    "email": deliver_email_batches,
+    "whatsapp": deliver_whatsapp_batches,
+}
+
+
+async def deliver_batches(
+    batches: list[NotificationBatch],
+    deliverers: Optional[dict[str, ChannelDeliverer]] = None,
+) -> dict[str, Optional[str]]:
+    """Kanalları paralel teslim eder; outbox_id -> hata (None = gönderildi) döner."""
+    deliverers = deliverers or CHANNEL_DELIVERERS
+    by_channel: "OrderedDict[str, list[NotificationBatch]]" = OrderedDict()
+    for b in batches:
+        by_channel.setdefault(b.channel, []).append(b)
+
+    async def _run_channel(channel: str, items: list[NotificationBatch]) -> list[Optional[str]]:
+        deliverer = deliverers.get(channel)
+        if deliverer is None:
+            return [f"Desteklenmeyen kanal: {channel}"] * len(items)
+        try:
+            return await deliverer(items)
+        except Exception as e:
+            logger.warning("Bildirim kanalı hatası (%s): %s", channel, e)
+            return [str(e)] * len(items)
+
+    channel_results = await asyncio.gather(*(_run_channel(c, items) for c, items in by_channel.items()))
+
+    outcome: dict[str, Optional[str]] = {}
+    for items, errors in zip(by_channel.values(), channel_results):
+        for batch, error in zip(items, errors):
+            for outbox_id in batch.outbox_ids:
+                outcome[outbox_id] = error
+    return outcome
+
+
+async def dispatch_pending_notifications(
+    session_factory=None,
+    limit: int = NOTIFICATION_CLAIM_LIMIT,
+    deliverers: Optional[dict[str, ChannelDeliverer]] = None,
+) -> dict:
+    """Vadesi gelen outbox kayıtlarını alır, teslim eder ve sonuçları yazar."""
+    if session_factory is None:
+        from app.database import async_session_factory as session_factory
+    if not session_factory:
+        return {"claimed": 0, "sent": 0, "retrying": 0, "failed": 0}
+
+    now = datetime.utcnow()
+    # 1) Kayıtları kilitleyerek al ve kira (lease) süresiyle "sending" işaretle
+    async with session_factory() as session:
+        stmt = (
+            select(NotificationOutbox)
+            .where(
+                or_(NotificationOutbox.status == "pending", NotificationOutbox.status == "sending"),
+                NotificationOutbox.next_attempt_at <= now,
+            )
+            .order_by(NotificationOutbox.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        rows = (await session.execute(stmt)).scalars().all()
+        if not rows:
+            return {"claimed": 0, "sent": 0, "retrying": 0, "failed": 0}
+        lease_until = now + timedelta(seconds=NOTIFICATION_LEASE_SECONDS)
+        for row in rows:
+            row.status = "sending"
+            row.next_attempt_at = lease_until
+        batches = group_batches(list(rows))
+        await session.commit()
+
+    # 2) Transaction dışında teslim et (DB bağlantısı bu sırada tutulmaz)
+    outcome = await deliver_batches(batches, deliverers)
+
+    # 3) Sonuçları yaz
+    stats = {"claimed": len(outcome), "batches": len(batches), "sent": 0, "retrying": 0, "failed": 0}
+    async with session_factory() as session:
+        result = await session.execute(
+            select(NotificationOutbox).where(NotificationOutbox.id.in_(list(outcome.keys())))
+        )
+        sent_by_history: dict[str, set[str]] = {}
+        finished = datetime.utcnow()
+        for row in result.scalars().all():
+            error = outcome.get(row.id)
+            if error is None:
+                row.status = "sent"
+                row.sent_at = finished
+                row.last_error = None
+                stats["sent"] += 1
+                if row.alert_history_id:
+                    sent_by_history.setdefault(row.alert_history_id, set()).add(row.channel)
+                continue
+            row.attempts += 1
+            row.last_error = error[:2000]
+            if row.attempts >= NOTIFICATION_MAX_ATTEMPTS:
+                row.status = "failed"
+                stats["failed"] += 1
+            else:
+                row.status = "pending"
+                row.next_attempt_at = finished + backoff_delay(row.attempts)
+                stats["retrying"] += 1
+
+        if sent_by_history:
+            histories = await session.execute(
+                select(AlertHistory).where(AlertHistory.id.in_(list(sent_by_history.keys())))
+            )
+            for history in histories.scalars().all():
+                channels = list(history.channels_sent or [])
+                for channel in sorted(sent_by_history[history.id]):
+                    if channel not in channels:
+                        channels.append(channel)
+                history.channels_sent = channels
+        await session.commit()
+
+    logger.info(
+        "Bildirim dispatch: %s kayıt, %s batch, %s gönderildi, %s yeniden denenecek, %s başarısız",
+        stats["claimed"], stats["batches"], stats["sent"], stats["retrying"], stats["failed"],
+    )
+    return stats
@@ -11,9 +11,16 @@ Davranış Modelleri:
 
 import json
 import csv
+import gzip
 import io
+import re
+import zlib
 from typing import Optional
 from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
 from app import config
 
 
@@ -110,6 +117,273 @@ BEHAVIOR_MODES = {
 }
 
 
+# --- Ham performans verisi: sütunsal ayrıştırma ve analiz ---
+# Kanonik sütun → kabul edilen başlıklar (normalize: Türkçe karakter sadeleştirilmiş, parantez içi atılmış)
+COLUMN_ALIASES = {
+    "spend": ("spend", "cost", "amount_spent", "harcanan_tutar", "harcama", "tutar"),
+    "clicks": ("clicks", "link_clicks", "tiklama", "tiklamalar", "baglanti_tiklamalari"),
+    "impressions": ("impressions", "gosterim", "gosterimler"),
+    "ctr": ("ctr", "click_through_rate", "tiklama_orani", "baglanti_tiklama_orani"),
+    "cpc": ("cpc", "cost_per_click", "tbm", "tiklama_basina_ucret", "tiklama_basina_maliyet",
+            "baglanti_tiklamasi_basina_ucret"),
+    "results": ("results", "conversions", "sonuclar", "sonuc"),
+    "platform": ("platform", "publisher_platform", "yayinci_platformu"),
+    "age": ("age", "age_range", "yas", "yas_araligi"),
+    "gender": ("gender", "cinsiyet"),
+}
+NUMERIC_COLUMNS = ("spend", "clicks", "impressions", "ctr", "cpc", "results")
+SEGMENT_COLUMNS = ("platform", "age", "gender")
+
+_ALIAS_LOOKUP = {alias: canonical for canonical, aliases in COLUMN_ALIASES.items() for alias in aliases}
+_HEADER_FOLD = str.maketrans("çğıöşüÇĞİÖŞÜ", "cgiosucgiosu")
+_DELIMITERS = (",", ";", "\t", "|")
+
+
+def _column_key(name) -> str:
+    """Başlığı eşleştirme anahtarına çevirir: "Harcanan Tutar (TRY)" → "harcanan_tutar"."""
+    key = re.sub(r"\(.*?\)", " ", str(name).translate(_HEADER_FOLD).lower())
+    return "_".join(re.findall(r"[a-z0-9]+", key))
+
+
+def _sniff_delimiter(header: str) -> str:
+    """Ayracı yalnızca başlık satırından tespit eder (tırnak içi sayılmaz)."""
+    header = re.sub(r'"[^"]*"', "", header)
+    counts = {d: header.count(d) for d in _DELIMITERS}
+    best = max(counts, key=counts.get)
+    return best if counts[best] else ","
+
+
+def _to_number(values: pd.Series) -> pd.Series:
+    """Metin sayıları (%, ₺, TL; Türkçe "1.234,56" veya İngilizce "1,234.56") float'a çevirir."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    text = values.astype("string").str.strip().str.replace(r"[%₺$€\s]|TRY|TL", "", regex=True)
+    # Sütunda virgüllü ondalık ("2,35") veya noktalı binlik + virgül ("1.234,5") varsa Türkçe biçim
+    if text.str.contains(r"\d,\d{1,2}$|\d\.\d{3},", regex=True).any():
+        text = text.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    else:
+        text = text.str.replace(",", "", regex=False)
+    return pd.to_numeric(text, errors="coerce").astype(float)
+
+
+def normalize_performance_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Başlıkları kanonik adlara eşler ve metrik sütunlarını sayıya çevirir.
+
+    Aynı kanonik ada düşen birden çok sütun (ör. spend ve cost) varsa ilk sütunun boş/0 olan
+    değerleri sıradakilerden doldurulur. Eşleşmeyen sütunlar normalize adlarıyla kalır.
+    """
+    columns: dict[str, pd.Series] = {}
+    for name in df.columns:
+        key = _column_key(name)
+        canonical = _ALIAS_LOOKUP.get(key, key)
+        values = df[name]
+        if canonical in NUMERIC_COLUMNS:
+            values = _to_number(values)
+        if canonical not in columns:
+            columns[canonical] = values
+        elif canonical in NUMERIC_COLUMNS:
+            current = columns[canonical]
+            columns[canonical] = current.where(current.notna() & (current != 0), values)
+    return pd.DataFrame(columns, index=df.index)
+
+
+def parse_csv_frame(csv_content: str) -> pd.DataFrame:
+    """CSV içeriğini tipli sütunlarla DataFrame'e çevirir (ayraç başlıktan tespit edilir)."""
+    csv_content = csv_content.lstrip("\ufeff")
+    if not csv_content.strip():
+        return pd.DataFrame()
+    sample = csv_content.lstrip()[:4096]
+    sep = _sniff_delimiter(sample.split("\n", 1)[0])
+    # Ayraç virgül değilse ve örnekte "2,35" gibi değerler varsa Türkçe sayı biçimi (1.234,56)
+    turkish = sep != "," and re.search(r"\d,\d", sample) is not None
+    try:
+        df = pd.read_csv(
+            io.StringIO(csv_content),
+            sep=sep,
+            decimal="," if turkish else ".",
+            thousands="." if turkish else None,
+            skipinitialspace=True,
+            on_bad_lines="skip",
+        )
+    except (ValueError, pd.errors.ParserError):
+        return pd.DataFrame()
+    return normalize_performance_frame(df)
+
+
+def parse_json_frame(json_content: str) -> pd.DataFrame:
+    """JSON içeriğini (liste, {"data": [...]} veya tek kayıt) DataFrame'e çevirir."""
+    rows = parse_json_data(json_content)
+    rows = [r for r in rows if isinstance(r, dict)]
+    if not rows:
+        return pd.DataFrame()
+    return normalize_performance_frame(pd.DataFrame.from_records(rows))
+
+
+# Akışlı yükleme: parça başına satır ve ayraç/sayı biçimi tespiti için okunan örnek boyutu
+STREAM_CHUNK_ROWS = 50_000
+_SAMPLE_CHARS = 4096
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+class UploadTooLarge(ValueError):
+    """Yüklenen (açılmış) veri STRATEGY_UPLOAD_MAX_MB sınırını aştı."""
+
+
+class _LimitedReader(io.RawIOBase):
+    """İkili akıştan okur; toplam okunan bayt sınırı aşılırsa UploadTooLarge fırlatır (gzip bombası koruması)."""
+
+    def __init__(self, raw, max_bytes: int):
+        self._raw = raw
+        self._max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._raw.read(len(buffer))
+        if not data:
+            return 0
+        self.bytes_read += len(data)
+        if self.bytes_read > self._max_bytes:
+            raise UploadTooLarge(f"Yüklenen veri {self._max_bytes / (1024 * 1024):.3g} MB sınırını aşıyor.")
+        buffer[: len(data)] = data
+        return len(data)
+
+
+class _PeekedText:
+    """Başından örnek okunmuş metin akışı; örnek tekrar başa eklenerek pandas'a dosya gibi verilir."""
+
+    def __init__(self, head: str, stream: io.TextIOBase):
+        self._head = head
+        self._stream = stream
+
+    def read(self, size: int = -1) -> str:
+        if not self._head:
+            return self._stream.read(size)
+        if size is None or size < 0:
+            data, self._head = self._head + self._stream.read(), ""
+            return data
+        data, self._head = self._head[:size], self._head[size:]
+        if len(data) < size:
+            data += self._stream.read(size - len(data))
+        return data
+
+    def readline(self) -> str:
+        if self._head:
+            line, sep, rest = self._head.partition("\n")
+            if sep:
+                self._head = rest
+                return line + sep
+            self._head = ""
+            return line + self._stream.readline()
+        return self._stream.readline()
+
+    def __iter__(self):
+        return iter(self.readline, "")
+
+
+def _open_upload_text(binary, filename: str, max_bytes: int) -> io.TextIOBase:
+    """Yüklenen dosyayı (gerekirse gzip açarak) sınırlı, UTF-8 metin akışına çevirir."""
+    buffered = io.BufferedReader(_LimitedReader(binary, max_bytes))
+    if buffered.peek(2)[:2] == _GZIP_MAGIC or filename.lower().endswith(".gz"):
+        buffered = gzip.GzipFile(fileobj=buffered, mode="rb")
+    limited = io.BufferedReader(_LimitedReader(buffered, max_bytes), buffer_size=256 * 1024)
+    return io.TextIOWrapper(limited, encoding="utf-8-sig", errors="replace", newline="")
+
+
+def _upload_format(filename: str, sample: str) -> str:
+    """csv | jsonl | json; önce dosya uzantısı, yoksa içeriğin ilk karakterleri belirler."""
+    name = filename.lower().removesuffix(".gz")
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if name.endswith(".json"):
+        return "json"
+    if name.endswith((".csv", ".tsv", ".txt")):
+        return "csv"
+    head = sample.lstrip()
+    if head.startswith("["):
+        return "json"
+    if head.startswith("{"):
+        # Satır başına bir nesne (JSON Lines) veya tek JSON nesnesi ({"data": [...]})
+        first, _, rest = head.partition("\n")
+        return "jsonl" if rest.lstrip().startswith("{") and first.rstrip().endswith("}") else "json"
+    return "csv"
+
+
+def _csv_chunks(text, sample: str):
+    sep = _sniff_delimiter(sample.lstrip().split("\n", 1)[0])
+    # parse_csv_frame ile aynı kural: ayraç virgül değilse ve örnekte "2,35" varsa Türkçe sayı biçimi
+    turkish = sep != "," and re.search(r"\d,\d", sample) is not None
+    reader = pd.read_csv(
+        text,
+        sep=sep,
+        decimal="," if turkish else ".",
+        thousands="." if turkish else None,
+        skipinitialspace=True,
+        on_bad_lines="skip",
+        chunksize=STREAM_CHUNK_ROWS,
+    )
+    with reader:
+        yield from reader
+
+
+def _jsonl_chunks(text):
+    batch = []
+    for line in text:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict):
+            batch.append(record)
+        if len(batch) >= STREAM_CHUNK_ROWS:
+            yield pd.DataFrame.from_records(batch)
+            batch = []
+    if batch:
+        yield pd.DataFrame.from_records(batch)
+
+
+def _json_chunks(text):
+    rows = [r for r in parse_json_data(text.read()) if isinstance(r, dict)]
+    for start in range(0, len(rows), STREAM_CHUNK_ROWS):
+        yield pd.DataFrame.from_records(rows[start: start + STREAM_CHUNK_ROWS])
+
+
+def analyze_performance_stream(binary, filename: str = "", max_bytes: Optional[int] = None) -> dict:
+    """
+    Yüklenen performans dosyasını (CSV, JSON Lines veya JSON; gzip destekli) parça parça okuyup
+    analiz eder. Her parça normalize edilip PerformanceAggregator'a eklenir ve bırakılır; bellekte
+    yalnızca bir parça ve segment toplamları tutulur. Düz JSON dizisi parçalanamadığından tamamı
+    okunur (max_bytes ile sınırlı).
+    """
+    max_bytes = config.STRATEGY_UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+    text = _open_upload_text(binary, filename, max_bytes)
+    aggregator = PerformanceAggregator()
+    try:
+        sample = text.read(_SAMPLE_CHARS)
+        if not sample.strip():
+            return aggregator.result()
+        fmt = _upload_format(filename, sample)
+        stream = _PeekedText(sample, text)
+        if fmt == "jsonl":
+            chunks = _jsonl_chunks(stream)
+        elif fmt == "json":
+            chunks = _json_chunks(stream)
+        else:
+            chunks = _csv_chunks(stream, sample)
+        for chunk in chunks:
+            aggregator.add(normalize_performance_frame(chunk))
+    except (gzip.BadGzipFile, EOFError, zlib.error) as e:
+        raise ValueError(f"Sıkıştırılmış dosya açılamadı: {e}") from e
+    except pd.errors.ParserError as e:
+        raise ValueError(f"CSV okunamadı: {e}") from e
+    return aggregator.result()
+
+
 def parse_csv_data(csv_content: str) -> list[dict]:
     """CSV içeriğini parse eder ve dict listesi döner."""
     if not csv_content.strip():
@@ -144,126 +418,181 @@ def parse_json_data(json_content: str) -> list[dict]:
         return []
 
 
+def _empty_performance_analysis() -> dict:
+    return {
+        "best_ctr": None,
+        "lowest_cpc": None,
+        "best_demographics": [],
+        "worst_demographics": [],
+        "platform_performance": {},
+        "age_performance": {},
+        "gender_performance": {},
+    }
+
+
+def _metric(df: pd.DataFrame, name: str) -> np.ndarray:
+    if name not in df:
+        return np.zeros(len(df))
+    return np.nan_to_num(df[name].to_numpy(dtype=float, na_value=np.nan), nan=0.0)
+
+
+_SEGMENT_FIELDS = {
+    "platform": ("spend", "clicks", "impressions", "results"),
+    "age": ("spend", "clicks", "results"),
+    "gender": ("spend", "clicks", "results"),
+}
+
+
+def _segment_sums(df: pd.DataFrame, column: str, metrics: dict[str, np.ndarray], fields: tuple) -> dict:
+    """Segment (platform/yaş/cinsiyet) bazında toplamlar; boş ve "unknown" değerler atlanır.
+
+    Sütun bir kez kodlanır (factorize); toplamlar kod dizisi üzerinde bincount ile alınır.
+    """
+    if column not in df:
+        return {}
+    codes, uniques = pd.factorize(df[column], sort=False)
+    # Ham değerler birkaç farklı yazımda gelebilir (" facebook", 25 / "25"); temiz anahtarlarda birleştirilir
+    names: dict[str, int] = {}
+    remap = np.full(len(uniques) + 1, -1, dtype=np.int64)
+    for i, raw in enumerate(uniques):
+        key = str(raw).strip()
+        if key and key != "unknown":
+            remap[i] = names.setdefault(key, len(names))
+    if not names:
+        return {}
+    seg = remap[codes]  # factorize NaN'ı -1 kodlar → remap[-1] = -1
+    valid = seg >= 0
+    seg = seg[valid]
+    n = len(names)
+    count = np.bincount(seg, minlength=n)
+    sums = {f: np.bincount(seg, weights=metrics[f][valid], minlength=n) for f in (*fields, "ctr")}
+
+    stats = {}
+    for key, j in names.items():
+        segment = {f: float(sums[f][j]) for f in fields}
+        segment["ctr_sum"] = float(sums["ctr"][j])
+        segment["count"] = int(count[j])
+        stats[key] = segment
+    return stats
+
+
+def _zero_result_segments(stats: dict, has_results: bool) -> list[str]:
+    """Harcama yapıp sonuç (sonuç sütunu yoksa tıklama) getirmeyen segmentler; en çok harcayan 2 tanesi."""
+    outcome = "results" if has_results else "clicks"
+    zero = [(k, v) for k, v in stats.items() if v.get("spend", 0) > 0 and v.get(outcome, 0) == 0]
+    zero.sort(key=lambda item: item[1]["spend"], reverse=True)
+    return [k for k, _ in zero[:2]]
+
+
+def _row_dict(df: pd.DataFrame, i: int) -> dict:
+    row = df.iloc[[i]].to_dict("records")[0]
+    return {k: (None if isinstance(v, float) and np.isnan(v) else v) for k, v in row.items()}
+
+
+class PerformanceAggregator:
+    """Normalize edilmiş performans verisini parça parça (chunk) toplar.
+
+    Her parça tek vektörel geçişte işlenir; saklanan durum yalnızca segment toplamları ve en iyi
+    CTR / en düşük CPC satırlarıdır, bu yüzden bellek kullanımı satır sayısından bağımsızdır.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.has_results = False
+        self.best_ctr, self.best_ctr_row = 0, None
+        self.lowest_cpc, self.lowest_cpc_row = float("inf"), None
+        self.totals = {"spend": 0.0, "clicks": 0.0, "impressions": 0.0}
+        self.segments: dict[str, dict[str, dict]] = {column: {} for column in SEGMENT_COLUMNS}
+
+    def add(self, df: pd.DataFrame) -> None:
+        if df is None or df.empty:
+            return
+        self.rows += len(df)
+        self.has_results = self.has_results or "results" in df
+
+        ctr = _metric(df, "ctr")
+        spend = _metric(df, "spend")
+        clicks = _metric(df, "clicks")
+        impressions = _metric(df, "impressions")
+        results = _metric(df, "results")
+        cpc = df["cpc"].to_numpy(dtype=float, na_value=np.nan) if "cpc" in df else np.full(len(df), np.nan)
+        metrics = {"spend": spend, "clicks": clicks, "impressions": impressions, "ctr": ctr, "results": results}
+
+        # En yüksek CTR (100+ gösterim) ve en düşük CPC (tıklaması olan satırlar); eşitlikte ilk satır kalır
+        ctr_candidates = np.where((impressions > 100) & (ctr > 0), ctr, -np.inf)
+        i = int(ctr_candidates.argmax())
+        if ctr_candidates[i] > self.best_ctr:
+            self.best_ctr, self.best_ctr_row = float(ctr[i]), _row_dict(df, i)
+        cpc_candidates = np.where((clicks > 0) & (cpc > 0), cpc, np.inf)
+        i = int(cpc_candidates.argmin())
+        if cpc_candidates[i] < self.lowest_cpc:
+            self.lowest_cpc, self.lowest_cpc_row = float(cpc[i]), _row_dict(df, i)
+
+        for name in self.totals:
+            self.totals[name] += float(metrics[name].sum())
+        for column, fields in _SEGMENT_FIELDS.items():
+            merged = self.segments[column]
+            for key, sums in _segment_sums(df, column, metrics, fields).items():
+                if key not in merged:
+                    merged[key] = sums
+                else:
+                    for field_name, value in sums.items():
+                        merged[key][field_name] += value
+
+    def result(self) -> dict:
+        if not self.rows:
+            return _empty_performance_analysis()
+
+        stats = {}
+        for column, segments in self.segments.items():
+            stats[column] = {}
+            for key, sums in segments.items():
+                segment = dict(sums)
+                segment["avg_ctr"] = segment["ctr_sum"] / segment["count"]
+                if column == "platform":
+                    segment["cpc"] = segment["spend"] / segment["clicks"] if segment["clicks"] > 0 else 0
+                stats[column][key] = segment
+        platform_stats, age_stats, gender_stats = stats["platform"], stats["age"], stats["gender"]
+
+        sorted_platforms = sorted(platform_stats.items(), key=lambda x: x[1]["avg_ctr"], reverse=True)
+        sorted_ages = sorted(age_stats.items(), key=lambda x: x[1]["avg_ctr"], reverse=True)
+
+        return {
+            "best_ctr": {"value": self.best_ctr, "row": self.best_ctr_row},
+            "lowest_cpc": {"value": self.lowest_cpc, "row": self.lowest_cpc_row},
+            "platform_performance": platform_stats,
+            "age_performance": age_stats,
+            "gender_performance": gender_stats,
+            "best_platforms": [p[0] for p in sorted_platforms[:3]],
+            "best_ages": [a[0] for a in sorted_ages[:3] if a[1].get("spend", 0) > 0],
+            "worst_platforms": _zero_result_segments(platform_stats, self.has_results),
+            "worst_ages": _zero_result_segments(age_stats, self.has_results),
+            "worst_genders": _zero_result_segments(gender_stats, self.has_results),
+            "total_spend": self.totals["spend"],
+            "total_clicks": self.totals["clicks"],
+            "total_impressions": self.totals["impressions"],
+            "rows_analyzed": self.rows,
+        }
+
+
+def analyze_performance_frame(df: pd.DataFrame) -> dict:
+    """
+    Normalize edilmiş performans verisini tek vektörel geçişte analiz eder.
+    En düşük CPC, en yüksek CTR, platform/yaş/cinsiyet kırılımları ve sonuç getirmeyen segmentler.
+    """
+    aggregator = PerformanceAggregator()
+    aggregator.add(df)
+    return aggregator.result()
+
+
 def analyze_performance_data(rows: list[dict]) -> dict:
     """
-    Ham performans verilerini analiz eder.
+    Ham performans verilerini analiz eder (satır listesi; bkz. analyze_performance_frame).
     En düşük CPC, en yüksek CTR, en iyi demografikleri bulur.
     """
     if not rows:
-        return {
-            "best_ctr": None,
-            "lowest_cpc": None,
-            "best_demographics": [],
-            "worst_demographics": [],
-            "platform_performance": {},
-            "age_performance": {},
-            "gender_performance": {}
-        }
-    
-    # Sayısal alanları çıkar
-    processed_rows = []
-    for row in rows:
-        processed = {}
-        for k, v in row.items():
-            key = k.lower().strip()
-            if isinstance(v, (int, float)):
-                processed[key] = v
-            else:
-                # String sayıları dönüştür
-                try:
-                    processed[key] = float(v) if v else 0
-                except (ValueError, TypeError):
-                    processed[key] = v
-        processed_rows.append(processed)
-    
-    # En iyi performans gösterenleri bul
-    best_ctr_row = None
-    lowest_cpc_row = None
-    best_ctr = 0
-    lowest_cpc = float('inf')
-    
-    platform_stats = {}
-    age_stats = {}
-    gender_stats = {}
-    
-    for row in processed_rows:
-        ctr = row.get('ctr', 0) or row.get('click_through_rate', 0) or 0
-        cpc = row.get('cpc', float('inf')) or row.get('cost_per_click', float('inf')) or float('inf')
-        spend = row.get('spend', 0) or row.get('cost', 0) or 0
-        clicks = row.get('clicks', 0) or 0
-        impressions = row.get('impressions', 0) or 0
-        
-        if ctr > best_ctr and impressions > 100:
-            best_ctr = ctr
-            best_ctr_row = row
-        
-        if cpc < lowest_cpc and clicks > 0 and cpc > 0:
-            lowest_cpc = cpc
-            lowest_cpc_row = row
-        
-        # Platform bazlı analiz
-        platform = row.get('platform', row.get('publisher_platform', 'unknown'))
-        if platform and platform != 'unknown':
-            if platform not in platform_stats:
-                platform_stats[platform] = {'spend': 0, 'clicks': 0, 'impressions': 0, 'ctr_sum': 0, 'count': 0}
-            platform_stats[platform]['spend'] += spend
-            platform_stats[platform]['clicks'] += clicks
-            platform_stats[platform]['impressions'] += impressions
-            platform_stats[platform]['ctr_sum'] += ctr
-            platform_stats[platform]['count'] += 1
-        
-        # Yaş bazlı analiz
-        age = row.get('age', row.get('age_range', 'unknown'))
-        if age and age != 'unknown':
-            if age not in age_stats:
-                age_stats[age] = {'spend': 0, 'clicks': 0, 'ctr_sum': 0, 'count': 0}
-            age_stats[age]['spend'] += spend
-            age_stats[age]['clicks'] += clicks
-            age_stats[age]['ctr_sum'] += ctr
-            age_stats[age]['count'] += 1
-        
-        # Cinsiyet bazlı analiz
-        gender = row.get('gender', 'unknown')
-        if gender and gender != 'unknown':
-            if gender not in gender_stats:
-                gender_stats[gender] = {'spend': 0, 'clicks': 0, 'ctr_sum': 0, 'count': 0}
-            gender_stats[gender]['spend'] += spend
-            gender_stats[gender]['clicks'] += clicks
-            gender_stats[gender]['ctr_sum'] += ctr
-            gender_stats[gender]['count'] += 1
-    
-    # Ortalama CTR hesapla
-    for platform in platform_stats:
-        stats = platform_stats[platform]
-        stats['avg_ctr'] = stats['ctr_sum'] / stats['count'] if stats['count'] > 0 else 0
-        stats['cpc'] = stats['spend'] / stats['clicks'] if stats['clicks'] > 0 else 0
-    
-    for age in age_stats:
-        stats = age_stats[age]
-        stats['avg_ctr'] = stats['ctr_sum'] / stats['count'] if stats['count'] > 0 else 0
-    
-    for gender in gender_stats:
-        stats = gender_stats[gender]
-        stats['avg_ctr'] = stats['ctr_sum'] / stats['count'] if stats['count'] > 0 else 0
-    
-    # En iyi ve en kötü performans gösterenleri sırala
-    sorted_platforms = sorted(platform_stats.items(), key=lambda x: x[1].get('avg_ctr', 0), reverse=True)
-    sorted_ages = sorted(age_stats.items(), key=lambda x: x[1].get('avg_ctr', 0), reverse=True)
-    
-    return {
-        "best_ctr": {"value": best_ctr, "row": best_ctr_row},
-        "lowest_cpc": {"value": lowest_cpc, "row": lowest_cpc_row},
-        "platform_performance": platform_stats,
-        "age_performance": age_stats,
-        "gender_performance": gender_stats,
-        "best_platforms": [p[0] for p in sorted_platforms[:3]],
-        "best_ages": [a[0] for a in sorted_ages[:3] if a[1].get('spend', 0) > 0],
-        "worst_platforms": [p[0] for p in sorted_platforms[-2:] if p[1].get('spend', 0) > 0 and p[1].get('clicks', 0) == 0],
-        "worst_ages": [a[0] for a in sorted_ages[-2:] if a[1].get('spend', 0) > 0 and a[1].get('clicks', 0) == 0],
-        "total_spend": sum(r.get('spend', 0) or r.get('cost', 0) or 0 for r in processed_rows),
-        "total_clicks": sum(r.get('clicks', 0) or 0 for r in processed_rows),
-        "total_impressions": sum(r.get('impressions', 0) or 0 for r in processed_rows),
-    }
+        return _empty_performance_analysis()
+    return analyze_performance_frame(normalize_performance_frame(pd.DataFrame.from_records(rows)))
 
 
 def extract_lessons_from_analysis(analysis_text: str) -> list[str]:
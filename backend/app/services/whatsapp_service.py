@@ -49,8 +49,11 @@ class WhatsAppService:
     def __init__(self):
         self.base_url = WHATSAPP_BASE_URL
 
-    async def _post(self, endpoint: str, data: dict) -> dict:
-        """WhatsApp API'ye POST isteği gönder."""
+    async def _post(self, endpoint: str, data: dict, client: Optional[httpx.AsyncClient] = None) -> dict:
+        """WhatsApp API'ye POST isteği gönder.
+
+        client verilirse bağlantı (TLS oturumu) yeniden kullanılır; toplu gönderimde kullanılır.
+        """
         if not _is_whatsapp_configured():
             raise WhatsAppError(
                 "WhatsApp API yapılandırılmamış. Lütfen WHATSAPP_PHONE_ID ve "
@@ -62,27 +65,30 @@ class WhatsAppService:
             "Content-Type": "application/json"
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{self.base_url}/{endpoint}",
-                json=data,
-                headers=headers
-            )
+        if client is None:
+            async with httpx.AsyncClient(timeout=30.0) as own_client:
+                return await self._post(endpoint, data, client=own_client)
+
+        response = await client.post(
+            f"{self.base_url}/{endpoint}",
+            json=data,
+            headers=headers
+        )
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            body = {}
             try:
-                response.raise_for_status()
-            except httpx.HTTPStatusError as e:
-                body = {}
-                try:
-                    body = response.json()
-                except Exception:
-                    pass
-                err = body.get("error", {})
-                msg = err.get("message", str(e))
-                code = err.get("code", "")
-                logger.warning(f"WhatsApp API hata: status={response.status_code} code={code} message={msg}")
-                raise WhatsAppError(f"WhatsApp API hatası: {msg}")
-            
-            return response.json()
+                body = response.json()
+            except Exception:
+                pass
+            err = body.get("error", {})
+            msg = err.get("message", str(e))
+            code = err.get("code", "")
+            logger.warning(f"WhatsApp API hata: status={response.status_code} code={code} message={msg}")
+            raise WhatsAppError(f"WhatsApp API hatası: {msg}")
+        
+        return response.json()
 
     async def _get(self, endpoint: str, params: dict = None) -> dict:
         """WhatsApp API'ye GET isteği gönder."""
@@ -124,7 +130,13 @@ class WhatsAppService:
         cleaned = phone.replace("+", "").replace(" ", "").replace("-", "").replace("(", "").replace(")", "")
         return cleaned
 
-    async def send_text_message(self, to_phone: str, message: str, preview_url: bool = False) -> dict:
+    async def send_text_message(
+        self,
+        to_phone: str,
+        message: str,
+        preview_url: bool = False,
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> dict:
         """
         Belirli bir numaraya metin mesajı gönder.
         
@@ -132,6 +144,7 @@ class WhatsAppService:
             to_phone: Alıcı telefon numarası (uluslararası format, + işaretsiz)
             message: Gönderilecek mesaj metni
             preview_url: Mesajdaki URL'ler için önizleme göster
+            client: Paylaşılan httpx.AsyncClient (toplu gönderimde bağlantı yeniden kullanımı)
         
         Returns:
             API yanıtı (message_id vb.)
@@ -150,7 +163,7 @@ class WhatsAppService:
             }
         }
         
-        result = await self._post(f"{phone_id}/messages", data)
+        result = await self._post(f"{phone_id}/messages", data, client=client)
         logger.info(f"WhatsApp mesaj gönderildi: {formatted_phone}, message_id: {result.get('messages', [{}])[0].get('id')}")
         return result
 
@@ -0,0 +1,410 @@
+# -*- coding: utf-8 -*-
+"""Hedef kitle kataloğu: "Meta - *.txt" dosyaları bir kez ayrıştırılır ve indekslenir.
+
+Katalog değişmez (immutable) bir yapıdır; dosyaların mtime/boyut imzası değiştiğinde bir
+sonraki erişimde yeniden yüklenir. Arama için etiketlerin Türkçe karakterleri sadeleştirilmiş
+küçük harf hâli üzerinde kelime öneki (kısa sorgular) ve trigram (3+ karakter) indeksi tutulur;
+"Büyüklük: X - Y" aralıkları sayıya çevrilir (min/max filtreleri için).
+
+AI prompt'larındaki etiket blokları da katalog başına önceden oluşturulur; bağlam (kullanıcı
+metni, rapor analizi) verildiğinde etiketler bağlamla ortak kelime köklerine göre sıralanır.
+"""
+
+import bisect
+import logging
+import math
+import os
+import re
+import threading
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# Docker'da TARGETING_FILES_DIR=/project ile proje kökü mount edilir
+_roottmp = Path(__file__).resolve().parent.parent.parent
+_fallback = os.getenv("TARGETING_FILES_DIR", "")
+BASE_DIR = Path(_fallback) if _fallback and Path(_fallback).exists() else _roottmp
+
+DEMOGRAPHICS_FILE = BASE_DIR / "Meta - Demografik Bilgiler.txt"
+BEHAVIORS_FILE = BASE_DIR / "Meta - Davranışlar.txt"
+INTERESTS_FILE = BASE_DIR / "Meta -  İlgi Alanları.txt"
+INTERESTS_ALT = BASE_DIR / "Meta - İlgi Alanları.txt"
+
+CATEGORIES = ("demographics", "interests", "behaviors")
+CATEGORY_TITLES = {"demographics": "Demografik Bilgiler", "interests": "İlgi Alanları", "behaviors": "Davranışlar"}
+
+# Prompt'a eklenecek en fazla etiket (tüm kategoriler; kategori büyüklüğüne orantılı paylaştırılır)
+PROMPT_LABELS = 300
+# Kaba Türkçe kök: ekler eşleşmeyi bozmasın diye kelimenin ilk N harfi
+_STEM_CHARS = 5
+_UNAVAILABLE = "Kullanılamıyor"
+
+_SIZE_MARKER = "(Büyüklük:"
+_FOLD = str.maketrans({"İ": "i", "I": "i", "ı": "i", "ğ": "g", "Ğ": "g", "ü": "u", "Ü": "u",
+                       "ş": "s", "Ş": "s", "ö": "o", "Ö": "o", "ç": "c", "Ç": "c"})
+
+
+def fold(text: str) -> str:
+    """Arama için normalize metin: Türkçe karakterler sadeleştirilir, küçük harfe çevrilir."""
+    return " ".join(text.translate(_FOLD).lower().split())
+
+
+def parse_size(size: Optional[str]) -> tuple[Optional[int], Optional[int]]:
+    """"1,045,931 - 1,230,016" → (1045931, 1230016); "1000'den az" → (0, 1000); bilinmiyorsa (None, None)."""
+    if not size:
+        return None, None
+    if "az" in size:
+        digits = "".join(ch for ch in size if ch.isdigit())
+        return (0, int(digits)) if digits else (None, None)
+    bounds = []
+    for part in size.split("-"):
+        digits = "".join(ch for ch in part if ch.isdigit())
+        if digits:
+            bounds.append(int(digits))
+    if not bounds:
+        return None, None
+    return min(bounds), max(bounds)
+
+
+@dataclass(frozen=True)
+class TargetingItem:
+    """Katalogdaki tek seçenek; path üst kategorilerin etiketleridir."""
+    id: int
+    category: str
+    label: str
+    size: Optional[str]
+    size_min: Optional[int]
+    size_max: Optional[int]
+    path: tuple[str, ...]
+
+    def as_option(self) -> dict:
+        return {"label": self.label, "size": self.size}
+
+    def as_dict(self) -> dict:
+        return {
+            "label": self.label,
+            "category": self.category,
+            "path": list(self.path),
+            "size": self.size,
+            "size_min": self.size_min,
+            "size_max": self.size_max,
+        }
+
+
+def _parse_lines(lines, category: str, start_id: int) -> list[TargetingItem]:
+    """Satır formatı: "   * Etiket (Büyüklük: X - Y)" veya "   * Alt Kategori" (girinti = seviye)."""
+    items: list[TargetingItem] = []
+    parents: list[tuple[int, str]] = []
+    for line in lines:
+        line = line.rstrip()
+        idx = line.find("*")
+        if idx < 0:
+            continue
+        rest = line[idx + 1:].strip()
+        if not rest:
+            continue
+
+        if _SIZE_MARKER in rest:
+            i = rest.rfind(_SIZE_MARKER)
+            label = rest[:i].strip().rstrip("(").strip()
+            start = i + len(_SIZE_MARKER)
+            end = rest.find(")", start)
+            size_val = rest[start:end].strip() if end >= 0 else None
+        else:
+            label = rest
+            size_val = None
+
+        # Çok kısa veya boş etiketleri atla
+        if len(label) < 2:
+            continue
+
+        while parents and parents[-1][0] >= idx:
+            parents.pop()
+        size_min, size_max = parse_size(size_val)
+        items.append(TargetingItem(
+            id=start_id + len(items),
+            category=category,
+            label=label,
+            size=size_val,
+            size_min=size_min,
+            size_max=size_max,
+            path=tuple(p[1] for p in parents),
+        ))
+        parents.append((idx, label))
+    return items
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def stems(text: str) -> set[str]:
+    """Metindeki 3+ harfli kelimelerin normalize kökleri."""
+    return {word[:_STEM_CHARS] for word in re.findall(r"\w+", fold(text)) if len(word) >= 3}
+
+
+@dataclass(frozen=True)
+class _PromptIndex:
+    """Kategori için prompt satırları ve kök → [(satır, ağırlık)] indeksi."""
+    lines: tuple[str, ...]
+    postings: Mapping[str, tuple[tuple[int, float], ...]]
+
+
+class TargetingCatalog:
+    """Ayrıştırılmış ve indekslenmiş katalog (oluşturulduktan sonra değişmez)."""
+
+    def __init__(self, items_by_category: Mapping[str, list[TargetingItem]]):
+        self.items: tuple[TargetingItem, ...] = tuple(
+            item for category in CATEGORIES for item in items_by_category.get(category, ())
+        )
+        self.by_category: Mapping[str, tuple[TargetingItem, ...]] = MappingProxyType(
+            {category: tuple(items_by_category.get(category, ())) for category in CATEGORIES}
+        )
+        self._folded = tuple(fold(item.label) for item in self.items)
+
+        trigrams: dict[str, set[int]] = {}
+        words: list[tuple[str, int]] = []
+        for item_id, text in enumerate(self._folded):
+            for gram in _trigrams(text):
+                trigrams.setdefault(gram, set()).add(item_id)
+            for word in set(text.replace("(", " ").replace(")", " ").split()):
+                words.append((word, item_id))
+        self._trigrams: Mapping[str, frozenset[int]] = MappingProxyType(
+            {gram: frozenset(ids) for gram, ids in trigrams.items()}
+        )
+        self._words: tuple[tuple[str, int], ...] = tuple(sorted(words))
+        self._options = {
+            category: [item.as_option() for item in items] for category, items in self.by_category.items()
+        }
+
+    @classmethod
+    def from_options(cls, options: Mapping[str, list[dict]]) -> "TargetingCatalog":
+        """/options biçimindeki sözlükten katalog oluşturur (dosya dışı kaynaklar için)."""
+        items: dict[str, list[TargetingItem]] = {}
+        next_id = 0
+        for category in CATEGORIES:
+            items[category] = []
+            for option in options.get(category) or []:
+                label = (option.get("label") or "").strip()
+                if not label:
+                    continue
+                size_min, size_max = parse_size(option.get("size"))
+                items[category].append(TargetingItem(
+                    next_id, category, label, option.get("size"), size_min, size_max, (),
+                ))
+                next_id += 1
+        return cls(items)
+
+    def options(self) -> dict:
+        """/options biçimi: kategori → [{"label", "size"}] (önceden oluşturulur; değiştirilmemeli)."""
+        return self._options
+
+    @cached_property
+    def _prompt_indexes(self) -> dict[str, _PromptIndex]:
+        indexes = {}
+        for category, items in self.by_category.items():
+            usable = [item for item in items if _UNAVAILABLE not in str(item.size or "")]
+            weighted: list[dict[str, float]] = []
+            df: dict[str, int] = {}
+            for item in usable:
+                # Etiketin kendi kelimeleri üst kategorilerinkinden daha belirleyicidir
+                item_stems = dict.fromkeys(stems(" ".join(item.path)), 1.0)
+                item_stems.update(dict.fromkeys(stems(item.label), 2.0))
+                weighted.append(item_stems)
+                for stem in item_stems:
+                    df[stem] = df.get(stem, 0) + 1
+            postings: dict[str, list[tuple[int, float]]] = {}
+            for pos, item_stems in enumerate(weighted):
+                for stem, weight in item_stems.items():
+                    idf = math.log(1 + len(usable) / df[stem])
+                    postings.setdefault(stem, []).append((pos, weight * idf))
+            indexes[category] = _PromptIndex(
+                lines=tuple(f"- {item.label}" for item in usable),
+                postings=MappingProxyType({stem: tuple(p) for stem, p in postings.items()}),
+            )
+        return indexes
+
+    @cached_property
+    def _fragments(self) -> dict[int, str]:
+        return {}
+
+    def _relevant(self, index: _PromptIndex, context_stems: set[str], cap: int) -> list[int]:
+        scores: dict[int, float] = {}
+        for stem in context_stems:
+            for pos, weight in index.postings.get(stem, ()):
+                scores[pos] = scores.get(pos, 0.0) + weight
+        chosen = sorted(scores, key=lambda pos: (-scores[pos], pos))[:cap]
+        if len(chosen) < cap:
+            # Kalan yer dosya sırasındaki etiketlerle doldurulur
+            taken = set(chosen)
+            chosen += [pos for pos in range(len(index.lines)) if pos not in taken][: cap - len(chosen)]
+        return chosen
+
+    def _quotas(self, cap: int) -> dict[str, int]:
+        sizes = {category: len(index.lines) for category, index in self._prompt_indexes.items()}
+        total = sum(sizes.values())
+        if total <= cap:
+            return sizes
+        # En büyük kalan yöntemi: taban paylar dağıtılır, kalan yerler en büyük kesirlere verilir
+        shares = {category: cap * n / total for category, n in sizes.items()}
+        quotas = {category: math.floor(share) for category, share in shares.items()}
+        leftover = cap - sum(quotas.values())
+        for category in sorted(shares, key=lambda c: quotas[c] - shares[c])[:leftover]:
+            quotas[category] += 1
+        return quotas
+
+    def prompt_fragment(self, context: str = "", cap: int = PROMPT_LABELS) -> str:
+        """Prompt için hedef kitle etiket bloğu (toplam en fazla cap etiket).
+
+        context verilirse her kategoride bağlamla en alakalı etiketler seçilir; verilmezse veya
+        hiçbir kök eşleşmezse dosya sırasındaki ilk etiketler. Bağlamsız blok cap başına bir kez
+        oluşturulur.
+        """
+        context_stems = stems(context) if context else set()
+        if not context_stems and cap in self._fragments:
+            return self._fragments[cap]
+        quotas = self._quotas(cap)
+        parts = []
+        for category, index in self._prompt_indexes.items():
+            title = CATEGORY_TITLES[category]
+            if not index.lines:
+                parts.append(f"### {title}: (boş)")
+                continue
+            quota = quotas[category]
+            positions = self._relevant(index, context_stems, quota) if context_stems else range(quota)
+            parts.append(
+                f"### {title} (sadece bu etiketlerden seç, aynen kopyala):\n"
+                + "\n".join(index.lines[pos] for pos in positions)
+            )
+        fragment = "\n\n".join(parts)
+        if not context_stems:
+            self._fragments[cap] = fragment
+        return fragment
+
+    def _word_prefix(self, token: str) -> set[int]:
+        start = bisect.bisect_left(self._words, (token, -1))
+        ids = set()
+        for word, item_id in self._words[start:]:
+            if not word.startswith(token):
+                break
+            ids.add(item_id)
+        return ids
+
+    def _match_token(self, token: str) -> set[int]:
+        if len(token) < 3:
+            return self._word_prefix(token)
+        postings = [self._trigrams.get(gram, frozenset()) for gram in _trigrams(token)]
+        postings.sort(key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        return {i for i in candidates if token in self._folded[i]}
+
+    def search(
+        self,
+        query: str = "",
+        category: Optional[str] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> tuple[int, list[TargetingItem]]:
+        """Etiket araması; (toplam eşleşme, sayfa) döner.
+
+        Boyut filtreleri, kitle aralığı [min_size, max_size] ile kesişen seçenekleri bırakır
+        (boyutu bilinmeyenler filtre verildiğinde elenir). Sıralama: etiket sorguyla başlayanlar,
+        sonra kelime başı eşleşmeler, sonra diğerleri; her grupta büyük kitle önce.
+        """
+        q = fold(query or "")
+        tokens = q.split()
+        if tokens:
+            ids: Optional[set[int]] = None
+            for token in tokens:
+                matched = self._match_token(token)
+                ids = matched if ids is None else ids & matched
+                if not ids:
+                    return 0, []
+            candidates = [self.items[i] for i in ids]
+        else:
+            candidates = list(self.items)
+
+        def keep(item: TargetingItem) -> bool:
+            if category and item.category != category:
+                return False
+            if min_size is not None and (item.size_max is None or item.size_max < min_size):
+                return False
+            if max_size is not None and (item.size_min is None or item.size_min > max_size):
+                return False
+            return True
+
+        def rank(item: TargetingItem):
+            text = self._folded[item.id]
+            if not q:
+                group = 0
+            elif text.startswith(q):
+                group = 0
+            elif f" {tokens[0]}" in f" {text}":
+                group = 1
+            else:
+                group = 2
+            return group, -(item.size_max or 0), text
+
+        matches = sorted(filter(keep, candidates), key=rank) if tokens else list(filter(keep, candidates))
+        return len(matches), matches[offset:offset + limit]
+
+
+def _interests_file() -> Path:
+    return INTERESTS_FILE if INTERESTS_FILE.exists() else INTERESTS_ALT
+
+
+def _source_files() -> dict[str, Path]:
+    return {"demographics": DEMOGRAPHICS_FILE, "interests": _interests_file(), "behaviors": BEHAVIORS_FILE}
+
+
+def _signature(files: Mapping[str, Path]) -> tuple:
+    sig = []
+    for category, path in files.items():
+        try:
+            st = path.stat()
+            sig.append((category, str(path), st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append((category, str(path), None, None))
+    return tuple(sig)
+
+
+def load_catalog(files: Optional[Mapping[str, Path]] = None) -> TargetingCatalog:
+    """Dosyaları ayrıştırıp yeni katalog oluşturur (olmayan dosya boş kategori olur)."""
+    files = _source_files() if files is None else files
+    items: dict[str, list[TargetingItem]] = {}
+    next_id = 0
+    for category in CATEGORIES:
+        path = files.get(category)
+        lines: list[str] = []
+        if path is not None and path.exists():
+            lines = path.read_text(encoding="utf-8", errors="replace").splitlines()
+        items[category] = _parse_lines(lines, category, next_id)
+        next_id += len(items[category])
+    return TargetingCatalog(items)
+
+
+_lock = threading.Lock()
+_current: Optional[tuple[tuple, TargetingCatalog]] = None
+
+
+def get_catalog() -> TargetingCatalog:
+    """Güncel katalog; dosyalar değiştiyse (mtime/boyut) yeniden yüklenir."""
+    global _current
+    files = _source_files()
+    signature = _signature(files)
+    current = _current
+    if current is not None and current[0] == signature:
+        return current[1]
+    with _lock:
+        if _current is not None and _current[0] == signature:
+            return _current[1]
+        catalog = load_catalog(files)
+        _current = (signature, catalog)
+        logger.info("Hedef kitle kataloğu yüklendi: %d seçenek", len(catalog.items))
+        return catalog
@@ -10,19 +10,40 @@ from typing import Optional, Tuple
 
 from app import config
 from app.celery_app import app
-from app.job_store import update_job_sync
+from app.job_store import report_job_progress, update_job_sync
 from app.report_storage import get_reports_csv_dir, write_csv_to_disk
 from app.report_templates import REPORT_TEMPLATES, get_report_data_for_template, get_template_csv_columns
 from app.saved_reports import get_saved_report_by_id_optional
 from app.services.meta_service import meta_service, MetaAPIError
 from app.database import async_session_factory
-from app.pdf_generator import generate_analysis_pdf
+from app.pdf_generator import render_analysis_pdf
+from app.services.ai_providers import close_providers
 
 # Alert sistemi için importlar
-from datetime import datetime, timedelta
+from datetime import datetime
+from dataclasses import replace
 from uuid import uuid4
-from sqlalchemy import select
-from app.models import AlertRule, AlertHistory
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from app.models import AlertRule, AlertHistory, ScheduledReport, ScheduledReportLog
+from app.alert_triggers import drain_pending_campaigns
+from app.alert_engine import (
+    CampaignFrame,
+    RuleMatch,
+    account_key as alert_account_key,
+    evaluate_rules,
+    load_snapshots as load_alert_snapshots,
+    save_snapshots as save_alert_snapshots,
+)
+from app.services.notification_service import dispatch_pending_notifications, enqueue_notification
+
+async def _closing_ai_clients(coro):
+    """AI kullanan task'larda istemci bağlantılarını, asyncio.run loop'u kapatmadan önce kapatır."""
+    try:
+        return await coro
+    finally:
+        await close_providers()
+
 
 # reports router'daki helper
 def _get_report_template_ids(r: dict):
@@ -51,7 +72,8 @@ async def _run_export(report_id: str, job_id: str) -> Tuple[Optional[str], Optio
         date_suffix = datetime.now().strftime("%Y%m%d_%H%M%S")
 
         def update_progress(progress: int):
-            update_job_sync(job_id, progress=progress)
+            # İlerleme Redis'e yayınlanır; DB'ye yalnızca durum geçişleri yazılır
+            report_job_progress(job_id, progress)
 
         async def fetch_template_with_retry(tid: str, retries: int = 3) -> list:
             for attempt in range(retries + 1):
@@ -67,18 +89,18 @@ async def _run_export(report_id: str, job_id: str) -> Tuple[Optional[str], Optio
 
         if len(tids) == 1:
             tid = tids[0]
-            await asyncio.get_event_loop().run_in_executor(None, lambda: update_progress(10))
+            update_progress(10)
             rows = await fetch_template_with_retry(tid)
             columns = get_template_csv_columns(tid)
             if columns:
                 rows = [{k: row.get(k, "") for k in columns} for row in rows]
             csv_content = meta_service.to_csv(rows)
-            await asyncio.get_event_loop().run_in_executor(None, lambda: update_progress(70))
+            update_progress(70)
             directory = get_reports_csv_dir()
             out_file = directory / f"{safe_name}_{job_id}_{date_suffix}.csv"
             out_file.write_text(csv_content, encoding="utf-8")
             file_name = f"{safe_name}_{date_suffix}.csv"
-            await asyncio.get_event_loop().run_in_executor(None, lambda: update_progress(100))
+            update_progress(100)
             return str(out_file), file_name
 
         # Çoklu şablon -> ZIP (her şablon arasında gecikme; rate limit önlemi)
@@ -86,7 +108,7 @@ async def _run_export(report_id: str, job_id: str) -> Tuple[Optional[str], Optio
         with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
             for i, tid in enumerate(tids):
                 p = 10 + int((i + 1) / len(tids) * 80)
-                await asyncio.get_event_loop().run_in_executor(None, lambda p=p: update_progress(p))
+                update_progress(p)
                 if i > 0:
                     await asyncio.sleep(8)
                 rows = await fetch_template_with_retry(tid)
@@ -100,12 +122,12 @@ async def _run_export(report_id: str, job_id: str) -> Tuple[Optional[str], Optio
                     f"{safe_name}_{slug}_{date_suffix}.csv",
                     csv_content.encode("utf-8"),
                 )
-        await asyncio.get_event_loop().run_in_executor(None, lambda: update_progress(95))
+        update_progress(95)
         directory = get_reports_csv_dir()
         zip_path = directory / f"{safe_name}_{job_id}_{date_suffix}.zip"
         zip_path.write_bytes(buf.getvalue())
         file_name = f"{safe_name}_{date_suffix}.zip"
-        await asyncio.get_event_loop().run_in_executor(None, lambda: update_progress(100))
+        update_progress(100)
         return str(zip_path), file_name
 
 
@@ -140,154 +162,119 @@ def export_report_task(self, report_id: str, job_id: str) -> None:
 
 # ============ AKILLI UYARI SİSTEMİ (SMART ALERTS) ============
 
-async def _send_email_alert(email_to: str, subject: str, message: str):
-    """E-posta bildirimi gönder."""
-    try:
-        from app.services.email_service import send_alert_email
-        await send_alert_email(to_email=email_to, subject=subject, body=message)
-        return True
-    except Exception as e:
-        print(f"E-posta gönderme hatası: {e}")
-        return False
-
+METRIC_NAMES = {
+    "ctr": "CTR",
+    "roas": "ROAS",
+    "spend": "Harcama",
+    "cpc": "CPC",
+    "cpm": "CPM",
+    "impressions": "Gösterim",
+    "clicks": "Tıklama",
+    "frequency": "Frequency",
+}
+
+
+def _format_metric_value(metric: str, value: float) -> str:
+    if metric == "ctr":
+        return f"%{value:.2f}"
+    if metric == "roas":
+        return f"{value:.2f}x"
+    if metric in ["spend", "cpc", "cpm"]:
+        return f"₺{value:,.2f}"
+    return f"{value:,.0f}"
+
+
+def _format_alert_message(rule: AlertRule, match: RuleMatch) -> tuple[str, str]:
+    """Eşleşme için (metrik adı, bildirim mesajı) döner."""
+    metric_name = METRIC_NAMES.get(rule.metric, rule.metric.upper())
+    value_display = _format_metric_value(rule.metric, match.actual_value)
+
+    if match.change_pct is not None:
+        direction = "arttı" if match.change_pct > 0 else "azaldı"
+        details = (
+            f"Önceki: {_format_metric_value(rule.metric, match.previous_value)}\n"
+            f"Değişim: %{match.change_pct:+.1f} (eşik ±%{rule.threshold:.1f})\n"
+            f"Durum: {direction} (eşik aşıldı)\n\n"
+        )
+    else:
+        condition_text = "düştü" if rule.condition == "lt" else "yükseldi"
+        details = (
+            f"Eşik: {_format_metric_value(rule.metric, rule.threshold)}\n"
+            f"Durum: {condition_text} (eşik aşıldı)\n\n"
+        )
 
-async def _send_whatsapp_alert(phone_to: str, message: str):
-    """WhatsApp bildirimi gönder."""
-    try:
-        from app.services.whatsapp_service import whatsapp_service
-        await whatsapp_service.send_message(to_phone=phone_to, body=message)
-        return True
-    except Exception as e:
-        print(f"WhatsApp gönderme hatası: {e}")
-        return False
+    message = (
+        f"🚨 Meta Ads Uyarısı\n\n"
+        f"Kampanya: {match.campaign_name}\n"
+        f"Metrik: {metric_name}\n"
+        f"Değer: {value_display}\n"
+        f"{details}"
+        f"Kural: {rule.name}"
+    )
+    return metric_name, message
 
 
-async def _check_single_rule(rule: AlertRule, campaigns: list, session) -> list[dict]:
+def _record_alert(match: RuleMatch, session) -> dict:
     """
-    Tek bir kuralı kontrol et.
-    Dönüş: Tetiklenen alert kayıtları listesi
+    Tetiklenen eşleşmeyi kaydeder: AlertHistory + outbox bildirimleri + kural sayaçları.
+    Dönüş: Tetiklenen alert özeti
     """
-    triggered_alerts = []
-    
-    # Cooldown kontrolü
-    if rule.last_triggered and rule.cooldown_minutes:
-        cooldown_end = rule.last_triggered + timedelta(minutes=rule.cooldown_minutes)
-        if datetime.utcnow() < cooldown_end:
-            return triggered_alerts  # Henüz cooldown bitmemiş
-    
-    for campaign in campaigns:
-        campaign_id = campaign.get("id")
-        campaign_name = campaign.get("name", "Bilinmeyen Kampanya")
-        metric_value = campaign.get(rule.metric)
-        
-        if metric_value is None:
-            continue
-        
-        try:
-            metric_value = float(metric_value)
-        except (TypeError, ValueError):
-            continue
-        
-        triggered = False
-        
-        if rule.condition == "lt" and metric_value < rule.threshold:
-            triggered = True
-            condition_text = "düştü"
-        elif rule.condition == "gt" and metric_value > rule.threshold:
-            triggered = True
-            condition_text = "yükseldi"
-        
-        if triggered:
-            # Metrik formatlama
-            if rule.metric == "ctr":
-                value_display = f"%{metric_value:.2f}"
-                threshold_display = f"%{rule.threshold:.2f}"
-            elif rule.metric == "roas":
-                value_display = f"{metric_value:.2f}x"
-                threshold_display = f"{rule.threshold:.2f}x"
-            elif rule.metric in ["spend", "cpc", "cpm"]:
-                value_display = f"₺{metric_value:,.2f}"
-                threshold_display = f"₺{rule.threshold:,.2f}"
-            else:
-                value_display = f"{metric_value:,.0f}"
-                threshold_display = f"{rule.threshold:,.0f}"
-            
-            # Bildirim mesajı
-            metric_names = {
-                "ctr": "CTR",
-                "roas": "ROAS",
-                "spend": "Harcama",
-                "cpc": "CPC",
-                "cpm": "CPM",
-                "impressions": "Gösterim",
-                "clicks": "Tıklama",
-                "frequency": "Frequency",
-            }
-            metric_name = metric_names.get(rule.metric, rule.metric.upper())
-            
-            message = (
-                f"🚨 Meta Ads Uyarısı\n\n"
-                f"Kampanya: {campaign_name}\n"
-                f"Metrik: {metric_name}\n"
-                f"Değer: {value_display}\n"
-                f"Eşik: {threshold_display}\n"
-                f"Durum: {condition_text} (eşik aşıldı)\n\n"
-                f"Kural: {rule.name}"
-            )
-            
-            channels_sent = []
-            
-            # E-posta gönder
-            if "email" in rule.channels and rule.email_to:
-                email_sent = await _send_email_alert(
-                    rule.email_to,
-                    f"Meta Ads Uyarı: {campaign_name} - {metric_name}",
-                    message
-                )
-                if email_sent:
-                    channels_sent.append("email")
-            
-            # WhatsApp gönder
-            if "whatsapp" in rule.channels and rule.whatsapp_to:
-                wa_sent = await _send_whatsapp_alert(rule.whatsapp_to, message)
-                if wa_sent:
-                    channels_sent.append("whatsapp")
-            
-            # AlertHistory kaydet
-            alert_record = AlertHistory(
-                id=str(uuid4()),
-                rule_id=rule.id,
-                campaign_id=campaign_id,
-                campaign_name=campaign_name,
-                metric=rule.metric,
-                threshold=rule.threshold,
-                actual_value=metric_value,
-                message=message,
-                channels_sent=channels_sent,
-            )
-            session.add(alert_record)
-            
-            # Kuralı güncelle (last_triggered + counter)
-            rule.last_triggered = datetime.utcnow()
-            rule.trigger_count += 1
-            
-            triggered_alerts.append({
-                "rule_id": rule.id,
-                "campaign_id": campaign_id,
-                "campaign_name": campaign_name,
-                "metric": rule.metric,
-                "actual_value": metric_value,
-                "channels_sent": channels_sent,
-            })
-            
-            # Bir kural bir seferde sadece bir kampanya için tetiklenir (spam önlemi)
-            break
-    
-    return triggered_alerts
+    rule = match.rule
+    metric_name, message = _format_alert_message(rule, match)
+
+    # AlertHistory kaydet; channels_sent dispatcher teslim ettikçe doldurulur
+    alert_record = AlertHistory(
+        id=str(uuid4()),
+        rule_id=rule.id,
+        campaign_id=match.campaign_id,
+        campaign_name=match.campaign_name,
+        metric=rule.metric,
+        threshold=rule.threshold,
+        actual_value=match.actual_value,
+        message=message,
+        channels_sent=[],
+    )
+    session.add(alert_record)
+
+    # Bildirimler outbox'a aynı transaction'da yazılır (gönderim dispatcher'da)
+    channels_queued = []
+    if "email" in (rule.channels or []) and rule.email_to:
+        enqueue_notification(
+            session,
+            channel="email",
+            recipient=rule.email_to,
+            subject=f"Meta Ads Uyarı: {match.campaign_name} - {metric_name}",
+            body=message,
+            alert_history_id=alert_record.id,
+        )
+        channels_queued.append("email")
+    if "whatsapp" in (rule.channels or []) and rule.whatsapp_to:
+        enqueue_notification(
+            session,
+            channel="whatsapp",
+            recipient=rule.whatsapp_to,
+            body=message,
+            alert_history_id=alert_record.id,
+        )
+        channels_queued.append("whatsapp")
+
+    # Kuralı güncelle (last_triggered + counter)
+    rule.last_triggered = datetime.utcnow()
+    rule.trigger_count = (rule.trigger_count or 0) + 1
+
+    return {
+        "rule_id": rule.id,
+        "campaign_id": match.campaign_id,
+        "campaign_name": match.campaign_name,
+        "metric": rule.metric,
+        "actual_value": match.actual_value,
+        "change_pct": match.change_pct,
+        "channels_queued": channels_queued,
+    }
 
 
 async def _run_alert_checks():
-    """Tüm aktif kuralları kontrol eder ve bildirim gönderir."""
+    """Tüm aktif kuralları vektörel motorla tek seferde değerlendirir ve bildirimleri kuyruğa alır."""
     if not async_session_factory:
         print("Alert check: Veritabanı yapılandırılmamış")
         return
@@ -302,26 +289,25 @@ async def _run_alert_checks():
             print("Alert check: Aktif kural bulunamadı")
             return
         
-        # Hesap bazlı kampanyaları önbelleğe al (performans için)
-        campaigns_cache = {}
-        all_triggered = []
+        # Her hesabın kampanyaları bir kez çekilir ve sütunsal matrise çevrilir
+        frames: dict[str, CampaignFrame] = {}
+        for account_id in {rule.ad_account_id for rule in rules}:
+            key = alert_account_key(account_id)
+            if key in frames:
+                continue
+            try:
+                campaigns = await meta_service.get_campaigns(7, account_id=account_id)
+            except MetaAPIError as e:
+                print(f"Alert check: Meta API hatası (account={account_id}): {e}")
+                continue
+            frames[key] = CampaignFrame.from_campaigns(key, campaigns)
         
-        for rule in rules:
-            account_id = rule.ad_account_id
-            cache_key = account_id or "default"
-            
-            if cache_key not in campaigns_cache:
-                try:
-                    campaigns = await meta_service.get_campaigns(7, account_id=account_id)
-                    campaigns_cache[cache_key] = campaigns
-                except MetaAPIError as e:
-                    print(f"Alert check: Meta API hatası (account={account_id}): {e}")
-                    continue
-            
-            campaigns = campaigns_cache.get(cache_key, [])
-            triggered = await _check_single_rule(rule, campaigns, session)
-            all_triggered.extend(triggered)
+        previous = await load_alert_snapshots(session, frames.keys())
+        matches = evaluate_rules(rules, frames, previous)
+        all_triggered = [_record_alert(match, session) for match in matches]
         
+        # Sonraki change_pct karşılaştırması için mevcut metrikleri sakla
+        await save_alert_snapshots(session, frames.values())
         await session.commit()
         
         print(f"Alert check: {len(rules)} kural kontrol edildi, {len(all_triggered)} uyarı tetiklendi.")
@@ -336,6 +322,9 @@ def check_alert_rules_task():
     """
     try:
         result = asyncio.run(_run_alert_checks())
+        if result:
+            # Outbox'a yazılan bildirimleri hemen teslim et
+            dispatch_notifications_task.delay()
         return {
             "status": "success",
             "triggered_count": len(result) if result else 0,
@@ -345,100 +334,172 @@ def check_alert_rules_task():
         return {"status": "error", "error": str(e)}
 
 
-# ============ ZAMANLANMIŞ RAPORLAR (SCHEDULED REPORTS) ============
-
-async def _generate_scheduled_report(report_id: str):
-    """Zamanlanmış raporu oluştur ve gönder."""
-    from app.services.meta_service import meta_service, MetaAPIError
-    from app.services.ai_service import analyze_campaigns
-    from app.services.email_service import build_report_html, send_report_email
-    from app.services.whatsapp_service import whatsapp_service
-    
+async def _run_targeted_alert_checks(account_id: Optional[str], campaign_ids: list[str]):
+    """Webhook ile değişen kampanyalar için yalnızca ilgili hesabın kurallarını değerlendirir."""
+    ids = sorted(set(campaign_ids or []) | set(drain_pending_campaigns(account_id)))
+    if not ids:
+        return []
     if not async_session_factory:
-        raise RuntimeError("Veritabanı yapılandırılmamış")
+        print("Targeted alert check: Veritabanı yapılandırılmamış")
+        return []
+    
+    # Hesap belirtilmemiş kurallar varsayılan hesaba aittir
+    default_account = (config.get_setting("META_AD_ACCOUNT_ID") or "").strip()
+    is_default = not account_id or account_id == default_account
+    # Dashboard'un eski metrikleri göstermemesi için bu hesabın kampanya cache'i temizlenir
+    meta_service.invalidate_campaigns_cache(None if is_default else account_id)
     
     async with async_session_factory() as session:
-        # Rapor tanımını al
-        from sqlalchemy import select
-        result = await session.execute(
-            select(ScheduledReport).where(ScheduledReport.id == report_id)
-        )
-        report = result.scalar_one_or_none()
+        account_filters = []
+        if account_id:
+            account_filters.append(AlertRule.ad_account_id == account_id)
+        if is_default:
+            account_filters.append(AlertRule.ad_account_id.is_(None))
+        stmt = select(AlertRule).where(AlertRule.is_active == True, or_(*account_filters))
+        rules = (await session.execute(stmt)).scalars().all()
+        if not rules:
+            return []
         
-        if not report:
-            raise ValueError("Zamanlanmış rapor bulunamadı")
+        try:
+            campaigns = await meta_service.get_campaigns_by_ids(ids, 7)
+        except MetaAPIError as e:
+            print(f"Targeted alert check: Meta API hatası (account={account_id}): {e}")
+            return []
         
-        if not report.is_active:
-            raise ValueError("Rapor pasif durumda")
+        frame = CampaignFrame.from_campaigns(alert_account_key(account_id), campaigns)
+        keys = {alert_account_key(rule.ad_account_id) for rule in rules}
+        frames = {key: replace(frame, account_key=key) for key in keys}
+        previous = await load_alert_snapshots(session, keys)
+        matches = evaluate_rules(rules, frames, previous)
+        triggered = [_record_alert(match, session) for match in matches]
         
-        # Log kaydı oluştur
-        log = ScheduledReportLog(
-            id=str(uuid4()),
-            scheduled_report_id=report_id,
-            status="running",
-        )
-        session.add(log)
+        # Snapshot'ta yalnızca bu kampanyalar güncellenir
+        await save_alert_snapshots(session, frames.values(), merge=True)
         await session.commit()
         
+        print(
+            f"Targeted alert check: {len(ids)} kampanya, {len(rules)} kural kontrol edildi, "
+            f"{len(triggered)} uyarı tetiklendi (account={account_id or 'default'})."
+        )
+        return triggered
+
+
+@app.task(name="app.tasks.reevaluate_campaign_alerts")
+def reevaluate_campaign_alerts_task(account_id: Optional[str] = None, campaign_ids: Optional[list] = None):
+    """
+    Meta webhook değişikliklerinden sonra (debounce ile) planlanan hedefli alert kontrolü.
+    Biriken kampanya id'leri Redis'ten alınır; Redis yoksa id'ler argüman olarak gelir.
+    """
+    try:
+        result = asyncio.run(_run_targeted_alert_checks(account_id, campaign_ids or []))
+        if result:
+            dispatch_notifications_task.delay()
+        return {"status": "success", "triggered_count": len(result)}
+    except Exception as e:
+        print(f"Targeted alert check task hatası: {e}")
+        return {"status": "error", "error": str(e)}
+
+
+@app.task(name="app.tasks.dispatch_notifications")
+def dispatch_notifications_task():
+    """
+    Bildirim outbox'ındaki bekleyen kayıtları teslim eder.
+    Uyarı kontrolünden sonra tetiklenir; yeniden denemeler için Beat ile dakikada bir çalışır.
+    """
+    try:
+        return {"status": "success", **asyncio.run(dispatch_pending_notifications())}
+    except Exception as e:
+        print(f"Bildirim dispatch hatası: {e}")
+        return {"status": "error", "error": str(e)}
+
+
+# ============ ZAMANLANMIŞ RAPORLAR (SCHEDULED REPORTS) ============
+
+REPORT_TITLES = {
+    "daily_summary": "Günlük Özet Rapor",
+    "weekly_summary": "Haftalık Performans Raporu",
+    "campaign_list": "Kampanya Listesi",
+    "performance": "Performans Analizi",
+}
+
+# AI analizi içeren rapor tipleri
+AI_REPORT_TYPES = ("weekly_summary", "performance")
+
+# Gruplamanın kazandırdığı çağrı sayaçları (Redis hash)
+SCHEDULED_METRICS_KEY = "scheduled_reports:metrics"
+
+
+def scheduled_group_key(report) -> tuple:
+    """Aynı veri setini paylaşan raporların grup anahtarı: (hesap, gün, rapor tipi)."""
+    return (report.ad_account_id or None, report.days, report.report_type)
+
+
+async def _build_scheduled_dataset(account_id: Optional[str], days: int, report_type: str) -> dict:
+    """Bir rapor grubu için kampanya verisini, özeti ve (gerekirse) AI analizini bir kez hesaplar."""
+    from app.services.ai_service import analyze_campaigns, campaigns_analysis_cache_key
+
+    campaigns = await meta_service.get_campaigns(days=days, account_id=account_id)
+    summary_data = {
+        "campaign_count": len(campaigns),
+        "total_spend": sum(float(c.get("spend", 0) or 0) for c in campaigns),
+        "total_impressions": sum(int(c.get("impressions", 0) or 0) for c in campaigns),
+        "total_clicks": sum(int(c.get("clicks", 0) or 0) for c in campaigns),
+        "avg_ctr": sum(float(c.get("ctr", 0) or 0) for c in campaigns) / len(campaigns) if campaigns else 0,
+    }
+
+    ai_analysis = None
+    ai_cache_key = None
+    if report_type in AI_REPORT_TYPES and campaigns:
         try:
-            # Meta verilerini çek
-            campaigns = await meta_service.get_campaigns(
-                days=report.days,
-                account_id=report.ad_account_id
+            ai_analysis = await analyze_campaigns(campaigns)
+            # Log'daki analiz, aynı veriyle yapılan sonraki analizlerde önbellek kaydı olarak kullanılır
+            ai_cache_key = campaigns_analysis_cache_key(campaigns)
+        except Exception as e:
+            print(f"AI analiz hatası: {e}")
+            ai_analysis = "AI analizi oluşturulamadı."
+
+    return {
+        "campaigns": campaigns,
+        "summary_data": summary_data,
+        "ai_analysis": ai_analysis,
+        "ai_cache_key": ai_cache_key,
+    }
+
+
+async def _deliver_scheduled_report(report: ScheduledReport, dataset: dict) -> list[str]:
+    """Hazır veri setini raporun kendi alıcılarına gönderir; başarılı kanalları döner."""
+    from app.services.email_service import build_report_html, send_report_email
+    from app.services.whatsapp_service import whatsapp_service
+
+    summary_data = dataset["summary_data"]
+    ai_analysis = dataset["ai_analysis"]
+    report_title = REPORT_TITLES.get(report.report_type, "Meta Ads Rapor")
+    channels_sent = []
+
+    # E-posta gönder
+    if "email" in report.channels and report.email_to:
+        try:
+            html_content = build_report_html(
+                report_text=ai_analysis or "Rapor detayları aşağıdadır.",
+                summary_data=summary_data,
+                period=f"Son {report.days} Gün"
             )
-            
-            # Özet veri oluştur
-            summary_data = {
-                "campaign_count": len(campaigns),
-                "total_spend": sum(float(c.get("spend", 0) or 0) for c in campaigns),
-                "total_impressions": sum(int(c.get("impressions", 0) or 0) for c in campaigns),
-                "total_clicks": sum(int(c.get("clicks", 0) or 0) for c in campaigns),
-                "avg_ctr": sum(float(c.get("ctr", 0) or 0) for c in campaigns) / len(campaigns) if campaigns else 0,
-            }
-            
-            # AI analizi (weekly/performance için)
-            ai_analysis = None
-            if report.report_type in ["weekly_summary", "performance"] and campaigns:
-                try:
-                    ai_analysis = await analyze_campaigns(campaigns)
-                except Exception as e:
-                    print(f"AI analiz hatası: {e}")
-                    ai_analysis = "AI analizi oluşturulamadı."
-            
-            # Bildirim mesajı oluştur
-            report_title = {
-                "daily_summary": "Günlük Özet Rapor",
-                "weekly_summary": "Haftalık Performans Raporu",
-                "campaign_list": "Kampanya Listesi",
-                "performance": "Performans Analizi",
-            }.get(report.report_type, "Meta Ads Rapor")
-            
-            channels_sent = []
-            
-            # E-posta gönder
-            if "email" in report.channels and report.email_to:
-                try:
-                    html_content = build_report_html(
-                        report_text=ai_analysis or "Rapor detayları aşağıdadır.",
-                        summary_data=summary_data,
-                        period=f"Son {report.days} Gün"
-                    )
-                    
-                    success = send_report_email(
-                        to_email=report.email_to,
-                        subject=f"📊 {report_title} - {datetime.now().strftime('%d.%m.%Y')}",
-                        html_content=html_content,
-                    )
-                    
-                    if success:
-                        channels_sent.append("email")
-                except Exception as e:
-                    print(f"E-posta gönderim hatası: {e}")
-            
-            # WhatsApp gönder
-            if "whatsapp" in report.channels and report.whatsapp_to:
-                try:
-                    message = f"""📊 *{report_title}*
+
+            success = send_report_email(
+                to_email=report.email_to,
+                subject=f"📊 {report_title} - {datetime.now().strftime('%d.%m.%Y')}",
+                html_content=html_content,
+            )
+
+            if success:
+                channels_sent.append("email")
+        except Exception as e:
+            print(f"E-posta gönderim hatası: {e}")
+
+    # WhatsApp gönder
+    if "whatsapp" in report.channels and report.whatsapp_to:
+        try:
+            message = f"""📊 *{report_title}*
 
 📅 {datetime.now().strftime('%d.%m.%Y %H:%M')}
 📈 Kampanya Sayısı: {summary_data['campaign_count']}
@@ -448,94 +509,254 @@ async def _generate_scheduled_report(report_id: str):
 📊 Ort. CTR: %{summary_data['avg_ctr']:.2f}
 
 _Detaylı rapor için dashboard'u ziyaret edin._"""
-                    
-                    await whatsapp_service.send_message(
-                        to_phone=report.whatsapp_to,
-                        body=message
-                    )
-                    channels_sent.append("whatsapp")
-                except Exception as e:
-                    print(f"WhatsApp gönderim hatası: {e}")
-            
-            # Log'u güncelle
-            log.status = "success"
-            log.completed_at = datetime.utcnow()
-            log.summary_data = summary_data
-            log.ai_analysis = ai_analysis
-            log.channels_sent = channels_sent
-            
-            # Raporun sonraki çalışma zamanını güncelle
-            report.last_run_at = datetime.utcnow()
-            report.run_count += 1
-            
-            # Bir sonraki çalışma zamanını hesapla
-            from app.routers.scheduled_reports import calculate_next_run
-            report.next_run_at = calculate_next_run(
-                frequency=report.frequency,
-                day_of_week=report.day_of_week,
-                day_of_month=report.day_of_month,
-                hour=report.hour,
-                minute=report.minute,
-            )
-            
-            await session.commit()
-            
-            return {
-                "status": "success",
-                "channels_sent": channels_sent,
-                "summary": summary_data,
-            }
-            
+
+            await whatsapp_service.send_text_message(to_phone=report.whatsapp_to, message=message)
+            channels_sent.append("whatsapp")
         except Exception as e:
-            log.status = "failed"
-            log.completed_at = datetime.utcnow()
-            log.error_message = str(e)
+            print(f"WhatsApp gönderim hatası: {e}")
+
+    return channels_sent
+
+
+async def _claim_report_run(session, report: ScheduledReport, run_key: Optional[str]) -> Optional[ScheduledReportLog]:
+    """Çalışma için log kaydı açar; run_key daha önce kullanıldıysa None döner (commit çağırana ait)."""
+    log = ScheduledReportLog(
+        id=str(uuid4()),
+        scheduled_report_id=report.id,
+        status="running",
+        run_key=run_key,
+    )
+    try:
+        # run_key benzersiz; savepoint sayesinde gruptaki diğer raporların kayıtları etkilenmez
+        async with session.begin_nested():
+            session.add(log)
+    except IntegrityError:
+        print(f"[Scheduled Reports] Çalışma zaten yapılmış, atlanıyor: {run_key}")
+        return None
+    return log
+
+
+def record_grouping_metrics(reports: int, meta_fetches_saved: int, ai_calls_saved: int) -> None:
+    """Gruplamanın kazandırdığı Meta/AI çağrılarını sayaçlara ekler (Redis yoksa atlanır)."""
+    from app.cache import get_redis_client
+
+    client = get_redis_client()
+    if not client:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.hincrby(SCHEDULED_METRICS_KEY, "groups", 1)
+        pipe.hincrby(SCHEDULED_METRICS_KEY, "reports", reports)
+        pipe.hincrby(SCHEDULED_METRICS_KEY, "meta_fetches_saved", meta_fetches_saved)
+        pipe.hincrby(SCHEDULED_METRICS_KEY, "ai_calls_saved", ai_calls_saved)
+        pipe.execute()
+    except Exception as e:
+        print(f"[Scheduled Reports] Metrik yazılamadı: {e}")
+
+
+def get_grouping_metrics() -> dict:
+    """Gruplama sayaçlarını döner."""
+    from app.cache import get_redis_client
+
+    fields = ("groups", "reports", "meta_fetches_saved", "ai_calls_saved")
+    client = get_redis_client()
+    raw = {}
+    if client:
+        try:
+            raw = client.hgetall(SCHEDULED_METRICS_KEY) or {}
+        except Exception as e:
+            print(f"[Scheduled Reports] Metrik okunamadı: {e}")
+    values = {(k.decode() if isinstance(k, bytes) else k): int(v) for k, v in raw.items()}
+    return {field: values.get(field, 0) for field in fields}
+
+
+async def _generate_scheduled_report_group(items: list, session_factory=None) -> dict:
+    """
+    Aynı (hesap, gün, rapor tipi) grubundaki raporları tek veri setiyle çalıştırır.
+
+    items: [[report_id, run_key], ...]. Meta verisi ve AI analizi grup için bir kez hesaplanır,
+    ardından her rapor kendi alıcılarına gönderilir ve kendi log kaydını alır. run_key'i daha önce
+    kullanılmış raporlar atlanır; run_key None ise manuel çalıştırmadır ve next_run_at yeniden hesaplanır.
+    """
+    session_factory = session_factory or async_session_factory
+    if not session_factory:
+        raise RuntimeError("Veritabanı yapılandırılmamış")
+
+    run_keys = {report_id: run_key for report_id, run_key in items}
+
+    async with session_factory() as session:
+        result = await session.execute(
+            select(ScheduledReport).where(ScheduledReport.id.in_(list(run_keys)))
+        )
+        reports = [r for r in result.scalars().all() if r.is_active]
+        if not reports:
+            raise ValueError("Zamanlanmış rapor bulunamadı veya pasif durumda")
+
+        claimed = []
+        for report in reports:
+            log = await _claim_report_run(session, report, run_keys[report.id])
+            if log is not None:
+                claimed.append((report, log))
+        await session.commit()
+
+        if not claimed:
+            return {"status": "skipped", "run_keys": list(run_keys.values())}
+
+        first = claimed[0][0]
+        try:
+            dataset = await _build_scheduled_dataset(first.ad_account_id, first.days, first.report_type)
+        except Exception as e:
+            for _, log in claimed:
+                log.status = "failed"
+                log.completed_at = datetime.utcnow()
+                log.error_message = str(e)
             await session.commit()
             raise
 
+        ai_used = dataset["ai_analysis"] is not None
+        results = {}
+        for report, log in claimed:
+            try:
+                channels_sent = await _deliver_scheduled_report(report, dataset)
+                log.status = "success"
+                log.summary_data = dataset["summary_data"]
+                log.ai_analysis = dataset["ai_analysis"]
+                log.ai_cache_key = dataset.get("ai_cache_key")
+                log.channels_sent = channels_sent
+                report.last_run_at = datetime.utcnow()
+                report.run_count += 1
+                # Planlı çalışmalarda next_run_at dispatcher tarafından zaten ilerletildi;
+                # manuel çalıştırmada (run_key yok) yeniden hesapla
+                if run_keys[report.id] is None:
+                    report.next_run_at = _next_run_for(report)
+                results[report.id] = channels_sent
+            except Exception as e:
+                log.status = "failed"
+                log.error_message = str(e)
+            log.completed_at = datetime.utcnow()
+
+        await session.commit()
+
+    saved = len(claimed) - 1
+    record_grouping_metrics(len(claimed), saved, saved if ai_used else 0)
+    return {
+        "status": "success",
+        "reports": len(claimed),
+        "delivered": results,
+        "summary": dataset["summary_data"],
+        "meta_fetches_saved": saved,
+        "ai_calls_saved": saved if ai_used else 0,
+    }
+
+
+async def _generate_scheduled_report(report_id: str, run_key: Optional[str] = None):
+    """
+    Zamanlanmış raporu oluştur ve gönder.
+    run_key: Dispatcher'ın idempotency anahtarı; aynı anahtarla ikinci çalışma atlanır.
+    """
+    result = await _generate_scheduled_report_group([[report_id, run_key]])
+    if result["status"] != "success":
+        return {"status": result["status"], "run_key": run_key}
+    return {
+        "status": "success",
+        "channels_sent": result["delivered"].get(report_id, []),
+        "summary": result["summary"],
+    }
+
 
 @app.task(name="app.tasks.generate_scheduled_report_task")
-def generate_scheduled_report_task(report_id: str):
+def generate_scheduled_report_task(report_id: str, run_key: Optional[str] = None):
     """Tek bir zamanlanmış raporu çalıştır."""
     try:
-        result = asyncio.run(_generate_scheduled_report(report_id))
+        result = asyncio.run(_closing_ai_clients(_generate_scheduled_report(report_id, run_key=run_key)))
         return result
     except Exception as e:
         return {"status": "error", "error": str(e)}
 
 
-async def _check_due_scheduled_reports():
-    """Vadesi gelen zamanlanmış raporları bul ve çalıştır."""
-    if not async_session_factory:
-        return
-    
-    async with async_session_factory() as session:
-        from sqlalchemy import select, and_
-        
+@app.task(name="app.tasks.generate_scheduled_report_group_task")
+def generate_scheduled_report_group_task(items: list):
+    """Aynı veri setini paylaşan zamanlanmış raporları birlikte çalıştır."""
+    try:
+        return asyncio.run(_closing_ai_clients(_generate_scheduled_report_group(items)))
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
+
+# Tek dispatcher turunda kilitlenecek en fazla rapor
+SCHEDULED_CLAIM_LIMIT = 500
+
+
+def _next_run_for(report: ScheduledReport) -> datetime:
+    from app.routers.scheduled_reports import calculate_next_run
+
+    return calculate_next_run(
+        frequency=report.frequency,
+        day_of_week=report.day_of_week,
+        day_of_month=report.day_of_month,
+        hour=report.hour,
+        minute=report.minute,
+    )
+
+
+def scheduled_run_key(report_id: str, due_at: datetime) -> str:
+    """Planlı çalışmanın idempotency anahtarı: rapor id + planlanan zaman (dakika hassasiyeti)."""
+    return f"{report_id}:{due_at.strftime('%Y%m%dT%H%M')}"
+
+
+async def _check_due_scheduled_reports(session_factory=None) -> list[str]:
+    """
+    Vadesi gelen zamanlanmış raporları kilitleyerek alır ve gruplar halinde kuyruğa ekler.
+
+    Satırlar FOR UPDATE SKIP LOCKED ile alınır ve next_run_at aynı transaction'da ilerletilir;
+    paralel çalışan beat/worker'lar aynı raporu alamaz, yavaş bir rapor sonraki turda tekrar
+    kuyruğa girmez. Aynı (hesap, gün, rapor tipi) raporları tek task'ta toplanır; veri ve AI
+    analizi grup başına bir kez hesaplanır. Task'lar commit'ten önce run_key'lerle kuyruğa alınır:
+    commit başarısız olursa sonraki tur aynı anahtarlarla tekrar dener ve her rapor yine yalnızca
+    bir kez çalışır.
+    """
+    session_factory = session_factory or async_session_factory
+    if not session_factory:
+        return []
+
+    async with session_factory() as session:
         now = datetime.utcnow()
-        
-        # Vadesi gelen aktif raporları bul
-        stmt = select(ScheduledReport).where(
-            and_(
-                ScheduledReport.is_active == True,
-                ScheduledReport.next_run_at <= now
-            )
+
+        # Vadesi gelen aktif raporları kilitle (ix_scheduled_reports_active_next_run)
+        stmt = (
+            select(ScheduledReport)
+            .where(ScheduledReport.is_active == True, ScheduledReport.next_run_at <= now)
+            .order_by(ScheduledReport.next_run_at)
+            .limit(SCHEDULED_CLAIM_LIMIT)
+            .with_for_update(skip_locked=True)
         )
-        result = await session.execute(stmt)
-        due_reports = result.scalars().all()
-        
+        due_reports = (await session.execute(stmt)).scalars().all()
+
         if not due_reports:
-            return
-        
-        print(f"[Scheduled Reports] {len(due_reports)} rapor çalıştırılıyor...")
-        
+            return []
+
+        groups: dict[tuple, list[ScheduledReport]] = {}
         for report in due_reports:
+            groups.setdefault(scheduled_group_key(report), []).append(report)
+
+        print(f"[Scheduled Reports] {len(due_reports)} rapor {len(groups)} grupta çalıştırılıyor...")
+
+        run_keys = []
+        for group in groups.values():
+            items = [[report.id, scheduled_run_key(report.id, report.next_run_at)] for report in group]
             try:
-                # Celery task olarak gönder (asenkron)
-                generate_scheduled_report_task.delay(report.id)
-                print(f"[Scheduled Reports] Rapor kuyruğa eklendi: {report.name}")
+                generate_scheduled_report_group_task.apply_async(args=[items], task_id=items[0][1])
             except Exception as e:
-                print(f"[Scheduled Reports] Rapor gönderim hatası ({report.name}): {e}")
+                # next_run_at ilerletilmez; gruptaki raporlar sonraki turda tekrar denenir
+                print(f"[Scheduled Reports] Rapor grubu gönderim hatası ({group[0].name}): {e}")
+                continue
+            for report in group:
+                report.next_run_at = _next_run_for(report)
+            run_keys.extend(run_key for _, run_key in items)
+            print(f"[Scheduled Reports] {len(group)} rapor kuyruğa eklendi: {', '.join(r.name for r in group)}")
+
+        await session.commit()
+        return run_keys
 
 
 @app.task(name="app.tasks.check_scheduled_reports_task")
@@ -545,16 +766,22 @@ def check_scheduled_reports_task():
     Celery Beat schedule ile 60 saniyede bir çalıştırılır.
     """
     try:
-        asyncio.run(_check_due_scheduled_reports())
-        return {"status": "success"}
+        run_keys = asyncio.run(_check_due_scheduled_reports())
+        return {"status": "success", "enqueued": len(run_keys)}
     except Exception as e:
         print(f"Scheduled reports check hatası: {e}")
         return {"status": "error", "error": str(e)}
 
 
-async def _run_analyze(report_id: str, job_id: str) -> tuple[str, Optional[str]]:
-    """Kayıtlı raporu AI ile analiz eder; (sonuç_metni, pdf_yolu) döner."""
-    from app.services.ai_service import analyze_report_data
+async def _run_analyze(report_id: str, job_id: str) -> tuple[str, Optional[str], Optional[str]]:
+    """Kayıtlı raporu AI ile analiz eder; (sonuç_metni, pdf_yolu, ai_önbellek_anahtarı) döner.
+
+    Tüm şablon verileri önce çekilir; aynı veriyle daha önce tamamlanmış bir analiz işi varsa
+    (JobStatus.result_text) AI çağrısı yapılmadan o sonuç kullanılır.
+    """
+    from app.ai_cache import get_cached_analysis, is_cacheable, store_analysis
+    from app.analysis_lessons import extract_job_lessons, replace_job_lessons, template_titles
+    from app.services.ai_service import analyze_report_data, report_job_cache_key
 
     if not async_session_factory:
         raise RuntimeError("Veritabanı yapılandırılmamış")
@@ -568,15 +795,19 @@ async def _run_analyze(report_id: str, job_id: str) -> tuple[str, Optional[str]]
         days = saved.get("days", 30)
         account_id = saved.get("ad_account_id")
         report_name = saved.get("name", "Rapor")
-        parts = []
+        # Her bölüm (başlık, satırlar, sütunlar) ya da hazır metin
+        sections: list = []
         total_rows = 0
+        # Meta/AI hatası içeren sonuçlar önbellek kaydı olarak kullanılmaz
+        complete = True
 
         def update_progress(progress: int):
-            update_job_sync(job_id, progress=progress)
+            # İlerleme Redis'e yayınlanır; DB'ye yalnızca durum geçişleri yazılır
+            report_job_progress(job_id, progress)
 
         for i, tid in enumerate(tids):
-            p = 5 + int((i + 1) / len(tids) * 90)
-            await asyncio.get_event_loop().run_in_executor(None, lambda p=p: update_progress(p))
+            p = 5 + int((i + 1) / len(tids) * 45)
+            update_progress(p)
             if i > 0:
                 await asyncio.sleep(2)
             template = next((t for t in REPORT_TEMPLATES if t["id"] == tid), {})
@@ -590,25 +821,55 @@ async def _run_analyze(report_id: str, job_id: str) -> tuple[str, Optional[str]]
                     try:
                         rows = await get_report_data_for_template(tid, days, account_id, meta_service)
                     except MetaAPIError:
-                        parts.append(f"## {title}\n\nMeta API istek limiti. Tekrar deneyin.")
+                        complete = False
+                        sections.append(f"## {title}\n\nMeta API istek limiti. Tekrar deneyin.")
                         continue
                 else:
-                    parts.append(f"## {title}\n\nMeta API hatası: {err_msg}")
+                    complete = False
+                    sections.append(f"## {title}\n\nMeta API hatası: {err_msg}")
                     continue
             columns = get_template_csv_columns(tid)
             if not rows:
-                parts.append(f"## {title}\n\nVeri bulunamadı.")
+                sections.append(f"## {title}\n\nVeri bulunamadı.")
                 continue
             total_rows += len(rows)
-            try:
-                analysis = await analyze_report_data(report_name, title, rows, columns or [])
-                parts.append(f"## {title}\n\n{analysis}")
-            except Exception as ae:
-                parts.append(f"## {title}\n\nAnaliz atlandı: {ae!s}")
-        await asyncio.get_event_loop().run_in_executor(None, lambda: update_progress(95))
+            sections.append((title, rows, columns or []))
+
+        ai_cache_key = report_job_cache_key(report_name, sections)
+        result_text = await get_cached_analysis(ai_cache_key)
+        if result_text is None:
+            parts = []
+            for j, section in enumerate(sections):
+                update_progress(50 + int((j + 1) / len(sections) * 45))
+                if isinstance(section, str):
+                    parts.append(section)
+                    continue
+                title, rows, columns = section
+                try:
+                    analysis = await analyze_report_data(report_name, title, rows, columns)
+                    complete = complete and is_cacheable(analysis)
+                    parts.append(f"## {title}\n\n{analysis}")
+                except Exception as ae:
+                    complete = False
+                    parts.append(f"## {title}\n\nAnaliz atlandı: {ae!s}")
+            result_text = "\n\n---\n\n".join(parts)
+            if complete:
+                # Kalıcı kopya JobStatus.result_text'tir; burada yalnızca Redis'e yazılır
+                await store_analysis(ai_cache_key, result_text, kind="report_job", provider="", model="", persist=False)
+            else:
+                ai_cache_key = None
+        update_progress(95)
+
+        # Dersler bir kez burada çıkarılır; stratejist özeti analysis_lessons tablosundan okur
+        try:
+            lessons = extract_job_lessons(result_text, template_titles(tids))
+            await replace_job_lessons(session, job_id, account_id, lessons)
+            await session.commit()
+        except Exception as lesson_err:
+            await session.rollback()
+            print(f"Analiz dersleri kaydedilemedi: {lesson_err}")
         
         # PDF oluştur
-        result_text = "\n\n---\n\n".join(parts)
         pdf_path = None
         try:
             directory = get_reports_csv_dir()
@@ -616,15 +877,15 @@ async def _run_analyze(report_id: str, job_id: str) -> tuple[str, Optional[str]]
             date_suffix = datetime.now().strftime("%Y%m%d_%H%M%S")
             pdf_file = directory / f"{safe_name}_analiz_{date_suffix}.pdf"
             
-            pdf_result = generate_analysis_pdf(result_text, report_name, pdf_file)
+            pdf_result = await render_analysis_pdf(result_text, report_name, pdf_file)
             if pdf_result:
                 pdf_path = str(pdf_result)
         except Exception as pdf_err:
             # PDF oluşturma hatası analizi engellemesin
             print(f"PDF oluşturma hatası: {pdf_err}")
         
-        await asyncio.get_event_loop().run_in_executor(None, lambda: update_progress(100))
-        return result_text, pdf_path
+        update_progress(100)
+        return result_text, pdf_path, ai_cache_key
 
 
 @app.task(bind=True, name="app.tasks.analyze_report")
@@ -632,13 +893,14 @@ def analyze_report_task(self, report_id: str, job_id: str) -> None:
     """Kayıtlı raporu AI ile analiz eder; sonucu job result_text'e ve PDF'e yazar."""
     update_job_sync(job_id, status="running", progress=0)
     try:
-        result_text, pdf_path = asyncio.run(_run_analyze(report_id, job_id))
+        result_text, pdf_path, ai_cache_key = asyncio.run(_closing_ai_clients(_run_analyze(report_id, job_id)))
         update_job_sync(
             job_id,
             status="completed",
             progress=100,
             result_text=result_text,
             pdf_path=pdf_path,
+            ai_cache_key=ai_cache_key,
         )
     except MetaAPIError as e:
         update_job_sync(
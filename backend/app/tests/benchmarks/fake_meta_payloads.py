@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""Benchmark'lar için sahte Meta liste yanıtları."""
+
+import random
+
+
+def ads_payload(n: int, seed: int = 3) -> dict:
+    """MetaAdsService.get_ads biçiminde reklamlar (Meta alanları + _parse_insight metrikleri)."""
+    rnd = random.Random(seed)
+    ads = []
+    for i in range(n):
+        ads.append({
+            "id": str(120200000000000 + i),
+            "name": f"Reklam {i} - Kış kampanyası / Görsel {i % 7}",
+            "status": rnd.choice(("ACTIVE", "PAUSED")),
+            "creative": {"id": str(1202000 + i)},
+            "adset_id": str(1201000 + i // 10),
+            "campaign_id": str(1200000 + i // 100),
+            "impressions": rnd.randint(0, 200_000),
+            "clicks": rnd.randint(0, 5_000),
+            "spend": round(rnd.uniform(0, 5_000), 2),
+            "ctr": round(rnd.uniform(0, 5), 4),
+            "cpc": round(rnd.uniform(0.1, 9), 4),
+            "cpm": round(rnd.uniform(5, 90), 4),
+            "reach": rnd.randint(0, 150_000),
+            "frequency": round(rnd.uniform(1, 4), 4),
+            "conversions": rnd.randint(0, 300),
+            "conversion_value": round(rnd.uniform(0, 20_000), 2),
+            "roas": round(rnd.uniform(0, 12), 4),
+        })
+    return {"data": ads, "count": n}
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: first dashboard screen from a large ad list — full list vs. server-side sorted page.
+
+Run with: pytest -m slow app/tests/benchmarks -s
+"""
+
+import time
+
+import pytest
+
+from app.entity_snapshots import EntitySnapshot
+from app.http_cache import encode_json
+from app.tests.benchmarks.fake_meta_payloads import ads_payload
+
+N_ADS = 10_000
+FIELDS = "name,status,spend,impressions,clicks,ctr"
+
+
+@pytest.mark.slow
+def test_entity_pagination_benchmark():
+    payload = ads_payload(N_ADS)
+    full_body = encode_json(payload)
+
+    # Önceki: tüm liste gönderilir, istemci sıralayıp ilk 50'yi gösterir
+    started = time.perf_counter()
+    encode_json(payload)
+    first_screen = sorted(payload["data"], key=lambda ad: ad["spend"], reverse=True)[:50]
+    full_time = time.perf_counter() - started
+
+    snapshot = EntitySnapshot(payload["data"], '"x"', 0)
+    started = time.perf_counter()
+    page = snapshot.page(limit=50, sort="-spend", fields=FIELDS)
+    cold_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    page = snapshot.page(limit=50, sort="-spend", fields=FIELDS)
+    page_body = encode_json(page)
+    warm_time = time.perf_counter() - started
+
+    assert [ad["id"] for ad in page["data"]] == [ad["id"] for ad in first_screen]
+    print(
+        f"\n{N_ADS} reklam: tam liste {len(full_body) / 1024:.0f} KB / {full_time * 1000:.1f} ms, "
+        f"sayfa {len(page_body) / 1024:.1f} KB / ilk sıralama {cold_time * 1000:.1f} ms, "
+        f"sonraki istekler {warm_time * 1000:.2f} ms"
+    )
+    assert len(page_body) * 20 < len(full_body)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: per-response JSON cost for campaign/ad lists of growing size.
+
+Compares the previous path (pickle cache hit + jsonable_encoder + stdlib json, as FastAPI's
+JSONResponse does), orjson encoding, and the pre-serialised cache hit that sends stored bytes.
+
+Run with: pytest -m slow app/tests/benchmarks -s
+"""
+
+import json
+import pickle
+import time
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from app.http_cache import encode_json, etag_for
+from app.tests.benchmarks.fake_meta_payloads import ads_payload
+
+SIZES = (100, 1_000, 10_000)
+
+
+def _previous_response(cached: bytes) -> bytes:
+    """Önceki yol: pickle'lı önbellekten liste çözülür, jsonable_encoder + json.dumps ile kodlanır."""
+    payload = pickle.loads(cached)
+    return json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _timed(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+@pytest.mark.slow
+def test_json_serialization_benchmark():
+    lines = []
+    for n in SIZES:
+        payload = ads_payload(n)
+        pickled = pickle.dumps(payload)
+        body = encode_json(payload)
+        stored = etag_for(body).encode("ascii") + b"\n" + body
+        assert json.loads(_previous_response(pickled)) == json.loads(body)
+
+        repeat = max(3, 20_000 // n)
+        previous = _timed(lambda: _previous_response(pickled), repeat)
+        orjson_only = _timed(lambda: encode_json(pickle.loads(pickled)), repeat)
+        hit = _timed(lambda: stored.partition(b"\n"), repeat)
+        lines.append(
+            f"{n:>6} reklam ({len(body) / 1024:7.0f} KB): önceki {previous * 1000:8.2f} ms, "
+            f"orjson {orjson_only * 1000:7.2f} ms, hazır bayt {hit * 1000:6.3f} ms "
+            f"({previous / orjson_only:.1f}x / {previous / hit:.0f}x)"
+        )
+    print("\n" + "\n".join(lines))
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: markdown → ReportLab flowables on 50 KB of AI analysis markdown.
+
+Compares the single-pass compiler with the previous line-by-line converter (kept here as
+reference) and checks that table markup becomes Table flowables.
+Run with: pytest -m slow app/tests/benchmarks -s
+"""
+
+import re
+import time
+
+import pytest
+from reportlab.lib import colors
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, Table, TableStyle
+
+from app import pdf_generator
+
+TARGET_BYTES = 50 * 1024
+
+
+def _markdown(target: int = TARGET_BYTES) -> str:
+    blocks = []
+    i = 0
+    while sum(len(b) + 1 for b in blocks) < target:
+        blocks += [
+            f"## Şablon {i}: Platform ve yerleşim kırılımı",
+            "Bu dönemde **harcama** %12 arttı; *tıklama başına maliyet* düşerken `ROAS` sabit kaldı.",
+            "| Kampanya | Harcama | CTR | ROAS |",
+            "|---|---:|---:|---:|",
+            *[f"| Kampanya {j} | ₺{100 + j * 7:.2f} | %{1 + j / 10:.2f} | {2 + j / 5:.1f}x |" for j in range(8)],
+            "### Öneriler",
+            *[f"- **Adım {j}**: bütçeyi en iyi reklam setine kaydırın" for j in range(5)],
+            "  - alt madde: frekansı 3'ün altında tutun",
+            "1. Kreatifleri yenileyin",
+            "---",
+        ]
+        i += 1
+    return "\n".join(blocks)
+
+
+def _previous_converter(text: str, styles) -> list:
+    """Önceki _markdown_to_pdf_elements (satır başına tekrarlanan kontroller ve re.sub)."""
+    safe = pdf_generator._safe
+    elements = []
+    for raw in text.split('\n'):
+        line = raw.strip()
+        if not line:
+            continue
+        if line.startswith('# '):
+            elements.append(Paragraph(safe(line[2:]), styles['Heading1']))
+        elif line.startswith('## '):
+            elements.append(Paragraph(safe(line[3:]), styles['Heading2']))
+        elif line.startswith('### '):
+            elements.append(Paragraph(safe(line[4:]), styles['Heading3']))
+        elif line.startswith('#### '):
+            elements.append(Paragraph(safe(line[5:]), styles['Heading3']))
+        elif line.startswith('**') and line.endswith('**'):
+            elements.append(Paragraph(f"<b>{safe(line.replace('**', ''))}</b>", styles['Normal']))
+        elif line.startswith('* ') or line.startswith('- '):
+            content = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', safe(line[2:]))
+            elements.append(Paragraph(f"• {content}", styles['Bullet']))
+        elif line == '---':
+            line_table = Table([['']], colWidths=[16 * cm])
+            line_table.setStyle(TableStyle([
+                ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.HexColor('#e5e7eb')),
+                ('TOPPADDING', (0, 0), (-1, 0), 6),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+            ]))
+            elements.append(line_table)
+        else:
+            safe_line = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', safe(line))
+            elements.append(Paragraph(safe_line, styles['Normal']))
+    return elements
+
+
+def _best_of(fn, runs: int = 5) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+@pytest.mark.slow
+def test_markdown_conversion_benchmark(tmp_path):
+    text = _markdown()
+    styles = pdf_generator._styles()
+    assert len(text.encode("utf-8")) >= TARGET_BYTES
+
+    previous = _best_of(lambda: _previous_converter(text, styles))
+    compiled = _best_of(lambda: pdf_generator._markdown_to_pdf_elements(text, styles))
+
+    old_elements = _previous_converter(text, styles)
+    new_elements = pdf_generator._markdown_to_pdf_elements(text, styles)
+    data_tables = [e for e in new_elements if isinstance(e, Table) and len(e._cellvalues) > 1]
+    table_sections = text.count("|---|")
+    assert len(data_tables) == table_sections
+    # Önceki dönüştürücü tablo satırlarını düz paragraf olarak basıyordu
+    assert sum(isinstance(e, Paragraph) and e.text.startswith("|") for e in old_elements) > 0
+
+    started = time.perf_counter()
+    assert pdf_generator.generate_analysis_pdf(text, "Benchmark", tmp_path / "bench.pdf")
+    build = time.perf_counter() - started
+
+    print(
+        f"\n{len(text.encode('utf-8')) / 1024:.0f} KB markdown: önceki {previous * 1000:.1f} ms "
+        f"({len(old_elements)} element), tek geçiş {compiled * 1000:.1f} ms ({len(new_elements)} element, "
+        f"{len(data_tables)} tablo); tam PDF {build:.2f} s"
+    )
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: 20-page analysis PDF with per-call font/style setup vs. cached.
+
+Run with: pytest -m slow app/tests/benchmarks -s
+"""
+
+import re
+import time
+
+import pytest
+
+from app import pdf_generator
+
+
+def _analysis_text(pages: int = 20) -> str:
+    sections = []
+    for i in range(pages):
+        sections.append(f"## Şablon {i + 1}: Yaş ve cinsiyet kırılımı")
+        sections.append("### Özet")
+        sections.append(
+            "Bu dönemde **harcama** %12 arttı; tıklama başına maliyet düşerken dönüşüm oranı sabit kaldı. "
+            * 5
+        )
+        for j in range(30):
+            sections.append(f"- **Kampanya {j}**: CTR %{1 + j / 10:.2f}, CPC ₺{2 + j / 7:.2f}, ROAS {3 + j / 5:.1f}x")
+        sections.append("### Öneriler")
+        for j in range(6):
+            sections.append(f"* Bütçeyi en iyi performans gösteren reklam setine kaydırın ({j}).")
+        sections.append("---")
+    return "\n".join(sections)
+
+
+def _cold_render(text, name, path):
+    """Önceki davranış: her çağrıda font kaydı ve stil sayfası yeniden oluşturulur."""
+    pdf_generator._register_fonts.cache_clear()
+    pdf_generator._styles.cache_clear()
+    return pdf_generator.generate_analysis_pdf(text, name, path)
+
+
+@pytest.mark.slow
+def test_pdf_render_benchmark(tmp_path):
+    text = _analysis_text()
+    out = tmp_path / "warmup.pdf"
+    assert pdf_generator.generate_analysis_pdf(text, "Isınma", out)
+    pages = len(re.findall(rb"/Type /Page\b(?!s)", out.read_bytes()))
+    assert pages >= 20
+
+    runs = 5
+    started = time.perf_counter()
+    for i in range(runs):
+        _cold_render(text, "Soğuk", tmp_path / f"cold_{i}.pdf")
+    cold = (time.perf_counter() - started) / runs
+
+    started = time.perf_counter()
+    for i in range(runs):
+        pdf_generator.generate_analysis_pdf(text, "Sıcak", tmp_path / f"warm_{i}.pdf")
+    warm = (time.perf_counter() - started) / runs
+
+    print(f"\n{pages} sayfa: soğuk {cold * 1000:.0f} ms, önbellekli {warm * 1000:.0f} ms / PDF")
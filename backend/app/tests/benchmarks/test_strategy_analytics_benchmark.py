@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: columnar strategy analytics vs. the previous DictReader + per-cell float() loop.
+
+Run with: pytest -m slow app/tests/benchmarks -s
+"""
+
+import csv
+import io
+import random
+import time
+
+import pytest
+
+from app.services import strategy_service
+
+N_ROWS = 100_000
+
+
+def _export(n_rows: int = N_ROWS, seed: int = 7) -> str:
+    rnd = random.Random(seed)
+    lines = ["campaign_name,platform,age,gender,spend,clicks,impressions,ctr,cpc,reach,frequency"]
+    for i in range(n_rows):
+        clicks = rnd.choice((0, rnd.randint(1, 80)))
+        impressions = rnd.randint(0, 20000)
+        lines.append(
+            f"Kampanya {i % 300},{rnd.choice(('facebook', 'instagram', 'audience_network', 'messenger'))},"
+            f"{rnd.choice(('18-24', '25-34', '35-44', '45-54', '55-64', '65+'))},"
+            f"{rnd.choice(('male', 'female', 'unknown'))},{rnd.uniform(0, 500):.2f},{clicks},{impressions},"
+            f"{rnd.uniform(0, 6):.3f},{rnd.uniform(0.1, 4) if clicks else 0:.3f},{impressions // 2},{rnd.uniform(1, 3):.2f}"
+        )
+    return "\n".join(lines)
+
+
+def _previous_parse(csv_content: str) -> list[dict]:
+    """Önceki parse_csv_data: tüm içerik DictReader ile dict listesine çevrilir."""
+    dialect = csv.Sniffer().sniff(csv_content[:1024])
+    return list(csv.DictReader(io.StringIO(csv_content), dialect=dialect))
+
+
+def _previous_analyze(rows: list[dict]) -> dict:
+    """Önceki analyze_performance_data'nın çekirdeği: hücre başına try float(), satır başına dict güncellemesi."""
+    processed_rows = []
+    for row in rows:
+        processed = {}
+        for k, v in row.items():
+            key = k.lower().strip()
+            try:
+                processed[key] = float(v) if v else 0
+            except (ValueError, TypeError):
+                processed[key] = v
+        processed_rows.append(processed)
+
+    best_ctr, lowest_cpc = 0, float("inf")
+    segments = {"platform": {}, "age": {}, "gender": {}}
+    for row in processed_rows:
+        ctr = row.get("ctr", 0) or 0
+        cpc = row.get("cpc", float("inf")) or float("inf")
+        spend, clicks, impressions = row.get("spend", 0) or 0, row.get("clicks", 0) or 0, row.get("impressions", 0) or 0
+        if ctr > best_ctr and impressions > 100:
+            best_ctr = ctr
+        if cpc < lowest_cpc and clicks > 0 and cpc > 0:
+            lowest_cpc = cpc
+        for column, stats in segments.items():
+            key = row.get(column, "unknown")
+            if key and key != "unknown":
+                s = stats.setdefault(key, {"spend": 0, "clicks": 0, "impressions": 0, "ctr_sum": 0, "count": 0})
+                s["spend"] += spend
+                s["clicks"] += clicks
+                s["impressions"] += impressions
+                s["ctr_sum"] += ctr
+                s["count"] += 1
+    return {"best_ctr": best_ctr, "lowest_cpc": lowest_cpc, "segments": segments}
+
+
+@pytest.mark.slow
+def test_strategy_analytics_benchmark():
+    content = _export()
+
+    started = time.perf_counter()
+    previous = _previous_analyze(_previous_parse(content))
+    previous_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    result = strategy_service.analyze_performance_frame(strategy_service.parse_csv_frame(content))
+    columnar_time = time.perf_counter() - started
+
+    assert result["best_ctr"]["value"] == pytest.approx(previous["best_ctr"])
+    assert result["lowest_cpc"]["value"] == pytest.approx(previous["lowest_cpc"])
+    for column in ("platform", "age", "gender"):
+        for key, stats in previous["segments"][column].items():
+            new = result[f"{column}_performance"][key]
+            assert new["count"] == stats["count"]
+            assert new["spend"] == pytest.approx(stats["spend"])
+
+    print(
+        f"\n{N_ROWS} satır ({len(content) / 1e6:.1f} MB): önceki {previous_time:.2f} s, "
+        f"sütunsal {columnar_time:.2f} s ({previous_time / columnar_time:.1f}x)"
+    )
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""Load test: acknowledge-then-process webhook pipeline vs. inline processing.
+
+Outbound channels are replaced by a local stand-in with a fixed latency; Redis is
+replaced by an in-memory stand-in. Run with: pytest -m slow app/tests/benchmarks -s
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import statistics
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app import webhook_events
+from app.routers import webhooks
+
+N_REQUESTS = 1000
+CONCURRENCY = 50
+REDELIVERY_EVERY = 5  # her 5. istek bir önceki gövdenin yeniden gönderimi
+CHANNEL_LATENCY = 0.005
+APP_SECRET = "load-test-secret"
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def set(self, key, value, nx=False, ex=None):
+        self.ops.append(key)
+
+    def execute(self):
+        results = []
+        for key in self.ops:
+            results.append(None if key in self.redis.seen else True)
+            self.redis.seen.add(key)
+        return results
+
+
+class FakeRedis:
+    """Alım stream'i (XADD) ve tekrar anahtarları (SET NX) için bellek içi stand-in."""
+
+    def __init__(self):
+        self.ingest = []
+        self.seen = set()
+
+    def xadd(self, name, fields, maxlen=None, approximate=True):
+        self.ingest.append(fields["body"])
+        return f"0-{len(self.ingest)}"
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+    def delete(self, *keys):
+        self.seen.difference_update(keys)
+
+
+class StandInChannels:
+    """Giden bildirim kanalları yerine sabit gecikmeli yerel stand-in."""
+
+    def __init__(self):
+        self.alerts = 0
+        self.reevaluations = 0
+
+    async def send_alert(self, session, object_type, object_id, changed_fields, event_data):
+        await asyncio.sleep(CHANNEL_LATENCY)
+        self.alerts += 1
+
+    def schedule(self, account_id, campaign_ids):
+        self.reevaluations += 1
+        return True
+
+
+def _bodies():
+    bodies = []
+    for i in range(N_REQUESTS):
+        if i % REDELIVERY_EVERY == REDELIVERY_EVERY - 1:
+            bodies.append(bodies[-1])
+            continue
+        bodies.append(json.dumps({
+            "object": "ads",
+            "entry": [{
+                "id": f"act_{i % 7}",
+                "time": 1_700_000_000 + i,
+                "changes": [{"field": "status", "value": {"campaign_id": str(i), "status": "PAUSED"}}],
+            }],
+        }).encode())
+    return bodies
+
+
+def _sign(body: bytes) -> str:
+    return "sha256=" + hmac.new(APP_SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+async def _fire(client: AsyncClient, bodies) -> list[float]:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+
+    async def _one(body):
+        async with semaphore:
+            t0 = time.perf_counter()
+            response = await client.post(
+                "/api/webhooks/meta", content=body, headers={"X-Hub-Signature-256": _sign(body)}
+            )
+            latencies.append(time.perf_counter() - t0)
+            assert response.status_code == 200
+
+    await asyncio.gather(*(_one(b) for b in bodies))
+    return latencies
+
+
+def _p95(values):
+    return statistics.quantiles(values, n=20)[-1]
+
+
+@pytest.mark.slow
+async def test_ack_then_process_under_load(monkeypatch):
+    channels = StandInChannels()
+    monkeypatch.setattr(webhooks, "_get_app_secret", lambda: APP_SECRET)
+    monkeypatch.setattr(webhooks, "_send_webhook_alert", channels.send_alert)
+    monkeypatch.setattr(webhooks, "schedule_reevaluation", channels.schedule)
+    monkeypatch.setattr(webhooks, "append_webhook_events", lambda events: True)
+
+    app = FastAPI()
+    app.include_router(webhooks.router)
+    bodies = _bodies()
+    unique = len(set(bodies))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        # 1) Ack-then-process: istek yalnızca imzayı doğrular ve gövdeyi kuyruğa ekler
+        fake = FakeRedis()
+        monkeypatch.setattr(webhook_events, "get_redis_client", lambda: fake)
+        ack_latencies = await _fire(client, bodies)
+        assert len(fake.ingest) == N_REQUESTS and channels.alerts == 0
+
+        # Arka plan tüketicisi: 100'lük batch'ler, yeniden gönderimler elenir
+        t0 = time.perf_counter()
+        for i in range(0, len(fake.ingest), 100):
+            await webhooks.process_webhook_payloads(fake.ingest[i:i + 100])
+        drain_seconds = time.perf_counter() - t0
+        assert channels.alerts == unique
+
+        # 2) Karşılaştırma: Redis yokken istek içinde işleme (önceki davranış)
+        channels.alerts = 0
+        monkeypatch.setattr(webhook_events, "get_redis_client", lambda: None)
+        inline_latencies = await _fire(client, bodies)
+        assert channels.alerts == N_REQUESTS  # tekrar eleme yok
+
+    print(
+        f"\n{N_REQUESTS} istek (eşzamanlılık {CONCURRENCY}, kanal gecikmesi {CHANNEL_LATENCY * 1000:.0f}ms): "
+        f"ack p95 {_p95(ack_latencies) * 1000:.2f}ms, inline p95 {_p95(inline_latencies) * 1000:.2f}ms; "
+        f"tüketici {unique} benzersiz olayı {drain_seconds:.2f}s içinde işledi "
+        f"({N_REQUESTS - unique} yeniden gönderim elendi)"
+    )
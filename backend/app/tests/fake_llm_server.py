@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""Yerel sahte LLM sağlayıcı sunucusu (çevrimdışı geliştirme ve testler için).
+
+Anthropic Messages (/v1/messages), Gemini REST (/v1beta/models/{model}:streamGenerateContent
+ve :generateContent) ve Ollama (/api/generate) uçlarını taklit eder; akışlı isteklerde yanıtı
+parça parça, her parça arasında FAKE_LLM_CHUNK_DELAY saniye bekleyerek gönderir.
+
+Çalıştırma:
+    python -m app.tests.fake_llm_server --port 8765
+
+Backend'i yönlendirmek için:
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765
+    GEMINI_BASE_URL=http://127.0.0.1:8765
+    OLLAMA_BASE_URL=http://127.0.0.1:8765
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import AsyncIterator, Iterator, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CHUNK_DELAY = float(os.getenv("FAKE_LLM_CHUNK_DELAY", "0.05"))
+# Testler için: verilirse akış ilk parçadan sonra bu olay set edilene (en fazla 30 sn) dek bekler
+FIRST_CHUNK_GATE: Optional[threading.Event] = None
+
+app = FastAPI(title="Fake LLM provider")
+
+
+def fake_completion(provider: str, prompt: str) -> list[str]:
+    """Sağlayıcıya ve prompt'a göre belirlenimci yanıt parçaları."""
+    return [
+        f"[{provider}] ",
+        "1. 📊 GENEL DEĞERLENDİRME\n",
+        f"Girdi {len(prompt)} karakter. ",
+        "2. 🎯 SOMUT ÖNERİLER\n",
+        "- Düşük CTR'li kreatifleri yenileyin.\n",
+    ]
+
+
+async def _paced(chunks: list[str]) -> AsyncIterator[str]:
+    for i, chunk in enumerate(chunks):
+        if CHUNK_DELAY:
+            await asyncio.sleep(CHUNK_DELAY)
+        yield chunk
+        gate = FIRST_CHUNK_GATE
+        if i == 0 and gate is not None:
+            await asyncio.get_running_loop().run_in_executor(None, gate.wait, 30)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/v1/messages")
+async def anthropic_messages(request: Request):
+    body = await request.json()
+    prompt = "".join(m.get("content", "") for m in body.get("messages", []) if isinstance(m.get("content"), str))
+    chunks = fake_completion("claude", prompt)
+    model = body.get("model", "fake-claude")
+    if not body.get("stream"):
+        return {
+            "id": "msg_fake", "type": "message", "role": "assistant", "model": model,
+            "content": [{"type": "text", "text": "".join(chunks)}],
+            "stop_reason": "end_turn", "stop_sequence": None,
+            "usage": {"input_tokens": len(prompt), "output_tokens": len(chunks)},
+        }
+
+    async def events():
+        yield _sse("message_start", {"type": "message_start", "message": {
+            "id": "msg_fake", "type": "message", "role": "assistant", "model": model, "content": [],
+            "stop_reason": None, "stop_sequence": None, "usage": {"input_tokens": len(prompt), "output_tokens": 0},
+        }})
+        yield _sse("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+        async for chunk in _paced(chunks):
+            yield _sse("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": chunk}})
+        yield _sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+        yield _sse("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": len(chunks)}})
+        yield _sse("message_stop", {"type": "message_stop"})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1beta/models/{model_action}")
+async def gemini_generate(model_action: str, request: Request):
+    body = await request.json()
+    prompt = "".join(
+        part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", [])
+    )
+    chunks = fake_completion("gemini", prompt)
+
+    def candidate(text: str) -> dict:
+        return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}]}
+
+    if not model_action.endswith(":streamGenerateContent"):
+        return candidate("".join(chunks))
+
+    async def events():
+        async for chunk in _paced(chunks):
+            yield f"data: {json.dumps(candidate(chunk), ensure_ascii=False)}\r\n\r\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/api/generate")
+async def ollama_generate(request: Request):
+    body = await request.json()
+    chunks = fake_completion("ollama", body.get("prompt", ""))
+    model = body.get("model", "fake-ollama")
+    if body.get("stream") is False:
+        return JSONResponse({"model": model, "response": "".join(chunks), "done": True})
+
+    async def lines():
+        async for chunk in _paced(chunks):
+            yield json.dumps({"model": model, "response": chunk, "done": False}, ensure_ascii=False) + "\n"
+        yield json.dumps({"model": model, "response": "", "done": True}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@contextmanager
+def run_in_thread(asgi_app=None, host: str = "127.0.0.1", port: int = 0) -> Iterator[str]:
+    """Sunucuyu (varsayılan: sahte sağlayıcı) arka plan thread'inde başlatır ve temel URL'yi verir."""
+    import uvicorn
+
+    config = uvicorn.Config(asgi_app or app, host=host, port=port, log_level="warning", lifespan="off")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline or not thread.is_alive():
+            raise RuntimeError("Test sunucusu başlatılamadı")
+        time.sleep(0.01)
+    bound_port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://{host}:{bound_port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
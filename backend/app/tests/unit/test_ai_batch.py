@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for batched multi-campaign AI analysis."""
+
+import re
+
+import pytest
+
+from app import ai_cache, config
+from app.services import ai_router, ai_service
+from app.services.meta_service import MetaAdsService
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+def _campaigns(n):
+    return [{"id": f"c{i}", "name": f"Kampanya {i}", "spend": 10.0 * i, "ctr": 1.1, "roas": 2.5} for i in range(n)]
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Prompt'taki kampanya satırları için "### [id]" bölümleri üreten sahte sağlayıcı."""
+    calls = []
+    skip = set()
+
+    async def fake_complete(provider, system, prompt, max_tokens=2000, images=()):
+        calls.append(prompt)
+        ids = re.findall(r"^(c\d+)\|", prompt, re.M)
+        return "\n\n".join(f"### [{cid}] Kampanya\nÖneri {cid}" for cid in ids if cid not in skip)
+
+    ai_router.reset_provider_stats()
+    monkeypatch.setattr(ai_cache, "get_redis_client", lambda redis=FakeRedis(): redis)
+    monkeypatch.setattr(ai_cache, "_get_session_factory", lambda session_factory=None: None)
+    monkeypatch.setattr(ai_service, "_ai_provider", lambda: "claude")
+    monkeypatch.setattr(ai_router, "configured_providers", lambda: ["claude"])
+    monkeypatch.setattr(ai_service, "_complete", fake_complete)
+    monkeypatch.setattr(config, "AI_CACHE_TTL_SECONDS", 3600)
+    return calls, skip
+
+
+async def test_campaigns_are_packed_into_few_calls_and_cached(llm):
+    calls, _ = llm
+    result = await ai_service.analyze_campaigns_batch(_campaigns(30))
+
+    per_call = ai_service.BATCH_MAX_OUTPUT_TOKENS // ai_service.BATCH_SECTION_TOKENS
+    assert result["usage"]["batch_sizes"] == [per_call, per_call, 30 - 2 * per_call]
+    assert result["usage"]["llm_calls"] == len(calls) == 3
+    assert [s["campaign_id"] for s in result["sections"]] == [f"c{i}" for i in range(30)]
+    assert result["sections"][5]["analysis"] == "Öneri c5"
+    assert result["usage"]["est_input_tokens"] > 0
+
+    again = await ai_service.analyze_campaigns_batch(_campaigns(30))
+    assert again["usage"]["cached"] == 30 and again["usage"]["llm_calls"] == 0
+    assert len(calls) == 3
+
+
+async def test_missing_sections_fall_back_to_rule_based(llm):
+    _, skip = llm
+    skip.add("c1")
+    result = await ai_service.analyze_campaigns_batch(_campaigns(3), use_cache=False)
+    sources = {s["campaign_id"]: s["source"] for s in result["sections"]}
+    assert sources == {"c0": "claude", "c1": "rule_based", "c2": "claude"}
+    assert result["usage"]["fallback_sections"] == 1
+
+
+async def test_get_campaigns_by_ids_uses_one_request_per_chunk(monkeypatch):
+    service = MetaAdsService()
+    requests = []
+
+    async def fake_get(endpoint, params=None):
+        ids = params["ids"].split(",")
+        requests.append(len(ids))
+        return {
+            cid: {"id": cid, "name": cid, "insights": {"data": [{"spend": "5", "impressions": "100", "clicks": "3"}]}}
+            for cid in ids if cid != "c7"
+        }
+
+    monkeypatch.setattr("app.services.meta_service._is_meta_configured", lambda account_id=None: True)
+    monkeypatch.setattr(service, "_get", fake_get)
+    campaigns = await service.get_campaigns_by_ids([f"c{i}" for i in range(120)], 30)
+
+    assert sorted(requests) == [20, 50, 50]
+    assert len(campaigns) == 119 and "c7" not in {c["id"] for c in campaigns}
+    assert campaigns[0]["spend"] == 5.0 and campaigns[0]["impressions"] == 100 and "insights" not in campaigns[0]
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the content-addressed AI analysis cache."""
+
+from decimal import Decimal
+
+from app import ai_cache
+from app.ai_cache import analysis_key, is_cacheable, normalize_payload
+from app.services import ai_router, ai_service
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+def test_key_ignores_dict_order_and_float_noise():
+    a = {"spend": 10.0000001, "name": " Yaz ", "ctr": Decimal("1.5")}
+    b = {"ctr": 1.5, "name": "Yaz", "spend": 10}
+    assert normalize_payload(a) == normalize_payload(b)
+    assert analysis_key("campaigns", "claude", "m1", "1", a) == analysis_key("campaigns", "claude", "m1", "1", b)
+    assert analysis_key("campaigns", "claude", "m1", "1", a) != analysis_key("campaigns", "claude", "m2", "1", a)
+    assert analysis_key("campaigns", "claude", "m1", "1", a) != analysis_key("campaigns", "claude", "m1", "2", a)
+
+
+def test_error_responses_are_not_cacheable():
+    assert is_cacheable("1. GENEL DEĞERLENDİRME")
+    assert not is_cacheable("Hata (Ollama): bağlantı reddedildi")
+    assert not is_cacheable("  ")
+
+
+class TestCachedAnalysis:
+    """Identical input hits the cache; refresh bypasses it and rewrites the entry."""
+
+    async def test_hit_and_bypass(self, monkeypatch):
+        redis = FakeRedis()
+        calls = []
+
+        async def fake_claude(provider, system, prompt, max_tokens=2000, images=()):
+            calls.append(provider)
+            return f"analiz {len(calls)}"
+
+        monkeypatch.setattr(ai_cache, "get_redis_client", lambda: redis)
+        monkeypatch.setattr(ai_cache, "_get_session_factory", lambda session_factory=None: None)
+        monkeypatch.setattr(ai_service, "_ai_provider", lambda: "claude")
+        monkeypatch.setattr(ai_service, "_get_claude_model", lambda: "claude-test")
+        monkeypatch.setattr(ai_service, "_complete", fake_claude)
+
+        campaigns = [{"id": "1", "name": "Yaz", "spend": 10.0, "ctr": 1.2, "extra": "yok sayılır"}]
+        first = await ai_service.analyze_campaigns(campaigns)
+        # Prompt'ta kullanılmayan alanlar anahtarı değiştirmez
+        second = await ai_service.analyze_campaigns([{**campaigns[0], "extra": "farklı"}])
+        refreshed = await ai_service.analyze_campaigns(campaigns, use_cache=False)
+        after_refresh = await ai_service.analyze_campaigns(campaigns)
+
+        assert first == second == "analiz 1"
+        assert refreshed == after_refresh == "analiz 2"
+        assert len(calls) == 2
+
+    async def test_failures_are_recomputed(self, monkeypatch):
+        redis = FakeRedis()
+        calls = []
+
+        async def failing_ollama(provider, system, prompt, max_tokens=2000, images=()):
+            calls.append(provider)
+            raise TimeoutError("zaman aşımı")
+
+        monkeypatch.setattr(ai_cache, "get_redis_client", lambda: redis)
+        monkeypatch.setattr(ai_cache, "_get_session_factory", lambda session_factory=None: None)
+        monkeypatch.setattr(ai_service, "_ai_provider", lambda: "ollama")
+        monkeypatch.setattr(ai_service, "_get_ollama_model", lambda: "llama-test")
+        monkeypatch.setattr(ai_service, "_complete", failing_ollama)
+
+        monkeypatch.setattr(ai_router, "configured_providers", lambda: [])
+
+        first = await ai_service.analyze_single_campaign({"id": "c1", "name": "Kış"})
+        await ai_service.analyze_single_campaign({"id": "c1", "name": "Kış"})
+
+        # Sağlayıcı başarısız: kural tabanlı yedek döner ama önbelleğe yazılmaz
+        assert first.startswith("Kampanya: Kış") and first.endswith(ai_service.FALLBACK_NOTE)
+        assert calls == ["ollama", "ollama"]
+        assert redis.data == {}
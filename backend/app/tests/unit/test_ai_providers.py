@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the shared async AI provider clients."""
+
+import asyncio
+
+import pytest
+
+from app import config
+from app.services import ai_providers, ai_service
+from app.tests import fake_llm_server
+from app.tests.fake_llm_server import fake_completion, run_in_thread
+
+
+@pytest.fixture(scope="module")
+def fake_server():
+    with run_in_thread() as base_url:
+        yield base_url
+
+
+@pytest.fixture
+def settings(monkeypatch, fake_server):
+    overrides = {
+        "ANTHROPIC_BASE_URL": fake_server, "GEMINI_BASE_URL": fake_server, "OLLAMA_BASE_URL": fake_server,
+        "ANTHROPIC_API_KEY": "test", "GEMINI_API_KEY": "test",
+    }
+    original = config.get_setting
+    monkeypatch.setattr(config, "get_setting", lambda key, default=None: overrides.get(key) or original(key, default))
+    monkeypatch.setattr(fake_llm_server, "CHUNK_DELAY", 0)
+    yield overrides
+
+
+@pytest.mark.parametrize("name", ["claude", "gemini", "ollama"])
+async def test_complete_reuses_one_client_per_loop(settings, name):
+    provider = ai_providers.get_provider(name)
+    texts = await asyncio.gather(*(provider.complete("m", "sistem", f"soru {i}") for i in range(3)))
+    assert ai_providers.get_provider(name) is provider
+    assert [t.strip() for t in texts] == ["".join(fake_completion(name, f"soru {i}")).strip() for i in range(3)]
+    await ai_providers.close_providers()
+
+
+async def test_changed_settings_rebuild_client(settings):
+    first = ai_providers.get_provider("gemini")
+    settings["GEMINI_API_KEY"] = "rotated"
+    second = ai_providers.get_provider("gemini")
+    assert second is not first and second.api_key == "rotated"
+    await ai_providers.close_providers()
+
+
+async def test_semaphore_and_timeout(settings, monkeypatch):
+    monkeypatch.setattr(config, "AI_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(fake_llm_server, "CHUNK_DELAY", 0.3)
+    provider = ai_providers.get_provider("ollama")
+    stream = provider.stream("m", "", "uzun")
+    first_chunk = await stream.__anext__()
+    assert first_chunk == "[ollama] "
+    # Akış semaforu tutarken ikinci istek sıraya girer ve zaman aşımına uğrar
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(provider.complete("m", "", "ikinci"), 0.2)
+    await stream.aclose()
+    assert await provider.complete("m", "", "üçüncü", timeout=5)
+    await ai_providers.close_providers()
+
+
+def test_provider_without_stream_fails_at_construction():
+    class CompleteOnly(ai_providers.AIProvider):
+        async def _complete(self, model, system, prompt, max_tokens, images) -> str:
+            return ""
+
+    with pytest.raises(TypeError):
+        CompleteOnly("key", None, 1, 1.0)
+
+
+async def test_report_analysis_falls_back_to_second_provider(settings, monkeypatch):
+    monkeypatch.setattr(config, "AI_CACHE_TTL_SECONDS", 0)
+    monkeypatch.setattr(ai_service, "_ai_provider", lambda: "claude")
+    settings["ANTHROPIC_BASE_URL"] = "http://127.0.0.1:9"  # bağlantı reddedilir
+    monkeypatch.setattr(ai_providers.ClaudeProvider, "max_retries", 0)
+    text = await ai_service.analyze_report_data("Rapor", "Şablon", [{"spend": 1}], ["spend"])
+    assert text.startswith("[gemini]")
+    await ai_providers.close_providers()
+
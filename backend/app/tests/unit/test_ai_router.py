@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for AI provider hedging and fallback, using local stand-in providers."""
+
+import asyncio
+
+import pytest
+
+from app.services import ai_router
+from app.services.ai_router import RULE_BASED, candidate_order, hedged_call, provider_stats
+
+
+@pytest.fixture(autouse=True)
+def clean_stats(monkeypatch):
+    ai_router.reset_provider_stats()
+    monkeypatch.setattr(ai_router.config, "AI_HEDGE_DEFAULT_DELAY_SECONDS", 0.05)
+    yield
+    ai_router.reset_provider_stats()
+
+
+class StandIn:
+    """Sağlayıcı yerine geçen sahte çağrı: sağlayıcı başına gecikme veya hata."""
+
+    def __init__(self, delays: dict, failing: tuple = ()):
+        self.delays = delays
+        self.failing = failing
+        self.started, self.cancelled = [], []
+
+    async def __call__(self, name: str) -> str:
+        self.started.append(name)
+        try:
+            await asyncio.sleep(self.delays.get(name, 0))
+        except asyncio.CancelledError:
+            self.cancelled.append(name)
+            raise
+        if name in self.failing:
+            raise RuntimeError(f"{name} çöktü")
+        return f"{name} yanıtı"
+
+
+async def test_fast_primary_is_not_hedged():
+    call = StandIn({"claude": 0, "gemini": 0})
+    result = await hedged_call("claude", call, providers=["claude", "gemini"], deadline=1)
+    assert (result.value, result.provider, result.hedged) == ("claude yanıtı", "claude", False)
+    assert call.started == ["claude"]
+
+
+async def test_slow_primary_is_hedged_after_its_p95():
+    for _ in range(10):
+        provider_stats("claude").record_success(0.05)
+    # Birincil süre sınırı içinde hiç yanıt vermez; sonucu yalnızca hedge isteği üretebilir
+    call = StandIn({"claude": 60, "gemini": 0})
+    result = await hedged_call("claude", call, providers=["claude", "gemini"], deadline=5)
+    assert (result.value, result.provider, result.hedged) == ("gemini yanıtı", "gemini", True)
+    assert call.started == ["claude", "gemini"]
+    assert call.cancelled == ["claude"]
+
+
+async def test_failure_fails_over_immediately():
+    call = StandIn({"claude": 0, "gemini": 0.01}, failing=("claude",))
+    result = await hedged_call("claude", call, providers=["claude", "gemini"], deadline=1, hedge=False)
+    assert result.provider == "gemini" and not result.hedged
+    assert provider_stats("claude").error_rate() == 1.0
+
+
+async def test_deadline_falls_back_to_rule_based():
+    call = StandIn({"claude": 5, "gemini": 5})
+    result = await hedged_call("claude", call, lambda: "kural", providers=["claude", "gemini"], deadline=0.2)
+    assert (result.value, result.provider) == ("kural", RULE_BASED)
+    assert sorted(call.cancelled) == ["claude", "gemini"]
+
+
+async def test_deadline_without_rule_based_raises():
+    call = StandIn({"claude": 5})
+    with pytest.raises(asyncio.TimeoutError):
+        await hedged_call("claude", call, providers=["claude"], deadline=0.1)
+
+
+def test_unhealthy_primary_is_demoted_and_secondaries_ranked():
+    for _ in range(6):
+        provider_stats("claude").record_error()
+    provider_stats("gemini").record_error()
+    provider_stats("ollama").record_success(1.0)
+    assert candidate_order("claude", ["claude", "gemini", "ollama"]) == ["ollama", "gemini", "claude"]
+    assert candidate_order("gemini", ["claude", "gemini"]) == ["gemini", "claude"]
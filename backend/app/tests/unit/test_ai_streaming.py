@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for streamed AI analysis against the local fake provider server."""
+
+import asyncio
+import threading
+
+import pytest
+from httpx import AsyncClient
+
+from app import config
+from app.deps import get_current_user
+from app.main import app
+from app.routers import ai_analysis
+from app.services import ai_service
+from app.tests import fake_llm_server
+from app.tests.fake_llm_server import fake_completion, run_in_thread
+
+CAMPAIGN = {"id": "c1", "name": "Yaz", "status": "ACTIVE", "objective": "SALES", "spend": 120.5,
+            "impressions": 1000, "clicks": 20, "ctr": 2.0, "cpc": 6.0, "cpm": 120.5, "roas": 3.1,
+            "frequency": 1.4, "conversions": 4}
+
+
+@pytest.fixture(scope="module")
+def fake_server():
+    with run_in_thread() as base_url:
+        yield base_url
+
+
+@pytest.fixture
+def provider(monkeypatch, fake_server):
+    """Sağlayıcıyı seçer ve tüm sağlayıcı adreslerini sahte sunucuya yönlendirir."""
+    overrides = {
+        "ANTHROPIC_BASE_URL": fake_server, "GEMINI_BASE_URL": fake_server, "OLLAMA_BASE_URL": fake_server,
+        "ANTHROPIC_API_KEY": "test", "GEMINI_API_KEY": "test",
+    }
+    original = config.get_setting
+    monkeypatch.setattr(config, "get_setting", lambda key, default=None: overrides.get(key) or original(key, default))
+    monkeypatch.setattr(config, "AI_CACHE_TTL_SECONDS", 0)
+    monkeypatch.setattr(fake_llm_server, "CHUNK_DELAY", 0)
+
+    def select(name):
+        monkeypatch.setattr(ai_service, "_ai_provider", lambda: name)
+    return select
+
+
+@pytest.mark.parametrize("name", ["claude", "gemini", "ollama"])
+async def test_provider_tokens_are_forwarded_in_order(provider, name):
+    provider(name)
+    chunks = [c async for c in ai_service.stream_single_campaign_analysis(CAMPAIGN)]
+    expected = fake_completion(name, "")
+    assert len(chunks) == len(expected)
+    assert chunks[0] == f"[{name}] "
+    assert chunks[-1] == expected[-1]
+
+
+async def test_sse_endpoint_emits_first_token_before_completion(provider, monkeypatch):
+    provider("ollama")
+    # Sahte sağlayıcı ilk parçadan sonra, istemci ilk token olayını alıp kapıyı açana dek bekler;
+    # uç nokta yanıtı tamponlasaydı ilk token hiç gelmez ve istek zaman aşımına uğrardı
+    gate = threading.Event()
+    monkeypatch.setattr(fake_llm_server, "FIRST_CHUNK_GATE", gate)
+
+    async def fake_campaigns(days, account_id=None):
+        return [CAMPAIGN]
+
+    async def read_events(client):
+        events = []
+        async with client.stream("GET", "/api/ai/analyze/stream") as response:
+            assert response.headers["content-type"].startswith("text/event-stream")
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    events.append(line[7:])
+                    if line == "event: token" and not gate.is_set():
+                        assert events.count("token") == 1
+                        gate.set()
+        return events
+
+    monkeypatch.setattr(ai_analysis.meta_service, "get_campaigns", fake_campaigns)
+    app.dependency_overrides[get_current_user] = lambda: None
+    try:
+        # ASGITransport yanıtı tamponladığı için uygulama gerçek bir sunucuda çalıştırılır
+        with run_in_thread(app) as base_url:
+            async with AsyncClient(base_url=base_url) as client:
+                events = await asyncio.wait_for(read_events(client), timeout=15)
+    finally:
+        gate.set()
+        app.dependency_overrides.pop(get_current_user, None)
+
+    assert events[0] == "start" and events[-1] == "done"
+    assert events.count("token") == len(fake_completion("ollama", ""))
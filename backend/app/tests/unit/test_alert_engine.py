@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the vectorised alert rule evaluation engine."""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+from app import alert_engine
+from app.alert_engine import CampaignFrame, evaluate_rules
+
+
+def _rule(rule_id, metric, condition, threshold, account=None, last_triggered=None, cooldown=60):
+    return SimpleNamespace(
+        id=rule_id,
+        metric=metric,
+        condition=condition,
+        threshold=threshold,
+        ad_account_id=account,
+        last_triggered=last_triggered,
+        cooldown_minutes=cooldown,
+    )
+
+
+CAMPAIGNS = [
+    {"id": "c1", "name": "Kampanya 1", "ctr": 2.0, "spend": 100.0, "roas": "1.5"},
+    {"id": "c2", "name": "Kampanya 2", "ctr": 0.4, "spend": 900.0, "roas": None},
+    {"id": "c3", "name": "Kampanya 3", "ctr": 0.2, "spend": "abc"},
+]
+
+
+class TestThresholdRules:
+    """lt / gt rules match the first triggering campaign per rule."""
+
+    def test_lt_and_gt(self):
+        rules = [_rule("r1", "ctr", "lt", 0.5), _rule("r2", "spend", "gt", 500)]
+
+        matches = evaluate_rules(rules, {"default": CAMPAIGNS})
+
+        assert [(m.rule.id, m.campaign_id, m.actual_value) for m in matches] == [
+            ("r1", "c2", 0.4),
+            ("r2", "c2", 900.0),
+        ]
+
+    def test_first_only_false_returns_all_campaigns(self):
+        matches = evaluate_rules([_rule("r1", "ctr", "lt", 0.5)], {"default": CAMPAIGNS}, first_only=False)
+
+        assert [m.campaign_id for m in matches] == ["c2", "c3"]
+
+    def test_missing_and_non_numeric_values_never_trigger(self):
+        rules = [_rule("r1", "roas", "lt", 10), _rule("r2", "spend", "lt", 1000)]
+
+        matches = evaluate_rules(rules, {"default": CAMPAIGNS}, first_only=False)
+
+        assert [(m.rule.id, m.campaign_id) for m in matches] == [("r1", "c1"), ("r2", "c1"), ("r2", "c2")]
+
+    def test_rules_grouped_by_account(self):
+        rules = [_rule("r1", "ctr", "lt", 0.5, account="act_1"), _rule("r2", "ctr", "lt", 0.5, account="act_2")]
+
+        matches = evaluate_rules(rules, {"act_1": CAMPAIGNS[:1], "act_2": CAMPAIGNS})
+
+        assert [(m.rule.id, m.account_key) for m in matches] == [("r2", "act_2")]
+
+    def test_cooldown_and_unknown_condition_are_skipped(self):
+        now = datetime(2026, 1, 1, 12, 0)
+        rules = [
+            _rule("r1", "ctr", "lt", 0.5, last_triggered=now - timedelta(minutes=10)),
+            _rule("r2", "ctr", "lt", 0.5, last_triggered=now - timedelta(minutes=90)),
+            _rule("r3", "ctr", "between", 0.5),
+        ]
+
+        matches = evaluate_rules(rules, {"default": CAMPAIGNS}, now=now)
+
+        assert [m.rule.id for m in matches] == ["r2"]
+        assert [m.rule.id for m in evaluate_rules(rules, {"default": CAMPAIGNS}, now=now, ignore_cooldown=True)] == ["r1", "r2"]
+
+
+class TestChangePct:
+    """change_pct compares against the stored snapshot aligned by campaign id."""
+
+    def test_change_against_previous_snapshot(self):
+        previous = CampaignFrame.from_campaigns("default", [
+            {"id": "c3", "ctr": 0.1},
+            {"id": "c1", "ctr": 4.0},
+            {"id": "gone", "ctr": 9.0},
+        ]).to_snapshot()
+
+        matches = evaluate_rules(
+            [_rule("r1", "ctr", "change_pct", 60)],
+            {"default": CAMPAIGNS},
+            {"default": previous},
+            first_only=False,
+        )
+
+        assert [(m.campaign_id, m.previous_value, round(m.change_pct, 1)) for m in matches] == [
+            ("c3", 0.1, 100.0),
+        ]
+
+    def test_drop_triggers_and_zero_previous_is_ignored(self):
+        previous = CampaignFrame.from_campaigns("default", [
+            {"id": "c1", "ctr": 4.0},
+            {"id": "c2", "ctr": 0.0},
+        ]).to_snapshot()
+
+        matches = evaluate_rules(
+            [_rule("r1", "ctr", "change_pct", 50)], {"default": CAMPAIGNS}, {"default": previous}, first_only=False
+        )
+
+        assert [(m.campaign_id, m.change_pct) for m in matches] == [("c1", -50.0)]
+
+    def test_no_snapshot_means_no_change_trigger(self):
+        assert evaluate_rules([_rule("r1", "ctr", "change_pct", 1)], {"default": CAMPAIGNS}) == []
+
+
+def test_rule_chunks_cover_all_rules(monkeypatch):
+    """Rules are evaluated in bounded chunks without losing matches."""
+    monkeypatch.setattr(alert_engine, "RULE_CHUNK", 3)
+    rules = [_rule(f"r{i}", "spend", "gt", float(i * 100)) for i in range(10)]
+
+    matches = evaluate_rules(rules, {"default": CAMPAIGNS})
+
+    assert [m.rule.id for m in matches] == [f"r{i}" for i in range(9)]
+
+
+def test_snapshot_roundtrip_keeps_missing_values():
+    frame = CampaignFrame.from_campaigns("default", CAMPAIGNS)
+    aligned = frame.align_previous(frame.to_snapshot())
+
+    np.testing.assert_array_equal(np.isnan(aligned), np.isnan(frame.values))
+    np.testing.assert_array_equal(np.nan_to_num(aligned), np.nan_to_num(frame.values))
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for webhook-driven, debounced alert re-evaluation."""
+
+from app import alert_triggers, config
+from app.alert_engine import CampaignFrame, merge_snapshot
+from app.alert_triggers import drain_pending_campaigns, extract_changed_campaigns, schedule_reevaluation
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def __getattr__(self, name):
+        def _queue(*args, **kwargs):
+            self.ops.append((name, args, kwargs))
+        return _queue
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.ops]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.sets = {}
+        self.keys = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(m.encode() for m in members)
+
+    def expire(self, key, ttl):
+        return True
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = value
+        return True
+
+    def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def delete(self, key):
+        return int(self.sets.pop(key, None) is not None or self.keys.pop(key, None) is not None)
+
+
+class TestExtractChangedCampaigns:
+    """Campaign ids are grouped by the account they belong to."""
+
+    def test_campaign_ids_from_values_and_entry_ids(self):
+        events = [
+            {"object_id": "act_1", "field": "status", "value": {"campaign_id": "10"}},
+            {"object_id": "act_1", "field": "daily_budget", "value": {"campaign_id": "11"}},
+            {"object_id": "act_1", "field": "status", "value": {"adset_id": "99"}},
+            {"object_id": "campaign_20", "field": "status", "value": {"account_id": "2"}},
+            {"object_id": "campaign_30", "field": "status", "value": "PAUSED"},
+        ]
+
+        assert extract_changed_campaigns(events) == {
+            "act_1": {"10", "11"},
+            "act_2": {"20"},
+            None: {"30"},
+        }
+
+
+class TestScheduleReevaluation:
+    """Changes inside the debounce window collapse into one scheduled task."""
+
+    def test_debounce_and_drain(self, monkeypatch):
+        fake = FakeRedis()
+        enqueued = []
+        monkeypatch.setattr(alert_triggers, "get_redis_client", lambda: fake)
+        monkeypatch.setattr(config, "ALERT_REEVAL_DEBOUNCE_SECONDS", 30)
+        enqueue = lambda *args: enqueued.append(args)
+
+        assert schedule_reevaluation("act_1", ["10"], enqueue) is True
+        assert schedule_reevaluation("act_1", ["11", "10"], enqueue) is False
+        assert schedule_reevaluation("act_2", ["20"], enqueue) is True
+        assert enqueued == [("act_1", [], 30), ("act_2", [], 30)]
+
+        assert drain_pending_campaigns("act_1") == ["10", "11"]
+        assert drain_pending_campaigns("act_1") == []
+        # Drain sonrası gelen değişiklik yeni bir task planlar
+        assert schedule_reevaluation("act_1", ["12"], enqueue) is True
+
+    def test_without_redis_enqueues_ids_immediately(self, monkeypatch):
+        enqueued = []
+        monkeypatch.setattr(alert_triggers, "get_redis_client", lambda: None)
+
+        assert schedule_reevaluation(None, ["2", "1"], lambda *args: enqueued.append(args)) is True
+        assert enqueued == [(None, ["1", "2"], 0)]
+        assert drain_pending_campaigns(None) == []
+
+
+def test_merge_snapshot_keeps_untouched_campaigns():
+    full = CampaignFrame.from_campaigns("default", [{"id": "a", "ctr": 1.0}, {"id": "b", "ctr": 2.0}]).to_snapshot()
+    partial = CampaignFrame.from_campaigns("default", [{"id": "b", "ctr": 5.0}, {"id": "c", "ctr": 7.0}])
+
+    merged = merge_snapshot(full, partial)
+
+    assert merged["campaign_ids"] == ["a", "b", "c"]
+    assert merged["metrics"]["ctr"] == [1.0, 5.0, 7.0]
+    assert merged["metrics"]["spend"] == [None, None, None]
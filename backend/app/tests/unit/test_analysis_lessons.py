@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for lessons extracted once per analyze job and read back by the strategist."""
+
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from app import analysis_lessons
+from app.analysis_lessons import extract_job_lessons, get_top_lessons, template_titles
+from app.models import AnalysisLesson
+
+PLATFORM_TITLE = "Hangi platform (Facebook / Instagram) daha iyi dönüşüm sağlıyor?"
+AGE_TITLE = "Hangi yaş grubu reklamlarla en çok etkileşime giriyor?"
+
+RESULT_TEXT = "\n\n---\n\n".join([
+    f"## {PLATFORM_TITLE}\n\n### Somut Öneriler\n- Instagram kreatiflerini çoğaltın\n- Audience Network'ü kapatın\n5. Bütçe",
+    f"## {AGE_TITLE}\n\n### Dikkat Edilmesi Gerekenler\n- 55+ grubunda CPC yüksek\n- Instagram kreatiflerini çoğaltın",
+])
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self, results):
+        self.results = list(results)
+        self.statements = []
+        self.added = []
+
+    async def execute(self, stmt):
+        self.statements.append(str(stmt.compile(dialect=postgresql.dialect())))
+        return FakeResult(self.results.pop(0) if self.results else [])
+
+    def add_all(self, rows):
+        self.added.extend(rows)
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+def test_lessons_are_tagged_by_report_section_and_deduplicated():
+    titles = template_titles(["template_2", "template_3"])
+    lessons = extract_job_lessons(RESULT_TEXT, titles)
+
+    assert [text for _, text in lessons] == [
+        "Instagram kreatiflerini çoğaltın",
+        "Audience Network'ü kapatın",
+        "55+ grubunda CPC yüksek",
+    ]
+    assert [tid for tid, _ in lessons] == ["template_2", "template_2", "template_3"]
+
+
+async def test_top_lessons_use_one_ordered_query():
+    # 1. sorgu: eski (lesson_count boş) iş yok; 2. sorgu: dersler
+    session = FakeSession([[], ["A", "B", "A", "C"]])
+
+    lessons = await get_top_lessons(session, ["j2", "j1", "j2"], limit=2)
+
+    assert lessons == ["A", "B"]
+    lesson_sql = session.statements[-1]
+    assert "FROM analysis_lessons JOIN job_status" in lesson_sql
+    assert "ORDER BY analysis_lessons.position, CASE analysis_lessons.job_id" in lesson_sql
+    assert "LIMIT" in lesson_sql
+
+
+async def test_jobs_completed_before_the_table_are_backfilled_once(monkeypatch):
+    legacy = SimpleNamespace(id="j1", report_id="r1", result_text=RESULT_TEXT)
+
+    async def saved_report(session, report_id):
+        return {"template_ids": ["template_2"], "ad_account_id": "act_1"}
+
+    monkeypatch.setattr(analysis_lessons, "get_saved_report_by_id_optional", saved_report)
+    session = FakeSession([[legacy]])
+
+    await get_top_lessons(session, ["j1"])
+
+    assert all(isinstance(row, AnalysisLesson) and row.ad_account_id == "act_1" for row in session.added)
+    assert [row.position for row in session.added] == [0, 1, 2]
+    assert any("UPDATE job_status SET lesson_count" in sql for sql in session.statements)
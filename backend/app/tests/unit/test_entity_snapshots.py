@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for server-side pagination, sorting and field projection of entity lists."""
+
+import fnmatch
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app import config, entity_snapshots
+from app.entity_snapshots import EntitySnapshot, entity_list_response
+
+ROWS = [
+    {"id": "1", "name": "Beta", "spend": "12.5", "clicks": 3},
+    {"id": "2", "name": "alfa", "spend": 40.0, "clicks": 0},
+    {"id": "3", "name": "Gama", "spend": None, "clicks": 9},
+    {"id": "4", "name": "Delta", "spend": 7, "clicks": 3},
+]
+
+
+def _ids(page):
+    return [row["id"] for row in page["data"]]
+
+
+def test_sorted_pages_follow_the_cursor_and_project_fields():
+    snapshot = EntitySnapshot(ROWS, '"x"', 0)
+
+    first = snapshot.page(limit=2, sort="-spend", fields="name")
+    assert _ids(first) == ["2", "1"]
+    assert first["data"][0] == {"id": "2", "name": "alfa"}
+    assert first["total"] == 4 and first["count"] == 2
+
+    second = snapshot.page(limit=2, sort="-spend", cursor=first["next_cursor"])
+    # Boş değerler her yönde sonda
+    assert _ids(second) == ["4", "3"]
+    assert second["next_cursor"] is None
+
+    assert _ids(snapshot.page(limit=10, sort="name")) == ["2", "1", "4", "3"]
+    # Eşit değerlerde kaynak sırası korunur
+    assert _ids(snapshot.page(limit=10, sort="clicks")) == ["2", "1", "4", "3"]
+
+
+def test_cursor_continues_after_the_last_entity_when_the_list_changes():
+    first = EntitySnapshot(ROWS, '"a"', 0).page(limit=2, sort="name")
+    assert _ids(first) == ["2", "1"]
+    changed = EntitySnapshot([{"id": "0", "name": "Aaa"}] + ROWS, '"b"', 0)
+    assert _ids(changed.page(limit=2, sort="name", cursor=first["next_cursor"])) == ["4", "3"]
+
+    with pytest.raises(ValueError):
+        changed.page(cursor="bozuk!")
+
+
+def test_endpoint_reuses_snapshot_and_keeps_full_list_path(monkeypatch):
+    monkeypatch.setattr(config, "CACHE_ENABLED", False)
+    entity_snapshots.clear_snapshots()
+    calls = []
+
+    async def producer():
+        calls.append(1)
+        return {"data": ROWS, "count": len(ROWS)}
+
+    app = FastAPI()
+
+    @app.get("/ads")
+    async def ads(request: Request, limit: int = None, cursor: str = None, sort: str = None, fields: str = None):
+        return await entity_list_response(
+            request, "ads", (30, None), producer, limit=limit, cursor=cursor, sort=sort, fields=fields
+        )
+
+    client = TestClient(app)
+    page = client.get("/ads", params={"limit": 1, "sort": "-clicks", "fields": "clicks"}).json()
+    assert page["data"] == [{"id": "3", "clicks": 9}]
+    client.get("/ads", params={"limit": 1, "cursor": page["next_cursor"], "sort": "-clicks"})
+    assert calls == [1]
+
+    assert client.get("/ads").json() == {"data": ROWS, "count": 4}
+    assert client.get("/ads", params={"cursor": "bozuk!"}).status_code == 400
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def getrange(self, key, start, end):
+        return (self.store.get(key) or b"")[start:end + 1]
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value
+
+    def scan_iter(self, match):
+        return [key for key in list(self.store) if fnmatch.fnmatchcase(key, match)]
+
+    def delete(self, key):
+        self.store.pop(key, None)
+
+
+def test_created_ad_shows_up_in_cached_lists(monkeypatch):
+    from app import cache, http_cache
+    from app.routers import ads as ads_router
+    from app.services.meta_service import meta_service
+
+    redis = FakeRedis()
+    for module in (cache, http_cache, entity_snapshots):
+        monkeypatch.setattr(module, "get_redis_client", lambda: redis)
+    monkeypatch.setattr(config, "CACHE_ENABLED", True)
+    entity_snapshots.clear_snapshots()
+    rows = [{"id": "1", "name": "Eski", "spend": 5}]
+
+    async def get_ads(campaign_id=None, days=30, account_id=None):
+        return list(rows)
+
+    async def create_ad(account_id, adset_id, creative_id, name, status="PAUSED"):
+        rows.append({"id": "2", "name": name, "spend": 0})
+        return {"id": "2"}
+
+    monkeypatch.setattr(meta_service, "get_ads", get_ads)
+    monkeypatch.setattr(meta_service, "create_ad", create_ad)
+    app = FastAPI()
+    app.include_router(ads_router.router, prefix="/api/ads")
+    client = TestClient(app)
+    params = {"ad_account_id": "act_1"}
+
+    assert client.get("/api/ads", params=params).json()["count"] == 1
+    assert client.get("/api/ads", params={**params, "limit": 10, "sort": "-spend"}).json()["total"] == 1
+
+    body = {"adset_id": "s1", "creative_id": "c1", "name": "Yeni", "ad_account_id": "act_1"}
+    assert client.post("/api/ads", json=body).status_code == 200
+
+    assert [row["id"] for row in client.get("/api/ads", params=params).json()["data"]] == ["1", "2"]
+    page = client.get("/api/ads", params={**params, "limit": 10, "sort": "-spend"}).json()
+    assert [row["id"] for row in page["data"]] == ["1", "2"]
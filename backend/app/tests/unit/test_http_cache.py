@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for ETag / 304 handling and response compression on dashboard endpoints."""
+
+import json
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app import config, http_cache
+from app.http_cache import etag_matches, json_response, negotiate_encoding
+
+PAYLOAD = {"data": [{"id": str(i), "name": f"Kampanya {i}", "spend": i * 1.5} for i in range(200)], "count": 200}
+
+
+def _client(payload=PAYLOAD):
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items(request: Request):
+        return json_response(request, payload)
+
+    return TestClient(app)
+
+
+def test_unchanged_payload_gets_304_without_body():
+    client = _client()
+    first = client.get("/items", headers={"Accept-Encoding": "identity"})
+    assert first.status_code == 200
+    assert first.json() == PAYLOAD
+    etag = first.headers["etag"]
+    assert etag.startswith('"') and "private" in first.headers["cache-control"]
+
+    again = client.get("/items", headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+    changed = _client({**PAYLOAD, "count": 201}).get("/items", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+
+
+def test_large_bodies_are_compressed_and_etag_survives_encoding(monkeypatch):
+    monkeypatch.setattr(config, "RESPONSE_COMPRESSION_MIN_BYTES", 1024)
+    monkeypatch.setattr(http_cache, "_ENCODINGS", ("gzip",))
+    client = _client()
+
+    response = client.get("/items", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].endswith('-gzip"')
+    assert response.json() == PAYLOAD  # httpx açar
+    assert int(response.headers["content-length"]) < len(json.dumps(PAYLOAD))
+
+    # Sıkıştırılmış temsilin ETag'i de 304 alır
+    revalidated = client.get("/items", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+
+    small = _client({"data": []}).get("/items", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+
+def test_header_parsing():
+    assert etag_matches('W/"abc", "def-br"', '"def"')
+    assert etag_matches("*", '"x"')
+    assert not etag_matches('"abc"', '"abd"')
+    assert negotiate_encoding("gzip;q=0, deflate") is None
+    assert negotiate_encoding("br;q=0.5, gzip") in ("br", "gzip")
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value
+
+
+async def test_cache_hit_sends_stored_bytes_without_calling_producer(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(http_cache, "get_redis_client", lambda: redis)
+    monkeypatch.setattr(config, "CACHE_ENABLED", True)
+    calls = []
+
+    async def producer():
+        calls.append(1)
+        return PAYLOAD
+
+    app = FastAPI()
+
+    @app.get("/campaigns")
+    async def campaigns(request: Request):
+        return await http_cache.cached_json_response(request, "campaigns", (30, "act_1"), producer)
+
+    client = TestClient(app)
+    first = client.get("/campaigns", headers={"Accept-Encoding": "identity"})
+    second = client.get("/campaigns", headers={"Accept-Encoding": "identity"})
+
+    assert calls == [1]
+    assert list(redis.store) == ["api_response:('campaigns', 30, 'act_1')"]
+    assert second.content == first.content and second.json() == PAYLOAD
+    assert second.headers["etag"] == first.headers["etag"]
+    assert client.get("/campaigns", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
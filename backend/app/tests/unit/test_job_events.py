@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for job progress events (Redis pub/sub + SSE helpers)."""
+
+import json
+
+from app import job_events, job_store
+from app.job_events import get_live_job_state, publish_job_event, sse_format
+
+
+class FakePipeline:
+    def __init__(self, store):
+        self.store = store
+        self.ops = []
+
+    def setex(self, key, ttl, value):
+        self.ops.append(("setex", key, value))
+
+    def publish(self, channel, value):
+        self.ops.append(("publish", channel, value))
+
+    def execute(self):
+        for op, key, value in self.ops:
+            if op == "setex":
+                self.store[key] = value
+            else:
+                self.store.setdefault("published", []).append((key, value))
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.store)
+
+    def get(self, key):
+        return self.store.get(key)
+
+
+class TestPublishJobEvent:
+    """Tests for publishing progress to Redis."""
+
+    def test_publish_stores_latest_state_and_publishes(self, monkeypatch):
+        fake = FakeRedis()
+        monkeypatch.setattr(job_events, "get_redis_client", lambda: fake)
+
+        assert publish_job_event("job-1", {"status": "running", "progress": 40}) is True
+
+        channel, payload = fake.store["published"][0]
+        assert channel == "job_events:job-1"
+        assert json.loads(payload)["progress"] == 40
+        assert get_live_job_state("job-1") == {"job_id": "job-1", "status": "running", "progress": 40}
+
+    def test_publish_without_redis_returns_false(self, monkeypatch):
+        monkeypatch.setattr(job_events, "get_redis_client", lambda: None)
+
+        assert publish_job_event("job-1", {"progress": 10}) is False
+        assert get_live_job_state("job-1") is None
+
+
+class TestReportJobProgress:
+    """Progress ticks skip the database unless Redis is unavailable."""
+
+    def test_progress_does_not_touch_db_when_redis_available(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(job_store, "publish_job_event", lambda job_id, event: True)
+        monkeypatch.setattr(job_store, "update_job_sync", lambda *a, **kw: calls.append(kw))
+
+        job_store.report_job_progress("job-1", 55)
+
+        assert calls == []
+
+    def test_progress_falls_back_to_db_without_redis(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(job_store, "publish_job_event", lambda job_id, event: False)
+        monkeypatch.setattr(job_store, "update_job_sync", lambda *a, **kw: calls.append(kw))
+
+        job_store.report_job_progress("job-1", 150)
+
+        assert calls == [{"progress": 100}]
+
+
+def test_sse_format():
+    """SSE frames carry the event name and a JSON data line, terminated by a blank line."""
+    frame = sse_format({"progress": 5}, event="progress")
+    assert frame == 'event: progress\ndata: {"progress": 5}\n\n'
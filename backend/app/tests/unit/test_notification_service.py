@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the notification outbox dispatcher helpers."""
+
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+
+from app.services.notification_service import (
+    BATCH_SEPARATOR,
+    CHANNEL_MAX_CHARS,
+    NOTIFICATION_BACKOFF_MAX_SECONDS,
+    backoff_delay,
+    deliver_batches,
+    group_batches,
+)
+
+
+def _row(row_id, channel, recipient, body, subject=None):
+    return SimpleNamespace(id=row_id, channel=channel, recipient=recipient, body=body, subject=subject)
+
+
+class TestGroupBatches:
+    """Messages to the same recipient on the same channel are merged."""
+
+    def test_same_recipient_is_batched(self):
+        rows = [
+            _row("1", "email", "a@x.com", "first", "S1"),
+            _row("2", "email", "a@x.com", "second", "S2"),
+            _row("3", "email", "b@x.com", "third", "S3"),
+            _row("4", "whatsapp", "905551112233", "wa"),
+        ]
+
+        batches = group_batches(rows)
+
+        assert [(b.channel, b.recipient, b.outbox_ids) for b in batches] == [
+            ("email", "a@x.com", ["1", "2"]),
+            ("email", "b@x.com", ["3"]),
+            ("whatsapp", "905551112233", ["4"]),
+        ]
+        assert batches[0].body == f"first{BATCH_SEPARATOR}second"
+        assert batches[0].subject == "Meta Ads: 2 yeni uyarı"
+        assert batches[1].subject == "S3"
+
+    def test_batches_are_split_at_channel_limit(self):
+        limit = CHANNEL_MAX_CHARS["whatsapp"]
+        body = "x" * (limit // 2)
+        rows = [_row(str(i), "whatsapp", "905551112233", body) for i in range(3)]
+
+        batches = group_batches(rows)
+
+        assert [b.outbox_ids for b in batches] == [["0"], ["1"], ["2"]]
+        assert all(len(b.body) <= limit for b in batches)
+
+
+def test_backoff_is_exponential_and_capped():
+    assert backoff_delay(1) == timedelta(seconds=30)
+    assert backoff_delay(2) == timedelta(seconds=60)
+    assert backoff_delay(3) == timedelta(seconds=120)
+    assert backoff_delay(50) == timedelta(seconds=NOTIFICATION_BACKOFF_MAX_SECONDS)
+
+
+class TestDeliverBatches:
+    """Channels are delivered concurrently and results are mapped back to outbox ids."""
+
+    async def test_channels_run_concurrently(self):
+        started = []
+        both_started = asyncio.Event()
+
+        async def wait_for_other_channel(name):
+            # Kanallar sırayla çalışsaydı ilk kanal burada sonsuza dek beklerdi
+            started.append(name)
+            if len(started) == 2:
+                both_started.set()
+            await both_started.wait()
+
+        async def slow_email(batches):
+            await wait_for_other_channel("email")
+            return [None] * len(batches)
+
+        async def slow_whatsapp(batches):
+            await wait_for_other_channel("whatsapp")
+            return ["boom"] * len(batches)
+
+        rows = [
+            _row("1", "email", "a@x.com", "m1"),
+            _row("2", "email", "a@x.com", "m2"),
+            _row("3", "whatsapp", "905551112233", "m3"),
+        ]
+        outcome = await asyncio.wait_for(
+            deliver_batches(group_batches(rows), {"email": slow_email, "whatsapp": slow_whatsapp}),
+            timeout=5,
+        )
+
+        assert outcome == {"1": None, "2": None, "3": "boom"}
+        assert sorted(started) == ["email", "whatsapp"]
+
+    async def test_failing_channel_marks_its_batches_failed(self):
+        async def broken(batches):
+            raise ConnectionError("smtp down")
+
+        outcome = await deliver_batches(
+            group_batches([_row("1", "email", "a@x.com", "m1"), _row("2", "sms", "x", "m2")]),
+            {"email": broken},
+        )
+
+        assert outcome["1"] == "smtp down"
+        assert outcome["2"].startswith("Desteklenmeyen kanal")
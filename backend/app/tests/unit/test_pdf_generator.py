@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for cached PDF styles and off-loop rendering."""
+
+from app import pdf_generator
+
+
+def test_fonts_and_styles_are_built_once():
+    assert pdf_generator._styles() is pdf_generator._styles()
+    assert pdf_generator._register_fonts.cache_info().misses <= 1
+
+
+async def test_render_analysis_pdf_writes_file_off_loop(tmp_path):
+    out = tmp_path / "r.pdf"
+    result = await pdf_generator.render_analysis_pdf("## Bölüm\n\n- **madde** & <etiket>", "Rapor", out)
+    assert result == out
+    assert out.read_bytes().startswith(b"%PDF")
+
+
+def test_inline_markup_is_escaped_and_converted():
+    assert pdf_generator._inline("a **kalın** & *eğik* <x>") == "a <b>kalın</b> &amp; <i>eğik</i> &lt;x&gt;"
+    assert pdf_generator._inline("snake_case_name 2 * 3") == "snake_case_name 2 * 3"
+    assert pdf_generator._inline("`ROAS`") == "ROAS"
+
+
+def test_markdown_tables_lists_and_headings_become_flowables():
+    from reportlab.platypus import Paragraph, Table
+
+    text = "\n".join([
+        "## Özet",
+        "| Kampanya | CTR |",
+        "|:---|---:|",
+        "| **A** | 1.2 |",
+        "| B | 2 |",
+        "- madde",
+        "  - iç madde",
+        "2. ikinci",
+        "| tablo değil |",
+        "---",
+    ])
+    styles = pdf_generator._styles()
+    elements = pdf_generator._markdown_to_pdf_elements(text, styles)
+    assert [type(e) for e in elements] == [Paragraph, Table, Paragraph, Paragraph, Paragraph, Paragraph, Table]
+
+    heading, table, bullet, nested, numbered, plain, _ = elements
+    assert heading.style is styles["Heading2"]
+    assert table._cellvalues[0] == ["Kampanya", "CTR"]
+    assert table._cellvalues[1][0].text == "<b>A</b>" and table._cellvalues[1][1] == "1.2"
+    assert bullet.text == "• madde" and nested.style.leftIndent > bullet.style.leftIndent
+    assert numbered.text == "2. ikinci"
+    assert plain.text == "| tablo değil |"
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the token-budgeted prompt compaction."""
+
+import json
+
+from app.prompt_compaction import compact_rows, estimate_tokens
+
+COLUMNS = ["Bölge", "Harcanan Tutar", "Sonuçlar", "CTR"]
+
+
+def _rows(n):
+    return [
+        {"Bölge": f"Bölge {i}", "Harcanan Tutar": float((i * 37) % n), "Sonuçlar": i % 7, "CTR": round(1 + (i % 5) / 10, 2)}
+        for i in range(n)
+    ]
+
+
+def test_small_table_is_sent_in_full_and_smaller_than_json():
+    rows = _rows(100)
+    table = compact_rows(rows, COLUMNS, budget_tokens=10_000)
+    assert not table.sampled and table.included_rows == 100
+    assert table.text.count("\n") == 101  # başlık satırı + sütunlar + 100 satır
+    assert len(table.text) < len(json.dumps(rows, ensure_ascii=False, indent=0)) / 2
+
+
+def test_large_table_fits_budget_with_extremes_and_aggregates():
+    rows = _rows(5000)
+    table = compact_rows(rows, COLUMNS, budget_tokens=1500)
+    assert table.sampled and 10 < table.included_rows < 5000
+    assert estimate_tokens(table.text) <= 1500
+    # Toplamlar tüm satırları kapsar; oran sütununda toplam verilmez
+    assert f"toplam={int(sum(r['Harcanan Tutar'] for r in rows))}" in table.text
+    assert "- CTR: ort=" in table.text
+    # En yüksek ve en düşük harcamalı satırlar her zaman dahil
+    assert "|4999|" in table.text and "|0|" in table.text
+    assert table.text == compact_rows(rows, COLUMNS, budget_tokens=1500).text
+
+
+def test_non_numeric_and_separator_values_are_encoded_safely():
+    rows = [{"Kampanya": "A|B\nC", "Harcanan Tutar": None, "Durum": "ACTIVE"}]
+    table = compact_rows(rows, ["Kampanya", "Harcanan Tutar", "Durum", "Yok"])
+    assert "Kampanya|Harcanan Tutar|Durum" in table.text
+    assert "A/B C||ACTIVE" in table.text
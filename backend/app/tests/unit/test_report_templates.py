@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for concurrent report template fetching."""
+
+import asyncio
+
+import pytest
+
+from app import report_templates
+from app.report_templates import fetch_templates_data, iter_templates_data
+
+
+class FakeMetaService:
+    """Minimal stand-in exposing only the concurrency limiter."""
+
+    def __init__(self, limit: int):
+        self._limit = limit
+        self._limiter = None
+
+    def concurrency_limiter(self) -> asyncio.Semaphore:
+        if self._limiter is None:
+            self._limiter = asyncio.Semaphore(self._limit)
+        return self._limiter
+
+
+@pytest.fixture
+def fake_fetch(monkeypatch):
+    """Replace the per-template fetch with a delay-controlled fake that tracks concurrency."""
+    state = {"running": 0, "peak": 0}
+    delays = {}
+
+    async def _fake(template_id, days, account_id, meta_service):
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        try:
+            await asyncio.sleep(delays.get(template_id, 0.01))
+            if template_id == "boom":
+                raise RuntimeError("fetch failed")
+            return [{"template": template_id}]
+        finally:
+            state["running"] -= 1
+
+    monkeypatch.setattr(report_templates, "get_report_data_for_template", _fake)
+    return state, delays
+
+
+class TestFetchTemplatesData:
+    """Tests for ordered, bounded template fetching."""
+
+    async def test_results_keep_template_order(self, fake_fetch):
+        """Final results follow template_ids order even if later templates finish first."""
+        _, delays = fake_fetch
+        delays.update({"a": 0.05, "b": 0.01, "c": 0.03})
+
+        results = await fetch_templates_data(["a", "b", "c"], 30, None, FakeMetaService(3))
+
+        assert [r[0]["template"] for r in results] == ["a", "b", "c"]
+
+    async def test_concurrency_is_bounded_by_limiter(self, fake_fetch):
+        """No more than the limiter size runs at once."""
+        state, _ = fake_fetch
+
+        await fetch_templates_data([f"t{i}" for i in range(6)], 30, None, FakeMetaService(2))
+
+        assert state["peak"] == 2
+
+    async def test_error_does_not_cancel_other_templates(self, fake_fetch):
+        """A failing template is returned as an exception; the others still complete."""
+        results = await fetch_templates_data(["a", "boom", "c"], 30, None, FakeMetaService(3))
+
+        assert isinstance(results[1], RuntimeError)
+        assert results[0] == [{"template": "a"}]
+        assert results[2] == [{"template": "c"}]
+
+    async def test_iter_yields_in_completion_order(self, fake_fetch):
+        """Partial results are yielded as soon as each template finishes."""
+        _, delays = fake_fetch
+        delays.update({"slow": 0.05, "fast": 0.0})
+
+        seen = [tid async for _, tid, _ in iter_templates_data(["slow", "fast"], 30, None, FakeMetaService(2))]
+
+        assert seen == ["fast", "slow"]
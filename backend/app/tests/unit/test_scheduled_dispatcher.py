@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the race-free, grouping scheduled-report dispatcher."""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+
+from app import tasks
+from app.tasks import _check_due_scheduled_reports, scheduled_run_key
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self, rows, log):
+        self.rows = rows
+        self.log = log
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt):
+        self.log.append(("execute", str(stmt.compile(dialect=postgresql.dialect()))))
+        return FakeResult(self.rows)
+
+    async def commit(self):
+        self.log.append(("commit", None))
+
+
+def _report(report_id, due_at, account="act_1", days=7, report_type="weekly_summary"):
+    return SimpleNamespace(
+        id=report_id, name=report_id, next_run_at=due_at,
+        frequency="daily", day_of_week=None, day_of_month=None, hour=9, minute=0,
+        ad_account_id=account, days=days, report_type=report_type,
+    )
+
+
+def test_run_key_is_minute_precision():
+    assert scheduled_run_key("r1", datetime(2026, 3, 1, 9, 0, 42)) == "r1:20260301T0900"
+
+
+class TestDispatcher:
+    """Due rows are claimed with SKIP LOCKED, advanced and enqueued before commit."""
+
+    async def test_claims_advances_and_enqueues_before_commit(self, monkeypatch):
+        due_at = datetime.utcnow() - timedelta(minutes=1)
+        next_run = datetime.utcnow() + timedelta(days=1)
+        rows = [_report("r1", due_at), _report("r2", due_at, account="act_2")]
+        log = []
+
+        def fake_apply_async(args, task_id):
+            if args[0][0][0] == "r2":
+                raise ConnectionError("broker down")
+            log.append(("enqueue", task_id))
+
+        monkeypatch.setattr(tasks.generate_scheduled_report_group_task, "apply_async", fake_apply_async)
+        monkeypatch.setattr(tasks, "_next_run_for", lambda report: next_run)
+
+        run_keys = await _check_due_scheduled_reports(lambda: FakeSession(rows, log))
+
+        sql = log[0][1]
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert "ORDER BY scheduled_reports.next_run_at" in sql
+        assert run_keys == [scheduled_run_key("r1", due_at)]
+        assert [entry[0] for entry in log] == ["execute", "enqueue", "commit"]
+        # Kuyruğa alınan rapor ilerletilir, alınamayan bir sonraki turda tekrar denenir
+        assert rows[0].next_run_at == next_run
+        assert rows[1].next_run_at == due_at
+
+    async def test_groups_reports_sharing_a_dataset(self, monkeypatch):
+        due_at = datetime.utcnow() - timedelta(minutes=1)
+        rows = [
+            _report("r1", due_at),
+            _report("r2", due_at),
+            _report("r3", due_at, days=30),
+            _report("r4", due_at, report_type="campaign_list"),
+        ]
+        enqueued = []
+        monkeypatch.setattr(
+            tasks.generate_scheduled_report_group_task, "apply_async",
+            lambda args, task_id: enqueued.append([report_id for report_id, _ in args[0]]),
+        )
+        monkeypatch.setattr(tasks, "_next_run_for", lambda report: due_at + timedelta(days=1))
+
+        run_keys = await _check_due_scheduled_reports(lambda: FakeSession(rows, []))
+
+        assert enqueued == [["r1", "r2"], ["r3"], ["r4"]]
+        assert len(run_keys) == 4
+
+
+class GroupSession(FakeSession):
+    """Log kayıtlarını toplar; daha önce kullanılmış run_key'lerde IntegrityError verir."""
+
+    def __init__(self, rows, used_keys=()):
+        super().__init__(rows, [])
+        self.used_keys = set(used_keys)
+        self.added = []
+        self._pending = None
+
+    def begin_nested(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._pending is not None:
+            log, self._pending = self._pending, None
+            if log.run_key in self.used_keys:
+                raise IntegrityError("insert", {}, Exception("duplicate run_key"))
+            self.added.append(log)
+        return False
+
+    def add(self, obj):
+        self._pending = obj
+
+
+class TestGroupRun:
+    """A group fetches campaigns and runs AI once, then delivers per report."""
+
+    async def test_dataset_computed_once_and_duplicates_skipped(self, monkeypatch):
+        rows = [
+            SimpleNamespace(id=f"r{i}", is_active=True, ad_account_id="act_1", days=7,
+                            report_type="weekly_summary", run_count=0, last_run_at=None)
+            for i in range(1, 4)
+        ]
+        builds, delivered, metrics = [], [], []
+
+        async def fake_build(account_id, days, report_type):
+            builds.append((account_id, days, report_type))
+            return {"campaigns": [{}], "summary_data": {"campaign_count": 1}, "ai_analysis": "ok"}
+
+        async def fake_deliver(report, dataset):
+            delivered.append(report.id)
+            return ["email"]
+
+        monkeypatch.setattr(tasks, "_build_scheduled_dataset", fake_build)
+        monkeypatch.setattr(tasks, "_deliver_scheduled_report", fake_deliver)
+        monkeypatch.setattr(tasks, "record_grouping_metrics", lambda *args: metrics.append(args))
+
+        session = GroupSession(rows, used_keys={"r3:k"})
+        result = await tasks._generate_scheduled_report_group(
+            [["r1", "r1:k"], ["r2", "r2:k"], ["r3", "r3:k"]], session_factory=lambda: session,
+        )
+
+        assert builds == [("act_1", 7, "weekly_summary")]
+        assert delivered == ["r1", "r2"]
+        assert [log.status for log in session.added] == ["success", "success"]
+        assert result["meta_fetches_saved"] == 1
+        assert result["ai_calls_saved"] == 1
+        assert metrics == [(2, 1, 1)]
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the columnar strategy analytics pipeline."""
+
+import gzip
+import io
+import json
+import math
+
+import pytest
+
+from app.services import strategy_service
+
+TURKISH_CSV = "﻿" + "\n".join([
+    "Platform;Yaş;Cinsiyet;Harcanan Tutar (TRY);Tıklama;Gösterim;CTR (Tümü);CPC;Sonuçlar",
+    "facebook;18-24;female;1.250,50;40;2.000;%2,00;31,26;3",
+    "instagram;25-34;male;300,00;0;500;0;;0",
+    "facebook;25-34;unknown;100,25;10;1.000;1,00;10,03;0",
+    "instagram;18-24;female;50,00;5;50;10,00;10,00;1",
+])
+
+
+def test_turkish_export_is_aliased_and_typed():
+    df = strategy_service.parse_csv_frame(TURKISH_CSV)
+    assert list(df.columns) == ["platform", "age", "gender", "spend", "clicks", "impressions", "ctr", "cpc", "results"]
+    assert df["spend"].tolist() == [1250.5, 300.0, 100.25, 50.0]
+    assert df["impressions"].tolist() == [2000, 500, 1000, 50]
+    assert df["ctr"].tolist() == [2.0, 0.0, 1.0, 10.0]
+    assert math.isnan(df["cpc"].iloc[1])
+
+
+def test_analysis_groups_segments_and_finds_extremes():
+    result = strategy_service.analyze_performance_frame(strategy_service.parse_csv_frame(TURKISH_CSV))
+
+    # 100 gösterim altındaki satır en iyi CTR sayılmaz
+    assert result["best_ctr"]["value"] == 2.0 and result["best_ctr"]["row"]["platform"] == "facebook"
+    assert result["lowest_cpc"]["value"] == 10.0
+    facebook = result["platform_performance"]["facebook"]
+    assert facebook["spend"] == 1350.75 and facebook["count"] == 2 and facebook["avg_ctr"] == 1.5
+    assert round(facebook["cpc"], 4) == round(1350.75 / 50, 4)
+    assert "unknown" not in result["gender_performance"]
+    # Sonuç sütunu varsa "sonuç getirmeyen" segment sonuçlara göre belirlenir
+    assert result["worst_platforms"] == []
+    assert result["worst_ages"] == ["25-34"]
+    assert result["total_spend"] == 1700.75 and result["total_clicks"] == 55
+
+
+def test_json_rows_and_row_api_share_the_pipeline():
+    rows = [
+        {"publisher_platform": "facebook", "cost": "12.5", "clicks": 0, "impressions": 300, "ctr": 0},
+        {"publisher_platform": "instagram", "spend": 0, "cost": 4, "clicks": 2, "impressions": 150, "ctr": 1.3},
+    ]
+    from_json = strategy_service.analyze_performance_frame(strategy_service.parse_json_frame(json.dumps({"data": rows})))
+    from_rows = strategy_service.analyze_performance_data(rows)
+    assert from_json == from_rows
+    assert from_rows["platform_performance"]["instagram"]["spend"] == 4.0
+    assert from_rows["worst_platforms"] == ["facebook"]
+    assert strategy_service.analyze_performance_frame(strategy_service.parse_csv_frame("  ")) == strategy_service.analyze_performance_data([])
+
+
+def test_gzip_upload_streams_in_chunks(monkeypatch):
+    monkeypatch.setattr(strategy_service, "STREAM_CHUNK_ROWS", 2)
+    upload = io.BytesIO(gzip.compress(TURKISH_CSV.encode("utf-8")))
+
+    streamed = strategy_service.analyze_performance_stream(upload, "rapor.csv.gz")
+    assert streamed == strategy_service.analyze_performance_frame(strategy_service.parse_csv_frame(TURKISH_CSV))
+
+    rows = [{"platform": "facebook", "spend": 5, "clicks": 1, "impressions": 200, "ctr": 0.5}] * 5
+    jsonl = "\n".join(json.dumps(r) for r in rows).encode()
+    assert strategy_service.analyze_performance_stream(io.BytesIO(jsonl))["rows_analyzed"] == 5
+
+
+def test_upload_size_limit_applies_after_decompression():
+    bomb = io.BytesIO(gzip.compress(b"platform,spend\n" + b"facebook,1\n" * 50_000))
+    with pytest.raises(strategy_service.UploadTooLarge):
+        strategy_service.analyze_performance_stream(bomb, "", max_bytes=64 * 1024)
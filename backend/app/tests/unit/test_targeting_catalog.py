@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the parsed, indexed targeting catalog."""
+
+import os
+
+from app import targeting_catalog
+from app.targeting_catalog import get_catalog, load_catalog, parse_size
+
+INTERESTS = """İlgi Alanları
+* Alışveriş ve moda
+   * Giyim (Büyüklük: 1,045,931 - 1,230,016)
+   * İç giyim (Büyüklük: 253,902,534 - 298,589,380)
+   * Ayakkabı (Büyüklük: 1000'den az)
+* Eğlence
+   * Oyunlar
+      * Kart oyunları (Büyüklük: Kullanılamıyor)
+"""
+
+
+def _files(tmp_path, interests=INTERESTS):
+    path = tmp_path / "interests.txt"
+    path.write_text(interests, encoding="utf-8")
+    return {"interests": path, "demographics": tmp_path / "yok.txt"}
+
+
+def test_parse_size():
+    assert parse_size("1,045,931 - 1,230,016") == (1045931, 1230016)
+    assert parse_size("1000'den az") == (0, 1000)
+    assert parse_size("Kullanılamıyor") == (None, None)
+    assert parse_size(None) == (None, None)
+
+
+def test_catalog_keeps_options_shape_and_paths(tmp_path):
+    catalog = load_catalog(_files(tmp_path))
+    options = catalog.options()
+    assert options["demographics"] == [] and options["behaviors"] == []
+    assert options["interests"][1] == {"label": "Giyim", "size": "1,045,931 - 1,230,016"}
+    card = catalog.by_category["interests"][-1]
+    assert card.label == "Kart oyunları" and card.path == ("Eğlence", "Oyunlar")
+
+
+def test_search_is_turkish_insensitive_and_filters_sizes(tmp_path):
+    catalog = load_catalog(_files(tmp_path))
+
+    total, items = catalog.search("giyim")
+    assert total == 2
+    # Etiketi sorguyla başlayan önce
+    assert [i.label for i in items] == ["Giyim", "İç giyim"]
+    assert [i.label for i in catalog.search("ic")[1]] == ["İç giyim"]
+    assert [i.label for i in catalog.search("AYAKKABI")[1]] == ["Ayakkabı"]
+
+    _, big = catalog.search("", min_size=100_000_000)
+    assert [i.label for i in big] == ["İç giyim"]
+    _, small = catalog.search("", max_size=5000)
+    assert [i.label for i in small] == ["Ayakkabı"]
+    assert catalog.search("yok böyle", category="interests") == (0, [])
+
+
+def test_get_catalog_reloads_when_file_changes(tmp_path, monkeypatch):
+    files = _files(tmp_path)
+    monkeypatch.setattr(targeting_catalog, "_source_files", lambda: files)
+    monkeypatch.setattr(targeting_catalog, "_current", None)
+
+    first = get_catalog()
+    assert get_catalog() is first
+
+    files["interests"].write_text(INTERESTS + "   * Çanta (Büyüklük: 10 - 20)\n", encoding="utf-8")
+    stat = files["interests"].stat()
+    os.utime(files["interests"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    reloaded = get_catalog()
+    assert reloaded is not first
+    assert [i.label for i in reloaded.search("canta")[1]] == ["Çanta"]
+
+
+def test_prompt_fragment_ranks_labels_by_context_and_caches_default(tmp_path):
+    catalog = load_catalog(_files(tmp_path))
+
+    default = catalog.prompt_fragment(cap=3)
+    assert catalog.prompt_fragment(cap=3) is default
+    assert "- Alışveriş ve moda\n- Giyim\n- İç giyim" in default
+    assert "Kart oyunları" not in default  # boyutu "Kullanılamıyor"
+    assert "### Davranışlar: (boş)" in default
+
+    ranked = catalog.prompt_fragment("Kadın ayakkabıları ve oyunlar satan mağaza", cap=3)
+    lines = [line for line in ranked.splitlines() if line.startswith("- ")]
+    assert lines[:2] == ["- Ayakkabı", "- Oyunlar"]
+    assert len(lines) == 3
+
+
+def test_prompt_fragment_never_exceeds_cap_across_categories(tmp_path):
+    files = _files(tmp_path)
+    behaviors = tmp_path / "behaviors.txt"
+    behaviors.write_text(
+        "Davranışlar\n" + "".join(f"* Davranış {i} (Büyüklük: 10 - 20)\n" for i in range(5)), encoding="utf-8"
+    )
+    demographics = tmp_path / "demographics.txt"
+    demographics.write_text(
+        "Demografik Bilgiler\n" + "".join(f"* Demografi {i} (Büyüklük: 10 - 20)\n" for i in range(4)), encoding="utf-8"
+    )
+    catalog = load_catalog({**files, "behaviors": behaviors, "demographics": demographics})
+
+    for cap in range(1, 16):
+        for context in ("", "giyim davranış"):
+            lines = [line for line in catalog.prompt_fragment(context, cap=cap).splitlines() if line.startswith("- ")]
+            assert len(lines) == min(cap, 15)
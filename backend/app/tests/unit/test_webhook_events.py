@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the Redis Streams webhook event log."""
+
+from collections import deque
+
+from app import webhook_events
+from app.webhook_events import append_webhook_events, read_webhook_events
+
+
+def _id_key(entry_id):
+    ms, seq = entry_id.split("-")
+    return int(ms), int(seq)
+
+
+class FakeStreamPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def xadd(self, *args, **kwargs):
+        self.ops.append((args, kwargs))
+
+    def execute(self):
+        return [self.redis.xadd(*args, **kwargs) for args, kwargs in self.ops]
+
+
+class FakeStreamRedis:
+    """Minimal XADD/XRANGE/XREVRANGE/XLEN implementation (exact trimming)."""
+
+    def __init__(self):
+        self.streams = {}
+        self.seq = 0
+
+    def pipeline(self, transaction=True):
+        return FakeStreamPipeline(self)
+
+    def xadd(self, name, fields, maxlen=None, approximate=True):
+        self.seq += 1
+        entry_id = f"1000-{self.seq}"
+        stream = self.streams.setdefault(name, [])
+        stream.append((entry_id.encode(), {k.encode(): v.encode() for k, v in fields.items()}))
+        if maxlen is not None:
+            del stream[:-maxlen]
+        return entry_id
+
+    def _select(self, name, low, high):
+        def bound(value, default):
+            if value in ("-", "+"):
+                return default, False
+            if value.startswith("("):
+                return _id_key(value[1:]), True
+            return _id_key(value), False
+
+        (lo, lo_ex), (hi, hi_ex) = bound(low, (0, 0)), bound(high, (10**18, 0))
+        out = []
+        for entry_id, fields in self.streams.get(name, []):
+            key = _id_key(entry_id.decode())
+            if (key > lo or (not lo_ex and key == lo)) and (key < hi or (not hi_ex and key == hi)):
+                out.append((entry_id, fields))
+        return out
+
+    def xrange(self, name, min="-", max="+", count=None):
+        return self._select(name, min, max)[:count]
+
+    def xrevrange(self, name, max="+", min="-", count=None):
+        return list(reversed(self._select(name, min, max)))[:count]
+
+    def xlen(self, name):
+        return len(self.streams.get(name, []))
+
+
+def _event(i, object_type="campaigns"):
+    return {"object_type": object_type, "object_id": f"campaign_{i}", "field": "status", "value": {"status": "PAUSED"}}
+
+
+class TestWebhookEventLog:
+    """Events go to the main stream and a per-object-type stream, read with cursors."""
+
+    def test_append_and_cursor_pagination(self, monkeypatch):
+        fake = FakeStreamRedis()
+        monkeypatch.setattr(webhook_events, "get_redis_client", lambda: fake)
+
+        assert append_webhook_events([_event(i) for i in range(5)] + [_event(9, "adsets")]) is True
+
+        page = read_webhook_events(limit=2, object_type="campaigns")
+        assert [e["object_id"] for e in page["events"]] == ["campaign_3", "campaign_4"]
+        assert page["total_stored"] == 5
+
+        older = read_webhook_events(limit=2, object_type="campaigns", before=page["next_cursor"])
+        assert [e["object_id"] for e in older["events"]] == ["campaign_1", "campaign_2"]
+
+        newer = read_webhook_events(limit=10, after=older["events"][-1]["stream_id"])
+        assert [e["object_id"] for e in newer["events"]] == ["campaign_3", "campaign_4", "campaign_9"]
+        assert newer["next_cursor"] is None
+
+    def test_streams_are_capped(self, monkeypatch):
+        fake = FakeStreamRedis()
+        monkeypatch.setattr(webhook_events, "get_redis_client", lambda: fake)
+        monkeypatch.setattr(webhook_events.config, "WEBHOOK_EVENTS_MAXLEN", 3)
+
+        append_webhook_events([_event(i) for i in range(10)])
+
+        assert fake.xlen(webhook_events.WEBHOOK_STREAM) == 3
+        assert fake.xlen(webhook_events.object_stream("campaigns")) == 3
+
+    def test_without_redis_uses_bounded_local_log(self, monkeypatch):
+        monkeypatch.setattr(webhook_events, "get_redis_client", lambda: None)
+        monkeypatch.setattr(webhook_events, "_local_events", deque(maxlen=3))
+
+        assert append_webhook_events([_event(i) for i in range(4)] + [_event(7, "ads")]) is False
+
+        result = read_webhook_events(limit=10, object_type="campaigns")
+        assert [e["object_id"] for e in result["events"]] == ["campaign_2", "campaign_3"]
+        assert result["total_stored"] == 3
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the acknowledge-then-process webhook pipeline."""
+
+import json
+
+import pytest
+
+from app import webhook_events
+from app.routers import webhooks
+
+
+class FakeSeenPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def set(self, key, value, nx=False, ex=None):
+        self.ops.append(key)
+
+    def execute(self):
+        results = []
+        for key in self.ops:
+            results.append(None if key in self.redis.keys else True)
+            self.redis.keys.add(key)
+        return results
+
+
+class FakeSeenRedis:
+    def __init__(self):
+        self.keys = set()
+
+    def pipeline(self, transaction=False):
+        return FakeSeenPipeline(self)
+
+    def delete(self, *keys):
+        self.keys.difference_update(keys)
+
+
+def _body(entry_id, time_unix, campaign_id="10"):
+    return json.dumps({
+        "object": "ads",
+        "entry": [{
+            "id": entry_id,
+            "time": time_unix,
+            "changes": [{"field": "status", "value": {"campaign_id": campaign_id, "status": "PAUSED"}}],
+        }],
+    }).encode()
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    fake = FakeSeenRedis()
+    processed, logged = [], []
+
+    async def fake_process(events):
+        processed.extend(events)
+
+    monkeypatch.setattr(webhook_events, "get_redis_client", lambda: fake)
+    monkeypatch.setattr(webhooks, "process_webhook_events", fake_process)
+    monkeypatch.setattr(webhooks, "append_webhook_events", lambda events: logged.extend(events))
+    return fake, processed, logged
+
+
+class TestProcessWebhookPayloads:
+    """Redeliveries are dropped by entry id + time; bad bodies are skipped."""
+
+    async def test_duplicates_and_invalid_bodies(self, pipeline):
+        _, processed, logged = pipeline
+
+        stats = await webhooks.process_webhook_payloads([
+            _body("act_1", 100),
+            _body("act_1", 100),  # aynı batch içinde yeniden gönderim
+            _body("act_1", 101),
+            b"not json",
+            json.dumps({"object": "page", "entry": []}).encode(),
+        ])
+        again = await webhooks.process_webhook_payloads([_body("act_1", 101)])
+
+        assert stats == {"payloads": 5, "invalid": 2, "duplicates": 1, "events": 2}
+        assert again["duplicates"] == 1 and again["events"] == 0
+        assert [e["entry_key"] for e in processed] == ["act_1:100", "act_1:101"]
+        assert logged == processed
+
+    async def test_failed_batch_can_be_redelivered(self, pipeline, monkeypatch):
+        fake, processed, _ = pipeline
+
+        async def broken(events):
+            raise RuntimeError("downstream down")
+
+        monkeypatch.setattr(webhooks, "process_webhook_events", broken)
+        with pytest.raises(RuntimeError):
+            await webhooks.process_webhook_payloads([_body("act_1", 200)])
+        assert fake.keys == set()
+
+
+class FakeConsumerPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def xpending_range(self, name, groupname, min, max, count):
+        self.ops.append(min)
+
+    async def execute(self):
+        return [[{"message_id": i, "times_delivered": self.redis.pending[i]}] if i in self.redis.pending else []
+                for i in self.ops]
+
+
+class FakeConsumerRedis:
+    """Consumer-group subset: XREADGROUP/XAUTOCLAIM/XPENDING/XACK/XADD with delivery counts (idle time ignored)."""
+
+    def __init__(self, bodies):
+        self.entries = [(f"1-{i}".encode(), {b"body": body}) for i, body in enumerate(bodies)]
+        self.delivered = False
+        self.pending = {}
+        self.dead = []
+
+    async def xreadgroup(self, group, consumer, streams, count=None, block=None):
+        if self.delivered:
+            return []
+        self.delivered = True
+        for entry_id, _ in self.entries:
+            self.pending[entry_id] = 1
+        return [(webhook_events.WEBHOOK_INGEST_STREAM.encode(), list(self.entries))]
+
+    async def xautoclaim(self, name, group, consumer, min_idle_time, start_id="0-0", count=None):
+        claimed = [(i, f) for i, f in self.entries if i in self.pending][:count]
+        for entry_id, _ in claimed:
+            self.pending[entry_id] += 1
+        return b"0-0", claimed, []
+
+    def pipeline(self, transaction=False):
+        return FakeConsumerPipeline(self)
+
+    async def xack(self, name, group, *ids):
+        for entry_id in ids:
+            self.pending.pop(entry_id, None)
+
+    async def xadd(self, name, fields, maxlen=None, approximate=True):
+        assert name == webhook_events.WEBHOOK_DEAD_LETTER_STREAM
+        self.dead.append(fields)
+
+
+class TestConsumeWebhookPayloads:
+    """A failing batch is retried entry by entry; a poison entry ends up in the dead-letter stream."""
+
+    async def test_poison_entry_is_isolated_and_dead_lettered(self):
+        redis = FakeConsumerRedis([b"ok-1", b"poison", b"ok-2"])
+        calls, handled = [], []
+
+        async def handler(bodies):
+            calls.append(bodies)
+            if b"poison" in bodies:
+                raise RuntimeError("cannot process")
+            handled.extend(bodies)
+
+        with pytest.raises(RuntimeError):
+            await webhook_events._consume_once(redis, handler, "c1", 100, 0)
+        assert len(redis.pending) == 3
+
+        await webhook_events._consume_once(redis, handler, "c1", 100, 0)
+        assert handled == [b"ok-1", b"ok-2"]
+        assert list(redis.pending) == [b"1-1"]
+
+        for _ in range(webhook_events.WEBHOOK_MAX_DELIVERIES):
+            await webhook_events._consume_once(redis, handler, "c1", 100, 0)
+        assert redis.pending == {}
+        assert [d["body"] for d in redis.dead] == [b"poison"]
+        assert redis.dead[0]["deliveries"] == webhook_events.WEBHOOK_MAX_DELIVERIES
+        # İlk batch + 2..(MAX-1). teslimler; MAX. teslimde handler çağrılmadan taşınır
+        assert sum(b"poison" in c for c in calls) == webhook_events.WEBHOOK_MAX_DELIVERIES - 1
+        assert handled == [b"ok-1", b"ok-2"]
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""Webhook alımı ve olay günlüğü (Redis Streams).
+
+Alım (ingest): Meta callback'i imzayı doğruladıktan sonra ham gövdeyi
+webhook_ingest stream'ine ekler ve hemen 200 döner. Arka plan tüketicisi bu
+stream'i consumer group ile toplu okur; gövdeleri ayrıştırır, Meta'nın yeniden
+gönderimlerini entry id + zaman anahtarıyla eler ve olayları işler. İşlenemeyen
+kayıtlar ACK'lenmez; süre aşımından sonra devralınır ve tek tek yeniden denenir.
+WEBHOOK_MAX_DELIVERIES teslimden sonra hâlâ işlenemeyen kayıt dead-letter
+stream'ine taşınıp ACK'lenir.
+
+Olay günlüğü: Her olay ana stream'e ve nesne tipine göre ikincil bir stream'e
+(XADD MAXLEN ~) eklenir; /events okuması nesne tipine göre doğrudan ikincil
+stream'den, cursor (stream id) ile sayfalanarak yapılır.
+
+Redis yoksa olaylar süreç içi sınırlı bir deque'de tutulur ve istek içinde
+işlenir (geliştirme ortamı).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+from app import config
+from app.cache import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_STREAM = "webhook_events"
+WEBHOOK_INGEST_STREAM = "webhook_ingest"
+WEBHOOK_CONSUMER_GROUP = "webhook_processors"
+WEBHOOK_SEEN_PREFIX = "webhook_seen"
+# Meta yeniden gönderimleri bu süre içinde tekrar işlenmez
+WEBHOOK_DEDUP_TTL = 60 * 60 * 24
+# Bu süreden uzun süredir ACK'lenmemiş olaylar başka tüketici tarafından devralınır
+WEBHOOK_CLAIM_IDLE_MS = 60_000
+# Bu kadar teslimden sonra işlenemeyen kayıtlar dead-letter stream'ine taşınır
+WEBHOOK_MAX_DELIVERIES = 5
+WEBHOOK_DEAD_LETTER_STREAM = f"{WEBHOOK_INGEST_STREAM}:dead"
+
+# Redis yokken kullanılan süreç içi günlük (O(1) ekleme/kırpma)
+_local_events: "deque[dict[str, Any]]" = deque(maxlen=config.WEBHOOK_EVENTS_MAXLEN)
+
+PayloadHandler = Callable[[list[bytes]], Awaitable[Any]]
+
+
+def object_stream(object_type: str) -> str:
+    """Nesne tipine göre ikincil stream adı."""
+    return f"{WEBHOOK_STREAM}:{object_type}"
+
+
+def _decode(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _entry_to_event(entry_id: Any, fields: dict) -> Optional[dict[str, Any]]:
+    raw = fields.get(b"data") if b"data" in fields else fields.get("data")
+    try:
+        event = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    event["stream_id"] = _decode(entry_id)
+    return event
+
+
+def append_webhook_events(events: list[dict[str, Any]]) -> bool:
+    """Olayları ana ve nesne tipi stream'lerine ekler. Redis'e yazılamazsa False döner.
+
+    Redis yoksa olaylar yalnızca süreç içi günlüğe yazılır; çağıran bu durumda
+    olayları kendisi işlemelidir.
+    """
+    if not events:
+        return True
+    client = get_redis_client()
+    if client:
+        maxlen = config.WEBHOOK_EVENTS_MAXLEN
+        try:
+            pipe = client.pipeline(transaction=False)
+            for event in events:
+                payload = {"data": json.dumps(event, ensure_ascii=False, default=str)}
+                pipe.xadd(WEBHOOK_STREAM, payload, maxlen=maxlen, approximate=True)
+                pipe.xadd(object_stream(event.get("object_type") or "unknown"), payload, maxlen=maxlen, approximate=True)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning("Webhook olayları stream'e yazılamadı: %s", e)
+    _local_events.extend(events)
+    return False
+
+
+def enqueue_webhook_payload(body: bytes) -> bool:
+    """Ham webhook gövdesini alım stream'ine ekler. Redis yoksa/yazılamazsa False döner."""
+    client = get_redis_client()
+    if not client:
+        return False
+    try:
+        client.xadd(WEBHOOK_INGEST_STREAM, {"body": body}, maxlen=config.WEBHOOK_EVENTS_MAXLEN, approximate=True)
+        return True
+    except Exception as e:
+        logger.warning("Webhook gövdesi kuyruğa alınamadı: %s", e)
+        return False
+
+
+def mark_entries_seen(keys: list[str]) -> list[bool]:
+    """Her anahtar için ilk kez mi görüldüğünü döner (SET NX + TTL). Redis yoksa hepsi yeni sayılır."""
+    if not keys:
+        return []
+    client = get_redis_client()
+    if not client:
+        return [True] * len(keys)
+    try:
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.set(f"{WEBHOOK_SEEN_PREFIX}:{key}", "1", nx=True, ex=WEBHOOK_DEDUP_TTL)
+        return [bool(result) for result in pipe.execute()]
+    except Exception as e:
+        logger.warning("Webhook tekrar kontrolü yapılamadı: %s", e)
+        return [True] * len(keys)
+
+
+def forget_entries(keys: list[str]) -> None:
+    """İşlenemeyen entry'lerin tekrar anahtarlarını siler (yeniden teslimde tekrar işlensinler)."""
+    client = get_redis_client()
+    if not client or not keys:
+        return
+    try:
+        client.delete(*[f"{WEBHOOK_SEEN_PREFIX}:{key}" for key in keys])
+    except Exception as e:
+        logger.warning("Webhook tekrar anahtarları silinemedi: %s", e)
+
+
+def read_webhook_events(
+    limit: int = 50,
+    object_type: Optional[str] = None,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+) -> dict[str, Any]:
+    """Olay günlüğünü cursor ile okur.
+
+    before: bu id'den eski olaylar (geriye sayfalama), after: bu id'den yeni olaylar (yeni olayları izleme).
+    Olaylar kronolojik sırada döner; next_cursor sonraki (daha eski) sayfa için before değeridir.
+    """
+    client = get_redis_client()
+    if not client:
+        events = [e for e in _local_events if not object_type or e.get("object_type") == object_type]
+        return {"events": events[-limit:], "next_cursor": None, "total_stored": len(_local_events)}
+
+    stream = object_stream(object_type) if object_type else WEBHOOK_STREAM
+    try:
+        if after:
+            entries = client.xrange(stream, min=f"({after}", max="+", count=limit)
+        else:
+            entries = list(reversed(client.xrevrange(stream, max=f"({before}" if before else "+", min="-", count=limit)))
+        total = client.xlen(stream)
+    except Exception as e:
+        logger.warning("Webhook olayları okunamadı: %s", e)
+        return {"events": [], "next_cursor": None, "total_stored": 0}
+
+    events = [e for e in (_entry_to_event(entry_id, fields) for entry_id, fields in entries) if e is not None]
+    next_cursor = events[0]["stream_id"] if events and not after and len(entries) == limit else None
+    return {"events": events, "next_cursor": next_cursor, "total_stored": total}
+
+
+def _consumer_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+async def _ensure_consumer_group(client) -> None:
+    import redis
+
+    try:
+        await client.xgroup_create(WEBHOOK_INGEST_STREAM, WEBHOOK_CONSUMER_GROUP, id="0", mkstream=True)
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def _ack(client, entry_ids: list) -> None:
+    if entry_ids:
+        await client.xack(WEBHOOK_INGEST_STREAM, WEBHOOK_CONSUMER_GROUP, *entry_ids)
+
+
+async def _delivery_counts(client, entry_ids: list) -> dict:
+    """Devralınan kayıtların teslim sayıları (XPENDING times_delivered)."""
+    pipe = client.pipeline(transaction=False)
+    for entry_id in entry_ids:
+        pipe.xpending_range(WEBHOOK_INGEST_STREAM, WEBHOOK_CONSUMER_GROUP, min=entry_id, max=entry_id, count=1)
+    counts = {}
+    for entry_id, pending in zip(entry_ids, await pipe.execute()):
+        counts[entry_id] = pending[0]["times_delivered"] if pending else 0
+    return counts
+
+
+async def _retry_claimed(client, handler: PayloadHandler, entries: list) -> None:
+    """Devralınan kayıtları tek tek yeniden dener; hatalı bir gövde diğerlerini bekletmez.
+
+    Teslim sayısı WEBHOOK_MAX_DELIVERIES'e ulaşan kayıt işlenmeden dead-letter stream'ine
+    taşınır ve ACK'lenir.
+    """
+    counts = await _delivery_counts(client, [entry_id for entry_id, _ in entries])
+    for entry_id, fields in entries:
+        body = fields.get(b"body") if fields else None
+        if body is None:
+            await _ack(client, [entry_id])
+            continue
+        deliveries = counts.get(entry_id, 0)
+        if deliveries >= WEBHOOK_MAX_DELIVERIES:
+            await client.xadd(
+                WEBHOOK_DEAD_LETTER_STREAM,
+                {"body": body, "entry_id": entry_id, "deliveries": deliveries},
+                maxlen=config.WEBHOOK_EVENTS_MAXLEN, approximate=True,
+            )
+            await _ack(client, [entry_id])
+            logger.error("Webhook kaydı %s %d teslimden sonra dead-letter'a taşındı", _decode(entry_id), deliveries)
+            continue
+        try:
+            await handler([body])
+        except Exception as e:
+            logger.warning("Webhook kaydı %s yeniden işlenemedi (%d. teslim): %s", _decode(entry_id), deliveries, e)
+            continue
+        await _ack(client, [entry_id])
+
+
+async def _consume_once(client, handler: PayloadHandler, consumer: str, batch_size: int, block_ms: int) -> None:
+    """Bir tur: önce süre aşımına uğramış kayıtları devralıp dener, yoksa yeni kayıtları toplu işler."""
+    # Önce çökmüş tüketicilerden kalan veya işlenemeyen (ACK'lenmemiş) kayıtları devral
+    _, entries, _ = await client.xautoclaim(
+        WEBHOOK_INGEST_STREAM, WEBHOOK_CONSUMER_GROUP, consumer,
+        min_idle_time=WEBHOOK_CLAIM_IDLE_MS, start_id="0-0", count=batch_size,
+    )
+    if entries:
+        await _retry_claimed(client, handler, entries)
+        return
+    response = await client.xreadgroup(
+        WEBHOOK_CONSUMER_GROUP, consumer, {WEBHOOK_INGEST_STREAM: ">"},
+        count=batch_size, block=block_ms,
+    )
+    entries = response[0][1] if response else []
+    if not entries:
+        return
+    bodies = [fields[b"body"] for _, fields in entries if fields and b"body" in fields]
+    if bodies:
+        # Hata durumunda batch ACK'lenmez; kayıtlar devralındığında tek tek denenir
+        await handler(bodies)
+    await _ack(client, [entry_id for entry_id, _ in entries])
+
+
+async def consume_webhook_payloads(
+    handler: PayloadHandler,
+    batch_size: int = 100,
+    block_ms: int = 5000,
+    consumer: Optional[str] = None,
+) -> None:
+    """Alım stream'ini consumer group ile okuyup ham gövdeleri handler'a toplu verir.
+
+    Handler hata vermezse batch ACK'lenir. İptal edilene kadar çalışır
+    (uygulama lifespan'inde arka plan görevi olarak başlatılır).
+    """
+    if not config.CACHE_ENABLED or get_redis_client() is None:
+        return
+    import redis.asyncio as aioredis
+
+    consumer = consumer or _consumer_name()
+    client = aioredis.from_url(config.REDIS_URL, decode_responses=False, socket_connect_timeout=5)
+    try:
+        await _ensure_consumer_group(client)
+        while True:
+            try:
+                await _consume_once(client, handler, consumer, batch_size, block_ms)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Webhook tüketici hatası: %s", e)
+                await asyncio.sleep(1)
+    finally:
+        try:
+            await client.aclose()
+        except Exception:
+            pass
@@ -560,7 +560,7 @@ export const api = {
     const params = new URLSearchParams();
     if (limit) params.set("limit", String(limit));
     if (objectType) params.set("object_type", objectType);
-    return apiFetch<{ events: WebhookEvent[]; total_stored: number }>(`/api/webhooks/events?${params}`);
+    return apiFetch<{ events: WebhookEvent[]; next_cursor: string | null; total_stored: number }>(`/api/webhooks/events?${params}`);
   },
 
   testWebhookDelivery: (body: {
@@ -804,6 +804,7 @@ export interface WebhookEvent {
   field: string;
   value: Record<string, unknown>;
   time: string;
+  stream_id?: string;
 }
 
 // Scheduled Report Types